@@ -13,7 +13,18 @@ from app.routes.wardrobe import init_wardrobe_routes
 from app.routes.recommendations import init_recommendation_routes
 from app.routes.trips import init_trip_routes
 from app.routes.interactions import init_interaction_routes
+from app.routes.jobs import init_job_routes
+from app.routes.metrics import init_metrics_routes
+from app.routes.dashboard import init_dashboard_routes
+from app.routes.batch import init_batch_routes
+from app.routes.account import init_account_routes
 from app.services.text_transformations import TextTransformationsService
+from app.services.idempotency import IdempotencyService, InMemoryIdempotencyStore, DynamoDBIdempotencyStore
+from app.services.jobs import JobsService, InMemoryJobStore, DynamoDBJobStore
+from app.services.feedback_ranker import FeedbackRanker, InMemoryAffinityStore, DynamoDBAffinityStore
+from app.services.dashboard import DashboardService
+from app.services.account import AccountService
+from app.services.interaction_archive import InteractionArchive
 
 
 oauth = OAuth()
@@ -39,16 +50,44 @@ def create_app(dynamoDBClient=DynamoDBClient(), google=None):
     rate_limit_service = RateLimitService(dynamoDBClient)
     llm_service = LLMService(rate_limit_service)
     wardrobe_service = WardrobeService(dynamoDBClient)
-    recommendations_service = RecommendationsService(llm_service, wardrobe_service)
-    interactions_service = InteractionsService(dynamoDBClient)
+    feedback_ranker = None
+    if Config.FEEDBACK_RANKER_ENABLED:
+        if Config.FEEDBACK_AFFINITY_STORE == 'dynamodb':
+            affinity_store = DynamoDBAffinityStore(dynamoDBClient)
+        else:
+            affinity_store = InMemoryAffinityStore()
+        feedback_ranker = FeedbackRanker(affinity_store)
+    recommendations_service = RecommendationsService(llm_service, wardrobe_service, feedback_ranker=feedback_ranker)
+    interactions_service = InteractionsService(dynamoDBClient, feedback_ranker=feedback_ranker)
     trips_service = TripsService(dynamoDBClient)
     text_transformations_service = TextTransformationsService(llm_service)
+    if Config.IDEMPOTENCY_STORE == 'dynamodb':
+        idempotency_store = DynamoDBIdempotencyStore(dynamoDBClient)
+    else:
+        idempotency_store = InMemoryIdempotencyStore()
+    idempotency_service = IdempotencyService(idempotency_store)
+    if Config.JOB_STORE == 'dynamodb':
+        job_store = DynamoDBJobStore(dynamoDBClient)
+    else:
+        job_store = InMemoryJobStore()
+    jobs_service = JobsService(job_store)
+    dashboard_service = DashboardService(wardrobe_service, trips_service, interactions_service)
+    account_service = AccountService(dynamoDBClient, wardrobe_service, trips_service, interactions_service,
+                                      rate_limit_service, feedback_ranker=feedback_ranker,
+                                      interaction_archive=InteractionArchive(Config.INTERACTION_ARCHIVE_DIR),
+                                      idempotency_service=idempotency_service, jobs_service=jobs_service)
 
     # Initialize routes
     init_auth_routes(app, google)
-    init_wardrobe_routes(app, wardrobe_service)
-    init_recommendation_routes(app, recommendations_service, interactions_service, trips_service, text_transformations_service)
+    init_wardrobe_routes(app, wardrobe_service, jobs_service=jobs_service)
+    init_recommendation_routes(app, recommendations_service, interactions_service, trips_service, text_transformations_service,
+                               idempotency_service=idempotency_service, jobs_service=jobs_service)
     init_trip_routes(app, trips_service)
-    init_interaction_routes(app, interactions_service)
+    init_interaction_routes(app, interactions_service, jobs_service=jobs_service)
+    init_job_routes(app, jobs_service)
+    init_dashboard_routes(app, dashboard_service)
+    init_batch_routes(app, wardrobe_service)
+    init_account_routes(app, account_service, jobs_service=jobs_service)
+    init_metrics_routes(app)
 
     return app
\ No newline at end of file
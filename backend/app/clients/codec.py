@@ -0,0 +1,157 @@
+import json
+import zlib
+from decimal import Decimal
+from boto3.dynamodb.types import Binary
+from app.config import Config
+
+# Encoded values are MAGIC + format version + compression, then the compressed JSON
+MAGIC = b'DZ'
+FORMAT_VERSION = 1
+ZLIB = 1
+HEADER_SIZE = len(MAGIC) + 2
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        # Fractions go through float's shortest repr, which reads back as the same Decimal
+        # for anything up to 15 significant digits
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"{type(value).__name__} can't be stored compressed")
+
+def _raw(value):
+    """The bytes of a stored binary attribute, or None if it isn't one."""
+    if isinstance(value, Binary):
+        return value.value
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    return None
+
+def is_encoded(value) -> bool:
+    raw = _raw(value)
+    return raw is not None and raw[:len(MAGIC)] == MAGIC and len(raw) > HEADER_SIZE
+
+def decode_value(value):
+    """The map or list an encoded attribute holds, with numbers as Decimal as DynamoDB returns them."""
+    raw = _raw(value)
+    version, compression = raw[len(MAGIC)], raw[len(MAGIC) + 1]
+    if version != FORMAT_VERSION or compression != ZLIB:
+        raise ValueError(f"Unknown compressed attribute format {version}/{compression}")
+    return json.loads(zlib.decompress(raw[HEADER_SIZE:]), parse_float=Decimal, parse_int=Decimal)
+
+class LazyItem(dict):
+    """
+    An item read from DynamoDB whose compressed attributes are decompressed the
+    first time they're accessed, then kept decoded. Reads that never touch them
+    (e.g. listing IDs or dates) skip the decompression.
+    """
+
+    def __init__(self, item: dict, encoded: set):
+        super().__init__(item)
+        self._encoded = set(encoded)
+
+    def _decode(self, key) -> None:
+        if key in self._encoded:
+            dict.__setitem__(self, key, decode_value(dict.__getitem__(self, key)))
+            self._encoded.discard(key)
+
+    def _decode_all(self) -> None:
+        for key in list(self._encoded):
+            self._decode(key)
+
+    def __getitem__(self, key):
+        self._decode(key)
+        return dict.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        self._encoded.discard(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._encoded.discard(key)
+        dict.__delitem__(self, key)
+
+    def __iter__(self):
+        # Iteration-based copies ({**item}, dict(item)) then look each value up
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        self._decode_all()
+        return dict.__eq__(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._decode_all()
+        return dict.__repr__(self)
+
+    def get(self, key, default=None):
+        self._decode(key)
+        return dict.get(self, key, default)
+
+    def pop(self, key, *default):
+        self._decode(key)
+        self._encoded.discard(key)
+        return dict.pop(self, key, *default)
+
+    def setdefault(self, key, default=None):
+        self._decode(key)
+        return dict.setdefault(self, key, default)
+
+    def items(self):
+        self._decode_all()
+        return dict.items(self)
+
+    def values(self):
+        self._decode_all()
+        return dict.values(self)
+
+    def copy(self) -> dict:
+        self._decode_all()
+        return dict(dict.items(self))
+
+class AttributeCodec:
+    """
+    Stores large map and list attributes as tagged, compressed binary, and turns
+    them back into maps and lists on read. Only the named attributes are encoded,
+    and only above min_bytes of JSON; everything else is stored as before.
+    """
+
+    def __init__(self, attributes=None, min_bytes: int = None, enabled: bool = None, level: int = 6):
+        self.attributes = frozenset(Config.STORAGE_COMPRESSED_ATTRIBUTES if attributes is None else attributes)
+        self.min_bytes = Config.STORAGE_COMPRESSION_MIN_BYTES if min_bytes is None else min_bytes
+        self.enabled = Config.STORAGE_COMPRESSION_ENABLED if enabled is None else enabled
+        self.level = level
+
+    def encode_value(self, value) -> bytes:
+        """The value as tagged, compressed bytes, or None if it is too small to be worth it."""
+        serialized = json.dumps(value, default=_json_default, separators=(',', ':'), sort_keys=True).encode()
+        if len(serialized) < self.min_bytes:
+            return None
+        compressed = zlib.compress(serialized, self.level)
+        if len(compressed) + HEADER_SIZE >= len(serialized):
+            return None
+        return MAGIC + bytes((FORMAT_VERSION, ZLIB)) + compressed
+
+    def encode(self, item: dict) -> dict:
+        """A copy of item ready to store, with large configured attributes compressed."""
+        if not self.enabled:
+            return item
+        encoded = None
+        for name in self.attributes:
+            value = item.get(name)
+            if not isinstance(value, (dict, list)):
+                continue
+            compressed = self.encode_value(value)
+            if compressed is not None:
+                if encoded is None:
+                    encoded = dict(item)
+                encoded[name] = compressed
+        return item if encoded is None else encoded
+
+    def decode(self, item: dict) -> dict:
+        """The item as read, wrapped to decompress its encoded attributes on access if it has any."""
+        if not item:
+            return item
+        encoded = {name for name, value in item.items() if is_encoded(value)}
+        return LazyItem(item, encoded) if encoded else item
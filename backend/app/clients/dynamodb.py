@@ -1,5 +1,9 @@
+import time
 import boto3
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.types import TypeDeserializer
 from botocore.exceptions import ClientError
+from app.clients.codec import AttributeCodec
 from app.config import Config
 import logging
 
@@ -9,8 +13,38 @@ class DynamoDBError(Exception):
     """Base exception for DynamoDB related errors"""
     pass
 
+class ConditionalCheckFailedError(DynamoDBError):
+    """Exception raised when a conditional write is rejected by DynamoDB"""
+
+    def __init__(self, message: str, item: dict = None):
+        super().__init__(message)
+        # The item as it was, when the write asked for it on failure
+        self.item = item
+
+def _is_conditional_check_failure(error: Exception) -> bool:
+    return (isinstance(error, ClientError)
+            and error.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException')
+
+def _is_cancelled_by_condition(error: Exception) -> bool:
+    if not isinstance(error, ClientError) or error.response.get('Error', {}).get('Code') != 'TransactionCanceledException':
+        return False
+    reasons = error.response.get('CancellationReasons', [])
+    return any(reason.get('Code') == 'ConditionalCheckFailed' for reason in reasons)
+
+def projection(attributes) -> tuple:
+    """A ProjectionExpression and its ExpressionAttributeNames for a list of attribute names."""
+    names = {f'#p{index}': name for index, name in enumerate(attributes)}
+    return ', '.join(names), names
+
+# Writes per BatchWriteItem request, and attempts at the items DynamoDB leaves unprocessed
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_MAX_ATTEMPTS = 6
+BATCH_WRITE_BASE_DELAY_SECONDS = 0.05
+
 class DynamoDBClient:
-    def __init__(self):
+    def __init__(self, codec: AttributeCodec = None):
+        # Compresses large recommendation attributes on write and decodes them on read
+        self.codec = codec or AttributeCodec()
         self.client = boto3.resource(
             'dynamodb',
             aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
@@ -22,13 +56,29 @@ class DynamoDBClient:
         """Get a DynamoDB table by name"""
         return self.client.Table(table_name)
     
-    def put_item(self, table_name: str, item: dict) -> bool:
-        """Put an item in a DynamoDB table"""
+    def put_item(self, table_name: str, item: dict, condition_expression: str = None,
+                 expression_attribute_names: dict = None, expression_attribute_values: dict = None) -> bool:
+        """
+        Put an item in a DynamoDB table
+
+        Raises:
+            ConditionalCheckFailedError: If condition_expression is given and does not hold
+            DynamoDBError: For any other error
+        """
         try:
             table = self.get_table(table_name)
-            table.put_item(Item=item)
+            put_params = {'Item': self.codec.encode(item)}
+            if condition_expression is not None:
+                put_params['ConditionExpression'] = condition_expression
+            if expression_attribute_names:
+                put_params['ExpressionAttributeNames'] = expression_attribute_names
+            if expression_attribute_values:
+                put_params['ExpressionAttributeValues'] = expression_attribute_values
+            table.put_item(**put_params)
             return True
         except (ClientError, Exception) as e:
+            if _is_conditional_check_failure(e):
+                raise ConditionalCheckFailedError(f"Condition failed putting item in {table_name}")
             logger.error(f"Error putting item in {table_name}: {str(e)}", exc_info=True)
             raise DynamoDBError(f"Failed to put item in {table_name}: {str(e)}")
     
@@ -37,24 +87,57 @@ class DynamoDBClient:
         try:
             table = self.get_table(table_name)
             response = table.get_item(Key=key)
+            if 'Item' in response:
+                response['Item'] = self.codec.decode(response['Item'])
             return response
         except (ClientError, Exception) as e:
             logger.error(f"Error getting item from {table_name}: {str(e)}", exc_info=True)
             raise DynamoDBError(f"Failed to get item from {table_name}: {str(e)}")
     
-    def update_item(self, table_name: str, key: dict, update_expression: str, 
-                   expression_attribute_names: dict, expression_attribute_values: dict) -> bool:
-        """Update an item in a DynamoDB table"""
+    def update_item(self, table_name: str, key: dict, update_expression: str,
+                   expression_attribute_names: dict, expression_attribute_values: dict,
+                   return_values: str = None, condition_expression: str = None,
+                   return_item_on_condition_failure: bool = False):
+        """
+        Update an item in a DynamoDB table
+
+        Args:
+            return_values (str): DynamoDB ReturnValues (e.g. ALL_OLD, ALL_NEW); when
+                given, the returned attributes are returned instead of True
+            condition_expression (str): A condition the item must meet to be updated
+            return_item_on_condition_failure (bool): Whether a failed condition returns
+                the item as it was, on the error, saving a read to find out why
+
+        Raises:
+            ConditionalCheckFailedError: If condition_expression is given and does not hold
+            DynamoDBError: For any other error
+        """
         try:
             table = self.get_table(table_name)
-            table.update_item(
-                Key=key,
-                UpdateExpression=update_expression,
-                ExpressionAttributeNames=expression_attribute_names,
-                ExpressionAttributeValues=expression_attribute_values
-            )
+            update_params = {
+                'Key': key,
+                'UpdateExpression': update_expression,
+                'ExpressionAttributeNames': expression_attribute_names,
+                'ExpressionAttributeValues': expression_attribute_values
+            }
+            if return_values is not None:
+                update_params['ReturnValues'] = return_values
+            if condition_expression is not None:
+                update_params['ConditionExpression'] = condition_expression
+            if return_item_on_condition_failure:
+                update_params['ReturnValuesOnConditionCheckFailure'] = 'ALL_OLD'
+            response = table.update_item(**update_params)
+            if return_values is not None:
+                return self.codec.decode(response.get('Attributes', {}))
             return True
         except (ClientError, Exception) as e:
+            if _is_conditional_check_failure(e):
+                item = None
+                if return_item_on_condition_failure:
+                    deserializer = TypeDeserializer()
+                    old = e.response.get('Item') or {}
+                    item = self.codec.decode({name: deserializer.deserialize(value) for name, value in old.items()})
+                raise ConditionalCheckFailedError(f"Condition failed updating item in {table_name}", item=item)
             logger.error(f"Error updating item in {table_name}: {str(e)}", exc_info=True)
             raise DynamoDBError(f"Failed to update item in {table_name}: {str(e)}")
     
@@ -70,7 +153,8 @@ class DynamoDBClient:
     
     def query(self, table_name: str, key_condition_expression: str, 
              expression_attribute_values: dict, scan_index_forward: bool = True,
-             limit: int = None) -> dict:
+             limit: int = None, exclusive_start_key: dict = None,
+             projection_expression: str = None, expression_attribute_names: dict = None) -> dict:
         """
         Query items from a DynamoDB table
         
@@ -80,6 +164,9 @@ class DynamoDBClient:
             expression_attribute_values (dict): Values for the condition expression
             scan_index_forward (bool): Whether to scan forward or backward (default: True)
             limit (int): Maximum number of items to return (default: None)
+            exclusive_start_key (dict): LastEvaluatedKey of the previous page (default: None)
+            projection_expression (str): Attributes to return (default: all)
+            expression_attribute_names (dict): Names used in the projection expression
             
         Returns:
             dict: The query response containing Items and other metadata
@@ -94,9 +181,147 @@ class DynamoDBClient:
             
             if limit is not None:
                 query_params['Limit'] = limit
+            if exclusive_start_key is not None:
+                query_params['ExclusiveStartKey'] = exclusive_start_key
+            if projection_expression is not None:
+                query_params['ProjectionExpression'] = projection_expression
+            if expression_attribute_names:
+                query_params['ExpressionAttributeNames'] = expression_attribute_names
                 
             response = table.query(**query_params)
+            if 'Items' in response:
+                response['Items'] = [self.codec.decode(item) for item in response['Items']]
             return response
         except (ClientError, Exception) as e:
             logger.error(f"Error querying items from {table_name}: {str(e)}", exc_info=True)
-            raise DynamoDBError(f"Failed to query items from {table_name}: {str(e)}") 
\ No newline at end of file
+            raise DynamoDBError(f"Failed to query items from {table_name}: {str(e)}")
+
+    def scan(self, table_name: str, projection_expression: str = None,
+             expression_attribute_names: dict = None, exclusive_start_key: dict = None,
+             limit: int = None, filter_expression: str = None, expression_attribute_values: dict = None,
+             segment: int = None, total_segments: int = None) -> dict:
+        """
+        Scan one page of a DynamoDB table, or of one segment of a parallel scan
+
+        Args:
+            table_name (str): Name of the table to scan
+            projection_expression (str): Attributes to return (default: all)
+            expression_attribute_names (dict): Names used in the projection expression
+            exclusive_start_key (dict): LastEvaluatedKey of the previous page
+            limit (int): Maximum number of items to evaluate (default: None)
+            filter_expression (str): Condition items must meet to be returned; filtered
+                items still count towards limit and read capacity
+            expression_attribute_values (dict): Values for the filter expression
+            segment (int): The segment to scan, from 0 to total_segments - 1
+            total_segments (int): The number of segments the table is split into
+
+        Returns:
+            dict: The scan response containing Items and, if there are more pages, LastEvaluatedKey
+        """
+        try:
+            table = self.get_table(table_name)
+            scan_params = {}
+            if projection_expression is not None:
+                scan_params['ProjectionExpression'] = projection_expression
+            if expression_attribute_names:
+                scan_params['ExpressionAttributeNames'] = expression_attribute_names
+            if exclusive_start_key is not None:
+                scan_params['ExclusiveStartKey'] = exclusive_start_key
+            if limit is not None:
+                scan_params['Limit'] = limit
+            if filter_expression is not None:
+                scan_params['FilterExpression'] = filter_expression
+            if expression_attribute_values:
+                scan_params['ExpressionAttributeValues'] = expression_attribute_values
+            if total_segments is not None:
+                scan_params['Segment'] = segment
+                scan_params['TotalSegments'] = total_segments
+            response = table.scan(**scan_params)
+            if 'Items' in response:
+                response['Items'] = [self.codec.decode(item) for item in response['Items']]
+            return response
+        except (ClientError, Exception) as e:
+            logger.error(f"Error scanning {table_name}: {str(e)}", exc_info=True)
+            raise DynamoDBError(f"Failed to scan {table_name}: {str(e)}")
+
+    def transact_write(self, operations: list) -> bool:
+        """
+        Apply writes to one or more tables atomically: all of them or none
+
+        Args:
+            operations (list): TransactWriteItems entries with plain Python values, e.g.
+                {'Put': {'TableName': ..., 'Item': {...}, 'ConditionExpression': ...}};
+                the resource's client types them, as it does for the table methods
+
+        Raises:
+            ConditionalCheckFailedError: If a condition in any operation does not hold
+            DynamoDBError: For any other error
+        """
+        transact_items = []
+        for operation in operations:
+            (kind, params), = operation.items()
+            params = dict(params)
+            if kind == 'Put':
+                params['Item'] = self.codec.encode(params['Item'])
+            transact_items.append({kind: params})
+        try:
+            self.client.meta.client.transact_write_items(TransactItems=transact_items)
+            return True
+        except (ClientError, Exception) as e:
+            if _is_cancelled_by_condition(e):
+                raise ConditionalCheckFailedError("Condition failed in write transaction")
+            logger.error(f"Error in write transaction: {str(e)}", exc_info=True)
+            raise DynamoDBError(f"Failed to write transaction: {str(e)}")
+
+    def _batch_write_chunk(self, table_name: str, requests: list) -> None:
+        """Write up to BATCH_WRITE_SIZE requests, retrying unprocessed ones with backoff."""
+        for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(BATCH_WRITE_BASE_DELAY_SECONDS * 2 ** (attempt - 1))
+            response = self.client.batch_write_item(RequestItems={table_name: requests})
+            requests = response.get('UnprocessedItems', {}).get(table_name, [])
+            if not requests:
+                return
+        raise DynamoDBError(f"{len(requests)} writes to {table_name} still unprocessed after {BATCH_WRITE_MAX_ATTEMPTS} attempts")
+
+    def batch_delete(self, table_name: str, keys: list, max_parallel: int = 1, on_chunk=None) -> int:
+        """
+        Delete items with BatchWriteItem, BATCH_WRITE_SIZE keys per request
+
+        Args:
+            table_name (str): Name of the table
+            keys (list): Keys of the items to delete
+            max_parallel (int): Requests in flight at once
+            on_chunk (callable): Called with the number of keys in each finished request
+
+        Returns:
+            int: The number of keys deleted
+
+        Raises:
+            DynamoDBError: If a request fails or items stay unprocessed; requests that
+                finished before it stay applied
+        """
+        chunks = [
+            [{'DeleteRequest': {'Key': key}} for key in keys[start:start + BATCH_WRITE_SIZE]]
+            for start in range(0, len(keys), BATCH_WRITE_SIZE)
+        ]
+
+        def write(chunk):
+            self._batch_write_chunk(table_name, chunk)
+            if on_chunk is not None:
+                on_chunk(len(chunk))
+
+        try:
+            if max_parallel <= 1 or len(chunks) <= 1:
+                for chunk in chunks:
+                    write(chunk)
+            else:
+                with ThreadPoolExecutor(max_workers=min(max_parallel, len(chunks)), thread_name_prefix='batch-write') as executor:
+                    for future in [executor.submit(write, chunk) for chunk in chunks]:
+                        future.result()
+            return len(keys)
+        except DynamoDBError:
+            raise
+        except (ClientError, Exception) as e:
+            logger.error(f"Error batch deleting from {table_name}: {str(e)}", exc_info=True)
+            raise DynamoDBError(f"Failed to batch delete from {table_name}: {str(e)}")
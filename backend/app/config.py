@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,6 +15,9 @@ class Config:
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
 
+    # Bearer token the metrics scraper sends to GET /metrics; unset, the endpoint refuses every request
+    METRICS_SCRAPE_TOKEN = os.getenv('METRICS_SCRAPE_TOKEN')
+
     # Frontend
     FRONTEND_REDIRECT_SUCCESS = 'http://localhost:3000/login-success'
     
@@ -25,3 +29,164 @@ class Config:
     # OpenAI
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', 'test')
     MAX_REQUESTS_PER_DAY = int(os.getenv('MAX_REQUESTS_PER_DAY', 10))
+    # Days a daily rate-limit counter is kept after its day ends, before its TTL expires it
+    RATE_LIMIT_RETENTION_DAYS = int(os.getenv('RATE_LIMIT_RETENTION_DAYS', 7))
+    # Limiters every charge must pass: daily_quota, token_bucket
+    RATE_LIMIT_ALGORITHMS = [name.strip() for name in os.getenv('RATE_LIMIT_ALGORITHMS', 'daily_quota,token_bucket').split(',') if name.strip()]
+    # Token bucket: units a user can spend at once, and seconds to earn one back
+    RATE_LIMIT_BURST_CAPACITY = int(os.getenv('RATE_LIMIT_BURST_CAPACITY', 3))
+    RATE_LIMIT_REFILL_SECONDS = float(os.getenv('RATE_LIMIT_REFILL_SECONDS', 20))
+    # Units charged per call site. A packing list is charged up front for its title too.
+    # RATE_LIMIT_ENDPOINT_COSTS takes the same shape as JSON and replaces these defaults.
+    RATE_LIMIT_ENDPOINT_COSTS = json.loads(os.getenv('RATE_LIMIT_ENDPOINT_COSTS', 'null')) or {
+        'default': 1,
+        'title': 0,
+        'outfit': 1,
+        'outfit_batch': 1,
+        'buy': 1,
+        'pack': 2,
+    }
+    # Users whose last rate-limit state each process keeps to plan charges from
+    RATE_LIMIT_STATE_CACHE_USERS = int(os.getenv('RATE_LIMIT_STATE_CACHE_USERS', 10000))
+
+    # Batch recommendations
+    MAX_BATCH_SITUATIONS = int(os.getenv('MAX_BATCH_SITUATIONS', 7))
+    BATCH_PROMPT_TOKEN_BUDGET = int(os.getenv('BATCH_PROMPT_TOKEN_BUDGET', 3000))
+
+    # POST /batch: sub-requests per call, and how many are dispatched at once
+    MAX_BATCH_REQUESTS = int(os.getenv('MAX_BATCH_REQUESTS', 50))
+    BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 8))
+
+    # Bulk deletes: IDs per request, BatchWriteItem requests in flight, and the size
+    # above which the delete runs as a job reporting its progress
+    BULK_DELETE_MAX_ITEMS = int(os.getenv('BULK_DELETE_MAX_ITEMS', 1000))
+    BULK_DELETE_PARALLEL_CHUNKS = int(os.getenv('BULK_DELETE_PARALLEL_CHUNKS', 4))
+    BULK_DELETE_SYNC_MAX_ITEMS = int(os.getenv('BULK_DELETE_SYNC_MAX_ITEMS', 100))
+
+    # Large recommendation maps stored as compressed binary. Reading them back works
+    # whatever the setting; enable once every process runs a version that can.
+    STORAGE_COMPRESSION_ENABLED = os.getenv('STORAGE_COMPRESSION_ENABLED', 'false').lower() == 'true'
+    STORAGE_COMPRESSION_MIN_BYTES = int(os.getenv('STORAGE_COMPRESSION_MIN_BYTES', 512))
+    STORAGE_COMPRESSED_ATTRIBUTES = [name.strip() for name in os.getenv('STORAGE_COMPRESSED_ATTRIBUTES', 'recommendation,packingList').split(',') if name.strip()]
+
+    # Interaction archival: rows older than this move to compressed files under the directory
+    INTERACTION_ARCHIVE_AFTER_DAYS = int(os.getenv('INTERACTION_ARCHIVE_AFTER_DAYS', 180))
+    INTERACTION_ARCHIVE_DIR = os.getenv('INTERACTION_ARCHIVE_DIR', 'archive/interactions')
+    INTERACTION_ARCHIVE_SEGMENTS = int(os.getenv('INTERACTION_ARCHIVE_SEGMENTS', 8))
+
+    # Idempotency keys
+    IDEMPOTENCY_STORE = os.getenv('IDEMPOTENCY_STORE', 'memory')  # 'memory' or 'dynamodb'
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 86400))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', 30))
+    # How long a request holds its key before a retry may take it over, in case the
+    # worker died before completing or releasing it: the slowest LLM deadline plus queueing
+    IDEMPOTENCY_LEASE_SECONDS = int(os.getenv('IDEMPOTENCY_LEASE_SECONDS', 90))
+
+    # Asynchronous jobs
+    JOB_STORE = os.getenv('JOB_STORE', 'memory')  # 'memory' or 'dynamodb'
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+    JOB_MAX_QUEUE_DEPTH = int(os.getenv('JOB_MAX_QUEUE_DEPTH', 32))
+    JOB_TTL_SECONDS = int(os.getenv('JOB_TTL_SECONDS', 3600))
+    JOB_RETRY_AFTER_SECONDS = int(os.getenv('JOB_RETRY_AFTER_SECONDS', 5))
+
+    # Users whose rendered wardrobe prompt block is kept in memory
+    WARDROBE_FRAGMENT_CACHE_USERS = int(os.getenv('WARDROBE_FRAGMENT_CACHE_USERS', 1024))
+
+    # How long an ETag from GET /wardrobe, /trips or /interactions is honored with a 304.
+    # Versions are per process, so this bounds how stale a 304 can be after a write
+    # handled by another process.
+    CONDITIONAL_GET_TTL_SECONDS = float(os.getenv('CONDITIONAL_GET_TTL_SECONDS', 60))
+
+    # GET /me/dashboard: reads fanned out in parallel, and how much of each it returns
+    DASHBOARD_WORKERS = int(os.getenv('DASHBOARD_WORKERS', 16))
+    DASHBOARD_WARDROBE_ITEMS = int(os.getenv('DASHBOARD_WARDROBE_ITEMS', 200))
+    DASHBOARD_RECENT_INTERACTIONS = int(os.getenv('DASHBOARD_RECENT_INTERACTIONS', 10))
+
+    # Wardrobe change log for delta sync
+    WARDROBE_CHANGES_PAGE_SIZE = int(os.getenv('WARDROBE_CHANGES_PAGE_SIZE', 200))
+    # Tombstones older than this are compacted away; older cursors must resync
+    WARDROBE_CHANGES_TOMBSTONE_TTL_SECONDS = int(os.getenv('WARDROBE_CHANGES_TOMBSTONE_TTL_SECONDS', 30 * 86400))
+
+    # Per-user wardrobe search indexes kept in memory
+    WARDROBE_SEARCH_INDEX_USERS = int(os.getenv('WARDROBE_SEARCH_INDEX_USERS', 256))
+    WARDROBE_SEARCH_INDEX_TTL_SECONDS = float(os.getenv('WARDROBE_SEARCH_INDEX_TTL_SECONDS', 300))
+    WARDROBE_SEARCH_MAX_RESULTS = int(os.getenv('WARDROBE_SEARCH_MAX_RESULTS', 50))
+
+    # Near-duplicate situations answered from a user's recent outfit recommendations
+    SITUATION_CACHE_ENABLED = os.getenv('SITUATION_CACHE_ENABLED', 'true').lower() == 'true'
+    SITUATION_CACHE_THRESHOLD = float(os.getenv('SITUATION_CACHE_THRESHOLD', 0.78))
+    SITUATION_CACHE_ENTRIES_PER_USER = int(os.getenv('SITUATION_CACHE_ENTRIES_PER_USER', 32))
+    SITUATION_CACHE_USERS = int(os.getenv('SITUATION_CACHE_USERS', 1024))
+    SITUATION_CACHE_TTL_SECONDS = float(os.getenv('SITUATION_CACHE_TTL_SECONDS', 3600))
+
+    # Serve rule-based outfits from the local engine when the LLM fails or the user is over quota
+    OUTFIT_FALLBACK_ENABLED = os.getenv('OUTFIT_FALLBACK_ENABLED', 'true').lower() == 'true'
+
+    # Per-user item and item-pair affinities learned from outfit feedback
+    FEEDBACK_RANKER_ENABLED = os.getenv('FEEDBACK_RANKER_ENABLED', 'true').lower() == 'true'
+    FEEDBACK_AFFINITY_STORE = os.getenv('FEEDBACK_AFFINITY_STORE', 'memory')  # 'memory' or 'dynamodb'
+    # Days an item or pair affinity is kept in DynamoDB after its last feedback, before its TTL expires it
+    FEEDBACK_AFFINITY_RETENTION_DAYS = int(os.getenv('FEEDBACK_AFFINITY_RETENTION_DAYS', 180))
+    FEEDBACK_CANDIDATES_PER_CATEGORY = int(os.getenv('FEEDBACK_CANDIDATES_PER_CATEGORY', 6))
+    # Smaller wardrobes keep their whole (cached, shared) wardrobe block in the prompt
+    FEEDBACK_PRESELECT_MIN_ITEMS = int(os.getenv('FEEDBACK_PRESELECT_MIN_ITEMS', 40))
+    # Net likes every pair of an outfit needs before it is served without the LLM; 0 disables
+    FEEDBACK_SKIP_LLM_MIN_AFFINITY = float(os.getenv('FEEDBACK_SKIP_LLM_MIN_AFFINITY', 2))
+
+    # Outbound LLM concurrency
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+    LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', 16))
+    LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', 10))
+    LLM_RETRY_AFTER_SECONDS = int(os.getenv('LLM_RETRY_AFTER_SECONDS', 2))
+
+    # OpenAI client resilience
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')  # None uses the official endpoint
+    # Overall deadline per call site, covering retries and hedges
+    LLM_DEADLINE_SECONDS = {
+        'default': float(os.getenv('LLM_DEADLINE_SECONDS', 30)),
+        'title': float(os.getenv('LLM_TITLE_DEADLINE_SECONDS', 8)),
+        'outfit': float(os.getenv('LLM_OUTFIT_DEADLINE_SECONDS', 20)),
+        'outfit_batch': float(os.getenv('LLM_OUTFIT_BATCH_DEADLINE_SECONDS', 45)),
+        'buy': float(os.getenv('LLM_BUY_DEADLINE_SECONDS', 20)),
+        'pack': float(os.getenv('LLM_PACK_DEADLINE_SECONDS', 40)),
+    }
+    LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', 3))
+    LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv('LLM_RETRY_BASE_DELAY_SECONDS', 0.25))
+    LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv('LLM_RETRY_MAX_DELAY_SECONDS', 4))
+    LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'false').lower() == 'true'
+    # Hedge after the endpoint's observed p95 latency, or this delay until enough samples exist
+    LLM_HEDGE_DELAY_SECONDS = float(os.getenv('LLM_HEDGE_DELAY_SECONDS', 8))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', 20))
+    LLM_CIRCUIT_FAILURE_RATE = float(os.getenv('LLM_CIRCUIT_FAILURE_RATE', 0.5))
+    LLM_CIRCUIT_WINDOW = int(os.getenv('LLM_CIRCUIT_WINDOW', 20))
+    LLM_CIRCUIT_MIN_CALLS = int(os.getenv('LLM_CIRCUIT_MIN_CALLS', 10))
+    LLM_CIRCUIT_RESET_SECONDS = float(os.getenv('LLM_CIRCUIT_RESET_SECONDS', 30))
+    # Fresh completions requested when a response can't be repaired locally
+    LLM_MAX_REASKS = int(os.getenv('LLM_MAX_REASKS', 1))
+
+    # LLM backends, in order of preference: openai, http, deterministic
+    LLM_BACKENDS = [name.strip() for name in os.getenv('LLM_BACKENDS', 'openai').split(',') if name.strip()]
+    LLM_HTTP_BACKEND_URL = os.getenv('LLM_HTTP_BACKEND_URL')
+    LLM_HTTP_BACKEND_API_KEY = os.getenv('LLM_HTTP_BACKEND_API_KEY')
+    LLM_HTTP_BACKEND_MODEL = os.getenv('LLM_HTTP_BACKEND_MODEL')
+    LLM_DETERMINISTIC_LATENCY_SECONDS = float(os.getenv('LLM_DETERMINISTIC_LATENCY_SECONDS', 0))
+    LLM_ROUTER_EWMA_ALPHA = float(os.getenv('LLM_ROUTER_EWMA_ALPHA', 0.2))
+    # Seconds for an idle backend's error rate to halve, so a recovered backend is tried again
+    LLM_ROUTER_ERROR_HALF_LIFE_SECONDS = float(os.getenv('LLM_ROUTER_ERROR_HALF_LIFE_SECONDS', 30))
+
+    # Model tiers, chosen per call from the call site and estimated prompt size
+    LLM_MODEL_TIERS = {
+        'small': os.getenv('LLM_SMALL_MODEL', 'gpt-4o-mini'),
+        'standard': os.getenv('LLM_STANDARD_MODEL', 'gpt-3.5-turbo'),
+        'large': os.getenv('LLM_LARGE_MODEL', 'gpt-4o'),
+    }
+    # Per endpoint, [max estimated prompt tokens, tier] buckets in order; null is unbounded.
+    # LLM_TIER_BUCKETS takes the same shape as JSON and replaces these defaults.
+    LLM_TIER_BUCKETS = json.loads(os.getenv('LLM_TIER_BUCKETS', 'null')) or {
+        'default': [[None, 'standard']],
+        'title': [[300, 'small'], [None, 'standard']],
+        'outfit': [[1500, 'small'], [6000, 'standard'], [None, 'large']],
+        'outfit_batch': [[6000, 'standard'], [None, 'large']],
+        'buy': [[1500, 'small'], [6000, 'standard'], [None, 'large']],
+        'pack': [[6000, 'standard'], [None, 'large']],
+    }
@@ -0,0 +1,176 @@
+"""
+Move interactions older than INTERACTION_ARCHIVE_AFTER_DAYS out of DynamoDB into
+the InteractionArchive: gzip-compressed JSON Lines files, partitioned by creation
+date and type.
+
+The table is read with a parallel scan, one segment per worker. Each page is
+written and flushed to disk before its rows are deleted, so a crash leaves rows
+archived twice, never lost; feedback_aggregates counts such duplicates once.
+Feedback given on a row between its scan and its delete isn't archived, which is
+why only old interactions are moved.
+
+    python -m app.maintenance.archive_interactions archive --older-than-days 180
+    python -m app.maintenance.archive_interactions feedback --since 2026-01-01
+"""
+import json
+import time
+import uuid
+import argparse
+import logging
+from datetime import datetime, timedelta, UTC
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError
+from app.config import Config
+from app.services.interaction_archive import InteractionArchive
+from app.services.interactions import INTERACTIONS_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Feedback column values: thumbs down, none yet, thumbs up
+DISLIKE, NO_FEEDBACK, LIKE = 0, 1, 2
+
+def _archive_segment(dynamodb: DynamoDBClient, interaction_archive: InteractionArchive, cutoff: str,
+                     run_id: str, segment: int, total_segments: int, delete: bool) -> dict:
+    counts = {'archived': 0, 'deleted': 0}
+    writer = interaction_archive.writer(run_id, segment)
+    start_key = None
+    try:
+        while True:
+            response = dynamodb.scan(
+                table_name=INTERACTIONS_TABLE,
+                filter_expression='#createdAt < :cutoff',
+                expression_attribute_names={'#createdAt': 'createdAt'},
+                expression_attribute_values={':cutoff': cutoff},
+                exclusive_start_key=start_key,
+                segment=segment,
+                total_segments=total_segments
+            )
+            rows = response.get('Items', [])
+            for row in rows:
+                writer.write(row)
+            if rows:
+                writer.sync()
+                counts['archived'] += len(rows)
+                if delete:
+                    keys = [{'userId': row['userId'], 'interactionId': row['interactionId']} for row in rows]
+                    counts['deleted'] += dynamodb.batch_delete(INTERACTIONS_TABLE, keys)
+            start_key = response.get('LastEvaluatedKey')
+            if start_key is None:
+                return counts
+    finally:
+        writer.close()
+
+def archive(dynamodb: DynamoDBClient, root: str = Config.INTERACTION_ARCHIVE_DIR,
+            older_than_days: int = Config.INTERACTION_ARCHIVE_AFTER_DAYS,
+            segments: int = Config.INTERACTION_ARCHIVE_SEGMENTS, delete: bool = True) -> dict:
+    """
+    Archive interactions created more than older_than_days ago, one scan segment per worker.
+
+    Args:
+        dynamodb (DynamoDBClient): Client for the interactions table
+        root (str): Directory the partitions are written under
+        older_than_days (int): Age after which an interaction is archived
+        segments (int): Parallel scan segments, each scanned by its own worker
+        delete (bool): Whether to delete the archived rows from the table
+
+    Returns:
+        dict: archived, deleted and failed_segments (segments that stopped on an error;
+            the rows they archived before it stay archived and deleted)
+    """
+    cutoff = (datetime.now(UTC) - timedelta(days=older_than_days)).isoformat()
+    run_id = f'{int(time.time())}-{uuid.uuid4().hex[:8]}'
+    summary = {'archived': 0, 'deleted': 0, 'failed_segments': []}
+    with ThreadPoolExecutor(max_workers=segments, thread_name_prefix='archive') as executor:
+        futures = {
+            executor.submit(_archive_segment, dynamodb, InteractionArchive(root), cutoff, run_id, segment, segments, delete): segment
+            for segment in range(segments)
+        }
+        for future in as_completed(futures):
+            try:
+                counts = future.result()
+            except (DynamoDBError, OSError) as e:
+                logger.error(f"Error archiving interactions segment {futures[future]}: {str(e)}")
+                summary['failed_segments'].append(futures[future])
+                continue
+            summary['archived'] += counts['archived']
+            summary['deleted'] += counts['deleted']
+    summary['failed_segments'].sort()
+    return summary
+
+def _feedback_column(feedback) -> int:
+    if feedback is None:
+        return NO_FEEDBACK
+    return LIKE if int(feedback) == 1 else DISLIKE
+
+def feedback_aggregates(root: str = Config.INTERACTION_ARCHIVE_DIR, since: str = None,
+                        until: str = None, types: list = None) -> dict:
+    """
+    Likes and dislikes per interaction type over the archive. Only the key, type and
+    feedback of each row are kept, as columns, and the counting is done on those.
+
+    Args:
+        root (str): The archive directory
+        since (str): First creation date to include, YYYY-MM-DD
+        until (str): Last creation date to include, YYYY-MM-DD
+        types (list): Interaction types to include (default: all)
+
+    Returns:
+        dict: Per type: total, likes, dislikes, noFeedback and likeRate (likes over
+            rated interactions, None if none were rated)
+    """
+    keys, row_types, feedback = [], [], []
+    interaction_archive = InteractionArchive(root)
+    for path in interaction_archive.parts(since, until, types):
+        for row in interaction_archive.rows(path):
+            keys.append(f"{row['userId']}\x00{row['interactionId']}")
+            row_types.append(row.get('type') or 'unknown')
+            feedback.append(_feedback_column(row.get('feedback')))
+    if not keys:
+        return {}
+
+    # A row archived twice (a run that stopped between writing and deleting) counts once
+    _, first = np.unique(np.array(keys), return_index=True)
+    type_names, type_index = np.unique(np.array(row_types)[first], return_inverse=True)
+    cells = type_index * 3 + np.array(feedback, dtype=np.int64)[first]
+    counts = np.bincount(cells, minlength=len(type_names) * 3).reshape(len(type_names), 3)
+
+    aggregates = {}
+    for name, (dislikes, none, likes) in zip(type_names.tolist(), counts.tolist()):
+        rated = likes + dislikes
+        aggregates[name] = {
+            'total': likes + dislikes + none,
+            'likes': likes,
+            'dislikes': dislikes,
+            'noFeedback': none,
+            'likeRate': likes / rated if rated else None
+        }
+    return aggregates
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old interactions and query the archive")
+    parser.add_argument('--root', default=Config.INTERACTION_ARCHIVE_DIR, help="Archive directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    archive_parser = commands.add_parser('archive', help="Move old interactions to the archive")
+    archive_parser.add_argument('--older-than-days', type=int, default=Config.INTERACTION_ARCHIVE_AFTER_DAYS)
+    archive_parser.add_argument('--segments', type=int, default=Config.INTERACTION_ARCHIVE_SEGMENTS,
+                                help="Parallel scan segments")
+    archive_parser.add_argument('--keep', action='store_true', help="Archive without deleting the rows")
+    feedback_parser = commands.add_parser('feedback', help="Feedback per interaction type in the archive")
+    feedback_parser.add_argument('--since', help="First date, YYYY-MM-DD")
+    feedback_parser.add_argument('--until', help="Last date, YYYY-MM-DD")
+    feedback_parser.add_argument('--type', action='append', dest='types', help="Interaction type (repeatable)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'archive':
+        summary = archive(DynamoDBClient(), args.root, args.older_than_days, args.segments, delete=not args.keep)
+        logger.info(
+            f"Archived {summary['archived']} interactions, deleted {summary['deleted']}, "
+            f"{len(summary['failed_segments'])} segments failed"
+        )
+    else:
+        print(json.dumps(feedback_aggregates(args.root, args.since, args.until, args.types), indent=2))
+
+if __name__ == '__main__':
+    main()
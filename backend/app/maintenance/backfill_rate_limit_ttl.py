@@ -0,0 +1,88 @@
+"""
+Set the expiresAt TTL on rate-limit counters written before it existed, so
+DynamoDB expires them like new ones. Rows whose retention has already passed
+get a TTL in the past and are deleted by DynamoDB's next TTL sweep. Only rows
+without expiresAt are read and updated, so the job can be re-run safely.
+
+    python -m app.maintenance.backfill_rate_limit_ttl --segments 4
+"""
+import argparse
+import logging
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError, ConditionalCheckFailedError
+from app.services.rate_limit import RATE_LIMIT_TABLE, expires_at
+
+logger = logging.getLogger(__name__)
+
+def _backfill_segment(dynamodb: DynamoDBClient, segment: int, total_segments: int) -> int:
+    updated = 0
+    start_key = None
+    while True:
+        response = dynamodb.scan(
+            table_name=RATE_LIMIT_TABLE,
+            projection_expression='#userId, #date',
+            expression_attribute_names={'#userId': 'userId', '#date': 'date', '#expiresAt': 'expiresAt'},
+            filter_expression='attribute_not_exists(#expiresAt)',
+            exclusive_start_key=start_key,
+            segment=segment,
+            total_segments=total_segments
+        )
+        for row in response.get('Items', []):
+            date = datetime.strptime(row['date'], '%Y-%m-%d').replace(tzinfo=timezone.utc)
+            try:
+                dynamodb.update_item(
+                    table_name=RATE_LIMIT_TABLE,
+                    key={'userId': row['userId'], 'date': row['date']},
+                    update_expression='SET #expiresAt = :expiresAt',
+                    expression_attribute_names={'#expiresAt': 'expiresAt'},
+                    expression_attribute_values={':expiresAt': expires_at(date)},
+                    condition_expression='attribute_not_exists(#expiresAt)'
+                )
+                updated += 1
+            except ConditionalCheckFailedError:
+                pass  # Deleted or given a TTL since the scan read it
+        start_key = response.get('LastEvaluatedKey')
+        if start_key is None:
+            return updated
+
+def backfill(dynamodb: DynamoDBClient, segments: int = 4) -> dict:
+    """
+    Backfill the TTL with a parallel scan, one segment per worker.
+
+    Args:
+        dynamodb (DynamoDBClient): Client for the rate-limit table
+        segments (int): Parallel scan segments
+
+    Returns:
+        dict: rows_updated and failed_segments (the segments that stopped on an error)
+    """
+    summary = {'rows_updated': 0, 'failed_segments': []}
+    with ThreadPoolExecutor(max_workers=segments, thread_name_prefix='backfill-ttl') as executor:
+        futures = {
+            executor.submit(_backfill_segment, dynamodb, segment, segments): segment
+            for segment in range(segments)
+        }
+        for future in as_completed(futures):
+            try:
+                summary['rows_updated'] += future.result()
+            except DynamoDBError as e:
+                logger.error(f"Error backfilling rate-limit TTLs in segment {futures[future]}: {str(e)}")
+                summary['failed_segments'].append(futures[future])
+    summary['failed_segments'].sort()
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the TTL on rate-limit rows")
+    parser.add_argument('--segments', type=int, default=4, help="Parallel scan segments")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    summary = backfill(DynamoDBClient(), segments=args.segments)
+    logger.info(
+        f"Set the TTL on {summary['rows_updated']} rate-limit rows, "
+        f"{len(summary['failed_segments'])} segments failed"
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Backfill the classifier attributes (category, colors, formality, tokens) onto
+wardrobe items saved before write-time categorization, or by an older
+CLASSIFIER_VERSION. Users are processed in parallel; items already tagged by the
+current version are skipped, so the job can be re-run safely.
+
+    python -m app.maintenance.backfill_wardrobe_categories --workers 8
+"""
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError
+from app.services.wardrobe import WardrobeService
+from app.maintenance.users import user_ids
+
+logger = logging.getLogger(__name__)
+
+def backfill_user(wardrobe_service: WardrobeService, user_id: str) -> int:
+    """
+    Categorize one user's items.
+
+    Returns:
+        int: The number of items updated
+    """
+    return sum(wardrobe_service.categorize_item(user_id, item) for item in wardrobe_service.get_wardrobe_items(user_id))
+
+def backfill(wardrobe_service: WardrobeService, dynamodb: DynamoDBClient, workers: int = 8) -> dict:
+    """
+    Categorize every user's items, one user per task.
+
+    Args:
+        wardrobe_service (WardrobeService): The service that owns the items
+        dynamodb (DynamoDBClient): Client used to list the users
+        workers (int): Users processed at the same time
+
+    Returns:
+        dict: users, items_updated and failed_users (the IDs whose backfill failed)
+    """
+    summary = {'users': 0, 'items_updated': 0, 'failed_users': []}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backfill') as executor:
+        futures = {
+            executor.submit(backfill_user, wardrobe_service, user_id): user_id
+            for user_id in user_ids(dynamodb, wardrobe_service.table_name)
+        }
+        for future in as_completed(futures):
+            user_id = futures[future]
+            summary['users'] += 1
+            try:
+                summary['items_updated'] += future.result()
+            except DynamoDBError as e:
+                # One user's failure shouldn't stop the rest; re-running picks them up
+                logger.error(f"Error backfilling wardrobe categories for {user_id}: {str(e)}")
+                summary['failed_users'].append(user_id)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill wardrobe item categories")
+    parser.add_argument('--workers', type=int, default=8, help="Users processed in parallel")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    dynamodb = DynamoDBClient()
+    summary = backfill(WardrobeService(dynamodb), dynamodb, workers=args.workers)
+    logger.info(
+        f"Backfilled {summary['items_updated']} items for {summary['users']} users, "
+        f"{len(summary['failed_users'])} failed"
+    )
+
+if __name__ == '__main__':
+    main()
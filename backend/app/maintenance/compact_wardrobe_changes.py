@@ -0,0 +1,62 @@
+"""
+Compact every user's wardrobe change log: drop changes superseded by a later one
+to the same item, and tombstones older than WARDROBE_CHANGES_TOMBSTONE_TTL_SECONDS.
+Run it periodically (e.g. daily); it is safe to re-run or to run while users sync.
+
+    python -m app.maintenance.compact_wardrobe_changes --workers 8
+"""
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError
+from app.config import Config
+from app.services.wardrobe_changes import WardrobeChangeLog
+from app.maintenance.users import user_ids
+
+logger = logging.getLogger(__name__)
+
+def compact(change_log: WardrobeChangeLog, dynamodb: DynamoDBClient, workers: int = 8,
+            tombstone_ttl_seconds: float = Config.WARDROBE_CHANGES_TOMBSTONE_TTL_SECONDS) -> dict:
+    """
+    Compact each user's change log, one user per task.
+
+    Args:
+        change_log (WardrobeChangeLog): The change log to compact
+        dynamodb (DynamoDBClient): Client used to list the users
+        workers (int): Users processed at the same time
+        tombstone_ttl_seconds (float): Age after which tombstones are dropped
+
+    Returns:
+        dict: users, rows_removed and failed_users (the IDs whose compaction failed)
+    """
+    summary = {'users': 0, 'rows_removed': 0, 'failed_users': []}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='compact') as executor:
+        futures = {
+            executor.submit(change_log.compact, user_id, tombstone_ttl_seconds): user_id
+            for user_id in user_ids(dynamodb, change_log.table_name)
+        }
+        for future in as_completed(futures):
+            user_id = futures[future]
+            summary['users'] += 1
+            try:
+                summary['rows_removed'] += future.result()
+            except DynamoDBError as e:
+                logger.error(f"Error compacting wardrobe changes for {user_id}: {str(e)}")
+                summary['failed_users'].append(user_id)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact wardrobe change logs")
+    parser.add_argument('--workers', type=int, default=8, help="Users processed in parallel")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    dynamodb = DynamoDBClient()
+    summary = compact(WardrobeChangeLog(dynamodb), dynamodb, workers=args.workers)
+    logger.info(
+        f"Removed {summary['rows_removed']} change rows for {summary['users']} users, "
+        f"{len(summary['failed_users'])} failed"
+    )
+
+if __name__ == '__main__':
+    main()
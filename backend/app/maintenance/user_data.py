@@ -0,0 +1,74 @@
+"""
+Export or delete one user's data for an operator, e.g. for a data request:
+
+    python -m app.maintenance.user_data export <user_id> [--format json] > export.ndjson
+    python -m app.maintenance.user_data delete <user_id>
+
+Deletion is idempotent; if it fails part way, run it again to finish. Stored
+idempotent responses and finished jobs are deleted when their stores are in
+DynamoDB. In-memory stores live in the API processes, out of reach from here:
+DELETE /me clears them, and otherwise their entries expire with
+IDEMPOTENCY_TTL_SECONDS and JOB_TTL_SECONDS.
+"""
+import sys
+import argparse
+import logging
+from app.clients.dynamodb import DynamoDBClient
+from app.config import Config
+from app.services.account import AccountService, EXPORT_FORMATS, NDJSON
+from app.services.interaction_archive import InteractionArchive
+from app.services.feedback_ranker import FeedbackRanker, DynamoDBAffinityStore
+from app.services.idempotency import IdempotencyService, DynamoDBIdempotencyStore
+from app.services.interactions import InteractionsService
+from app.services.jobs import JobsService, DynamoDBJobStore
+from app.services.rate_limit import RateLimitService
+from app.services.trips import TripsService
+from app.services.wardrobe import WardrobeService
+
+logger = logging.getLogger(__name__)
+
+def account_service(dynamodb: DynamoDBClient) -> AccountService:
+    # An in-memory affinity store lives in the API processes, out of reach from here
+    feedback_ranker = None
+    if Config.FEEDBACK_AFFINITY_STORE == 'dynamodb':
+        feedback_ranker = FeedbackRanker(DynamoDBAffinityStore(dynamodb))
+    idempotency_service = None
+    if Config.IDEMPOTENCY_STORE == 'dynamodb':
+        idempotency_service = IdempotencyService(DynamoDBIdempotencyStore(dynamodb))
+    jobs_service = None
+    if Config.JOB_STORE == 'dynamodb':
+        jobs_service = JobsService(DynamoDBJobStore(dynamodb), max_workers=1)
+    return AccountService(
+        dynamodb,
+        WardrobeService(dynamodb),
+        TripsService(dynamodb),
+        InteractionsService(dynamodb),
+        RateLimitService(dynamodb),
+        feedback_ranker=feedback_ranker,
+        interaction_archive=InteractionArchive(Config.INTERACTION_ARCHIVE_DIR),
+        idempotency_service=idempotency_service,
+        jobs_service=jobs_service
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or delete a user's data")
+    parser.add_argument('action', choices=['export', 'delete'])
+    parser.add_argument('user_id')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default=NDJSON, help="Export format")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    service = account_service(DynamoDBClient())
+    if args.action == 'export':
+        for chunk in service.export(args.user_id, args.format):
+            sys.stdout.write(chunk)
+        return
+
+    deleted = service.delete_account(
+        args.user_id,
+        progress=lambda state: logger.info(f"Progress: {state['tables']}")
+    )
+    logger.info(f"Deleted {args.user_id}: {deleted}")
+
+if __name__ == '__main__':
+    main()
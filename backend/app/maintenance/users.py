@@ -0,0 +1,20 @@
+from app.clients.dynamodb import DynamoDBClient
+
+def user_ids(dynamodb: DynamoDBClient, table_name: str):
+    """Yield each user ID in a table keyed by userId once, scanning only the key attribute."""
+    seen = set()
+    start_key = None
+    while True:
+        response = dynamodb.scan(
+            table_name=table_name,
+            projection_expression='#userId',
+            expression_attribute_names={'#userId': 'userId'},
+            exclusive_start_key=start_key
+        )
+        for item in response.get('Items', []):
+            if item['userId'] not in seen:
+                seen.add(item['userId'])
+                yield item['userId']
+        start_key = response.get('LastEvaluatedKey')
+        if start_key is None:
+            return
@@ -0,0 +1,63 @@
+from flask import Response, request, jsonify, stream_with_context
+import logging
+
+from app.services.account import AccountService, EXPORT_FORMATS, NDJSON
+from app.services.jobs import JobsService
+from app.routes.auth import requires_auth
+from app.routes.bulk import run_with_progress
+
+logger = logging.getLogger(__name__)
+
+MIMETYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+def init_account_routes(app, account_service: AccountService, jobs_service: JobsService = None):
+    @app.route('/me/export', methods=['GET'])
+    @requires_auth
+    def export_account():
+        """
+        Download everything stored about the user, streamed as it is read.
+        ?format=ndjson (default) or ?format=json.
+        """
+        user_id = request.user['sub']
+        export_format = request.args.get('format', NDJSON)
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({
+                "error": "Invalid format",
+                "type": "validation_error",
+                "message": f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+            }), 400
+
+        chunks = account_service.export(user_id, export_format)
+        try:
+            # Read the first page before committing to a 200
+            first = next(chunks, '')
+        except Exception as e:
+            logger.error(f"Error exporting account: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+        def stream():
+            yield first
+            yield from chunks
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype=MIMETYPES[export_format],
+            headers={'Content-Disposition': f'attachment; filename=dorian-export.{export_format}'}
+        )
+
+    @app.route('/me', methods=['DELETE'])
+    @requires_auth
+    def delete_account():
+        """
+        Delete everything stored about the user, as a job; GET /jobs/<job_id>
+        reports the rows deleted per table. Re-run it to resume a failed deletion.
+        """
+        user_id = request.user['sub']
+
+        def work(report):
+            return {"deleted": account_service.delete_account(user_id, progress=report)}
+
+        return run_with_progress(jobs_service, user_id, 'account_delete', work, True, 'deleting account')
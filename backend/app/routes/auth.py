@@ -8,6 +8,10 @@ JWT_SECRET = Config.JWT_SECRET_KEY
 JWT_ALGORITHM = "HS256"
 JWT_EXP_DELTA_SECONDS = 3600
 
+# WSGI environ key carrying an already verified token payload, set by POST /batch on
+# its sub-requests. Clients can't set environ keys, only HTTP_* headers.
+AUTHENTICATED_USER_ENVIRON = 'dorian.authenticated_user'
+
 def init_auth_routes(app, google):
     @app.route('/auth/login')
     def login():
@@ -50,6 +54,11 @@ def init_auth_routes(app, google):
 def requires_auth(f):
     @wraps(f)
     def decorated(*args, **kwargs):
+        payload = request.environ.get(AUTHENTICATED_USER_ENVIRON)
+        if payload is not None:
+            request.user = payload
+            return f(*args, **kwargs)
+
         auth_header = request.headers.get("Authorization", None)
         if not auth_header:
             return jsonify({"error": "Missing Authorization Header"}), 401
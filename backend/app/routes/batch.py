@@ -0,0 +1,124 @@
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from flask import request, jsonify, current_app
+from werkzeug.test import EnvironBuilder
+
+from app.config import Config
+from app.routes.auth import requires_auth, AUTHENTICATED_USER_ENVIRON
+from app.services.wardrobe import WardrobeService
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Sub-requests answered together instead of through their route, one pattern per kind
+WARDROBE_DELETE = re.compile(r'^/wardrobe/([^/?]+)$')
+
+# Headers passed on to sub-requests; everything else comes from the batch itself
+FORWARDED_HEADERS = ('If-None-Match', 'Idempotency-Key')
+
+def _invalid(message: str) -> dict:
+    return {'status': 400, 'body': {'error': message}}
+
+def init_batch_routes(app, wardrobe_service: WardrobeService):
+    executor = ThreadPoolExecutor(max_workers=Config.BATCH_WORKERS, thread_name_prefix='batch')
+
+    def dispatch(sub_request: dict, user: dict) -> dict:
+        """Run one sub-request through the app's own routes, as the batch's user."""
+        headers = {name: value for name, value in (sub_request.get('headers') or {}).items() if name in FORWARDED_HEADERS}
+        builder = EnvironBuilder(
+            path=sub_request['path'],
+            method=sub_request['method'],
+            json=sub_request.get('body'),
+            headers=headers
+        )
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+        environ[AUTHENTICATED_USER_ENVIRON] = user
+        with app.request_context(environ):
+            response = app.full_dispatch_request()
+        result = {'status': response.status_code, 'body': response.get_json(silent=True)}
+        if response.headers.get('ETag'):
+            result['etag'] = response.headers['ETag']
+        return result
+
+    def delete_wardrobe_items(indexes: list, item_ids: list, user: dict, results: list) -> None:
+        """Answer DELETE /wardrobe/<item_id> sub-requests with coalesced transactions."""
+        try:
+            wardrobe_service.delete_wardrobe_items(user['sub'], item_ids)
+            outcome = {'status': 200, 'body': {'message': 'Item deleted successfully'}}
+        except Exception as e:
+            logger.error(f"Error deleting wardrobe items in batch: {str(e)}", exc_info=True)
+            body = {'error': str(e)} if current_app.debug else {'error': 'An error occurred while deleting the item'}
+            outcome = {'status': 500, 'body': body}
+        for index in indexes:
+            results[index] = dict(outcome)
+
+    @app.route('/batch', methods=['POST'])
+    @requires_auth
+    def batch():
+        """
+        Run several requests in one call, authenticated once.
+
+        Request body:
+            {
+                "requests": [
+                    {"method": "DELETE", "path": "/wardrobe/<item_id>"},
+                    {"method": "PATCH", "path": "/interactions/<id>/feedback", "body": {"feedback": 1}}
+                ]
+            }
+
+        Sub-requests run in parallel, up to BATCH_WORKERS at a time, so their order
+        isn't guaranteed; each gets its own status in "responses", in request order.
+        Wardrobe deletes are grouped into as few DynamoDB transactions as possible.
+        """
+        data = request.get_json(silent=True) or {}
+        sub_requests = data.get('requests')
+        if not isinstance(sub_requests, list) or not sub_requests:
+            return jsonify({'error': 'requests must be a non-empty list'}), 400
+        if len(sub_requests) > Config.MAX_BATCH_REQUESTS:
+            return jsonify({'error': f'At most {Config.MAX_BATCH_REQUESTS} requests are allowed per batch'}), 400
+
+        user = request.user
+        results = [None] * len(sub_requests)
+        wardrobe_deletes = ([], [])
+        dispatched = []
+        for index, sub_request in enumerate(sub_requests):
+            if not isinstance(sub_request, dict) or not isinstance(sub_request.get('path'), str) or not sub_request['path'].startswith('/'):
+                results[index] = _invalid('Each request needs a path starting with /')
+                continue
+            method = str(sub_request.get('method', 'GET')).upper()
+            if method not in METHODS:
+                results[index] = _invalid(f"method must be one of: {', '.join(METHODS)}")
+                continue
+            if sub_request['path'].split('?')[0].rstrip('/') == '/batch':
+                results[index] = _invalid('Batches cannot be nested')
+                continue
+            sub_request = dict(sub_request, method=method)
+
+            match = WARDROBE_DELETE.match(sub_request['path'])
+            if method == 'DELETE' and match:
+                wardrobe_deletes[0].append(index)
+                wardrobe_deletes[1].append(match.group(1))
+            else:
+                dispatched.append((index, executor.submit(dispatch, sub_request, user)))
+
+        metrics.increment('batch_requests_total')
+        metrics.observe('batch_size', len(sub_requests))
+        metrics.increment('batch_sub_requests_total', len(wardrobe_deletes[0]), labels={'handling': 'coalesced'})
+        metrics.increment('batch_sub_requests_total', len(dispatched), labels={'handling': 'dispatched'})
+
+        if wardrobe_deletes[0]:
+            delete_wardrobe_items(*wardrobe_deletes, user, results)
+        for index, future in dispatched:
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                logger.error(f"Error in batch sub-request: {str(e)}", exc_info=True)
+                results[index] = {'status': 500, 'body': {'error': 'An error occurred while handling the request'}}
+
+        return jsonify({'responses': results}), 200
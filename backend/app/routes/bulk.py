@@ -0,0 +1,60 @@
+from flask import jsonify
+import logging
+
+from app.config import Config
+from app.services.jobs import JobsService, JobQueueFullError
+
+logger = logging.getLogger(__name__)
+
+def id_list(data: dict, field: str):
+    """
+    The IDs to bulk delete from a request body.
+
+    Returns:
+        tuple: (ids, None), or (None, error message) if the field isn't a valid ID list
+    """
+    ids = (data or {}).get(field)
+    if not isinstance(ids, list) or not ids or not all(isinstance(value, str) and value for value in ids):
+        return None, f'{field} must be a non-empty list of IDs'
+    if len(ids) > Config.BULK_DELETE_MAX_ITEMS:
+        return None, f'At most {Config.BULK_DELETE_MAX_ITEMS} IDs are allowed per request'
+    return ids, None
+
+def run_with_progress(jobs_service: JobsService, user_id: str, job_type: str, work, run_async: bool, description: str):
+    """
+    Run long work in the request, or as a job whose progress GET /jobs/<job_id> shows.
+
+    Args:
+        jobs_service (JobsService): The worker pool, or None to always run in the request
+        user_id (str): The user's ID
+        job_type (str): The job type, e.g. wardrobe_delete
+        work (callable): Takes a function accepting a progress dict and returns the body
+        run_async (bool): Whether to run as a job
+        description (str): What is being done, used in error logs
+
+    Returns:
+        The response: the body with 200, or 202 with the job ID
+    """
+    if run_async and jobs_service is not None:
+        try:
+            job_id = jobs_service.submit(user_id, job_type, lambda report: (work(report), 200), reports_progress=True)
+        except JobQueueFullError as e:
+            response = jsonify({
+                "error": str(e),
+                "type": "overloaded",
+                "message": "The server is busy. Please try again shortly.",
+                "retry_after": Config.JOB_RETRY_AFTER_SECONDS
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(Config.JOB_RETRY_AFTER_SECONDS)
+            return response
+        except Exception as e:
+            logger.error(f"Error queueing {job_type} job: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+        return jsonify({"job_id": job_id, "status": "queued"}), 202, {"Location": f"/jobs/{job_id}"}
+
+    try:
+        return jsonify(work(lambda progress: None)), 200
+    except Exception as e:
+        logger.error(f"Error {description}: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,35 @@
+from flask import Response, request
+
+from app.services.metrics import metrics
+
+def not_modified(resource: str, etag: str):
+    """
+    Answer a conditional GET whose If-None-Match still matches, before the
+    resource is read or serialized.
+
+    Args:
+        resource (str): The resource name, used as the metrics label
+        etag (str): The resource's current ETag, unquoted
+
+    Returns:
+        Response: A 304 to return as-is, or None if the full response is needed
+    """
+    if not request.if_none_match:
+        metrics.increment('conditional_get_total', labels={'resource': resource, 'result': 'unconditional'})
+        return None
+
+    hit = request.if_none_match.contains(etag)
+    metrics.increment('conditional_get_total', labels={'resource': resource, 'result': 'not_modified' if hit else 'modified'})
+    hits = metrics.counter('conditional_get_total', {'resource': resource, 'result': 'not_modified'})
+    misses = metrics.counter('conditional_get_total', {'resource': resource, 'result': 'modified'})
+    metrics.set_gauge('conditional_get_hit_ratio', hits / (hits + misses), labels={'resource': resource})
+    if not hit:
+        return None
+    response = Response(status=304)
+    return with_etag(response, etag)
+
+def with_etag(response, etag: str):
+    """Tag a response, asking clients to revalidate it before reuse."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
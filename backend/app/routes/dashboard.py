@@ -0,0 +1,29 @@
+from flask import request, jsonify
+import logging
+
+from app.services.dashboard import DashboardService
+from app.routes.auth import requires_auth
+from app.routes.conditional import not_modified, with_etag
+
+logger = logging.getLogger(__name__)
+
+def init_dashboard_routes(app, dashboard_service: DashboardService):
+    @app.route('/me/dashboard', methods=['GET'])
+    @requires_auth
+    def get_dashboard():
+        """
+        The user's wardrobe, latest trip and recent interactions in one response,
+        in place of separate calls to /wardrobe, /trips and /interactions.
+        """
+        try:
+            user_id = request.user['sub']
+            etag = dashboard_service.get_dashboard_etag(user_id)
+            cached = not_modified('dashboard', etag)
+            if cached is not None:
+                return cached
+
+            return with_etag(jsonify(dashboard_service.get_dashboard(user_id)), etag)
+
+        except Exception as e:
+            logger.error(f"Error getting dashboard: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
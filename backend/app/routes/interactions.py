@@ -3,18 +3,27 @@ import logging
 
 from app.services.interactions import InteractionsService
 from app.routes.auth import requires_auth
+from app.routes.conditional import not_modified, with_etag
+from app.routes.bulk import id_list, run_with_progress
+from app.services.jobs import JobsService
+from app.config import Config
 
 logger = logging.getLogger(__name__)
 
-def init_interaction_routes(app, interactions_service: InteractionsService):
+def init_interaction_routes(app, interactions_service: InteractionsService, jobs_service: JobsService = None):
     @app.route('/interactions', methods=['GET'])
     @requires_auth
     def get_user_interactions():
         """
-        Get all interactions for the authenticated user.
+        Get all interactions for the authenticated user. Answers 304 without
+        reading them when If-None-Match holds the current ETag.
         """
         try:
             user_id = request.user['sub']
+            etag = interactions_service.get_interactions_etag(user_id)
+            cached = not_modified('interactions', etag)
+            if cached is not None:
+                return cached
             
             # Get the user's interactions
             interactions = interactions_service.get_user_interactions(user_id)
@@ -26,12 +35,50 @@ def init_interaction_routes(app, interactions_service: InteractionsService):
                     "message": "You don't have any interactions yet."
                 }), 404
             
-            return jsonify(interactions)
+            return with_etag(jsonify(interactions), etag)
             
         except Exception as e:
             logger.error(f"Error getting user interactions: {str(e)}", exc_info=True)
             return jsonify({"error": str(e)}), 500
 
+    @app.route('/interactions/delete', methods=['POST'])
+    @requires_auth
+    def delete_interactions():
+        """
+        Delete several interactions: {"interactionIds": [...]}. Large sets, or any
+        with ?async=1, run as a job; GET /jobs/<job_id> reports the progress.
+        """
+        user_id = request.user['sub']
+        interaction_ids, error = id_list(request.get_json(silent=True), 'interactionIds')
+        if error:
+            return jsonify({
+                "error": error,
+                "type": "validation_error",
+                "message": error
+            }), 400
+
+        def work(report):
+            progress = lambda deleted: report({"deleted": deleted, "total": len(interaction_ids)})
+            return {"deleted": interactions_service.delete_interactions(user_id, interaction_ids, progress=progress)}
+
+        run_async = request.args.get('async') == '1' or len(interaction_ids) > Config.BULK_DELETE_SYNC_MAX_ITEMS
+        return run_with_progress(jobs_service, user_id, 'interactions_delete', work, run_async, 'deleting interactions')
+
+    @app.route('/interactions', methods=['DELETE'])
+    @requires_auth
+    def clear_interactions():
+        """
+        Clear the user's whole history. Its size isn't known up front, so it runs
+        as a job; GET /jobs/<job_id> reports how many are deleted so far.
+        """
+        user_id = request.user['sub']
+
+        def work(report):
+            progress = lambda deleted: report({"deleted": deleted})
+            return {"deleted": interactions_service.clear_interactions(user_id, progress=progress)}
+
+        return run_with_progress(jobs_service, user_id, 'interactions_clear', work, True, 'clearing interactions')
+
     @app.route('/interactions/<interaction_id>/feedback', methods=['PATCH'])
     @requires_auth
     def update_interaction_feedback(interaction_id):
@@ -0,0 +1,33 @@
+from flask import request, jsonify
+import logging
+
+from app.services.jobs import JobsService
+from app.routes.auth import requires_auth
+
+logger = logging.getLogger(__name__)
+
+def init_job_routes(app, jobs_service: JobsService):
+    @app.route('/jobs/<job_id>', methods=['GET'])
+    @requires_auth
+    def get_job(job_id: str):
+        """
+        Poll an asynchronous recommendation started with ?async=1.
+        Once finished, the job carries the status code and body the synchronous
+        request would have returned.
+        """
+        try:
+            user_id = request.user['sub']
+
+            job = jobs_service.get_job(user_id, job_id)
+            if not job:
+                return jsonify({
+                    "error": "Job not found",
+                    "type": "not_found",
+                    "message": "This job does not exist or has expired."
+                }), 404
+
+            return jsonify(job)
+
+        except Exception as e:
+            logger.error(f"Error getting job: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
@@ -0,0 +1,18 @@
+import hmac
+from flask import jsonify, request
+
+from app.config import Config
+from app.services.metrics import metrics
+
+def init_metrics_routes(app):
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        """
+        Snapshot of the process's in-memory counters, gauges and histograms, for
+        the scraper holding METRICS_SCRAPE_TOKEN.
+        """
+        token = Config.METRICS_SCRAPE_TOKEN
+        auth_header = request.headers.get('Authorization', '')
+        if not token or not hmac.compare_digest(auth_header.encode(), f'Bearer {token}'.encode()):
+            return jsonify({"error": "Invalid scrape token"}), 401
+        return jsonify(metrics.snapshot())
@@ -1,30 +1,163 @@
 from flask import Blueprint, request, jsonify
+from functools import wraps
+import hashlib
 import logging
 
 from app.services.recommendations import RecommendationsService, InsufficientWardrobeError
 from app.services.interactions import InteractionsService
-from app.services.trips import TripsService
+from app.services.trips import TripsService, TripNotFoundError
 from app.services.text_transformations import TextTransformationsService
 from app.services.rate_limit import RateLimitError
+from app.services.concurrency import LLMOverloadedError
+from app.services.idempotency import IdempotencyService, IdempotencyConflictError, IdempotencyInProgressError, scoped_key
+from app.services.jobs import JobsService, JobQueueFullError
 from app.routes.auth import requires_auth
+from app.config import Config
 
 logger = logging.getLogger(__name__)
 
-def init_recommendation_routes(app, recommendations_service: RecommendationsService, interactions_service: InteractionsService, trips_service: TripsService, text_transformations_service: TextTransformationsService):
+def _overloaded(error: Exception, retry_after: int) -> dict:
+    return {
+        "error": str(error),
+        "type": "overloaded",
+        "message": "The server is busy. Please try again shortly.",
+        "retry_after": retry_after
+    }
+
+def _rate_limited(error: RateLimitError) -> dict:
+    if error.retry_after is None:
+        return {
+            "error": str(error),
+            "type": "rate_limit",
+            "message": "You have exceeded your daily request limit. Please try again tomorrow."
+        }
+    return {
+        "error": str(error),
+        "type": "rate_limit",
+        "message": "You are sending requests too quickly. Please try again shortly.",
+        "retry_after": error.retry_after
+    }
+
+def _json_response(body: dict, status_code: int):
+    """Build the response, advertising Retry-After on load-shedding 503s and burst-limited 429s."""
+    response = jsonify(body)
+    response.status_code = status_code
+    if status_code in (429, 503) and 'retry_after' in body:
+        response.headers['Retry-After'] = str(body['retry_after'])
+    return response
+
+def _run(work, description: str) -> tuple:
+    """
+    Run a recommendation and map its errors to the API's error responses.
+
+    Args:
+        work (callable): Computes the response body
+        description (str): What is being recommended, used in error logs
+
+    Returns:
+        tuple: (body, status_code)
+    """
+    try:
+        return work(), 200
+    except InsufficientWardrobeError as e:
+        return {
+            "error": str(e),
+            "type": "insufficient_wardrobe",
+            "message": "Please add more items to your wardrobe before requesting recommendations."
+        }, 400
+    except TripNotFoundError:
+        return {"error": "Trip not found"}, 404
+    except RateLimitError as e:
+        return _rate_limited(e), 429
+    except LLMOverloadedError as e:
+        return _overloaded(e, e.retry_after), 503
+    except Exception as e:
+        logger.error(f"Error in {description}: {str(e)}", exc_info=True)
+        return {"error": str(e)}, 500
+
+def init_recommendation_routes(app, recommendations_service: RecommendationsService, interactions_service: InteractionsService, trips_service: TripsService, text_transformations_service: TextTransformationsService,
+                               idempotency_service: IdempotencyService = None, jobs_service: JobsService = None):
+    def idempotent(f):
+        """
+        Honor the Idempotency-Key header: a retried request replays the first response
+        instead of calling the LLM again, and concurrent duplicates wait for it.
+        Only successful responses are stored, so failed requests can be retried.
+        """
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            idempotency_key = request.headers.get('Idempotency-Key')
+            if not idempotency_key or idempotency_service is None:
+                return f(*args, **kwargs)
+
+            key = scoped_key(request.user['sub'], request.path, idempotency_key)
+            fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+            try:
+                stored = idempotency_service.begin(key, fingerprint)
+            except IdempotencyConflictError as e:
+                return jsonify({
+                    "error": str(e),
+                    "type": "idempotency_conflict",
+                    "message": "Use a new Idempotency-Key for a different request."
+                }), 422
+            except IdempotencyInProgressError as e:
+                return jsonify({
+                    "error": str(e),
+                    "type": "idempotency_in_progress",
+                    "message": "The original request is still being processed. Please retry shortly."
+                }), 409
+
+            if stored is not None:
+                body, status_code = stored
+                response = jsonify(body)
+                response.status_code = status_code
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            try:
+                response = app.make_response(f(*args, **kwargs))
+            except Exception:
+                idempotency_service.release(key)
+                raise
+            if 200 <= response.status_code < 300:
+                idempotency_service.complete(key, fingerprint, response.get_json(), response.status_code)
+            else:
+                idempotency_service.release(key)
+            return response
+        return decorated
+
+    def respond(job_type: str, description: str, work):
+        """
+        Run a recommendation in the request, or on the worker pool when the client
+        opts in with ?async=1. Async requests get 202 and poll GET /jobs/<job_id>.
+        """
+        if request.args.get('async') == '1' and jobs_service is not None:
+            try:
+                job_id = jobs_service.submit(request.user['sub'], job_type, lambda: _run(work, description))
+            except JobQueueFullError as e:
+                return _json_response(_overloaded(e, Config.JOB_RETRY_AFTER_SECONDS), 503)
+            except Exception as e:
+                logger.error(f"Error queueing {description}: {str(e)}", exc_info=True)
+                return jsonify({"error": str(e)}), 500
+            return jsonify({"job_id": job_id, "status": "queued"}), 202, {"Location": f"/jobs/{job_id}"}
+
+        body, status_code = _run(work, description)
+        return _json_response(body, status_code)
+
     @app.route('/recommend/wear', methods=['POST'])
     @requires_auth
+    @idempotent
     def recommend_outfit():
         """
         Recommend an outfit based on the user's wardrobe and situation.
         """
-        try:
-            data = request.get_json()
-            if not data or 'situation' not in data:
-                return jsonify({"error": "Missing situation in request"}), 400
+        data = request.get_json()
+        if not data or 'situation' not in data:
+            return jsonify({"error": "Missing situation in request"}), 400
 
-            situation = data['situation']
-            user_id = request.user['sub']
+        situation = data['situation']
+        user_id = request.user['sub']
 
+        def work():
             # Get recommendation
             recommendation = recommendations_service.get_outfit_recommendation(user_id, situation)
             
@@ -35,46 +168,88 @@ def init_recommendation_routes(app, recommendations_service: RecommendationsServ
                 recommendation=recommendation
             )
             
-            return jsonify({
+            body = {
                 "outfit": recommendation,
                 "interaction_id": interaction_id
-            })
-            
-        except InsufficientWardrobeError as e:
+            }
+            # Built by the local engine because the LLM failed or the user is over quota
+            degraded_reason = getattr(recommendation, 'degraded_reason', None)
+            if degraded_reason:
+                body["degraded"] = True
+                body["degraded_reason"] = degraded_reason
+            return body
+
+        return respond("outfit_recommendation", "outfit recommendation", work)
+
+    @app.route('/recommend/wear/batch', methods=['POST'])
+    @requires_auth
+    @idempotent
+    def recommend_outfits_batch():
+        """
+        Recommend one outfit per situation (e.g. planning a work week) in a single request.
+        Each situation counts as one request against the daily rate limit.
+        """
+        data = request.get_json()
+        if not data or 'situations' not in data:
+            return jsonify({"error": "Missing situations in request"}), 400
+
+        situations = data['situations']
+        if (not isinstance(situations, list) or not situations
+                or not all(isinstance(situation, str) and situation.strip() for situation in situations)):
+            return jsonify({"error": "Situations must be a non-empty list of descriptions"}), 400
+        if len(situations) > Config.MAX_BATCH_SITUATIONS:
             return jsonify({
-                "error": str(e),
-                "type": "insufficient_wardrobe",
-                "message": "Please add more items to your wardrobe before requesting recommendations."
+                "error": f"At most {Config.MAX_BATCH_SITUATIONS} situations are allowed per batch"
             }), 400
-        except RateLimitError as e:
-            return jsonify({
-                "error": str(e),
-                "type": "rate_limit",
-                "message": "You have exceeded your daily request limit. Please try again tomorrow."
-            }), 429
-        except Exception as e:
-            logger.error(f"Error in outfit recommendation: {str(e)}", exc_info=True)
-            return jsonify({"error": str(e)}), 500
+
+        user_id = request.user['sub']
+
+        def work():
+            # Get recommendations
+            recommendations = recommendations_service.get_batch_outfit_recommendations(user_id, situations)
+
+            # Save one interaction per situation
+            results = []
+            for situation, recommendation in zip(situations, recommendations):
+                interaction_id = interactions_service.save_recommendation_interaction(
+                    user_id=user_id,
+                    situation=situation,
+                    recommendation=recommendation
+                )
+                result = {
+                    "situation": situation,
+                    "outfit": recommendation,
+                    "interaction_id": interaction_id
+                }
+                degraded_reason = getattr(recommendation, 'degraded_reason', None)
+                if degraded_reason:
+                    result["degraded"] = True
+                    result["degraded_reason"] = degraded_reason
+                results.append(result)
+
+            return {"results": results}
+
+        return respond("batch_outfit_recommendation", "batch outfit recommendation", work)
 
     @app.route('/recommend/wear/trip/<trip_id>', methods=['POST'])
     @requires_auth
+    @idempotent
     def recommend_outfit_for_trip(trip_id):
         """
         Recommend an outfit based on a specific trip's context.
         """
-        try:
-            user_id = request.user['sub']
-            
+        data = request.get_json()
+        if not data or 'situation' not in data:
+            return jsonify({"error": "Missing situation in request"}), 400
+
+        situation = data['situation']
+        user_id = request.user['sub']
+
+        def work():
             # Get trip details
             trip = trips_service.get_trip(trip_id, user_id)
             if not trip:
-                return jsonify({"error": "Trip not found"}), 404
-            
-            data = request.get_json()
-            if not data or 'situation' not in data:
-                return jsonify({"error": "Missing situation in request"}), 400
-
-            situation = data['situation']
+                raise TripNotFoundError(f"Trip {trip_id} not found")
 
             # Get recommendation based on trip context
             recommendation = recommendations_service.get_trip_outfit_recommendation(
@@ -89,41 +264,28 @@ def init_recommendation_routes(app, recommendations_service: RecommendationsServ
                 trip_id=trip_id
             )
             
-            return jsonify({
+            return {
                 "outfit": recommendation,
                 "interaction_id": interaction_id
-            })
-            
-        except InsufficientWardrobeError as e:
-            return jsonify({
-                "error": str(e),
-                "type": "insufficient_wardrobe",
-                "message": "Please add more items to your wardrobe before requesting recommendations."
-            }), 400
-        except RateLimitError as e:
-            return jsonify({
-                "error": str(e),
-                "type": "rate_limit",
-                "message": "You have exceeded your daily request limit. Please try again tomorrow."
-            }), 429
-        except Exception as e:
-            logger.error(f"Error in trip outfit recommendation: {str(e)}", exc_info=True)
-            return jsonify({"error": str(e)}), 500
+            }
+
+        return respond("trip_outfit_recommendation", "trip outfit recommendation", work)
 
     @app.route('/recommend/buy', methods=['POST'])
     @requires_auth
+    @idempotent
     def recommend_items_to_buy():
         """
         Recommend a single item to buy based on the user's situation and current wardrobe.
         """
-        try:
-            data = request.get_json()
-            if not data or 'situation' not in data:
-                return jsonify({"error": "Missing situation in request"}), 400
+        data = request.get_json()
+        if not data or 'situation' not in data:
+            return jsonify({"error": "Missing situation in request"}), 400
 
-            situation = data['situation']
-            user_id = request.user['sub']
+        situation = data['situation']
+        user_id = request.user['sub']
 
+        def work():
             # Get recommendation
             recommendation = recommendations_service.get_items_to_buy_recommendation(user_id, situation)
             
@@ -134,41 +296,28 @@ def init_recommendation_routes(app, recommendations_service: RecommendationsServ
                 recommendation=recommendation
             )
             
-            return jsonify({
+            return {
                 "item_to_buy": recommendation,
                 "interaction_id": interaction_id
-            })
-            
-        except InsufficientWardrobeError as e:
-            return jsonify({
-                "error": str(e),
-                "type": "insufficient_wardrobe",
-                "message": "Please add more items to your wardrobe before requesting recommendations."
-            }), 400
-        except RateLimitError as e:
-            return jsonify({
-                "error": str(e),
-                "type": "rate_limit",
-                "message": "You have exceeded your daily request limit. Please try again tomorrow."
-            }), 429
-        except Exception as e:
-            logger.error(f"Error in purchase recommendation: {str(e)}", exc_info=True)
-            return jsonify({"error": str(e)}), 500
+            }
+
+        return respond("purchase_recommendation", "purchase recommendation", work)
 
     @app.route('/recommend/pack', methods=['POST'])
     @requires_auth
+    @idempotent
     def recommend_packing_list():
         """
         Recommend a packing list based on the user's wardrobe and trip description.
         """
-        try:
-            data = request.get_json()
-            if not data or 'situation' not in data:
-                return jsonify({"error": "Missing situation in request"}), 400
+        data = request.get_json()
+        if not data or 'situation' not in data:
+            return jsonify({"error": "Missing situation in request"}), 400
 
-            situation = data['situation']
-            user_id = request.user['sub']
+        situation = data['situation']
+        user_id = request.user['sub']
 
+        def work():
             # Get recommendation
             packing_list = recommendations_service.get_packing_recommendation(user_id, situation)
             
@@ -189,24 +338,10 @@ def init_recommendation_routes(app, recommendations_service: RecommendationsServ
                 packing_list=packing_list
             )
             
-            return jsonify({
+            return {
                 "trip_id": trip_id,
                 "description": description,
                 "packing_list": packing_list
-            })
-            
-        except InsufficientWardrobeError as e:
-            return jsonify({
-                "error": str(e),
-                "type": "insufficient_wardrobe",
-                "message": "Please add more items to your wardrobe before requesting recommendations."
-            }), 400
-        except RateLimitError as e:
-            return jsonify({
-                "error": str(e),
-                "type": "rate_limit",
-                "message": "You have exceeded your daily request limit. Please try again tomorrow."
-            }), 429
-        except Exception as e:
-            logger.error(f"Error in packing list recommendation: {str(e)}", exc_info=True)
-            return jsonify({"error": str(e)}), 500
+            }
+
+        return respond("packing_list", "packing list recommendation", work)
@@ -3,6 +3,7 @@ import logging
 
 from app.services.trips import TripsService
 from app.routes.auth import requires_auth
+from app.routes.conditional import not_modified, with_etag
 
 logger = logging.getLogger(__name__)
 
@@ -11,10 +12,15 @@ def init_trip_routes(app, trips_service: TripsService):
     @requires_auth
     def get_user_trip():
         """
-        Get the user's most recent trip.
+        Get the user's most recent trip. Answers 304 without reading it when
+        If-None-Match holds the current ETag.
         """
         try:
             user_id = request.user['sub']
+            etag = trips_service.get_trips_etag(user_id)
+            cached = not_modified('trips', etag)
+            if cached is not None:
+                return cached
             
             # Get the user's trip
             trip = trips_service.get_user_trip(user_id)
@@ -26,7 +32,7 @@ def init_trip_routes(app, trips_service: TripsService):
                     "message": "You don't have any trips yet."
                 }), 404
             
-            return jsonify(trip)
+            return with_etag(jsonify(trip), etag)
             
         except Exception as e:
             logger.error(f"Error getting user trip: {str(e)}", exc_info=True)
@@ -1,12 +1,18 @@
 from flask import jsonify, request, current_app
 import uuid
 import logging
+from app.config import Config
 from app.routes.auth import requires_auth
+from app.routes.conditional import not_modified, with_etag
+from app.routes.bulk import id_list, run_with_progress
+from app.services.jobs import JobsService
 from app.services.wardrobe import WardrobeService
+from app.services.item_classifier import CATEGORIES
+from app.services.wardrobe_changes import CursorExpiredError
 
 logger = logging.getLogger(__name__)
 
-def init_wardrobe_routes(app, wardrobe_service: WardrobeService):
+def init_wardrobe_routes(app, wardrobe_service: WardrobeService, jobs_service: JobsService = None):
     @app.route('/wardrobe', methods=['POST'])
     @requires_auth
     def add_wardrobe_item():
@@ -17,15 +23,20 @@ def init_wardrobe_routes(app, wardrobe_service: WardrobeService):
 
         item_id = str(uuid.uuid4())
         try:
+            duplicate_ids = [item['itemId'] for item in wardrobe_service.find_duplicates(user['sub'], data['description'])]
             wardrobe_service.add_wardrobe_item(
                 user_id=user['sub'],
                 item_id=item_id,
                 description=data['description']
             )
-            return jsonify({
+            body = {
                 'itemId': item_id,
                 'description': data['description']
-            }), 201
+            }
+            if duplicate_ids:
+                # Still added: the client decides whether to keep both
+                body['duplicateOf'] = duplicate_ids
+            return jsonify(body), 201
         except Exception as e:
             logger.error(f"Error adding wardrobe item: {str(e)}", exc_info=True)
             if current_app.debug:
@@ -36,15 +47,92 @@ def init_wardrobe_routes(app, wardrobe_service: WardrobeService):
     @requires_auth
     def get_wardrobe_items():
         user = request.user
+        category = request.args.get('category')
+        if category is not None and category not in CATEGORIES:
+            return jsonify({'error': f"Invalid category, expected one of: {', '.join(CATEGORIES)}"}), 400
+        etag = wardrobe_service.get_wardrobe_etag(user['sub'], category)
+        cached = not_modified('wardrobe', etag)
+        if cached is not None:
+            return cached
         try:
-            items = wardrobe_service.get_wardrobe_items(user['sub'])
-            return jsonify({'items': items}), 200
+            # Read before the items, so a write in between is replayed rather than missed
+            cursor = wardrobe_service.get_wardrobe_cursor(user['sub'])
+            if category is None:
+                items = wardrobe_service.get_wardrobe_items(user['sub'])
+            else:
+                items = wardrobe_service.get_wardrobe_items(user['sub'], category=category)
+            return with_etag(jsonify({'items': items, 'cursor': cursor}), etag), 200
         except Exception as e:
             logger.error(f"Error getting wardrobe items: {str(e)}", exc_info=True)
             if current_app.debug:
                 return jsonify({'error': str(e)}), 500
             return jsonify({'error': 'An error occurred while retrieving items'}), 500
 
+    @app.route('/wardrobe/changes', methods=['GET'])
+    @requires_auth
+    def get_wardrobe_changes():
+        user = request.user
+        try:
+            since = int(request.args.get('since', ''))
+        except ValueError:
+            return jsonify({'error': 'since must be a cursor from GET /wardrobe or a previous sync'}), 400
+        if since < 0:
+            return jsonify({'error': 'since must be a cursor from GET /wardrobe or a previous sync'}), 400
+        try:
+            return jsonify(wardrobe_service.get_wardrobe_changes(user['sub'], since)), 200
+        except CursorExpiredError as e:
+            return jsonify({
+                'error': 'Cursor expired',
+                'type': 'resync_required',
+                'message': str(e)
+            }), 410
+        except Exception as e:
+            logger.error(f"Error getting wardrobe changes: {str(e)}", exc_info=True)
+            if current_app.debug:
+                return jsonify({'error': str(e)}), 500
+            return jsonify({'error': 'An error occurred while retrieving changes'}), 500
+
+    @app.route('/wardrobe/search', methods=['GET'])
+    @requires_auth
+    def search_wardrobe_items():
+        user = request.user
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Missing search query'}), 400
+        try:
+            limit = min(int(request.args.get('limit', Config.WARDROBE_SEARCH_MAX_RESULTS)), Config.WARDROBE_SEARCH_MAX_RESULTS)
+        except ValueError:
+            return jsonify({'error': 'limit must be a number'}), 400
+        if limit < 1:
+            return jsonify({'error': 'limit must be at least 1'}), 400
+        try:
+            items = wardrobe_service.search_wardrobe_items(user['sub'], query, limit=limit)
+            return jsonify({'items': items}), 200
+        except Exception as e:
+            logger.error(f"Error searching wardrobe items: {str(e)}", exc_info=True)
+            if current_app.debug:
+                return jsonify({'error': str(e)}), 500
+            return jsonify({'error': 'An error occurred while searching items'}), 500
+
+    @app.route('/wardrobe/delete', methods=['POST'])
+    @requires_auth
+    def delete_wardrobe_items():
+        """
+        Delete several items: {"itemIds": [...]}. Large sets, or any with ?async=1,
+        run as a job; GET /jobs/<job_id> reports how many are deleted so far.
+        """
+        user_id = request.user['sub']
+        item_ids, error = id_list(request.get_json(silent=True), 'itemIds')
+        if error:
+            return jsonify({'error': error}), 400
+
+        def work(report):
+            progress = lambda deleted: report({'deleted': deleted, 'total': len(item_ids)})
+            return {'deleted': wardrobe_service.delete_wardrobe_items(user_id, item_ids, progress=progress)}
+
+        run_async = request.args.get('async') == '1' or len(item_ids) > Config.BULK_DELETE_SYNC_MAX_ITEMS
+        return run_with_progress(jobs_service, user_id, 'wardrobe_delete', work, run_async, 'deleting wardrobe items')
+
     @app.route('/wardrobe/<item_id>', methods=['DELETE'])
     @requires_auth
     def delete_wardrobe_item(item_id):
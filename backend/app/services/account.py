@@ -0,0 +1,225 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError, projection
+from app.config import Config
+from app.services.wardrobe import WardrobeService
+from app.services.trips import TripsService
+from app.services.interactions import InteractionsService
+from app.services.rate_limit import RateLimitService
+from app.services.feedback_ranker import FeedbackRanker
+from app.services.idempotency import IdempotencyService
+from app.services.jobs import JobsService
+from app.services.wardrobe_changes import WARDROBE_CHANGES_TABLE
+from app.services.interaction_archive import InteractionArchive
+from app.services.metrics import metrics
+from app.services.serialization import json_default
+
+logger = logging.getLogger(__name__)
+
+JSON = 'json'
+NDJSON = 'ndjson'
+EXPORT_FORMATS = (JSON, NDJSON)
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=json_default, separators=(',', ':'))
+
+class AccountService:
+    """
+    Export or delete everything stored about a user. Every table is read a
+    DynamoDB page at a time, so memory stays flat however much the user has.
+    Interactions already moved to the interaction archive are exported and
+    deleted with the ones still in the table.
+
+    Stored idempotent responses and job results are copies of responses already
+    exported as interactions, so export leaves them out, but deletion removes them.
+    Only queued or running jobs, and a response stored by a request still running
+    during the deletion, are left to their TTL (JOB_TTL_SECONDS, IDEMPOTENCY_TTL_SECONDS).
+    """
+
+    def __init__(self, dynamodb_client: DynamoDBClient, wardrobe_service: WardrobeService,
+                 trips_service: TripsService, interactions_service: InteractionsService,
+                 rate_limit_service: RateLimitService, feedback_ranker: FeedbackRanker = None,
+                 interaction_archive: InteractionArchive = None, idempotency_service: IdempotencyService = None,
+                 jobs_service: JobsService = None):
+        self.dynamodb = dynamodb_client
+        self.wardrobe_service = wardrobe_service
+        self.trips_service = trips_service
+        self.interactions_service = interactions_service
+        self.feedback_ranker = feedback_ranker
+        self.interaction_archive = interaction_archive
+        # (state section, service) for stores that can only delete a user's rows with forget()
+        self.forgetting = [
+            (section, service) for section, service in (('idempotencyKeys', idempotency_service), ('jobs', jobs_service))
+            if service is not None
+        ]
+        # (export section, table, sort key) for every table keyed by userId + a sort key
+        self.tables = [
+            ('wardrobeItems', wardrobe_service.table_name, 'itemId'),
+            ('interactions', interactions_service.table_name, 'interactionId'),
+            ('trips', trips_service.table_name, 'tripId'),
+            ('rateLimits', rate_limit_service.table_name, 'date'),
+            ('wardrobeChanges', WARDROBE_CHANGES_TABLE, 'seq'),
+        ]
+        # The change log is sync bookkeeping rather than the user's data
+        self.exported_sections = ['wardrobeItems', 'interactions', 'trips', 'rateLimits']
+
+    def _pages(self, table_name: str, user_id: str, attributes: list = None):
+        """Yield the user's rows in a table, one DynamoDB page at a time."""
+        query = {}
+        if attributes is not None:
+            query['projection_expression'], query['expression_attribute_names'] = projection(attributes)
+        start_key = None
+        while True:
+            response = self.dynamodb.query(
+                table_name=table_name,
+                key_condition_expression='userId = :user_id',
+                expression_attribute_values={':user_id': user_id},
+                exclusive_start_key=start_key,
+                **query
+            )
+            yield response.get('Items', [])
+            start_key = response.get('LastEvaluatedKey')
+            if start_key is None:
+                return
+
+    def _section_items(self, section: str, table_name: str, user_id: str):
+        """Yield the user's items in an export section, archived interactions after the table's."""
+        interaction_ids = set()
+        for page in self._pages(table_name, user_id):
+            for item in page:
+                if section == 'interactions':
+                    interaction_ids.add(item['interactionId'])
+                yield item
+        if section == 'interactions' and self.interaction_archive is not None:
+            for row in self.interaction_archive.user_rows(user_id):
+                # A row whose archiving run stopped before deleting it is in both
+                if row['interactionId'] not in interaction_ids:
+                    yield row
+
+    def export(self, user_id: str, export_format: str = NDJSON):
+        """
+        Stream the user's data.
+
+        Args:
+            user_id (str): The user's ID
+            export_format (str): NDJSON, one {"section", "item"} object per line, or
+                JSON, one object with a list per section
+
+        Yields:
+            str: Chunks of the export
+
+        Raises:
+            DynamoDBError: If a read fails part way through the stream
+            OSError: If the interaction archive can't be read
+        """
+        sections = [(section, table_name) for section, table_name, _ in self.tables if section in self.exported_sections]
+        metrics.increment('account_exports_total', labels={'format': export_format})
+        if export_format == NDJSON:
+            for section, table_name in sections:
+                for item in self._section_items(section, table_name, user_id):
+                    yield _dumps({'section': section, 'item': item}) + '\n'
+            return
+
+        yield '{"userId":' + _dumps(user_id)
+        for section, table_name in sections:
+            yield ',' + _dumps(section) + ':['
+            separator = ''
+            for item in self._section_items(section, table_name, user_id):
+                yield separator + _dumps(item)
+                separator = ','
+            yield ']'
+        yield '}'
+
+    def _delete_table(self, user_id: str, table_name: str, sort_key: str, on_deleted) -> int:
+        deleted = 0
+        # Each page's keys are deleted before the next page is read, so a re-run
+        # after a failure only finds what's left
+        for page in self._pages(table_name, user_id, attributes=['userId', sort_key]):
+            if page:
+                deleted += self.dynamodb.batch_delete(
+                    table_name, page,
+                    max_parallel=Config.BULK_DELETE_PARALLEL_CHUNKS,
+                    on_chunk=on_deleted
+                )
+        return deleted
+
+    def delete_account(self, user_id: str, progress=None) -> dict:
+        """
+        Delete all of the user's rows, every table in parallel. Deletion is
+        idempotent: if it fails part way, running it again resumes with what's left.
+
+        Args:
+            user_id (str): The user's ID
+            progress (callable): Called with {"tables": {section: {"deleted", "done"}}}
+                as deletes land; archived interactions are the interactionArchive section
+
+        Returns:
+            dict: The rows deleted per section
+
+        Raises:
+            DynamoDBError: If any table's deletes fail, after the others finish
+        """
+        state = {section: {'deleted': 0, 'done': False} for section, _, _ in self.tables}
+        if self.interaction_archive is not None:
+            state['interactionArchive'] = {'deleted': 0, 'done': False}
+        for section, _ in self.forgetting:
+            state[section] = {'deleted': 0, 'done': False}
+        lock = threading.Lock()
+
+        def report(section: str, deleted: int = 0, done: bool = False):
+            with lock:
+                state[section]['deleted'] += deleted
+                state[section]['done'] = state[section]['done'] or done
+                if progress is not None:
+                    progress({'tables': {name: dict(values) for name, values in state.items()}})
+
+        def delete(section: str, table_name: str, sort_key: str) -> int:
+            deleted = self._delete_table(user_id, table_name, sort_key, lambda count: report(section, count))
+            report(section, done=True)
+            return deleted
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=len(self.tables), thread_name_prefix='account-delete') as executor:
+            futures = {section: executor.submit(delete, section, table_name, sort_key)
+                       for section, table_name, sort_key in self.tables}
+            for section, future in futures.items():
+                try:
+                    future.result()
+                except DynamoDBError as e:
+                    logger.error(f"Error deleting {section} for {user_id}: {str(e)}", exc_info=True)
+                    errors.append(section)
+
+        # After the table, so rows archived while it was being deleted are purged too
+        if self.interaction_archive is not None:
+            try:
+                report('interactionArchive', self.interaction_archive.purge_user(user_id), done=True)
+            except OSError as e:
+                logger.error(f"Error purging archived interactions for {user_id}: {str(e)}", exc_info=True)
+                errors.append('interactionArchive')
+
+        for section, service in self.forgetting:
+            try:
+                report(section, service.forget(user_id), done=True)
+            except DynamoDBError as e:
+                logger.error(f"Error deleting {section} for {user_id}: {str(e)}", exc_info=True)
+                errors.append(section)
+
+        if self.feedback_ranker is not None:
+            try:
+                self.feedback_ranker.forget(user_id)
+            except DynamoDBError as e:
+                logger.error(f"Error deleting feedback affinities for {user_id}: {str(e)}", exc_info=True)
+                errors.append('feedbackAffinity')
+
+        # Drop this process's caches of the user's data
+        self.wardrobe_service.versions.bump(user_id)
+        self.wardrobe_service.search_indexes.drop(user_id)
+        self.trips_service.versions.bump(user_id)
+        self.interactions_service.versions.bump(user_id)
+
+        if errors:
+            raise DynamoDBError(f"Failed to delete {', '.join(errors)}; run the deletion again to resume")
+        metrics.increment('account_deletions_total')
+        return {section: values['deleted'] for section, values in state.items()}
@@ -0,0 +1,77 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class LLMOverloadedError(Exception):
+    """Exception raised when an LLM call is shed because too many calls are in flight or queued"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class ConcurrencyLimiter:
+    """
+    Bounds concurrent calls to an upstream. Calls over max_concurrent wait in a
+    bounded queue for up to queue_timeout seconds; calls that find the queue full
+    or time out are shed with LLMOverloadedError instead of piling onto the upstream.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float,
+                 retry_after: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._queued = 0
+
+    def _publish(self) -> None:
+        metrics.set_gauge(f'{self.name}_in_flight', self._in_flight)
+        metrics.set_gauge(f'{self.name}_queued', self._queued)
+
+    def _shed(self, reason: str) -> LLMOverloadedError:
+        metrics.increment(f'{self.name}_shed_total', labels={'reason': reason})
+        logger.warning(f"Shedding {self.name} call: {reason}")
+        return LLMOverloadedError(f"Too many concurrent requests ({reason})", self.retry_after)
+
+    @contextmanager
+    def acquire(self):
+        """
+        Hold one concurrency slot for the duration of the with block.
+
+        Raises:
+            LLMOverloadedError: If the wait queue is full or the queue timeout expires
+        """
+        started = time.monotonic()
+        with self._condition:
+            if self._in_flight >= self.max_concurrent:
+                if self._queued >= self.max_queue:
+                    raise self._shed('queue_full')
+                self._queued += 1
+                self._publish()
+                try:
+                    admitted = self._condition.wait_for(
+                        lambda: self._in_flight < self.max_concurrent, timeout=self.queue_timeout
+                    )
+                finally:
+                    self._queued -= 1
+                if not admitted:
+                    self._publish()
+                    raise self._shed('queue_timeout')
+            self._in_flight += 1
+            self._publish()
+        metrics.observe(f'{self.name}_queue_wait_seconds', time.monotonic() - started)
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._publish()
+                self._condition.notify()
@@ -0,0 +1,86 @@
+import time
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from app.config import Config
+from app.services.wardrobe import WardrobeService
+from app.services.trips import TripsService
+from app.services.interactions import InteractionsService, INTERACTION_ID_PREFIXES
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# What the dashboard shows of each resource; the full documents stay behind their own endpoints
+WARDROBE_ATTRIBUTES = ['itemId', 'description', 'category']
+TRIP_ATTRIBUTES = ['tripId', 'description', 'createdAt']
+INTERACTION_ATTRIBUTES = ['interactionId', 'type', 'situation', 'description', 'recommendation', 'feedback', 'createdAt']
+
+class DashboardService:
+    """
+    One document with a user's wardrobe, latest trip and recent history, read in
+    parallel on a shared executor so it takes about as long as the slowest read.
+    """
+
+    def __init__(self, wardrobe_service: WardrobeService, trips_service: TripsService,
+                 interactions_service: InteractionsService, workers: int = Config.DASHBOARD_WORKERS):
+        self.wardrobe_service = wardrobe_service
+        self.trips_service = trips_service
+        self.interactions_service = interactions_service
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dashboard')
+
+    def get_dashboard_etag(self, user_id: str) -> str:
+        """ETag for GET /me/dashboard, changed whenever any of its parts' ETags change."""
+        etags = (
+            self.wardrobe_service.get_wardrobe_etag(user_id),
+            self.trips_service.get_trips_etag(user_id),
+            self.interactions_service.get_interactions_etag(user_id),
+        )
+        return hashlib.sha256('|'.join(etags).encode()).hexdigest()[:32]
+
+    def _timed(self, part: str, read, *args):
+        started = time.monotonic()
+        try:
+            return read(*args)
+        finally:
+            metrics.observe('dashboard_read_seconds', time.monotonic() - started, labels={'part': part})
+
+    def get_dashboard(self, user_id: str,
+                      wardrobe_limit: int = Config.DASHBOARD_WARDROBE_ITEMS,
+                      interactions_limit: int = Config.DASHBOARD_RECENT_INTERACTIONS) -> dict:
+        """
+        Read the dashboard. Every read is one DynamoDB query, projected to the
+        attributes the dashboard shows and limited to what it returns; recent
+        history is one query per interaction type, merged here.
+
+        Args:
+            user_id (str): The user's ID
+            wardrobe_limit (int): Maximum number of wardrobe items
+            interactions_limit (int): Maximum number of recent interactions
+
+        Returns:
+            dict: wardrobe (items and hasMore), trip (or None) and interactions (newest first)
+
+        Raises:
+            DynamoDBError: If any of the reads fails
+        """
+        wardrobe = self.executor.submit(
+            self._timed, 'wardrobe', self.wardrobe_service.get_wardrobe_page, user_id, wardrobe_limit, WARDROBE_ATTRIBUTES
+        )
+        trip = self.executor.submit(
+            self._timed, 'trip', self.trips_service.get_user_trip, user_id, TRIP_ATTRIBUTES
+        )
+        interactions = [
+            self.executor.submit(
+                self._timed, 'interactions', self.interactions_service.get_recent_interactions,
+                user_id, interaction_type, interactions_limit, INTERACTION_ATTRIBUTES
+            )
+            for interaction_type in INTERACTION_ID_PREFIXES
+        ]
+
+        recent = [interaction for future in interactions for interaction in future.result()]
+        recent.sort(key=lambda interaction: interaction.get('createdAt', ''), reverse=True)
+        return {
+            'wardrobe': wardrobe.result(),
+            'trip': trip.result(),
+            'interactions': recent[:interactions_limit],
+        }
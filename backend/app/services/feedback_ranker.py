@@ -0,0 +1,317 @@
+import time
+import logging
+import threading
+from itertools import combinations
+import numpy as np
+from app.clients.dynamodb import DynamoDBClient, projection
+from app.config import Config
+from app.services.outfit_engine import (
+    ACCESSORIES, BOTTOM, ONE_PIECE, OUTERWEAR, SHOES, TOP, classify_item, item_fit, read_situation
+)
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_AFFINITY_TABLE = f'{Config.ENV}-feedback-affinity'
+
+# Outfit keys whose values are wardrobe item descriptions
+OUTFIT_SLOTS = ('top', 'bottom', 'shoes', 'outerwear', 'accessories')
+
+# Normalized descriptions never contain tabs, so a tab safely joins a pair key
+PAIR_SEPARATOR = '\t'
+
+# DynamoDB store row keys: the kind of counter, then its item or pair key
+ITEM_PREFIX = 'item#'
+PAIR_PREFIX = 'pair#'
+
+# Actions DynamoDB accepts in one TransactWriteItems call
+MAX_TRANSACT_WRITES = 100
+
+# How much learned affinity moves an item's score relative to its situation fit
+ITEM_AFFINITY_WEIGHT = 1.5
+PAIR_AFFINITY_WEIGHT = 1.0
+
+# Items that fit the situation worse than this are never served without the LLM
+MIN_CONFIDENT_FIT = -1.0
+
+def normalize_description(description: str) -> str:
+    return ' '.join(description.lower().split())
+
+def pair_key(first: str, second: str) -> str:
+    return PAIR_SEPARATOR.join(sorted((first, second)))
+
+def feedback_value(feedback) -> int:
+    """+1 for a thumbs up, -1 for a thumbs down, 0 for no feedback yet."""
+    if feedback is None:
+        return 0
+    return 1 if int(feedback) == 1 else -1
+
+def outfit_items(recommendation: dict) -> list:
+    """The distinct, normalized item descriptions of an outfit recommendation."""
+    items = []
+    for slot in OUTFIT_SLOTS:
+        value = recommendation.get(slot)
+        if isinstance(value, str) and value.strip():
+            item = normalize_description(value)
+            if item not in items:
+                items.append(item)
+    return items
+
+class InMemoryAffinityStore:
+    """Process-local affinity store."""
+
+    def __init__(self):
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> tuple:
+        """
+        Returns:
+            tuple: (item affinities, pair affinities), both dicts of key to net feedback
+        """
+        with self._lock:
+            items, pairs = self._users.get(user_id, ({}, {}))
+            return dict(items), dict(pairs)
+
+    def add(self, user_id: str, item_deltas: dict, pair_deltas: dict) -> None:
+        with self._lock:
+            items, pairs = self._users.setdefault(user_id, ({}, {}))
+            for key, delta in item_deltas.items():
+                items[key] = items.get(key, 0) + delta
+            for key, delta in pair_deltas.items():
+                pairs[key] = pairs.get(key, 0) + delta
+
+    def delete(self, user_id: str) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+class DynamoDBAffinityStore:
+    """
+    Affinity store shared across processes: one row per user and item or pair,
+    keyed by affinityKey (ITEM_PREFIX or PAIR_PREFIX plus the item or pair key).
+
+    Pairs grow roughly quadratically with the items a user gives feedback on, so
+    they can't share one row per user: that row would eventually pass DynamoDB's
+    400 KB item limit and every later feedback write would fail. As separate rows
+    they have no size limit. Each update refreshes the row's TTL, so entries with no
+    feedback for FEEDBACK_AFFINITY_RETENTION_DAYS expire and a user's row count
+    stays bounded by recent feedback; get reads them with a paginated query.
+    """
+
+    def __init__(self, dynamodb_client: DynamoDBClient):
+        self.dynamodb = dynamodb_client
+        self.table_name = FEEDBACK_AFFINITY_TABLE
+
+    def _rows(self, user_id: str, attributes: list):
+        start_key = None
+        projection_expression, names = projection(attributes)
+        while True:
+            response = self.dynamodb.query(
+                table_name=self.table_name,
+                key_condition_expression='userId = :user_id',
+                expression_attribute_values={':user_id': user_id},
+                exclusive_start_key=start_key,
+                projection_expression=projection_expression,
+                expression_attribute_names=names
+            )
+            yield from response.get('Items', [])
+            start_key = response.get('LastEvaluatedKey')
+            if start_key is None:
+                return
+
+    def get(self, user_id: str) -> tuple:
+        items, pairs = {}, {}
+        for row in self._rows(user_id, ['affinityKey', 'net']):
+            net = float(row.get('net', 0))
+            # Feedback that cancelled out is the same as none
+            if not net:
+                continue
+            key = row['affinityKey']
+            if key.startswith(ITEM_PREFIX):
+                items[key[len(ITEM_PREFIX):]] = net
+            elif key.startswith(PAIR_PREFIX):
+                pairs[key[len(PAIR_PREFIX):]] = net
+        return items, pairs
+
+    def add(self, user_id: str, item_deltas: dict, pair_deltas: dict) -> None:
+        expires_at = int(time.time()) + Config.FEEDBACK_AFFINITY_RETENTION_DAYS * 86400
+        updates = [
+            {'Update': {
+                'TableName': self.table_name,
+                'Key': {'userId': user_id, 'affinityKey': prefix + key},
+                'UpdateExpression': 'SET #net = if_not_exists(#net, :zero) + :delta, #expiresAt = :expiresAt',
+                'ExpressionAttributeNames': {'#net': 'net', '#expiresAt': 'expiresAt'},
+                'ExpressionAttributeValues': {':zero': 0, ':delta': delta, ':expiresAt': expires_at}
+            }}
+            for prefix, deltas in ((ITEM_PREFIX, item_deltas), (PAIR_PREFIX, pair_deltas))
+            for key, delta in deltas.items()
+        ]
+        # One round trip, and an outfit's items and pairs move together
+        for start in range(0, len(updates), MAX_TRANSACT_WRITES):
+            self.dynamodb.transact_write(updates[start:start + MAX_TRANSACT_WRITES])
+
+    def delete(self, user_id: str) -> None:
+        keys = [
+            {'userId': user_id, 'affinityKey': row['affinityKey']}
+            for row in self._rows(user_id, ['affinityKey'])
+        ]
+        self.dynamodb.batch_delete(self.table_name, keys)
+
+class Ranking:
+    """The ranker's answer for one request: the items worth prompting with, and an outfit it is sure of."""
+
+    def __init__(self, candidates: list, outfit: dict = None):
+        self.candidates = candidates
+        self.outfit = outfit
+
+class FeedbackRanker:
+    """
+    Learns per-user item and item-pair affinities from thumbs up/down on outfit
+    recommendations and ranks a wardrobe with them.
+
+    An item's affinity is the net feedback (likes minus dislikes) on outfits that
+    included it, and a pair's is the net feedback on outfits that included both.
+    Each feedback write adds its delta to those counters, so nothing is recomputed
+    from the interaction history.
+    """
+
+    def __init__(self, store, candidates_per_category: int = Config.FEEDBACK_CANDIDATES_PER_CATEGORY,
+                 min_confidence: float = Config.FEEDBACK_SKIP_LLM_MIN_AFFINITY):
+        self.store = store
+        self.candidates_per_category = candidates_per_category
+        self.min_confidence = min_confidence
+
+    def record_feedback(self, user_id: str, recommendation: dict, delta: int) -> None:
+        """
+        Apply a change in feedback on an outfit recommendation.
+
+        Args:
+            user_id (str): The user's ID
+            recommendation (dict): The outfit the feedback is about
+            delta (int): New minus previous feedback value, e.g. +2 when a thumbs
+                down becomes a thumbs up
+
+        Raises:
+            DynamoDBError: If the DynamoDB store can't be updated
+        """
+        items = outfit_items(recommendation)
+        if not delta or not items:
+            return
+        item_deltas = {item: delta for item in items}
+        pair_deltas = {pair_key(first, second): delta for first, second in combinations(items, 2)}
+        self.store.add(user_id, item_deltas, pair_deltas)
+        metrics.increment('feedback_affinity_updates_total', labels={'direction': 'up' if delta > 0 else 'down'})
+
+    def forget(self, user_id: str) -> None:
+        """
+        Drop everything learned about a user.
+
+        Raises:
+            DynamoDBError: If the DynamoDB store can't be updated
+        """
+        self.store.delete(user_id)
+
+    def rank(self, user_id: str, wardrobe_items: list, situation: str) -> Ranking:
+        """
+        Rank a wardrobe for a situation by fit plus learned affinity.
+
+        Args:
+            user_id (str): The user's ID
+            wardrobe_items (list): Wardrobe items with a description
+            situation (str): The situation the user described
+
+        Returns:
+            Ranking: The best candidates per category and, when a combination the
+                user liked repeatedly fits the situation, that outfit. None if the
+                user hasn't given any feedback yet.
+
+        Raises:
+            DynamoDBError: If the DynamoDB store can't be read
+        """
+        item_affinities, pair_affinities = self.store.get(user_id)
+        if not item_affinities:
+            return None
+
+        descriptions = [item.get('description', '').strip() for item in wardrobe_items]
+        keys = [normalize_description(description) for description in descriptions]
+        positions = {}
+        for position, key in enumerate(keys):
+            positions.setdefault(key, position)
+
+        targets = read_situation(situation)
+        fit = np.array([item_fit(description, targets) for description in descriptions])
+        affinity = np.array([item_affinities.get(key, 0.0) for key in keys])
+        pairs = np.zeros((len(keys), len(keys)))
+        for key, value in pair_affinities.items():
+            first, second = (positions.get(part) for part in key.split(PAIR_SEPARATOR))
+            if first is not None and second is not None:
+                pairs[first, second] = pairs[second, first] = value
+
+        # Squashed so a long history can't drown out how well an item suits the situation
+        scores = fit + ITEM_AFFINITY_WEIGHT * np.tanh(affinity / 2) + PAIR_AFFINITY_WEIGHT * np.tanh(pairs.sum(axis=1) / 4)
+
+        categories = np.array([classify_item(description)[0] or '' for description in descriptions])
+        by_category = {}
+        for category in np.unique(categories):
+            members = np.flatnonzero(categories == category)
+            best = members[np.argsort(-scores[members], kind='stable')[:self.candidates_per_category]]
+            by_category[category] = best
+
+        chosen = np.sort(np.concatenate(list(by_category.values())))
+        candidates = [wardrobe_items[position] for position in chosen]
+        outfit = self._confident_outfit(by_category, descriptions, fit, scores, pairs)
+        return Ranking(candidates, outfit)
+
+    def _confident_outfit(self, by_category: dict, descriptions: list, fit: np.ndarray,
+                          scores: np.ndarray, pairs: np.ndarray) -> dict:
+        """
+        The best-scoring outfit among the candidates whose every pair of core items
+        has at least min_confidence net likes together and whose items all suit the
+        situation, or None.
+        """
+        if self.min_confidence <= 0:
+            return None
+        shoes = by_category.get(SHOES)
+        if shoes is None:
+            return None
+        shoes = shoes[fit[shoes] >= MIN_CONFIDENT_FIT]
+
+        best_score, best = None, None
+        tops, bottoms = by_category.get(TOP), by_category.get(BOTTOM)
+        if tops is not None and bottoms is not None:
+            tops = tops[fit[tops] >= MIN_CONFIDENT_FIT]
+            bottoms = bottoms[fit[bottoms] >= MIN_CONFIDENT_FIT]
+            # Every top x bottom x shoes combination at once: its weakest pair and its total score
+            confidence = np.minimum(
+                np.minimum(pairs[np.ix_(tops, bottoms)][:, :, None], pairs[np.ix_(tops, shoes)][:, None, :]),
+                pairs[np.ix_(bottoms, shoes)][None, :, :]
+            )
+            total = scores[tops][:, None, None] + scores[bottoms][None, :, None] + scores[shoes][None, None, :]
+            total = np.where(confidence >= self.min_confidence, total, -np.inf)
+            if total.size and np.isfinite(total.max()):
+                top, bottom, shoe = np.unravel_index(np.argmax(total), total.shape)
+                best_score, best = total[top, bottom, shoe], {TOP: tops[top], BOTTOM: bottoms[bottom], SHOES: shoes[shoe]}
+
+        one_pieces = by_category.get(ONE_PIECE)
+        if one_pieces is not None:
+            one_pieces = one_pieces[fit[one_pieces] >= MIN_CONFIDENT_FIT]
+            total = 2 * scores[one_pieces][:, None] + scores[shoes][None, :]
+            total = np.where(pairs[np.ix_(one_pieces, shoes)] >= self.min_confidence, total, -np.inf)
+            if total.size and np.isfinite(total.max()) and (best_score is None or total.max() > best_score):
+                one_piece, shoe = np.unravel_index(np.argmax(total), total.shape)
+                # Both required slots hold the one-piece, as in the LLM's outfits
+                best = {TOP: one_pieces[one_piece], BOTTOM: one_pieces[one_piece], SHOES: shoes[shoe]}
+
+        if best is None:
+            return None
+        core = np.array(list(best.values()))
+        for category in (OUTERWEAR, ACCESSORIES):
+            extras = by_category.get(category)
+            if extras is None:
+                continue
+            # Only add what the user liked alongside this exact outfit
+            support = pairs[np.ix_(extras, core)].min(axis=1)
+            extra = int(np.argmax(support))
+            if support[extra] >= self.min_confidence and fit[extras[extra]] >= MIN_CONFIDENT_FIT:
+                best[category] = extras[extra]
+        return {slot: descriptions[position] for slot, position in best.items()}
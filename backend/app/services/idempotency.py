@@ -0,0 +1,282 @@
+import json
+import time
+import logging
+import threading
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError, ConditionalCheckFailedError, projection
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TABLE = f'{Config.ENV}-idempotency-keys'
+
+IN_PROGRESS = 'in_progress'
+COMPLETED = 'completed'
+
+# How often the DynamoDB store re-reads a key while a duplicate waits on it
+POLL_INTERVAL_SECONDS = 0.2
+
+def scoped_key(user_id: str, path: str, key: str) -> str:
+    """An Idempotency-Key header scoped to the user and endpoint, so keys never collide across them."""
+    return f'{user_id}#{path}#{key}'
+
+def _user_prefix(user_id: str) -> str:
+    return f'{user_id}#'
+
+class IdempotencyConflictError(Exception):
+    """Exception raised when an idempotency key is reused with a different request body"""
+    pass
+
+class IdempotencyInProgressError(Exception):
+    """Exception raised when the first request for a key is still running after the wait timeout"""
+    pass
+
+class InMemoryIdempotencyStore:
+    """
+    Process-local idempotency store. Duplicates wait on a condition variable.
+    Keys are rarely looked up again once their retries stop, so each claim drops
+    every expired record rather than waiting for its key to come back.
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._condition = threading.Condition()
+
+    def _get_live(self, key: str) -> dict:
+        record = self._records.get(key)
+        if record and record['expiresAt'] <= time.time():
+            del self._records[key]
+            return None
+        return record
+
+    def claim(self, key: str, fingerprint: str, lease_seconds: int) -> dict:
+        """
+        Claim a key for the current request, until complete() or release() or the
+        lease runs out. A key whose lease ran out is claimed like a new one.
+
+        Returns:
+            dict: None if the key was claimed, otherwise the existing record
+        """
+        with self._condition:
+            now = time.time()
+            expired = [stored_key for stored_key, stored in self._records.items() if stored['expiresAt'] <= now]
+            for stored_key in expired:
+                del self._records[stored_key]
+            record = self._records.get(key)
+            if record:
+                return dict(record)
+            self._records[key] = {
+                'status': IN_PROGRESS,
+                'fingerprint': fingerprint,
+                'expiresAt': time.time() + lease_seconds
+            }
+            return None
+
+    def complete(self, key: str, fingerprint: str, response: str, ttl_seconds: int) -> None:
+        with self._condition:
+            self._records[key] = {
+                'status': COMPLETED,
+                'fingerprint': fingerprint,
+                'response': response,
+                'expiresAt': time.time() + ttl_seconds
+            }
+            self._condition.notify_all()
+
+    def release(self, key: str) -> None:
+        with self._condition:
+            self._records.pop(key, None)
+            self._condition.notify_all()
+
+    def delete_user(self, user_id: str) -> int:
+        with self._condition:
+            keys = [key for key in self._records if key.startswith(_user_prefix(user_id))]
+            for key in keys:
+                del self._records[key]
+            self._condition.notify_all()
+            return len(keys)
+
+    def wait(self, key: str, timeout: float) -> dict:
+        """
+        Wait until the record for a key is no longer in progress.
+
+        Returns:
+            dict: The record, or None if it was released or expired
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                record = self._get_live(key)
+                remaining = deadline - time.monotonic()
+                if not record or record['status'] != IN_PROGRESS or remaining <= 0:
+                    return dict(record) if record else None
+                self._condition.wait(remaining)
+
+class DynamoDBIdempotencyStore:
+    """Idempotency store shared across processes, backed by a DynamoDB table with TTL on expiresAt."""
+
+    def __init__(self, dynamodb_client: DynamoDBClient):
+        self.dynamodb = dynamodb_client
+        self.table_name = IDEMPOTENCY_TABLE
+
+    def _get_live(self, key: str) -> dict:
+        response = self.dynamodb.get_item(
+            table_name=self.table_name,
+            key={'idempotencyKey': key}
+        )
+        record = response.get('Item')
+        # DynamoDB TTL deletes lazily, so expired rows may still be returned
+        if record and int(record['expiresAt']) <= time.time():
+            return None
+        return record
+
+    def claim(self, key: str, fingerprint: str, lease_seconds: int) -> dict:
+        now = int(time.time())
+        try:
+            self.dynamodb.put_item(
+                table_name=self.table_name,
+                item={
+                    'idempotencyKey': key,
+                    'status': IN_PROGRESS,
+                    'fingerprint': fingerprint,
+                    'expiresAt': now + lease_seconds
+                },
+                # An expired lease is taken over: its request's worker is gone
+                condition_expression='attribute_not_exists(idempotencyKey) OR expiresAt <= :now',
+                expression_attribute_values={':now': now}
+            )
+            return None
+        except ConditionalCheckFailedError:
+            return self._get_live(key)
+
+    def complete(self, key: str, fingerprint: str, response: str, ttl_seconds: int) -> None:
+        self.dynamodb.put_item(
+            table_name=self.table_name,
+            item={
+                'idempotencyKey': key,
+                'status': COMPLETED,
+                'fingerprint': fingerprint,
+                'response': response,
+                'expiresAt': int(time.time()) + ttl_seconds
+            }
+        )
+
+    def release(self, key: str) -> None:
+        self.dynamodb.delete_item(
+            table_name=self.table_name,
+            key={'idempotencyKey': key}
+        )
+
+    def delete_user(self, user_id: str) -> int:
+        # Keyed by the scoped key alone, so finding a user's keys takes a scan; the
+        # table only holds IDEMPOTENCY_TTL_SECONDS of keys, which bounds it
+        projection_expression, names = projection(['idempotencyKey'])
+        deleted, start_key = 0, None
+        while True:
+            response = self.dynamodb.scan(
+                table_name=self.table_name,
+                projection_expression=projection_expression,
+                expression_attribute_names=names,
+                exclusive_start_key=start_key,
+                filter_expression='begins_with(#p0, :prefix)',
+                expression_attribute_values={':prefix': _user_prefix(user_id)}
+            )
+            keys = response.get('Items', [])
+            if keys:
+                deleted += self.dynamodb.batch_delete(self.table_name, keys)
+            start_key = response.get('LastEvaluatedKey')
+            if start_key is None:
+                return deleted
+
+    def wait(self, key: str, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        while True:
+            record = self._get_live(key)
+            if not record or record['status'] != IN_PROGRESS or time.monotonic() >= deadline:
+                return record
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+class IdempotencyService:
+    """
+    Runs each idempotency key's request once and replays its response to retries.
+    A claimed key is leased for lease_seconds, so a retry can take it over if the
+    worker holding it dies; a completed response is kept for ttl_seconds.
+    """
+
+    def __init__(self, store=None, ttl_seconds: int = Config.IDEMPOTENCY_TTL_SECONDS,
+                 wait_timeout: float = Config.IDEMPOTENCY_WAIT_SECONDS,
+                 lease_seconds: int = Config.IDEMPOTENCY_LEASE_SECONDS):
+        self.store = store or InMemoryIdempotencyStore()
+        self.ttl_seconds = ttl_seconds
+        self.wait_timeout = wait_timeout
+        self.lease_seconds = lease_seconds
+
+    def begin(self, key: str, fingerprint: str) -> tuple:
+        """
+        Start handling a request carrying an idempotency key.
+
+        If another request already holds the key, wait for it to finish and replay its
+        stored response. If that request failed and released the key, or its lease
+        ran out, claim it instead.
+
+        Args:
+            key (str): The idempotency key, already scoped to the user and endpoint
+            fingerprint (str): A hash of the request body
+
+        Returns:
+            tuple: (body, status_code) of the stored response, or None if the caller
+                now owns the key and must call complete() or release()
+
+        Raises:
+            IdempotencyConflictError: If the key was used with a different request body
+            IdempotencyInProgressError: If the first request is still running after the wait timeout
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            try:
+                record = self.store.claim(key, fingerprint, self.lease_seconds)
+            except DynamoDBError as e:
+                # Fail open like the rate limiter: run the request without deduplication
+                logger.error(f"Error claiming idempotency key: {str(e)}", exc_info=True)
+                return None
+            if record is None:
+                return None
+
+            if record['fingerprint'] != fingerprint:
+                raise IdempotencyConflictError("Idempotency key was already used with a different request")
+
+            if record['status'] == IN_PROGRESS:
+                record = self.store.wait(key, max(deadline - time.monotonic(), 0))
+                if record is None:
+                    # The first request failed and released the key; try to claim it
+                    continue
+                if record['status'] == IN_PROGRESS:
+                    raise IdempotencyInProgressError("A request with this idempotency key is still in progress")
+
+            stored = json.loads(record['response'])
+            return stored['body'], stored['status']
+
+    def complete(self, key: str, fingerprint: str, body: dict, status_code: int) -> None:
+        """Store the response for a key so retries replay it until the TTL expires."""
+        try:
+            response = json.dumps({'body': body, 'status': status_code})
+            self.store.complete(key, fingerprint, response, self.ttl_seconds)
+        except DynamoDBError as e:
+            logger.error(f"Error storing idempotent response: {str(e)}", exc_info=True)
+
+    def release(self, key: str) -> None:
+        """Forget a key whose request failed, so a retry runs it again."""
+        try:
+            self.store.release(key)
+        except DynamoDBError as e:
+            logger.error(f"Error releasing idempotency key: {str(e)}", exc_info=True)
+
+    def forget(self, user_id: str) -> int:
+        """
+        Delete every key of a user's, with the responses stored for them.
+
+        Returns:
+            int: The number of keys deleted
+
+        Raises:
+            DynamoDBError: If the DynamoDB store can't be scanned or updated
+        """
+        return self.store.delete_user(user_id)
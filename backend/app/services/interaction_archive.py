@@ -0,0 +1,134 @@
+import os
+import gzip
+import json
+import uuid
+import logging
+from app.services.serialization import json_default
+
+logger = logging.getLogger(__name__)
+
+PART_SUFFIX = '.jsonl.gz'
+
+class ArchiveWriter:
+    """One archiving worker's open part files, one per partition it has seen."""
+
+    def __init__(self, root: str, name: str):
+        self.root = root
+        self.name = name
+        self.files = {}
+
+    def write(self, row: dict) -> None:
+        directory = os.path.join(self.root, f"date={row['createdAt'][:10]}", f"type={row.get('type') or 'unknown'}")
+        part = self.files.get(directory)
+        if part is None:
+            os.makedirs(directory, exist_ok=True)
+            raw = open(os.path.join(directory, self.name), 'ab')
+            part = self.files[directory] = (raw, gzip.GzipFile(fileobj=raw, mode='ab'))
+        part[1].write(json.dumps(row, default=json_default, separators=(',', ':')).encode() + b'\n')
+
+    def sync(self) -> None:
+        """Make everything written so far durable, so its rows can be deleted."""
+        for raw, compressed in self.files.values():
+            compressed.flush()
+            raw.flush()
+            os.fsync(raw.fileno())
+
+    def close(self) -> None:
+        for raw, compressed in self.files.values():
+            compressed.close()
+            raw.close()
+
+class InteractionArchive:
+    """
+    Interactions moved out of DynamoDB, as gzip-compressed JSON Lines files
+    partitioned by creation date and type:
+
+        <root>/date=2026-04-01/type=trip/part-<run>-<segment>.jsonl.gz
+
+    Account export and deletion read and purge it alongside the tables, so a
+    user's archived interactions are exported and deleted with the rest of their
+    data. A purge that overlaps an archive run can miss rows that run writes
+    after the purge has passed their file; running the deletion again removes them.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def writer(self, run_id: str, segment: int) -> ArchiveWriter:
+        return ArchiveWriter(self.root, f'part-{run_id}-{segment:03d}{PART_SUFFIX}')
+
+    def parts(self, since: str = None, until: str = None, types: list = None) -> list:
+        """
+        The part files in the date and type partitions asked for, found from the
+        directory names alone.
+
+        Args:
+            since (str): First creation date to include, YYYY-MM-DD
+            until (str): Last creation date to include, YYYY-MM-DD
+            types (list): Interaction types to include (default: all)
+        """
+        parts = []
+        if not os.path.isdir(self.root):
+            return parts
+        for date_dir in sorted(os.listdir(self.root)):
+            date = date_dir.removeprefix('date=')
+            if date == date_dir or (since and date < since) or (until and date > until):
+                continue
+            for type_dir in sorted(os.listdir(os.path.join(self.root, date_dir))):
+                interaction_type = type_dir.removeprefix('type=')
+                if interaction_type == type_dir or (types and interaction_type not in types):
+                    continue
+                directory = os.path.join(self.root, date_dir, type_dir)
+                parts.extend(
+                    os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                    if name.endswith(PART_SUFFIX)
+                )
+        return parts
+
+    def rows(self, path: str):
+        """Yield the rows of a part file, up to where it ends if a run stopped mid-write."""
+        try:
+            with gzip.open(path, 'rt') as lines:
+                for line in lines:
+                    yield json.loads(line)
+        except EOFError:
+            # A run that stopped mid-write leaves the file unterminated after its last synced page
+            logger.warning(f"{path} is truncated; read the rows before the end")
+
+    def user_rows(self, user_id: str):
+        """Yield the user's archived interactions, each once."""
+        seen = set()
+        for path in self.parts():
+            for row in self.rows(path):
+                if row.get('userId') == user_id and row['interactionId'] not in seen:
+                    seen.add(row['interactionId'])
+                    yield row
+
+    def purge_user(self, user_id: str) -> int:
+        """
+        Remove the user's rows from the archive. Each part file holding any is
+        rewritten without them and swapped in atomically, or removed if nothing
+        else is left in it.
+
+        Returns:
+            int: The number of rows removed
+
+        Raises:
+            OSError: If a part file can't be read or replaced
+        """
+        removed = 0
+        for path in self.parts():
+            rows = list(self.rows(path))
+            kept = [row for row in rows if row.get('userId') != user_id]
+            if len(kept) == len(rows):
+                continue
+            if kept:
+                temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+                with gzip.open(temporary, 'wb') as part:
+                    for row in kept:
+                        part.write(json.dumps(row, default=json_default, separators=(',', ':')).encode() + b'\n')
+                os.replace(temporary, path)
+            else:
+                os.remove(path)
+            removed += len(rows) - len(kept)
+        return removed
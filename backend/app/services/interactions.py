@@ -1,16 +1,33 @@
 import logging
+import threading
 from datetime import datetime, UTC
-from app.clients.dynamodb import DynamoDBClient, DynamoDBError
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError, projection
 from app.config import Config
+from app.services.feedback_ranker import FeedbackRanker, feedback_value
+from app.services.versions import UserVersions
 
 logger = logging.getLogger(__name__)
 
 INTERACTIONS_TABLE = f'{Config.ENV}-interactions'
 
+# Interaction IDs are a per-type prefix plus the creation timestamp, so each type
+# sorts by time within the user's partition
+INTERACTION_ID_PREFIXES = {
+    'outfit_recommendation': 'rec_',
+    'purchase_recommendation': 'buy_',
+    'trip': 'trip_',
+}
+
 class InteractionsService:
-    def __init__(self, dynamodb_client: DynamoDBClient):
+    def __init__(self, dynamodb_client: DynamoDBClient, feedback_ranker: FeedbackRanker = None):
         self.dynamodb = dynamodb_client
         self.table_name = INTERACTIONS_TABLE
+        self.feedback_ranker = feedback_ranker
+        self.versions = UserVersions()
+
+    def get_interactions_etag(self, user_id: str) -> str:
+        """ETag for GET /interactions, changed by every write through this service (see UserVersions.etag)."""
+        return self.versions.etag(user_id)
 
     def save_recommendation_interaction(self, user_id: str, situation: str, recommendation: dict, trip_id: str = None) -> str:
         """
@@ -42,6 +59,7 @@ class InteractionsService:
                     "createdAt": timestamp
                 }
             )
+            self.versions.bump(user_id)
             
             return interaction_id
         except DynamoDBError as e:
@@ -77,6 +95,7 @@ class InteractionsService:
                     "createdAt": timestamp
                 }
             )
+            self.versions.bump(user_id)
             return interaction_id
         except DynamoDBError as e:
             logger.error(f"Error saving purchase recommendation interaction: {str(e)}", exc_info=True)
@@ -114,6 +133,7 @@ class InteractionsService:
                     "createdAt": timestamp
                 }
             )
+            self.versions.bump(user_id)
             
             return trip_id
         except DynamoDBError as e:
@@ -149,6 +169,38 @@ class InteractionsService:
             logger.error(f"Error getting user interactions: {str(e)}", exc_info=True)
             raise
 
+    def get_recent_interactions(self, user_id: str, interaction_type: str, limit: int, attributes: list) -> list:
+        """
+        The user's newest interactions of one type, reading only those.
+
+        Args:
+            user_id (str): The user's ID
+            interaction_type (str): A key of INTERACTION_ID_PREFIXES
+            limit (int): Maximum number of interactions to return
+            attributes (list): The interaction attributes to return
+
+        Returns:
+            list: The interactions, newest first
+
+        Raises:
+            DynamoDBError: If there's an error querying DynamoDB
+        """
+        projection_expression, names = projection(attributes)
+        try:
+            response = self.dynamodb.query(
+                table_name=self.table_name,
+                key_condition_expression="userId = :user_id AND begins_with(interactionId, :prefix)",
+                expression_attribute_values={":user_id": user_id, ":prefix": INTERACTION_ID_PREFIXES[interaction_type]},
+                scan_index_forward=False,
+                limit=limit,
+                projection_expression=projection_expression,
+                expression_attribute_names=names
+            )
+            return response.get('Items', [])
+        except DynamoDBError as e:
+            logger.error(f"Error getting recent interactions: {str(e)}", exc_info=True)
+            raise
+
     def delete_interaction(self, user_id: str, interaction_id: str) -> None:
         """
         Delete a specific interaction from DynamoDB.
@@ -168,13 +220,95 @@ class InteractionsService:
                     "interactionId": interaction_id
                 }
             )
+            self.versions.bump(user_id)
         except DynamoDBError as e:
             logger.error(f"Error deleting interaction: {str(e)}", exc_info=True)
             raise
 
+    def delete_interactions(self, user_id: str, interaction_ids: list, progress=None) -> int:
+        """
+        Delete several interactions with batched deletes, several batches at a time.
+
+        Args:
+            user_id (str): The user's ID
+            interaction_ids (list): The interaction IDs to delete
+            progress (callable): Called with the running count of deleted interactions
+
+        Returns:
+            int: The number of interactions deleted
+
+        Raises:
+            DynamoDBError: If a batch fails; batches that finished stay deleted
+        """
+        keys = [{"userId": user_id, "interactionId": interaction_id} for interaction_id in dict.fromkeys(interaction_ids)]
+        deleted = 0
+        lock = threading.Lock()
+
+        def on_chunk(count):
+            nonlocal deleted
+            with lock:
+                deleted += count
+                if progress is not None:
+                    progress(deleted)
+
+        try:
+            return self.dynamodb.batch_delete(
+                self.table_name, keys,
+                max_parallel=Config.BULK_DELETE_PARALLEL_CHUNKS,
+                on_chunk=on_chunk
+            )
+        except DynamoDBError as e:
+            logger.error(f"Error deleting interactions: {str(e)}", exc_info=True)
+            raise
+        finally:
+            if deleted:
+                self.versions.bump(user_id)
+
+    def clear_interactions(self, user_id: str, progress=None) -> int:
+        """
+        Delete all of a user's interactions, a page of keys at a time.
+
+        Args:
+            user_id (str): The user's ID
+            progress (callable): Called with the running count of deleted interactions
+
+        Returns:
+            int: The number of interactions deleted
+
+        Raises:
+            DynamoDBError: If a read or a batch fails; pages already deleted stay deleted
+        """
+        projection_expression, names = projection(["interactionId"])
+        cleared = 0
+        start_key = None
+        while True:
+            try:
+                response = self.dynamodb.query(
+                    table_name=self.table_name,
+                    key_condition_expression="userId = :user_id",
+                    expression_attribute_values={":user_id": user_id},
+                    exclusive_start_key=start_key,
+                    projection_expression=projection_expression,
+                    expression_attribute_names=names
+                )
+            except DynamoDBError as e:
+                logger.error(f"Error listing interactions to clear: {str(e)}", exc_info=True)
+                raise
+            page = [item["interactionId"] for item in response.get("Items", [])]
+            offset = cleared
+            cleared += self.delete_interactions(
+                user_id, page,
+                progress=None if progress is None else lambda deleted: progress(offset + deleted)
+            )
+            start_key = response.get("LastEvaluatedKey")
+            if start_key is None:
+                return cleared
+
     def update_interaction_feedback(self, user_id: str, interaction_id: str, feedback: int) -> None:
         """
-        Update an interaction with user feedback.
+        Update an interaction with user feedback. Feedback on an outfit recommendation
+        also updates the user's item affinities in the feedback ranker, by the change
+        from the interaction's previous feedback.
         
         Args:
             user_id (str): The user's ID
@@ -184,21 +318,37 @@ class InteractionsService:
         Raises:
             DynamoDBError: If there's an error updating DynamoDB
         """
+        update = {
+            "table_name": self.table_name,
+            "key": {
+                "userId": user_id,
+                "interactionId": interaction_id
+            },
+            "update_expression": "SET #feedback = :feedback",
+            "expression_attribute_names": {
+                "#feedback": "feedback"
+            },
+            "expression_attribute_values": {
+                ":feedback": feedback
+            }
+        }
         try:
-            self.dynamodb.update_item(
-                table_name=self.table_name,
-                key={
-                    "userId": user_id,
-                    "interactionId": interaction_id
-                },
-                update_expression="SET #feedback = :feedback",
-                expression_attribute_names={
-                    "#feedback": "feedback"
-                },
-                expression_attribute_values={
-                    ":feedback": feedback
-                }
-            )
+            if self.feedback_ranker is None:
+                self.dynamodb.update_item(**update)
+                self.versions.bump(user_id)
+                return
+            # The old item says what the outfit was and what feedback it replaces
+            previous = self.dynamodb.update_item(**update, return_values="ALL_OLD")
         except DynamoDBError as e:
             logger.error(f"Error updating interaction feedback: {str(e)}", exc_info=True)
-            raise 
\ No newline at end of file
+            raise
+        self.versions.bump(user_id)
+
+        if previous.get("type") != "outfit_recommendation":
+            return
+        delta = feedback_value(feedback) - feedback_value(previous.get("feedback"))
+        try:
+            self.feedback_ranker.record_feedback(user_id, previous.get("recommendation") or {}, delta)
+        except DynamoDBError as e:
+            # The feedback itself is saved; only the ranker misses this update
+            logger.error(f"Error updating feedback affinities: {str(e)}", exc_info=True)
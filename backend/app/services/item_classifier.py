@@ -0,0 +1,76 @@
+import re
+from functools import lru_cache
+from app.services.outfit_engine import classify_item
+
+# Bump when the classification changes so the backfill re-tags existing items
+CLASSIFIER_VERSION = 1
+
+OTHER = 'other'
+
+# Category of each wardrobe item, in the order prompts list them
+CATEGORIES = ('top', 'bottom', 'one_piece', 'shoes', 'outerwear', 'accessories', OTHER)
+
+# Color words, with synonyms folded into one name
+COLOR_WORDS = {
+    'black': 'black', 'white': 'white', 'ivory': 'white', 'cream': 'beige', 'beige': 'beige', 'tan': 'beige',
+    'camel': 'beige', 'khaki': 'beige', 'grey': 'grey', 'gray': 'grey', 'charcoal': 'grey', 'silver': 'grey',
+    'navy': 'navy', 'blue': 'blue', 'denim': 'blue', 'teal': 'green', 'green': 'green', 'olive': 'green',
+    'red': 'red', 'burgundy': 'red', 'maroon': 'red', 'wine': 'red', 'pink': 'pink', 'purple': 'purple',
+    'lilac': 'purple', 'yellow': 'yellow', 'mustard': 'yellow', 'gold': 'yellow', 'orange': 'orange',
+    'brown': 'brown', 'chocolate': 'brown', 'cognac': 'brown',
+}
+
+# Words that don't tell two items apart
+_FILLER_WORDS = frozenset({'a', 'an', 'the', 'and', 'with', 'of', 'in', 'for', 'my', 'pair', 'new', 'old'})
+
+_WORD = re.compile(r"[a-z]+(?:-[a-z]+)*")
+
+def _singular(word: str) -> str:
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+def normalize_tokens(description: str) -> list:
+    """
+    The sorted, distinct, singular words of a description, without filler words,
+    so "Blue Jeans" and "jeans, blue" have the same tokens.
+    """
+    return sorted({_singular(word) for word in _WORD.findall(description.lower()) if word not in _FILLER_WORDS})
+
+def item_category(description: str) -> str:
+    """The item's category from CATEGORIES."""
+    return classify_item(description)[0] or OTHER
+
+@lru_cache(maxsize=65536)
+def _classify(description: str) -> tuple:
+    category, formality, _, _ = classify_item(description)
+    words = _WORD.findall(description.lower())
+    colors = []
+    for word in words:
+        color = COLOR_WORDS.get(word)
+        if color and color not in colors:
+            colors.append(color)
+    label = 'formal' if formality > 0 else 'casual' if formality < 0 else 'neutral'
+    return category or OTHER, tuple(colors), label, tuple(normalize_tokens(description))
+
+def classify_wardrobe_item(description: str) -> dict:
+    """
+    Classify a wardrobe item description with the local keyword rules.
+
+    Args:
+        description (str): The item description, e.g. "Navy wool blazer"
+
+    Returns:
+        dict: The attributes stored with the item: category, colors, formality
+            (formal, neutral or casual), tokens, normalizedKey (the tokens joined,
+            equal for duplicate items) and classifierVersion
+    """
+    category, colors, formality, tokens = _classify(description)
+    return {
+        'category': category,
+        'colors': list(colors),
+        'formality': formality,
+        'tokens': list(tokens),
+        'normalizedKey': ' '.join(tokens),
+        'classifierVersion': CLASSIFIER_VERSION
+    }
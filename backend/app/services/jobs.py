@@ -0,0 +1,245 @@
+import json
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError, projection
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+JOBS_TABLE = f'{Config.ENV}-jobs'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+class JobQueueFullError(Exception):
+    """Exception raised when the worker pool queue is full and a job is not admitted"""
+    pass
+
+class InMemoryJobStore:
+    """Process-local job store, used in tests and single-process deployments."""
+
+    def __init__(self, ttl_seconds: int = Config.JOB_TTL_SECONDS):
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.ttl_seconds = ttl_seconds
+
+    def create(self, job: dict) -> None:
+        with self._lock:
+            now = time.time()
+            expired = [job_id for job_id, stored in self._jobs.items() if stored['expiresAt'] <= now]
+            for job_id in expired:
+                del self._jobs[job_id]
+            self._jobs[job['jobId']] = dict(job, expiresAt=now + self.ttl_seconds)
+
+    def update(self, job_id: str, fields: dict) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id: str) -> dict:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def delete_finished(self, user_id: str) -> int:
+        with self._lock:
+            job_ids = [
+                job_id for job_id, job in self._jobs.items()
+                if job['userId'] == user_id and job['status'] in (SUCCEEDED, FAILED)
+            ]
+            for job_id in job_ids:
+                del self._jobs[job_id]
+            return len(job_ids)
+
+class DynamoDBJobStore:
+    """Job store shared across processes, backed by a DynamoDB table with TTL on expiresAt."""
+
+    def __init__(self, dynamodb_client: DynamoDBClient, ttl_seconds: int = Config.JOB_TTL_SECONDS):
+        self.dynamodb = dynamodb_client
+        self.table_name = JOBS_TABLE
+        self.ttl_seconds = ttl_seconds
+
+    def create(self, job: dict) -> None:
+        self.dynamodb.put_item(
+            table_name=self.table_name,
+            item=dict(job, expiresAt=int(time.time()) + self.ttl_seconds)
+        )
+
+    def update(self, job_id: str, fields: dict) -> None:
+        names = {f'#{name}': name for name in fields}
+        values = {f':{name}': value for name, value in fields.items()}
+        self.dynamodb.update_item(
+            table_name=self.table_name,
+            key={'jobId': job_id},
+            update_expression='SET ' + ', '.join(f'#{name} = :{name}' for name in fields),
+            expression_attribute_names=names,
+            expression_attribute_values=values
+        )
+
+    def get(self, job_id: str) -> dict:
+        response = self.dynamodb.get_item(
+            table_name=self.table_name,
+            key={'jobId': job_id}
+        )
+        return response.get('Item')
+
+    def delete_finished(self, user_id: str) -> int:
+        # Keyed by job ID alone, so finding a user's jobs takes a scan; the table
+        # only holds JOB_TTL_SECONDS of jobs, which bounds it
+        projection_expression, names = projection(['jobId'])
+        names.update({'#userId': 'userId', '#status': 'status'})
+        deleted, start_key = 0, None
+        while True:
+            response = self.dynamodb.scan(
+                table_name=self.table_name,
+                projection_expression=projection_expression,
+                expression_attribute_names=names,
+                exclusive_start_key=start_key,
+                filter_expression='#userId = :user_id AND #status IN (:succeeded, :failed)',
+                expression_attribute_values={':user_id': user_id, ':succeeded': SUCCEEDED, ':failed': FAILED}
+            )
+            keys = response.get('Items', [])
+            if keys:
+                deleted += self.dynamodb.batch_delete(self.table_name, keys)
+            start_key = response.get('LastEvaluatedKey')
+            if start_key is None:
+                return deleted
+
+class JobsService:
+    def __init__(self, store=None, max_workers: int = Config.JOB_WORKERS,
+                 max_queue_depth: int = Config.JOB_MAX_QUEUE_DEPTH):
+        self.store = store or InMemoryJobStore()
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='jobs')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of admitted jobs waiting for a free worker."""
+        with self._lock:
+            return max(self._pending - self.max_workers, 0)
+
+    def submit(self, user_id: str, job_type: str, work, reports_progress: bool = False) -> str:
+        """
+        Queue work on the bounded worker pool.
+
+        Args:
+            user_id (str): The user's ID, the only user allowed to read the job
+            job_type (str): What the job computes (e.g. outfit_recommendation)
+            work (callable): Returns a (body, status_code) tuple. It runs outside the
+                request context, so it must not touch flask.request.
+            reports_progress (bool): Call work with a function that takes a progress
+                dict, which GET /jobs/<job_id> shows while the job runs
+
+        Returns:
+            str: The job ID
+
+        Raises:
+            JobQueueFullError: If max_queue_depth jobs are already waiting for a worker
+            DynamoDBError: If the job can't be stored
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue_depth:
+                raise JobQueueFullError("Too many queued jobs, please retry later")
+            self._pending += 1
+
+        job_id = str(uuid.uuid4())
+        try:
+            self.store.create({
+                'jobId': job_id,
+                'userId': user_id,
+                'type': job_type,
+                'status': QUEUED,
+                'createdAt': datetime.now(UTC).isoformat()
+            })
+            if reports_progress:
+                self.executor.submit(self._run, job_id, lambda: work(lambda progress: self._report_progress(job_id, progress)))
+            else:
+                self.executor.submit(self._run, job_id, work)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id: str, work) -> None:
+        try:
+            self.store.update(job_id, {'status': RUNNING})
+            try:
+                body, status_code = work()
+                # Stored as JSON so any response body fits in DynamoDB
+                result = json.dumps(body)
+            except Exception as e:
+                logger.error(f"Error running job {job_id}: {str(e)}", exc_info=True)
+                status_code, result = 500, json.dumps({"error": str(e)})
+            self.store.update(job_id, {
+                'status': SUCCEEDED if status_code < 400 else FAILED,
+                'statusCode': status_code,
+                'result': result,
+                'finishedAt': datetime.now(UTC).isoformat()
+            })
+        except DynamoDBError as e:
+            logger.error(f"Error updating job {job_id}: {str(e)}", exc_info=True)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _report_progress(self, job_id: str, progress: dict) -> None:
+        try:
+            self.store.update(job_id, {'progress': json.dumps(progress)})
+        except DynamoDBError as e:
+            # Progress is informational; the job itself carries on
+            logger.error(f"Error updating job {job_id} progress: {str(e)}")
+
+    def forget(self, user_id: str) -> int:
+        """
+        Delete a user's finished jobs and their results. Queued and running jobs
+        are left to expire with JOB_TTL_SECONDS: one of them may be the account
+        deletion calling this, whose client still polls it.
+
+        Returns:
+            int: The number of jobs deleted
+
+        Raises:
+            DynamoDBError: If the DynamoDB store can't be scanned or updated
+        """
+        return self.store.delete_finished(user_id)
+
+    def get_job(self, user_id: str, job_id: str) -> dict:
+        """
+        Get the state of a job owned by the user.
+
+        Args:
+            user_id (str): The user's ID
+            job_id (str): The job ID
+
+        Returns:
+            dict: The job state, or None if no such job exists for the user
+
+        Raises:
+            DynamoDBError: If there's an error reading the job
+        """
+        job = self.store.get(job_id)
+        if not job or job['userId'] != user_id:
+            return None
+
+        state = {
+            "job_id": job['jobId'],
+            "type": job['type'],
+            "status": job['status'],
+            "created_at": job['createdAt']
+        }
+        if 'progress' in job:
+            state["progress"] = json.loads(job['progress'])
+        if 'result' in job:
+            state["status_code"] = int(job['statusCode'])
+            state["result"] = json.loads(job['result'])
+        return state
@@ -1,54 +1,289 @@
-import os
-import json
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from app.config import Config
 from app.services.rate_limit import RateLimitService, RateLimitError
+from app.services.concurrency import ConcurrencyLimiter, LLMOverloadedError
+from app.services.resilience import (
+    CircuitBreaker, CircuitOpenError, RetryPolicy, DeadlineExceededError, hedged_call, is_retryable
+)
+from app.services.llm_backends import (
+    BackendRoute, BackendRouter, CompletionResult, DeterministicBackend, OpenAIBackend,
+    OpenAICompatibleHTTPBackend
+)
+from app.services.model_tiering import ModelTieringPolicy
+from app.services.prompts import REASK_INSTRUCTIONS
+from app.services.structured_output import RESPONSE_SCHEMAS, StructuredOutputError, parse_structured
+from app.services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 class LLMService:
     def __init__(self, rate_limit_service: RateLimitService):
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        # Retries are handled by get_completion so they share the endpoint deadline
+        self.client = OpenAI(
+            api_key=Config.OPENAI_API_KEY,
+            base_url=Config.OPENAI_BASE_URL,
+            timeout=max(Config.LLM_DEADLINE_SECONDS.values()),
+            max_retries=0
+        )
         self.rate_limit_service = rate_limit_service
+        self.limiter = ConcurrencyLimiter(
+            name='llm',
+            max_concurrent=Config.LLM_MAX_CONCURRENCY,
+            max_queue=Config.LLM_MAX_QUEUE,
+            queue_timeout=Config.LLM_QUEUE_TIMEOUT_SECONDS,
+            retry_after=Config.LLM_RETRY_AFTER_SECONDS
+        )
+        self.retry_policy = RetryPolicy(
+            max_attempts=Config.LLM_MAX_ATTEMPTS,
+            base_delay=Config.LLM_RETRY_BASE_DELAY_SECONDS,
+            max_delay=Config.LLM_RETRY_MAX_DELAY_SECONDS
+        )
+        self.router = BackendRouter([
+            BackendRoute(
+                backend,
+                CircuitBreaker(
+                    name=f'llm_{backend.name}',
+                    failure_rate_threshold=Config.LLM_CIRCUIT_FAILURE_RATE,
+                    window_size=Config.LLM_CIRCUIT_WINDOW,
+                    min_calls=Config.LLM_CIRCUIT_MIN_CALLS,
+                    reset_timeout=Config.LLM_CIRCUIT_RESET_SECONDS
+                ),
+                alpha=Config.LLM_ROUTER_EWMA_ALPHA,
+                error_half_life=Config.LLM_ROUTER_ERROR_HALF_LIFE_SECONDS
+            )
+            for backend in self._build_backends()
+        ])
+        self.tiering_policy = ModelTieringPolicy(Config.LLM_MODEL_TIERS, Config.LLM_TIER_BUCKETS)
+        self.hedging_enabled = Config.LLM_HEDGE_ENABLED
+        # Room for a primary and a hedged request per concurrency slot
+        self.hedge_executor = ThreadPoolExecutor(
+            max_workers=Config.LLM_MAX_CONCURRENCY * 2, thread_name_prefix='llm-hedge'
+        )
+
+    def _build_backends(self) -> list:
+        """Backends named in LLM_BACKENDS, in order of preference."""
+        backends = []
+        for name in Config.LLM_BACKENDS:
+            if name == 'openai':
+                backends.append(OpenAIBackend(self.client))
+            elif name == 'http':
+                backends.append(OpenAICompatibleHTTPBackend(
+                    base_url=Config.LLM_HTTP_BACKEND_URL,
+                    api_key=Config.LLM_HTTP_BACKEND_API_KEY,
+                    model=Config.LLM_HTTP_BACKEND_MODEL
+                ))
+            elif name == 'deterministic':
+                backends.append(DeterministicBackend(latency=Config.LLM_DETERMINISTIC_LATENCY_SECONDS))
+            else:
+                raise ValueError(f"Unknown LLM backend: {name}")
+        return backends
 
-    def get_completion(self, prompt: str, user_id: str, model: str = "gpt-3.5-turbo") -> dict:
+    def get_completion(self, prompt: str, user_id: str, model: str = None,
+                       rate_limit_units: int = 1, endpoint: str = "default") -> dict:
         """
-        Get a completion from the OpenAI API.
-        
+        Get a completion from the first healthy LLM backend (OpenAI by default).
+
         Args:
             prompt (str): The prompt to send to the model
             user_id (str): The ID of the user making the request
-            model (str): The model to use (default: gpt-3.5-turbo)
-            
+            model (str): The model to use. By default the tiering policy picks one from
+                the endpoint and the estimated prompt size.
+            rate_limit_units (int): Requests to charge against the user's rate limits,
+                each weighted by the endpoint's cost. Use 0 when the units were already
+                charged by an earlier call.
+            endpoint (str): The call site (e.g. outfit, pack, title), which selects the
+                deadline from LLM_DEADLINE_SECONDS
+
         Returns:
             dict: The parsed JSON response from the API
-            
+
         Raises:
-            RateLimitError: If the user has exceeded their daily rate limit
+            RateLimitError: If the user has exceeded their daily quota or is sending
+                requests faster than their burst allowance
+            LLMOverloadedError: If too many calls are already in flight or queued, or
+                every backend's circuit breaker is open (CircuitOpenError)
             Exception: If there's an error calling the API or parsing the response
         """
-        # Check rate limit first
-        self.rate_limit_service.check_and_increment(user_id)
-        
+        # Wait for a concurrency slot before charging, so shed calls cost no quota
+        with self.limiter.acquire():
+            # Check rate limit first
+            if rate_limit_units > 0:
+                self.rate_limit_service.check_and_increment(user_id, units=rate_limit_units, endpoint=endpoint)
+
+            if model is None:
+                decision = self.tiering_policy.choose(endpoint, prompt)
+            else:
+                decision = self.tiering_policy.explicit(endpoint, prompt, model)
+
+            started = time.monotonic()
+            try:
+                return self._request_completion(prompt, decision.model, endpoint, decision.tier)
+            finally:
+                metrics.observe('llm_tier_latency_seconds', time.monotonic() - started,
+                                labels={'tier': decision.tier})
+
+    def _request_completion(self, prompt: str, model: str, endpoint: str, tier: str = None) -> dict:
+        """
+        Send a prompt to the LLM backends and parse the JSON response.
+
+        Raises:
+            LLMOverloadedError: If every backend's circuit breaker is open
+            Exception: If there's an error calling the API or parsing the response
+        """
+        deadline_seconds = Config.LLM_DEADLINE_SECONDS.get(endpoint, Config.LLM_DEADLINE_SECONDS['default'])
+        deadline = time.monotonic() + deadline_seconds
         try:
             logger.info(f"Sending prompt to OpenAI: {prompt}")
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={ "type": "json_object" }
-            )
-            
+            result = self._create_with_retries(prompt, model, endpoint, deadline)
+            self._record_usage(result, endpoint, tier)
+
             try:
-                return json.loads(response.choices[0].message.content)
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON response: {str(e)}", exc_info=True)
-                raise Exception(f"Failed to parse JSON response: {str(e)}")
+                return self._parse_response(result.content, endpoint)
+            except StructuredOutputError as e:
+                parse_error = e
+
+            # Only responses the local repair couldn't fix are asked for again, within the same deadline
+            for _ in range(Config.LLM_MAX_REASKS):
+                metrics.increment('llm_structured_output_total', labels={'endpoint': endpoint, 'outcome': 'reasked'})
+                logger.warning(f"Re-asking for {endpoint} completion after: {str(parse_error)}")
+                result = self._create_with_retries(prompt + REASK_INSTRUCTIONS, model, endpoint, deadline)
+                self._record_usage(result, endpoint, tier)
+                try:
+                    return self._parse_response(result.content, endpoint)
+                except StructuredOutputError as e:
+                    parse_error = e
+
+            metrics.increment('llm_structured_output_total', labels={'endpoint': endpoint, 'outcome': 'failed'})
+            logger.error(f"Error parsing JSON response: {str(parse_error)}")
+            raise Exception(f"Failed to parse JSON response: {str(parse_error)}")
         except RateLimitError as e:
             logger.error(f"Rate limit exceeded: {str(e)}", exc_info=True)
             raise e
+        except LLMOverloadedError as e:
+            logger.warning(f"OpenAI call rejected: {str(e)}")
+            raise e
         except Exception as e:
             logger.error(f"Error calling OpenAI API: {str(e)}", exc_info=True)
-            raise Exception(f"Failed to get completion from OpenAI: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Failed to get completion from OpenAI: {str(e)}")
+
+    def _create_with_retries(self, prompt: str, model: str, endpoint: str, deadline: float) -> CompletionResult:
+        """
+        Call the backends, retrying retryable errors with jittered backoff until the deadline.
+
+        Raises:
+            CircuitOpenError: If every backend's circuit breaker is open
+            DeadlineExceededError: If the deadline leaves no time for another attempt
+            Exception: The last upstream error when it is not retryable or retries ran out
+        """
+        delays = self.retry_policy.delays()
+        while True:
+            try:
+                return self._attempt(prompt, model, endpoint, deadline)
+            except LLMOverloadedError:
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                delay = next(delays, None)
+                if delay is None or time.monotonic() + delay >= deadline:
+                    raise
+                metrics.increment('llm_retries_total', labels={'endpoint': endpoint})
+                logger.warning(f"Retrying OpenAI call in {delay:.2f}s after: {str(e)}")
+                time.sleep(delay)
+
+    def _attempt(self, prompt: str, model: str, endpoint: str, deadline: float) -> CompletionResult:
+        """
+        One attempt across the backends in router order: a retryable failure fails
+        over to the next backend straight away. Each backend call is guarded by that
+        backend's circuit breaker and hedged when enabled.
+        """
+        messages = [
+            {"role": "user", "content": prompt}
+        ]
+        labels = {'endpoint': endpoint}
+        last_error = None
+        for route in self.router.ranked():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError(f"Deadline exceeded for {endpoint} completion")
+
+            try:
+                route.breaker.before_call()
+            except CircuitOpenError as e:
+                last_error = e
+                continue
+            if last_error is not None:
+                metrics.increment('llm_backend_failovers_total', labels={'backend': route.name})
+
+            def complete(backend=route.backend, timeout=remaining):
+                return backend.complete(model, messages, timeout)
+
+            started = time.monotonic()
+            try:
+                if self.hedging_enabled:
+                    result = hedged_call(complete, self._hedge_delay(endpoint), self.hedge_executor, labels)
+                else:
+                    result = complete()
+            except Exception as e:
+                if not is_retryable(e):
+                    route.breaker.record_ignored()
+                    raise
+                route.breaker.record_failure()
+                route.record(time.monotonic() - started, ok=False)
+                metrics.increment('llm_upstream_errors_total', labels=labels)
+                logger.warning(f"LLM backend {route.name} failed: {str(e)}")
+                last_error = e
+                continue
+
+            elapsed = time.monotonic() - started
+            route.breaker.record_success()
+            route.record(elapsed, ok=True)
+            metrics.observe('llm_latency_seconds', elapsed, labels=labels)
+            return result
+
+        raise last_error
+
+    def _parse_response(self, content: str, endpoint: str) -> dict:
+        """
+        Parse and validate a completion against the endpoint's response schema,
+        repairing it locally where possible.
+
+        Raises:
+            StructuredOutputError: If the completion can't be repaired
+        """
+        data, repaired = parse_structured(content, RESPONSE_SCHEMAS.get(endpoint))
+        outcome = 'repaired' if repaired else 'valid'
+        metrics.increment('llm_structured_output_total', labels={'endpoint': endpoint, 'outcome': outcome})
+        return data
+
+    def _record_usage(self, result: CompletionResult, endpoint: str, tier: str) -> None:
+        """
+        Count the tokens reported by the backend: per tier as the cost signal, and
+        prompt vs cached prompt tokens per endpoint for the prefix-cache hit rate.
+        """
+        for kind in ('prompt_tokens', 'completion_tokens'):
+            tokens = result.usage.get(kind)
+            if tokens:
+                metrics.increment('llm_tokens_total', tokens, labels={'tier': tier or 'explicit', 'kind': kind})
+
+        prompt_tokens = result.usage.get('prompt_tokens')
+        if not prompt_tokens:
+            return
+        labels = {'endpoint': endpoint}
+        metrics.increment('llm_prompt_tokens_total', prompt_tokens, labels=labels)
+        metrics.increment('llm_cached_tokens_total', result.usage.get('cached_tokens', 0), labels=labels)
+        metrics.set_gauge(
+            'llm_prefix_cache_hit_ratio',
+            metrics.counter('llm_cached_tokens_total', labels) / metrics.counter('llm_prompt_tokens_total', labels),
+            labels=labels
+        )
+
+    def _hedge_delay(self, endpoint: str) -> float:
+        """The endpoint's observed p95 latency, once there are enough samples."""
+        labels = {'endpoint': endpoint}
+        if metrics.observation_count('llm_latency_seconds', labels) < Config.LLM_HEDGE_MIN_SAMPLES:
+            return Config.LLM_HEDGE_DELAY_SECONDS
+        return metrics.percentile('llm_latency_seconds', 0.95, labels)
@@ -0,0 +1,236 @@
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+import requests
+from typing import Protocol
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class BackendError(Exception):
+    """Exception raised by a backend call, flagged with whether retrying elsewhere may help"""
+
+    def __init__(self, message: str, retryable: bool, status_code: int = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+
+def _field(source, name):
+    return source.get(name) if isinstance(source, dict) else getattr(source, name, None)
+
+def usage_dict(usage) -> dict:
+    """
+    Token counts from an SDK usage object or a raw usage dict, skipping anything
+    that isn't an int. cached_tokens is the part of the prompt served from the
+    provider's prefix cache.
+    """
+    counts = {}
+    for kind in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+        value = _field(usage, kind)
+        if isinstance(value, int):
+            counts[kind] = value
+    cached_tokens = _field(_field(usage, 'prompt_tokens_details'), 'cached_tokens')
+    if isinstance(cached_tokens, int):
+        counts['cached_tokens'] = cached_tokens
+    return counts
+
+class CompletionResult:
+    """The text of a chat completion plus where it came from."""
+
+    def __init__(self, content: str, backend: str, usage: dict = None):
+        self.content = content
+        self.backend = backend
+        self.usage = usage or {}
+
+class LLMBackend(Protocol):
+    name: str
+
+    def complete(self, model: str, messages: list, timeout: float) -> CompletionResult:
+        """Run one JSON-mode chat completion, giving up after timeout seconds."""
+        ...
+
+class OpenAIBackend:
+    """The official OpenAI API through the openai SDK client."""
+
+    def __init__(self, client, name: str = 'openai'):
+        self.client = client
+        self.name = name
+
+    def complete(self, model: str, messages: list, timeout: float) -> CompletionResult:
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            response_format={ "type": "json_object" },
+            timeout=timeout
+        )
+        return CompletionResult(response.choices[0].message.content, self.name,
+                                usage_dict(getattr(response, 'usage', None)))
+
+class OpenAICompatibleHTTPBackend:
+    """
+    Any server speaking the OpenAI chat completions protocol (self-hosted models,
+    gateways, alternative providers), called over plain HTTP.
+    """
+
+    def __init__(self, base_url: str, api_key: str = None, model: str = None, name: str = 'http'):
+        self.url = base_url.rstrip('/') + '/chat/completions'
+        self.api_key = api_key
+        # Self-hosted servers usually serve one model regardless of the requested one
+        self.model = model
+        self.name = name
+        self.session = requests.Session()
+
+    def complete(self, model: str, messages: list, timeout: float) -> CompletionResult:
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        try:
+            response = self.session.post(
+                self.url,
+                headers=headers,
+                json={
+                    'model': self.model or model,
+                    'messages': messages,
+                    'response_format': {'type': 'json_object'}
+                },
+                timeout=timeout
+            )
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise BackendError(f"{self.name} backend unreachable: {str(e)}", retryable=True)
+
+        if response.status_code != 200:
+            retryable = response.status_code == 429 or response.status_code >= 500
+            raise BackendError(
+                f"{self.name} backend returned HTTP {response.status_code}",
+                retryable=retryable, status_code=response.status_code
+            )
+        try:
+            body = response.json()
+            return CompletionResult(body['choices'][0]['message']['content'], self.name, usage_dict(body.get('usage')))
+        except (ValueError, KeyError, IndexError) as e:
+            raise BackendError(f"{self.name} backend returned a malformed completion: {str(e)}", retryable=True)
+
+class DeterministicBackend:
+    """
+    In-process backend for benchmarks and offline load tests. It fills the JSON
+    example embedded in the prompt with wardrobe lines picked by a hash of the
+    prompt, so the same prompt always gets the same answer.
+    """
+
+    def __init__(self, latency: float = 0.0, name: str = 'deterministic'):
+        self.latency = latency
+        self.name = name
+
+    def complete(self, model: str, messages: list, timeout: float) -> CompletionResult:
+        if self.latency:
+            time.sleep(min(self.latency, timeout))
+        prompt = messages[-1]['content']
+        seed = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        candidates = self._wardrobe_lines(prompt) or ['plain white t-shirt']
+        template = self._json_template(prompt)
+        if template is None:
+            content = {'title': ' '.join(candidates[seed % len(candidates)].split()[:5]).title()}
+        else:
+            content = self._fill(template, candidates, seed)
+        return CompletionResult(json.dumps(content), self.name)
+
+    @staticmethod
+    def _wardrobe_lines(prompt: str) -> list:
+        match = re.search(r'wardrobe items:\n(.*?)\n\n', prompt, re.DOTALL)
+        if not match:
+            return []
+        # Lines ending in a colon are category headings, not items
+        return [line.strip() for line in match.group(1).splitlines() if line.strip() and not line.strip().endswith(':')]
+
+    @staticmethod
+    def _json_template(prompt: str):
+        start = prompt.find('{')
+        end = prompt.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        try:
+            return json.loads(prompt[start:end + 1])
+        except ValueError:
+            return None
+
+    def _fill(self, template, candidates: list, seed: int):
+        if isinstance(template, dict):
+            return {key: self._fill(value, candidates, seed + index) for index, (key, value) in enumerate(template.items())}
+        if isinstance(template, list):
+            return [self._fill(value, candidates, seed + index) for index, value in enumerate(template)]
+        if isinstance(template, str):
+            return candidates[seed % len(candidates)]
+        return template
+
+class BackendRoute:
+    """
+    A backend plus its circuit breaker and rolling latency/error EWMAs. The error
+    rate halves every error_half_life seconds without samples: a backend demoted
+    by failures gets no traffic to clear its record, so otherwise it would stay
+    ranked behind the others after it recovered.
+    """
+
+    def __init__(self, backend: LLMBackend, breaker, alpha: float, error_half_life: float = 30.0):
+        self.backend = backend
+        self.breaker = breaker
+        self.alpha = alpha
+        self.error_half_life = error_half_life
+        self.ewma_latency = None
+        self.ewma_error_rate = 0.0
+        self._sampled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _error_rate(self, now: float) -> float:
+        """The error EWMA decayed for the time since the last sample. Call with the lock held."""
+        return self.ewma_error_rate * 0.5 ** ((now - self._sampled_at) / self.error_half_life)
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    def score(self) -> float:
+        """Lower is better: expected latency inflated by the recent error rate."""
+        with self._lock:
+            if self.ewma_latency is None:
+                return float('inf')
+            return self.ewma_latency * (1 + 10 * self._error_rate(time.monotonic()))
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            # Failures often return early, so only successes shape the latency estimate
+            if ok and self.ewma_latency is None:
+                self.ewma_latency = latency
+            elif ok:
+                self.ewma_latency += self.alpha * (latency - self.ewma_latency)
+            now = time.monotonic()
+            error_rate = self._error_rate(now)
+            self.ewma_error_rate = error_rate + self.alpha * ((0.0 if ok else 1.0) - error_rate)
+            self._sampled_at = now
+            labels = {'backend': self.name}
+            if self.ewma_latency is not None:
+                metrics.set_gauge('llm_backend_ewma_latency_seconds', self.ewma_latency, labels)
+            metrics.set_gauge('llm_backend_ewma_error_rate', self.ewma_error_rate, labels)
+        metrics.increment('llm_backend_requests_total', labels={'backend': self.name})
+        if ok:
+            metrics.observe('llm_backend_latency_seconds', latency, labels={'backend': self.name})
+        else:
+            metrics.increment('llm_backend_errors_total', labels={'backend': self.name})
+
+class BackendRouter:
+    """
+    Orders backends by their latency/error EWMA so each call starts with the
+    healthiest one and fails over down the list. Backends without samples rank
+    last and ties keep the configured order, so a standby backend only takes
+    traffic once the preferred ones fail or degrade. A demoted backend's errors
+    fade while it is idle, so it moves back up once they have worn off.
+    """
+
+    def __init__(self, routes: list):
+        self.routes = routes
+
+    def ranked(self) -> list:
+        order = {id(route): index for index, route in enumerate(self.routes)}
+        return sorted(self.routes, key=lambda route: (route.score(), order[id(route)]))
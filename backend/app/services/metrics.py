@@ -0,0 +1,95 @@
+import threading
+from collections import deque
+
+# Observations kept per histogram for percentile estimates
+HISTOGRAM_WINDOW = 1024
+
+def _series_name(name: str, labels: dict = None) -> str:
+    if not labels:
+        return name
+    label_text = ','.join(f'{key}={labels[key]}' for key in sorted(labels))
+    return f'{name}{{{label_text}}}'
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and histograms, exposed as JSON by GET /metrics.
+    Series are named Prometheus-style, e.g. llm_shed_total{reason=queue_full}.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def increment(self, name: str, value: float = 1, labels: dict = None) -> None:
+        series = _series_name(name, labels)
+        with self._lock:
+            self._counters[series] = self._counters.get(series, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: dict = None) -> None:
+        series = _series_name(name, labels)
+        with self._lock:
+            self._gauges[series] = value
+
+    def observe(self, name: str, value: float, labels: dict = None) -> None:
+        series = _series_name(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(series)
+            if histogram is None:
+                histogram = self._histograms[series] = {
+                    'count': 0, 'sum': 0.0, 'window': deque(maxlen=HISTOGRAM_WINDOW)
+                }
+            histogram['count'] += 1
+            histogram['sum'] += value
+            histogram['window'].append(value)
+
+    def counter(self, name: str, labels: dict = None) -> float:
+        with self._lock:
+            return self._counters.get(_series_name(name, labels), 0)
+
+    def gauge(self, name: str, labels: dict = None) -> float:
+        with self._lock:
+            return self._gauges.get(_series_name(name, labels), 0)
+
+    def observation_count(self, name: str, labels: dict = None) -> int:
+        with self._lock:
+            histogram = self._histograms.get(_series_name(name, labels))
+            return histogram['count'] if histogram else 0
+
+    def percentile(self, name: str, fraction: float, labels: dict = None) -> float:
+        """Percentile over the most recent observations, or None if there are none."""
+        with self._lock:
+            histogram = self._histograms.get(_series_name(name, labels))
+            values = sorted(histogram['window']) if histogram else []
+        return _percentile(values, fraction) if values else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            histograms = {}
+            for series, histogram in self._histograms.items():
+                values = sorted(histogram['window'])
+                histograms[series] = {
+                    'count': histogram['count'],
+                    'sum': histogram['sum'],
+                    'p50': _percentile(values, 0.50),
+                    'p95': _percentile(values, 0.95),
+                    'p99': _percentile(values, 0.99)
+                }
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'histograms': histograms
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+metrics = MetricsRegistry()
@@ -0,0 +1,64 @@
+import logging
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Rough local token estimate (~4 characters per token), close enough to bucket prompts
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in text without calling a tokenizer."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+class TierDecision:
+    """The model tier picked for one call and the prompt size it was based on."""
+
+    def __init__(self, endpoint: str, tier: str, model: str, estimated_tokens: int):
+        self.endpoint = endpoint
+        self.tier = tier
+        self.model = model
+        self.estimated_tokens = estimated_tokens
+
+class ModelTieringPolicy:
+    """
+    Picks a model per call from the call site and the estimated prompt size.
+    Each endpoint has buckets of (max estimated prompt tokens, tier) checked in
+    order; a bucket with no limit catches every larger prompt.
+    """
+
+    def __init__(self, models: dict, buckets: dict):
+        self.models = models
+        self.buckets = buckets
+
+    def choose(self, endpoint: str, prompt: str) -> TierDecision:
+        """
+        Pick the tier for a prompt and record the decision.
+
+        Args:
+            endpoint (str): The call site (e.g. outfit, pack, title)
+            prompt (str): The prompt about to be sent
+
+        Returns:
+            TierDecision: The chosen tier and model
+        """
+        estimated_tokens = estimate_tokens(prompt)
+        buckets = self.buckets.get(endpoint, self.buckets['default'])
+        tier = buckets[-1][1]
+        for max_tokens, bucket_tier in buckets:
+            if max_tokens is None or estimated_tokens <= max_tokens:
+                tier = bucket_tier
+                break
+
+        labels = {'endpoint': endpoint, 'tier': tier}
+        metrics.increment('llm_tier_decisions_total', labels=labels)
+        metrics.observe('llm_prompt_tokens_estimated', estimated_tokens, labels=labels)
+        logger.info(f"Routing {endpoint} prompt (~{estimated_tokens} tokens) to {tier} tier")
+        return TierDecision(endpoint, tier, self.models[tier], estimated_tokens)
+
+    def explicit(self, endpoint: str, prompt: str, model: str) -> TierDecision:
+        """Record a call whose model was chosen by the caller."""
+        estimated_tokens = estimate_tokens(prompt)
+        labels = {'endpoint': endpoint, 'tier': 'explicit'}
+        metrics.increment('llm_tier_decisions_total', labels=labels)
+        metrics.observe('llm_prompt_tokens_estimated', estimated_tokens, labels=labels)
+        return TierDecision(endpoint, 'explicit', model, estimated_tokens)
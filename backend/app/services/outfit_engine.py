@@ -0,0 +1,241 @@
+import re
+import logging
+from functools import lru_cache
+from itertools import product
+
+logger = logging.getLogger(__name__)
+
+class NoValidOutfitError(Exception):
+    """Exception raised when the wardrobe has no top, bottom and shoes to combine"""
+    pass
+
+class DegradedOutfit(dict):
+    """An outfit built by the local engine instead of the LLM; reason says why."""
+
+    def __init__(self, outfit: dict, reason: str):
+        super().__init__(outfit)
+        self.degraded_reason = reason
+
+TOP = 'top'
+BOTTOM = 'bottom'
+SHOES = 'shoes'
+OUTERWEAR = 'outerwear'
+ACCESSORIES = 'accessories'
+ONE_PIECE = 'one_piece'
+
+# Head nouns per category; a description is classified by its last matching word
+CATEGORY_KEYWORDS = {
+    TOP: {
+        'shirt', 't-shirt', 'tshirt', 'tee', 'blouse', 'sweater', 'jumper', 'hoodie', 'sweatshirt', 'polo',
+        'tank', 'top', 'camisole', 'turtleneck', 'henley', 'pullover', 'knit', 'crewneck', 'tunic', 'bodysuit',
+    },
+    BOTTOM: {
+        'jeans', 'trousers', 'pants', 'chinos', 'shorts', 'skirt', 'leggings', 'joggers', 'slacks',
+        'sweatpants', 'culottes', 'cargos',
+    },
+    SHOES: {
+        'sneakers', 'shoes', 'boots', 'loafers', 'heels', 'sandals', 'trainers', 'flats', 'oxfords', 'brogues',
+        'pumps', 'mules', 'espadrilles', 'slippers', 'derbies', 'moccasins', 'flip-flops',
+    },
+    OUTERWEAR: {
+        'jacket', 'coat', 'blazer', 'parka', 'raincoat', 'trench', 'windbreaker', 'cardigan', 'gilet', 'vest',
+        'anorak', 'overcoat', 'puffer', 'poncho', 'overshirt',
+    },
+    ACCESSORIES: {
+        'belt', 'scarf', 'hat', 'cap', 'beanie', 'watch', 'tie', 'bowtie', 'bag', 'handbag', 'backpack',
+        'sunglasses', 'necklace', 'earrings', 'bracelet', 'ring', 'gloves', 'umbrella', 'socks',
+    },
+    ONE_PIECE: {'dress', 'jumpsuit', 'romper', 'overalls', 'suit'},
+}
+_CATEGORY_BY_WORD = {word: category for category, words in CATEGORY_KEYWORDS.items() for word in words}
+
+# Item attribute words: +1 / -1 on formality and warmth
+FORMALITY_WORDS = {
+    'blazer': 1, 'suit': 1, 'tie': 1, 'bowtie': 1, 'oxfords': 1, 'oxford': 1, 'brogues': 1, 'loafers': 1,
+    'heels': 1, 'pumps': 1, 'silk': 1, 'tailored': 1, 'slacks': 1, 'trousers': 1, 'blouse': 1,
+    'button-down': 1, 'dress': 1, 'leather': 1, 'cashmere': 1, 'pencil': 1, 'satin': 1, 'derbies': 1,
+    'overcoat': 1, 'trench': 1,
+    't-shirt': -1, 'tshirt': -1, 'tee': -1, 'hoodie': -1, 'sweatshirt': -1, 'jeans': -1, 'sneakers': -1,
+    'trainers': -1, 'shorts': -1, 'joggers': -1, 'sweatpants': -1, 'flip-flops': -1, 'sandals': -1,
+    'graphic': -1, 'denim': -1, 'tank': -1, 'cap': -1, 'backpack': -1, 'leggings': -1, 'ripped': -1,
+    'slippers': -1, 'cargos': -1,
+}
+WARMTH_WORDS = {
+    'wool': 1, 'woolen': 1, 'fleece': 1, 'down': 1, 'puffer': 1, 'coat': 1, 'overcoat': 1, 'parka': 1,
+    'sweater': 1, 'jumper': 1, 'thermal': 1, 'knit': 1, 'cashmere': 1, 'boots': 1, 'scarf': 1,
+    'beanie': 1, 'gloves': 1, 'turtleneck': 1, 'corduroy': 1, 'flannel': 1, 'lined': 1, 'hoodie': 1,
+    'sweatshirt': 1, 'cardigan': 1, 'jacket': 1,
+    'linen': -1, 'shorts': -1, 'sandals': -1, 'tank': -1, 'sleeveless': -1, 'flip-flops': -1,
+    'espadrilles': -1, 'short-sleeve': -1, 'camisole': -1, 'sunglasses': -1, 'seersucker': -1,
+    't-shirt': -1, 'tshirt': -1, 'tee': -1, 'skirt': -1, 'dress': -1,
+}
+RAIN_WORDS = {'waterproof', 'raincoat', 'rain', 'anorak', 'umbrella', 'trench', 'windbreaker', 'poncho', 'gore-tex'}
+
+# Situation words: target formality and warmth, and whether rain gear helps
+SITUATION_FORMALITY = {
+    'wedding': 1, 'interview': 1, 'office': 1, 'meeting': 1, 'business': 1, 'gala': 1, 'formal': 1,
+    'conference': 1, 'funeral': 1, 'presentation': 1, 'client': 1, 'work': 1, 'opera': 1, 'theater': 1,
+    'theatre': 1, 'ceremony': 1, 'elegant': 1, 'smart': 1, 'cocktail': 1, 'court': 1,
+    'casual': -1, 'beach': -1, 'gym': -1, 'park': -1, 'picnic': -1, 'hike': -1, 'hiking': -1,
+    'weekend': -1, 'brunch': -1, 'home': -1, 'errands': -1, 'bbq': -1, 'barbecue': -1, 'festival': -1,
+    'concert': -1, 'camping': -1, 'travel': -1, 'flight': -1, 'movie': -1, 'relaxed': -1, 'lazy': -1,
+}
+SITUATION_WARMTH = {
+    'cold': 1, 'winter': 1, 'snow': 1, 'snowy': 1, 'chilly': 1, 'freezing': 1, 'cool': 1, 'windy': 1,
+    'autumn': 1, 'fall': 1, 'ski': 1, 'skiing': 1, 'mountain': 1,
+    'hot': -1, 'summer': -1, 'beach': -1, 'heat': -1, 'sunny': -1, 'warm': -1, 'tropical': -1,
+    'humid': -1, 'pool': -1,
+}
+SITUATION_RAIN = {'rain', 'rainy', 'raining', 'storm', 'stormy', 'wet', 'drizzle', 'showers'}
+
+# Best items per category considered when combining, which bounds the search
+CANDIDATES_PER_CATEGORY = 4
+
+_WORD = re.compile(r"[a-z]+(?:-[a-z]+)*")
+
+def _words(text: str) -> list:
+    return _WORD.findall(text.lower())
+
+@lru_cache(maxsize=65536)
+def classify_item(description: str) -> tuple:
+    """
+    Classify a wardrobe item description.
+
+    Args:
+        description (str): The item description, e.g. "navy wool blazer"
+
+    Returns:
+        tuple: (category or None, formality, warmth, rain_ready)
+    """
+    words = _words(description)
+    category, head = None, None
+    for index in range(len(words) - 1, -1, -1):
+        word = words[index]
+        category = _CATEGORY_BY_WORD.get(word) or _CATEGORY_BY_WORD.get(word.rstrip('s'))
+        if category:
+            head = index
+            break
+    # The head noun says more than its modifiers: "leather sandals" are still sandals
+    weights = [1.0 if index == head else 0.5 for index in range(len(words))]
+    formality = sum(FORMALITY_WORDS.get(word, 0) * weight for word, weight in zip(words, weights))
+    warmth = sum(WARMTH_WORDS.get(word, 0) * weight for word, weight in zip(words, weights))
+    return category, max(-2, min(2, formality)), max(-2, min(2, warmth)), any(word in RAIN_WORDS for word in words)
+
+def read_situation(situation: str) -> tuple:
+    """
+    Read the target formality and warmth from a situation.
+
+    Returns:
+        tuple: (formality -1..1, warmth -1..1, rainy)
+    """
+    words = _words(situation)
+    formality = sum(SITUATION_FORMALITY.get(word, 0) for word in words)
+    warmth = sum(SITUATION_WARMTH.get(word, 0) for word in words)
+    rainy = any(word in SITUATION_RAIN for word in words)
+    return (formality > 0) - (formality < 0), (warmth > 0) - (warmth < 0), rainy
+
+def _warmth_penalty(warmth: int, target_warmth: int) -> float:
+    # Extra warmth never hurts in the cold, nor lightness in the heat
+    if target_warmth > 0:
+        return max(0, target_warmth - warmth)
+    if target_warmth < 0:
+        return max(0, warmth - target_warmth)
+    return 0.5 * abs(warmth)
+
+def _item_score(item: tuple, target_formality: int, target_warmth: int, rainy: bool) -> float:
+    _, _, formality, warmth, rain_ready = item
+    score = -abs(formality - target_formality) - 0.75 * _warmth_penalty(warmth, target_warmth)
+    if rainy and rain_ready:
+        score += 1.5
+    return score
+
+def item_fit(description: str, situation: tuple) -> float:
+    """
+    How well one item suits a situation; 0 is a perfect fit and lower is worse.
+
+    Args:
+        description (str): The item description
+        situation (tuple): The situation as returned by read_situation
+
+    Returns:
+        float: The item's score for the situation
+    """
+    category, formality, warmth, rain_ready = classify_item(description)
+    return _item_score((description, category, formality, warmth, rain_ready), *situation)
+
+def recommend_outfit(wardrobe_items: list, situation: str) -> dict:
+    """
+    Build an outfit from the wardrobe without an LLM.
+
+    Items are classified by keyword, the best few per category are kept, and every
+    valid combination (top + bottom + shoes, or a one-piece + shoes) is scored on
+    how well items match the situation's formality and weather and each other's
+    formality. Outerwear is added when the situation is cold, rainy or formal, and
+    an accessory when one fits.
+
+    Args:
+        wardrobe_items (list): Wardrobe items with a description
+        situation (str): The situation the user described
+
+    Returns:
+        dict: An outfit with the same keys the LLM returns
+
+    Raises:
+        NoValidOutfitError: If the wardrobe lacks the items for a complete outfit
+    """
+    target_formality, target_warmth, rainy = read_situation(situation)
+
+    by_category = {}
+    for wardrobe_item in wardrobe_items:
+        description = wardrobe_item.get('description', '').strip()
+        if not description:
+            continue
+        category, formality, warmth, rain_ready = classify_item(description)
+        if category is not None:
+            item = (description, category, formality, warmth, rain_ready)
+            by_category.setdefault(category, []).append((_item_score(item, target_formality, target_warmth, rainy), item))
+
+    candidates = {}
+    for category, scored in by_category.items():
+        # Description breaks ties so the same wardrobe always gives the same outfit
+        scored.sort(key=lambda entry: (-entry[0], entry[1][0]))
+        candidates[category] = scored[:CANDIDATES_PER_CATEGORY]
+
+    if SHOES not in candidates or not ((TOP in candidates and BOTTOM in candidates) or ONE_PIECE in candidates):
+        raise NoValidOutfitError("Wardrobe has no complete outfit (top, bottom and shoes)")
+
+    bases = []
+    if TOP in candidates and BOTTOM in candidates:
+        bases.extend(product(candidates[TOP], candidates[BOTTOM]))
+    if ONE_PIECE in candidates:
+        bases.extend((one_piece,) for one_piece in candidates[ONE_PIECE])
+
+    wants_outerwear = target_warmth > 0 or rainy or target_formality > 0
+    outerwear_options = [None] + candidates.get(OUTERWEAR, []) if wants_outerwear else [None]
+
+    best_score, best = None, None
+    for base, shoes, outerwear in product(bases, candidates[SHOES], outerwear_options):
+        chosen = list(base) + [shoes] + ([outerwear] if outerwear else [])
+        formalities = [item[2] for _, item in chosen]
+        score = sum(item_score for item_score, _ in chosen)
+        if len(base) == 1:
+            # A one-piece stands in for both a top and a bottom
+            score += base[0][0]
+        # Items should agree with each other, not just with the situation
+        score -= 0.25 * (max(formalities) - min(formalities))
+        if outerwear is not None:
+            score += 1
+        if best_score is None or score > best_score:
+            best_score, best = score, chosen
+
+    outfit = {}
+    for _, (description, category, *_rest) in best:
+        if category == ONE_PIECE:
+            # Filled into both required slots, as the LLM prompt does for dresses
+            outfit[TOP] = outfit[BOTTOM] = description
+        else:
+            outfit[category] = description
+    accessories = candidates.get(ACCESSORIES)
+    if accessories and accessories[0][0] >= -1:
+        outfit[ACCESSORIES] = accessories[0][1][0]
+    return outfit
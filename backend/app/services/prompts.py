@@ -0,0 +1,212 @@
+import threading
+from collections import OrderedDict
+from app.services.item_classifier import CATEGORIES, item_category
+
+# Prompts are laid out as static instructions -> wardrobe block -> request so that
+# calls for the same wardrobe share a byte-identical prefix, which upstream
+# providers can serve from their prompt-prefix cache.
+
+WARDROBE_HEADER = "The user's wardrobe items:"
+
+# Heading above each category's items in a categorized wardrobe block
+CATEGORY_HEADINGS = {
+    'top': 'Tops:',
+    'bottom': 'Bottoms:',
+    'one_piece': 'Dresses and one-pieces:',
+    'shoes': 'Shoes:',
+    'outerwear': 'Outerwear:',
+    'accessories': 'Accessories:',
+    'other': 'Other:',
+}
+
+OUTFIT_INSTRUCTIONS = """You are a stylist. You will be given the user's wardrobe items and the situation they are in.
+
+Recommend an outfit using only items from their wardrobe. Format the response as a JSON object with the following structure:
+{
+    "top": "description of top",
+    "bottom": "description of bottom",
+    "shoes": "description of shoes",
+    "outerwear": "description of outerwear (optional)",
+    "accessories": "description of accessories (optional)"
+}"""
+
+BATCH_OUTFIT_INSTRUCTIONS = """You are a stylist. You will be given the user's wardrobe items and a numbered list of situations.
+
+Recommend one outfit per situation using only items from their wardrobe. Format the response as a JSON object with the following structure:
+{
+    "outfits": [
+        {
+            "situation": 1,
+            "top": "description of top",
+            "bottom": "description of bottom",
+            "shoes": "description of shoes",
+            "outerwear": "description of outerwear (optional)",
+            "accessories": "description of accessories (optional)"
+        }
+    ]
+}
+
+Include exactly one outfit for every numbered situation."""
+
+BUY_INSTRUCTIONS = """You are a stylist. You will be given the user's wardrobe items and the situation they are in.
+
+Recommend ONE item they should buy to improve their wardrobe for this situation. Format the response as a JSON object with the following structure:
+{
+    "item": "detailed description of the item to buy",
+    "explanation": "detailed explanation of why this item would be beneficial for the situation, including how it complements their existing wardrobe"
+}"""
+
+PACK_INSTRUCTIONS = """You are a stylist. You will be given the user's wardrobe items and the trip they are planning.
+
+Recommend a packing list using only items from their wardrobe. Format the response as a JSON object with the following structure:
+{
+    "tops": ["list of tops"],
+    "bottoms": ["list of bottoms"],
+    "shoes": ["list of shoes"],
+    "outerwear": ["list of outerwear"],
+    "accessories": ["list of accessories"]
+}
+
+Each list should contain 2-3 items that would be appropriate for the trip."""
+
+TITLE_INSTRUCTIONS = """You will be given a trip situation.
+
+Generate a clean, concise title (max 5 words) that summarizes this trip.
+The title should be professional and easy to understand.
+Return the response as a JSON object with a single field 'title' containing the title text."""
+
+# Appended to the original prompt when a response couldn't be repaired, keeping its prefix
+REASK_INSTRUCTIONS = """
+
+Your previous response was not a valid JSON object with the structure above. Respond again with only that JSON object, including every required field."""
+
+def wardrobe_block(descriptions: list, categories: list = None) -> str:
+    """
+    Render wardrobe item descriptions as the shared middle segment of a prompt.
+
+    Descriptions are whitespace-normalized and sorted, so the same wardrobe renders
+    to the same bytes whatever order the items were loaded in. With categories, the
+    items are grouped under a heading per category, so the model doesn't have to
+    work out what each item is.
+
+    Args:
+        descriptions (list): The item descriptions
+        categories (list): The category of each description, from CATEGORIES
+
+    Returns:
+        str: The wardrobe block
+    """
+    if categories is None:
+        lines = sorted(' '.join(description.split()) for description in descriptions)
+        return WARDROBE_HEADER + "\n" + "\n".join(lines)
+
+    grouped = {}
+    for description, category in zip(descriptions, categories):
+        grouped.setdefault(category, []).append(' '.join(description.split()))
+    lines = [WARDROBE_HEADER]
+    for category in CATEGORIES:
+        if category in grouped:
+            lines.append(CATEGORY_HEADINGS[category])
+            lines.extend(sorted(grouped[category]))
+    return "\n".join(lines)
+
+def categorized_wardrobe_block(wardrobe_items: list) -> str:
+    """
+    The wardrobe block for stored wardrobe items, grouped by the category saved with
+    each item. Items saved before categorization are classified on the fly.
+    """
+    descriptions = [item["description"] for item in wardrobe_items]
+    categories = [item.get("category") or item_category(item["description"]) for item in wardrobe_items]
+    return wardrobe_block(descriptions, categories)
+
+class PromptTemplate:
+    """
+    A prompt compiled once at import: the static instructions are joined into the
+    prefix up front, so rendering only appends the wardrobe block and the request.
+    """
+
+    def __init__(self, name: str, instructions: str, request: str, uses_wardrobe: bool = True):
+        self.name = name
+        self.uses_wardrobe = uses_wardrobe
+        self.prefix = instructions + "\n\n"
+        self.request = request
+
+    def render(self, wardrobe: str = None, **fields) -> str:
+        """
+        Render the prompt, most stable segment first.
+
+        Args:
+            wardrobe (str): The block from wardrobe_block, if the template uses one
+            **fields: Values for the request placeholders, e.g. situation
+
+        Returns:
+            str: The prompt
+        """
+        request = self.request.format(**fields)
+        if self.uses_wardrobe:
+            return self.prefix + wardrobe + "\n\n" + request
+        return self.prefix + request
+
+PROMPT_TEMPLATES = {
+    template.name: template for template in (
+        PromptTemplate('outfit', OUTFIT_INSTRUCTIONS, "The user is in this situation: {situation}"),
+        PromptTemplate('outfit_batch', BATCH_OUTFIT_INSTRUCTIONS,
+                       "The user needs an outfit for each of these situations:\n{situations}"),
+        PromptTemplate('buy', BUY_INSTRUCTIONS, "The user is in this situation: {situation}"),
+        PromptTemplate('pack', PACK_INSTRUCTIONS, "The user is planning this trip: {situation}"),
+        PromptTemplate('title', TITLE_INSTRUCTIONS, "Trip situation:\n{situation}", uses_wardrobe=False),
+    )
+}
+
+def render_prompt(name: str, wardrobe: str = None, **fields) -> str:
+    """Render the registered template called name (see PromptTemplate.render)."""
+    return PROMPT_TEMPLATES[name].render(wardrobe, **fields)
+
+class WardrobeFragmentCache:
+    """
+    Memoized wardrobe blocks, one per user, keyed by the wardrobe version that
+    WardrobeService bumps on every write. Entries also remember the item IDs they
+    were rendered from, so a write made by another process, which this process's
+    version never saw, still misses. Least recently used users are evicted first.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, version, wardrobe_items: list) -> str:
+        """
+        Return the wardrobe block for the items, rendering it only on a miss.
+
+        Args:
+            user_id (str): The wardrobe owner
+            version: The user's current wardrobe version
+            wardrobe_items (list): The wardrobe items as loaded
+
+        Returns:
+            str: The wardrobe block
+        """
+        try:
+            item_ids = [item['itemId'] for item in wardrobe_items]
+        except KeyError:
+            # Nothing reliable to validate the entry against
+            return categorized_wardrobe_block(wardrobe_items)
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == version and entry[1] == item_ids:
+                self._entries.move_to_end(user_id)
+                return entry[2]
+
+        fragment = categorized_wardrobe_block(wardrobe_items)
+        with self._lock:
+            self._entries[user_id] = (version, item_ids, fragment)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return fragment
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
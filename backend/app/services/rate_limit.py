@@ -1,87 +1,228 @@
 import logging
-from datetime import datetime, timezone
-from app.clients.dynamodb import DynamoDBClient, DynamoDBError
+import threading
+from decimal import Decimal
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError, ConditionalCheckFailedError
 from app.config import Config
+from app.services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 RATE_LIMIT_TABLE = f'{Config.ENV}-rate-limits'
 MAX_REQUESTS_PER_DAY = Config.MAX_REQUESTS_PER_DAY
 
+# Attempts at a charge when the item changed since the state it was planned from
+MAX_CHARGE_ATTEMPTS = 3
+
+def expires_at(date: datetime) -> int:
+    """
+    The TTL, in epoch seconds, for the counter of date's day: RATE_LIMIT_RETENTION_DAYS
+    after the day ends, after which DynamoDB deletes the row.
+    """
+    day_end = date.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return int((day_end + timedelta(days=Config.RATE_LIMIT_RETENTION_DAYS)).timestamp())
+
+def endpoint_cost(endpoint: str, units: int = 1) -> int:
+    """The units charged for a call to endpoint, from RATE_LIMIT_ENDPOINT_COSTS."""
+    costs = Config.RATE_LIMIT_ENDPOINT_COSTS
+    return units * costs.get(endpoint, costs['default'])
+
 class RateLimitError(Exception):
     """Exception raised when rate limit is exceeded"""
-    pass
+
+    def __init__(self, message: str, retry_after: int = None):
+        super().__init__(message)
+        # Seconds until the request would be allowed, when that is soon
+        self.retry_after = retry_after
+
+class Charge:
+    """One limiter's part of the single update that charges a request."""
+
+    def __init__(self, updates: list, condition: str, values: dict):
+        self.updates = updates
+        self.condition = condition
+        self.values = values
+
+class DailyQuota:
+    """At most MAX_REQUESTS_PER_DAY units per user per UTC day."""
+
+    name = 'daily_quota'
+    names = {'#count': 'count'}
+
+    def __init__(self, limit: int = None):
+        self._limit = limit
+
+    @property
+    def limit(self) -> int:
+        return MAX_REQUESTS_PER_DAY if self._limit is None else self._limit
+
+    def check(self, state: dict, cost: int, now: float) -> None:
+        if int(state.get('count', 0)) + cost > self.limit:
+            raise RateLimitError("Daily rate limit exceeded")
+
+    def charge(self, state: dict, cost: int, now: float) -> Charge:
+        # A charge over the whole quota would otherwise pass on the day's first write
+        if cost > self.limit:
+            raise RateLimitError("Daily rate limit exceeded")
+        # Doesn't depend on the state, so it never needs re-planning
+        return Charge(
+            ['#count = if_not_exists(#count, :zero) + :cost'],
+            '(attribute_not_exists(#count) OR #count <= :countLimit)',
+            {':zero': 0, ':cost': cost, ':countLimit': self.limit - cost}
+        )
+
+class TokenBucket:
+    """
+    Smooths bursts: a bucket of capacity units, refilled one unit every
+    refill_seconds. Kept as a single timestamp (GCRA), the time at which the
+    bucket would be full again, so a charge is one conditional update. A charge
+    larger than the bucket is let through only when the bucket is full.
+    """
+
+    name = 'token_bucket'
+    names = {'#tat': 'bucketFullAt'}
+
+    def __init__(self, capacity: int = None, refill_seconds: float = None):
+        self.capacity = Config.RATE_LIMIT_BURST_CAPACITY if capacity is None else capacity
+        self.refill_seconds = Config.RATE_LIMIT_REFILL_SECONDS if refill_seconds is None else refill_seconds
+
+    def _window(self, cost: int) -> tuple:
+        """The bucket's span and the refill time a charge of cost takes, in seconds."""
+        span = self.capacity * self.refill_seconds
+        return span, cost * self.refill_seconds
+
+    def check(self, state: dict, cost: int, now: float) -> None:
+        full_at = float(state.get('bucketFullAt', 0))
+        span, refill = self._window(cost)
+        if full_at > now and full_at + min(refill, span) - now > span:
+            wait = full_at + min(refill, span) - now - span
+            raise RateLimitError("Too many requests", retry_after=max(1, int(wait + 0.999)))
+
+    def charge(self, state: dict, cost: int, now: float) -> Charge:
+        span, refill = self._window(cost)
+        now_value = Decimal(str(round(now, 3)))
+        refill_value = Decimal(str(round(refill, 3)))
+        if float(state.get('bucketFullAt', 0)) <= now:
+            # Full bucket: refilling starts now
+            return Charge(
+                ['#tat = :now + :refill'],
+                '(attribute_not_exists(#tat) OR #tat <= :now)',
+                {':now': now_value, ':refill': refill_value}
+            )
+        # Partly drained: allowed while the charge still fits in the bucket's span
+        return Charge(
+            ['#tat = #tat + :refill'],
+            '#tat BETWEEN :now AND :tatLimit',
+            {':now': now_value, ':refill': refill_value,
+             ':tatLimit': Decimal(str(round(now + span - min(refill, span), 3)))}
+        )
+
+RATE_LIMIT_ALGORITHMS = {
+    DailyQuota.name: DailyQuota,
+    TokenBucket.name: TokenBucket,
+}
 
 class RateLimitService:
-    def __init__(self, dynamodb_client: DynamoDBClient):
+    """
+    Charges requests against the limiters in RATE_LIMIT_ALGORITHMS, all kept on the
+    user's item for the day and charged in one conditional update. Each limiter
+    adds its update and condition, planned from the item as this process last saw
+    it. If the item changed since, the failed update returns it, the limiters check
+    it, and the charge is re-planned; so a request costs one write unless it races.
+    """
+
+    def __init__(self, dynamodb_client: DynamoDBClient, algorithms: list = None):
         self.dynamodb = dynamodb_client
         self.table_name = RATE_LIMIT_TABLE
+        names = Config.RATE_LIMIT_ALGORITHMS if algorithms is None else algorithms
+        self.algorithms = [RATE_LIMIT_ALGORITHMS[name]() if isinstance(name, str) else name for name in names]
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
 
-    def _get_today_date(self) -> str:
-        """Get today's date in YYYY-MM-DD format"""
-        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    def _last_state(self, user_id: str, today: str) -> dict:
+        with self._lock:
+            entry = self._states.get(user_id)
+            return entry[1] if entry is not None and entry[0] == today else {}
 
-    def check_and_increment(self, user_id: str) -> bool:
+    def _remember(self, user_id: str, today: str, state: dict) -> None:
+        with self._lock:
+            self._states[user_id] = (today, state)
+            self._states.move_to_end(user_id)
+            while len(self._states) > Config.RATE_LIMIT_STATE_CACHE_USERS:
+                self._states.popitem(last=False)
+
+    def _charge(self, user_id: str, today: str, state: dict, cost: int, now: datetime) -> dict:
+        """Apply every limiter's charge in one update, returning the new item."""
+        timestamp = now.timestamp()
+        charges = [algorithm.charge(state, cost, timestamp) for algorithm in self.algorithms]
+        names = {'#createdAt': 'createdAt', '#expiresAt': 'expiresAt'}
+        values = {':createdAt': str(now), ':expiresAt': expires_at(now)}
+        for algorithm, charge in zip(self.algorithms, charges):
+            names.update(algorithm.names)
+            values.update(charge.values)
+        updates = [
+            '#createdAt = if_not_exists(#createdAt, :createdAt)',
+            '#expiresAt = :expiresAt',
+            *(update for charge in charges for update in charge.updates)
+        ]
+        return self.dynamodb.update_item(
+            table_name=self.table_name,
+            key={'userId': user_id, 'date': today},
+            update_expression='SET ' + ', '.join(updates),
+            expression_attribute_names=names,
+            expression_attribute_values=values,
+            condition_expression=' AND '.join(charge.condition for charge in charges),
+            return_values='ALL_NEW',
+            return_item_on_condition_failure=True
+        )
+
+    def check_and_increment(self, user_id: str, units: int = 1, endpoint: str = 'default') -> bool:
         """
         Check if user has exceeded rate limit and increment if not.
-        
+
         Args:
             user_id (str): The user's ID
-            
+            units (int): Number of requests to charge (default: 1). Batch requests
+                charge one unit per situation, all or nothing.
+            endpoint (str): The call site; its weight in RATE_LIMIT_ENDPOINT_COSTS
+                multiplies units (a packing list, which also titles the trip, costs more)
+
         Returns:
             bool: True if request is allowed, False if rate limit exceeded
-            
+
         Raises:
             RateLimitError: If rate limit is exceeded
         """
-        try:
-            today = self._get_today_date()
-            
-            # Try to get existing record
-            response = self.dynamodb.get_item(
-                table_name=self.table_name,
-                key={
-                    'userId': user_id,
-                    'date': today
-                }
-            )
-            
-            if 'Item' not in response:
-                # First request of the day
-                self.dynamodb.put_item(
-                    table_name=self.table_name,
-                    item={
-                        'userId': user_id,
-                        'date': today,
-                        'count': 1,
-                        'createdAt': str(datetime.now(timezone.utc))
-                    }
-                )
-                return True
-            
-            current_count = response['Item']['count']
-            
-            if current_count >= MAX_REQUESTS_PER_DAY:
-                raise RateLimitError("Daily rate limit exceeded")
-            
-            # Increment count
-            self.dynamodb.update_item(
-                table_name=self.table_name,
-                key={
-                    'userId': user_id,
-                    'date': today
-                },
-                update_expression='SET #count = #count + :inc',
-                expression_attribute_names={'#count': 'count'},
-                expression_attribute_values={':inc': 1}
-            )
-            
+        cost = endpoint_cost(endpoint, units)
+        if cost <= 0:
             return True
-            
+        try:
+            now = datetime.now(timezone.utc)
+            today = now.strftime('%Y-%m-%d')
+            state = self._last_state(user_id, today)
+
+            for attempt in range(MAX_CHARGE_ATTEMPTS):
+                try:
+                    state = self._charge(user_id, today, state, cost, now)
+                    self._remember(user_id, today, state)
+                    return True
+                except ConditionalCheckFailedError as e:
+                    state = e.item or {}
+                    self._remember(user_id, today, state)
+                    for algorithm in self.algorithms:
+                        try:
+                            algorithm.check(state, cost, now.timestamp())
+                        except RateLimitError:
+                            metrics.increment('rate_limit_rejections_total', labels={'algorithm': algorithm.name})
+                            raise
+                    metrics.increment('rate_limit_replans_total')
+            raise RateLimitError("Too many concurrent requests", retry_after=1)
+
         except RateLimitError:
             raise
         except DynamoDBError as e:
             logger.error(f"Error in rate limit check: {str(e)}", exc_info=True)
             # In case of DynamoDB errors, we'll allow the request to proceed
             # This is a fail-open approach to avoid blocking legitimate requests
-            return True 
\ No newline at end of file
+            return True
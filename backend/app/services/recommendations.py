@@ -1,7 +1,17 @@
 import logging
+from app.config import Config
 from app.services.llm import LLMService
 from app.services.wardrobe import WardrobeService
 from app.services.rate_limit import RateLimitError
+from app.services.model_tiering import estimate_tokens
+from app.services.prompts import (
+    PROMPT_TEMPLATES, WardrobeFragmentCache, categorized_wardrobe_block, render_prompt, wardrobe_block
+)
+from app.services.situation_cache import SituationCache
+from app.services.outfit_engine import DegradedOutfit, NoValidOutfitError, recommend_outfit
+from app.services.feedback_ranker import FeedbackRanker, Ranking
+from app.clients.dynamodb import DynamoDBError
+from app.services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -11,14 +21,36 @@ class InsufficientWardrobeError(Exception):
 
 MIN_WARDROBE_ITEMS = 3
 
+# Tokens reserved in the budget for each outfit the model has to write back
+OUTFIT_RESPONSE_TOKENS = 80
+
 class RecommendationsService:
-    def __init__(self, llm_service: LLMService, wardrobe_service: WardrobeService):
+    def __init__(self, llm_service: LLMService, wardrobe_service: WardrobeService,
+                 feedback_ranker: FeedbackRanker = None):
         self.llm_service = llm_service
         self.wardrobe_service = wardrobe_service
+        self.feedback_ranker = feedback_ranker
+        self.wardrobe_fragments = WardrobeFragmentCache(Config.WARDROBE_FRAGMENT_CACHE_USERS)
+        self.situation_cache = SituationCache(
+            threshold=Config.SITUATION_CACHE_THRESHOLD,
+            max_entries=Config.SITUATION_CACHE_ENTRIES_PER_USER,
+            max_users=Config.SITUATION_CACHE_USERS,
+            ttl_seconds=Config.SITUATION_CACHE_TTL_SECONDS
+        ) if Config.SITUATION_CACHE_ENABLED else None
+
+    def _wardrobe_fragment(self, user_id: str, wardrobe_items: list) -> str:
+        """The user's wardrobe block, reused until their wardrobe version changes."""
+        version = self.wardrobe_service.get_wardrobe_version(user_id)
+        return self.wardrobe_fragments.get(user_id, version, wardrobe_items)
 
     def get_outfit_recommendation(self, user_id: str, situation: str) -> dict:
         """
         Get an outfit recommendation based on the user's wardrobe and situation.
+        Near-duplicates of a recent situation are answered from the situation cache
+        without an LLM call. Once the user has given feedback, the feedback ranker
+        either answers with an outfit they liked repeatedly or trims a large wardrobe
+        to its best candidates before prompting. When the LLM call fails (including
+        over quota), the local outfit engine answers instead with a DegradedOutfit.
         
         Args:
             user_id (str): The user's ID
@@ -29,7 +61,8 @@ class RecommendationsService:
             
         Raises:
             InsufficientWardrobeError: If user has fewer than MIN_WARDROBE_ITEMS items
-            RateLimitError: If the user has exceeded their daily rate limit
+            RateLimitError: If the user has exceeded their daily rate limit and the
+                wardrobe has no complete outfit for the local engine
             Exception: If there's an error getting the recommendation
         """
         try:
@@ -43,7 +76,34 @@ class RecommendationsService:
                     f"Current items: {len(wardrobe_items)}"
                 )
             
-            return self._generate_outfit_recommendation(wardrobe_items, situation, user_id)
+            wardrobe = self._wardrobe_fragment(user_id, wardrobe_items)
+            if self.situation_cache is not None:
+                # The rendered block changes with the wardrobe, even when another worker made the write
+                wardrobe_key = (self.wardrobe_service.get_wardrobe_version(user_id), wardrobe)
+                cached = self.situation_cache.lookup(user_id, wardrobe_key, situation)
+                if cached is not None:
+                    return cached
+
+            ranking = self._rank_wardrobe(user_id, wardrobe_items, situation)
+            if ranking is not None and ranking.outfit is not None:
+                metrics.increment('feedback_ranker_total', labels={'outcome': 'skipped_llm'})
+                recommendation = ranking.outfit
+            else:
+                prompt_wardrobe = wardrobe
+                if ranking is not None and len(wardrobe_items) >= Config.FEEDBACK_PRESELECT_MIN_ITEMS:
+                    metrics.increment('feedback_ranker_total', labels={'outcome': 'preselected'})
+                    metrics.observe('feedback_ranker_kept_ratio', len(ranking.candidates) / len(wardrobe_items))
+                    prompt_wardrobe = categorized_wardrobe_block(ranking.candidates)
+                try:
+                    recommendation = self._generate_outfit_recommendation(prompt_wardrobe, situation, user_id)
+                except Exception as e:
+                    if not Config.OUTFIT_FALLBACK_ENABLED:
+                        raise
+                    return self._degraded_outfit_recommendation(wardrobe_items, situation, e)
+
+            if self.situation_cache is not None:
+                self.situation_cache.store(user_id, wardrobe_key, situation, recommendation)
+            return recommendation
             
         except InsufficientWardrobeError:
             raise
@@ -54,6 +114,41 @@ class RecommendationsService:
             logger.error(f"Error getting outfit recommendation: {str(e)}", exc_info=True)
             raise
 
+    def _rank_wardrobe(self, user_id: str, wardrobe_items: list, situation: str) -> Ranking:
+        """The feedback ranker's ranking, or None without a ranker, feedback or a readable store."""
+        if self.feedback_ranker is None:
+            return None
+        try:
+            return self.feedback_ranker.rank(user_id, wardrobe_items, situation)
+        except DynamoDBError as e:
+            # Ranking only saves work, so a store outage just means the full prompt
+            logger.error(f"Error ranking wardrobe by feedback: {str(e)}", exc_info=True)
+            return None
+
+    def _degraded_outfit_recommendation(self, wardrobe_items: list, situation: str, error: Exception) -> DegradedOutfit:
+        """
+        Build an outfit with the local rule-based engine after the LLM call failed.
+        
+        Args:
+            wardrobe_items (list): List of wardrobe items
+            situation (str): The situation description
+            error (Exception): Why the LLM couldn't answer
+            
+        Returns:
+            DegradedOutfit: The outfit, flagged with the reason it is degraded
+            
+        Raises:
+            Exception: The original error if the wardrobe has no complete outfit
+        """
+        reason = 'rate_limited' if isinstance(error, RateLimitError) else 'llm_unavailable'
+        try:
+            outfit = recommend_outfit(wardrobe_items, situation)
+        except NoValidOutfitError:
+            raise error
+        metrics.increment('outfit_fallback_total', labels={'reason': reason})
+        logger.warning(f"Serving rule-based outfit ({reason}) after: {str(error)}")
+        return DegradedOutfit(outfit, reason)
+
     def get_trip_outfit_recommendation(self, trip: dict, situation: str) -> dict:
         """
         Get an outfit recommendation based on a trip's packing list and situation.
@@ -78,10 +173,10 @@ class RecommendationsService:
                 else:
                     packing_list.append(items)
 
-            # Create wardrobe items from the packing list
-            wardrobe_items = [{"description": item} for item in packing_list]
+            # Packing lists change with the trip, so their block isn't cached
+            wardrobe = wardrobe_block(packing_list)
             
-            return self._generate_outfit_recommendation(wardrobe_items, situation, trip['userId'])
+            return self._generate_outfit_recommendation(wardrobe, situation, trip['userId'])
             
         except RateLimitError:
             logger.error("Rate limit exceeded while getting trip outfit recommendation", exc_info=True)
@@ -90,14 +185,16 @@ class RecommendationsService:
             logger.error(f"Error getting trip outfit recommendation: {str(e)}", exc_info=True)
             raise
 
-    def _generate_outfit_recommendation(self, wardrobe_items: list, situation: str, user_id: str) -> dict:
+    def _generate_outfit_recommendation(self, wardrobe: str, situation: str, user_id: str,
+                                        rate_limit_units: int = 1) -> dict:
         """
         Internal method to generate outfit recommendations.
         
         Args:
-            wardrobe_items (list): List of wardrobe items
+            wardrobe (str): The wardrobe block of the prompt
             situation (str): The situation description
             user_id (str): The user's ID
+            rate_limit_units (int): Requests to charge for this completion
             
         Returns:
             dict: The outfit recommendation
@@ -108,23 +205,12 @@ class RecommendationsService:
         """
         try:
             # Construct the prompt
-            wardrobe_description = "\n".join([item["description"] for item in wardrobe_items])
-            prompt = f"""Given the following wardrobe items:
-{wardrobe_description}
-
-The user is in this situation: {situation}
-
-Recommend an outfit using only items from their wardrobe. Format the response as a JSON object with the following structure:
-{{
-    "top": "description of top",
-    "bottom": "description of bottom",
-    "shoes": "description of shoes",
-    "outerwear": "description of outerwear (optional)",
-    "accessories": "description of accessories (optional)"
-}}"""
+            prompt = render_prompt("outfit", wardrobe, situation=situation)
 
             # Get recommendation from LLM
-            return self.llm_service.get_completion(prompt, user_id)
+            return self.llm_service.get_completion(
+                prompt, user_id, rate_limit_units=rate_limit_units, endpoint="outfit"
+            )
         except RateLimitError:
             logger.error("Rate limit exceeded while generating outfit recommendation", exc_info=True)
             raise
@@ -164,20 +250,11 @@ Recommend an outfit using only items from their wardrobe. Format the response as
                 )
             
             # Construct the prompt
-            wardrobe_description = "\n".join([item["description"] for item in wardrobe_items])
-            prompt = f"""Given the following wardrobe items:
-{wardrobe_description}
-
-The user is in this situation: {situation}
-
-Recommend ONE item they should buy to improve their wardrobe for this situation. Format the response as a JSON object with the following structure:
-{{
-    "item": "detailed description of the item to buy",
-    "explanation": "detailed explanation of why this item would be beneficial for the situation, including how it complements their existing wardrobe"
-}}"""
+            wardrobe = self._wardrobe_fragment(user_id, wardrobe_items)
+            prompt = render_prompt("buy", wardrobe, situation=situation)
 
             # Get recommendation from LLM
-            return self.llm_service.get_completion(prompt, user_id)
+            return self.llm_service.get_completion(prompt, user_id, endpoint="buy")
             
         except InsufficientWardrobeError:
             raise
@@ -223,25 +300,11 @@ Recommend ONE item they should buy to improve their wardrobe for this situation.
                 )
             
             # Construct the prompt
-            wardrobe_description = "\n".join([item["description"] for item in wardrobe_items])
-            prompt = f"""Given the following wardrobe items:
-{wardrobe_description}
-
-The user is planning this trip: {situation}
-
-Recommend a packing list using only items from their wardrobe. Format the response as a JSON object with the following structure:
-{{
-    "tops": ["list of tops"],
-    "bottoms": ["list of bottoms"],
-    "shoes": ["list of shoes"],
-    "outerwear": ["list of outerwear"],
-    "accessories": ["list of accessories"]
-}}
-
-Each list should contain 2-3 items that would be appropriate for the trip."""
+            wardrobe = self._wardrobe_fragment(user_id, wardrobe_items)
+            prompt = render_prompt("pack", wardrobe, situation=situation)
 
             # Get recommendation from LLM
-            return self.llm_service.get_completion(prompt, user_id)
+            return self.llm_service.get_completion(prompt, user_id, endpoint="pack")
             
         except InsufficientWardrobeError:
             raise
@@ -250,4 +313,152 @@ Each list should contain 2-3 items that would be appropriate for the trip."""
             raise
         except Exception as e:
             logger.error(f"Error getting packing recommendation: {str(e)}", exc_info=True)
-            raise 
\ No newline at end of file
+            raise
+
+    def get_batch_outfit_recommendations(self, user_id: str, situations: list) -> list:
+        """
+        Get outfit recommendations for several situations at once (e.g. a work week).
+
+        The wardrobe is fetched once and shared by every situation. Situations are sent
+        together in as few completions as the BATCH_PROMPT_TOKEN_BUDGET allows. Each
+        situation counts as one request against the daily rate limit, charged up front,
+        so a situation a later completion leaves without an outfit is asked again on
+        its own at no charge, and falls back to the local engine if that fails too.
+        
+        Args:
+            user_id (str): The user's ID
+            situations (list): The situations the user described
+            
+        Returns:
+            list: One outfit recommendation per situation, in the same order; a
+                DegradedOutfit where the local engine answered
+            
+        Raises:
+            InsufficientWardrobeError: If user has fewer than MIN_WARDROBE_ITEMS items
+            RateLimitError: If the batch would exceed the user's daily rate limit
+            Exception: If there's an error getting the recommendations
+        """
+        try:
+            # Get user's wardrobe items
+            wardrobe_items = self.wardrobe_service.get_wardrobe_items(user_id)
+            
+            # Check if user has enough items
+            if len(wardrobe_items) < MIN_WARDROBE_ITEMS:
+                raise InsufficientWardrobeError(
+                    f"Need at least {MIN_WARDROBE_ITEMS} items in wardrobe for recommendations. "
+                    f"Current items: {len(wardrobe_items)}"
+                )
+
+            wardrobe = self._wardrobe_fragment(user_id, wardrobe_items)
+            chunks = self._chunk_situations(wardrobe, situations)
+
+            recommendations = []
+            for index, chunk in enumerate(chunks):
+                # The whole batch is charged with the first completion
+                units = len(situations) if index == 0 else 0
+                try:
+                    recommendations.extend(
+                        self._generate_batch_outfit_recommendations(wardrobe, chunk, user_id, units)
+                    )
+                except Exception as e:
+                    if index == 0:
+                        raise
+                    logger.error(f"Error generating batch outfit recommendations: {str(e)}", exc_info=True)
+                    recommendations.extend([None] * len(chunk))
+
+            for position, recommendation in enumerate(recommendations):
+                if recommendation is None:
+                    recommendations[position] = self._missing_batch_outfit(
+                        wardrobe_items, wardrobe, situations[position], user_id
+                    )
+            return recommendations
+
+        except InsufficientWardrobeError:
+            raise
+        except RateLimitError:
+            logger.error("Rate limit exceeded while getting batch outfit recommendations", exc_info=True)
+            raise
+        except Exception as e:
+            logger.error(f"Error getting batch outfit recommendations: {str(e)}", exc_info=True)
+            raise
+
+    def _missing_batch_outfit(self, wardrobe_items: list, wardrobe: str, situation: str, user_id: str) -> dict:
+        """
+        An outfit for a situation the batch completions didn't answer. The batch
+        already paid for it, so it is asked for on its own without charging again.
+
+        Raises:
+            Exception: The error of that request if the local engine can't answer either
+        """
+        metrics.increment('batch_outfit_missing_total')
+        try:
+            return self._generate_outfit_recommendation(wardrobe, situation, user_id, rate_limit_units=0)
+        except Exception as e:
+            if not Config.OUTFIT_FALLBACK_ENABLED:
+                raise
+            return self._degraded_outfit_recommendation(wardrobe_items, situation, e)
+
+    def _chunk_situations(self, wardrobe: str, situations: list) -> list:
+        """
+        Split situations into chunks whose prompts fit in BATCH_PROMPT_TOKEN_BUDGET.
+        
+        Args:
+            wardrobe (str): The shared wardrobe block of the prompt
+            situations (list): The situations to split
+            
+        Returns:
+            list: Lists of situations, each holding at least one situation
+        """
+        base_tokens = estimate_tokens(PROMPT_TEMPLATES["outfit_batch"].prefix) + estimate_tokens(wardrobe)
+        chunks = []
+        current, current_tokens = [], base_tokens
+        for situation in situations:
+            tokens = estimate_tokens(situation) + OUTFIT_RESPONSE_TOKENS
+            if current and current_tokens + tokens > Config.BATCH_PROMPT_TOKEN_BUDGET:
+                chunks.append(current)
+                current, current_tokens = [], base_tokens
+            current.append(situation)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _generate_batch_outfit_recommendations(self, wardrobe: str, situations: list,
+                                               user_id: str, rate_limit_units: int) -> list:
+        """
+        Internal method to generate outfit recommendations for a chunk of situations.
+        
+        Args:
+            wardrobe (str): The shared wardrobe block of the prompt
+            situations (list): The situations in this chunk
+            user_id (str): The user's ID
+            rate_limit_units (int): Requests to charge for this completion
+            
+        Returns:
+            list: One outfit recommendation per situation, in the same order, with
+                None for any situation the response has no outfit for
+            
+        Raises:
+            RateLimitError: If the user has exceeded their daily rate limit
+            Exception: If there's an error calling the LLM
+        """
+        numbered_situations = "\n".join(
+            f"{number}. {situation}" for number, situation in enumerate(situations, start=1)
+        )
+        prompt = render_prompt("outfit_batch", wardrobe, situations=numbered_situations)
+
+        response = self.llm_service.get_completion(
+            prompt, user_id, rate_limit_units=rate_limit_units, endpoint="outfit_batch"
+        )
+
+        outfits_by_number = {}
+        for outfit in response.get("outfits", []):
+            outfit = dict(outfit)
+            number = outfit.pop("situation", None)
+            if number is not None:
+                outfits_by_number[int(number)] = outfit
+
+        missing = [number for number in range(1, len(situations) + 1) if number not in outfits_by_number]
+        if missing:
+            logger.warning(f"Batch response has no outfit for situations {missing}")
+        return [outfits_by_number.get(number) for number in range(1, len(situations) + 1)]
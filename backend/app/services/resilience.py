@@ -0,0 +1,150 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+import openai
+from app.services.concurrency import LLMOverloadedError
+from app.services.llm_backends import BackendError
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(LLMOverloadedError):
+    """Exception raised when the circuit breaker is open and calls fail fast"""
+    pass
+
+class DeadlineExceededError(Exception):
+    """Exception raised when the per-endpoint deadline expires before a call can complete"""
+    pass
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection errors, upstream 429s and 5xx responses are worth retrying."""
+    if isinstance(error, BackendError):
+        return error.retryable
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return isinstance(error, (FutureTimeoutError, TimeoutError, ConnectionError))
+
+class RetryPolicy:
+    """Bounded retries with decorrelated jitter: each delay is random in [base, 3 * previous], capped."""
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delays(self):
+        """Yield the delay before each retry (max_attempts - 1 of them)."""
+        delay = self.base_delay
+        for _ in range(self.max_attempts - 1):
+            delay = min(self.max_delay, random.uniform(self.base_delay, delay * 3))
+            yield delay
+
+class CircuitBreaker:
+    """
+    Fails fast while the upstream is unhealthy. The breaker opens when the failure
+    rate over the last window_size calls reaches failure_rate_threshold (once at
+    least min_calls were seen), rejects calls for reset_timeout seconds, then lets
+    a single probe through: success closes it, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_rate_threshold: float, window_size: int, min_calls: int,
+                 reset_timeout: float):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self._outcomes = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        metrics.set_gauge(f'{self.name}_circuit_open', 1 if state == OPEN else 0)
+        logger.warning(f"Circuit breaker {self.name} is now {state}")
+
+    def before_call(self) -> None:
+        """
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with a probe already running
+        """
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    metrics.increment(f'{self.name}_circuit_rejected_total')
+                    raise CircuitOpenError("Upstream is unavailable", retry_after=max(int(remaining), 1))
+                self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probe_in_flight:
+                    metrics.increment(f'{self.name}_circuit_rejected_total')
+                    raise CircuitOpenError("Upstream is unavailable", retry_after=1)
+                self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._outcomes.append(True)
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                self._outcomes.clear()
+                self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._outcomes.append(False)
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+                return
+            failures = self._outcomes.count(False)
+            if (self._state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate_threshold):
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def record_ignored(self) -> None:
+        """Release a half-open probe whose outcome says nothing about upstream health."""
+        with self._lock:
+            self._probe_in_flight = False
+
+def hedged_call(call, hedge_delay: float, executor, metric_labels: dict = None):
+    """
+    Run call(); if it hasn't finished after hedge_delay seconds, start a second
+    identical call and return whichever succeeds first.
+
+    Raises:
+        Exception: The error of the first call if it fails before the hedge is sent,
+            otherwise the last error once both calls failed
+    """
+    first = executor.submit(call)
+    try:
+        return first.result(timeout=hedge_delay)
+    except FutureTimeoutError:
+        pass
+
+    metrics.increment('llm_hedges_total', labels=metric_labels)
+    pending = {first, executor.submit(call)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
@@ -0,0 +1,15 @@
+import base64
+from decimal import Decimal
+from boto3.dynamodb.types import Binary
+
+def json_default(value):
+    """json.dumps default for DynamoDB values: numbers, sets and binary."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, Binary):
+        value = value.value
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode('ascii')
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
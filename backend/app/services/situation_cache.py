@@ -0,0 +1,133 @@
+import re
+import time
+import zlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from app.services.metrics import metrics
+from app.services.outfit_engine import read_situation
+
+_NON_WORD = re.compile(r'[^\w\s]+')
+# Words that say nothing about the outfit
+_STOPWORDS = frozenset({
+    'a', 'an', 'the', 'and', 'or', 'with', 'at', 'in', 'on', 'for', 'to', 'of', 'my', 'our',
+    'some', 'going', 'i', 'im', 'am', 'we', 'is', 'it', 'this', 'that'
+})
+
+def embed_situation(text: str, dimensions: int, ngram: int = 3) -> np.ndarray:
+    """
+    Hash the character n-grams of each word into a unit vector. Case, punctuation,
+    stopwords and word order don't matter, so "dinner, casual" lands next to "Casual dinner".
+
+    Args:
+        text (str): The situation
+        dimensions (int): Size of the hashed vector
+        ngram (int): Characters per n-gram
+
+    Returns:
+        np.ndarray: An L2-normalized float32 vector (all zeros for empty text)
+    """
+    words = [word for word in _NON_WORD.sub(' ', text.lower()).split() if word not in _STOPWORDS]
+    indexes = [
+        zlib.crc32(padded[start:start + ngram].encode()) % dimensions
+        for padded in (f' {word} ' for word in words)
+        for start in range(max(len(padded) - ngram + 1, 1))
+    ]
+    vector = np.zeros(dimensions, dtype=np.float32)
+    if indexes:
+        np.add.at(vector, indexes, 1.0)
+        vector /= np.linalg.norm(vector)
+    return vector
+
+class _UserEntries:
+    def __init__(self, wardrobe_key, dimensions: int):
+        self.wardrobe_key = wardrobe_key
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self.situations = []
+        self.signals = []
+        self.results = []
+        self.stored_at = []
+
+class SituationCache:
+    """
+    Recent outfit recommendations per user, looked up by situation similarity
+    rather than exact text. Text similarity alone can't tell "hiking trip" from
+    "winter hiking trip", so a hit also needs the same formality, warmth and rain
+    from read_situation. Entries are keyed by the user's wardrobe version and
+    dropped as soon as it changes. Each user keeps at most max_entries situations
+    for ttl_seconds; least recently used users are evicted past max_users.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, max_users: int, ttl_seconds: float,
+                 dimensions: int = 4096):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.dimensions = dimensions
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, user_id: str, wardrobe_key, situation: str):
+        """
+        Find the cached recommendation for the most similar recent situation that
+        calls for the same formality, warmth and rain.
+
+        Args:
+            user_id (str): The user's ID
+            wardrobe_key: The user's current wardrobe version
+            situation (str): The situation the user described
+
+        Returns:
+            dict: A copy of the cached recommendation, or None below the threshold
+        """
+        vector = embed_situation(situation, self.dimensions)
+        signals = read_situation(situation)
+        with self._lock:
+            entries = self._live_entries(user_id, wardrobe_key)
+            matching = [index for index, stored in enumerate(entries.signals) if stored == signals] if entries else []
+            if not matching:
+                metrics.increment('situation_cache_requests_total', labels={'result': 'miss'})
+                return None
+            similarities = entries.vectors[matching] @ vector
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            result = dict(entries.results[matching[best]]) if similarity >= self.threshold else None
+
+        metrics.observe('situation_cache_similarity', similarity)
+        metrics.increment('situation_cache_requests_total', labels={'result': 'hit' if result else 'miss'})
+        return result
+
+    def store(self, user_id: str, wardrobe_key, situation: str, result: dict) -> None:
+        """Remember a recommendation, replacing the user's oldest entry when full."""
+        vector = embed_situation(situation, self.dimensions)
+        with self._lock:
+            entries = self._live_entries(user_id, wardrobe_key)
+            if entries is None:
+                entries = self._users[user_id] = _UserEntries(wardrobe_key, self.dimensions)
+            self._users.move_to_end(user_id)
+
+            entries.vectors = np.vstack([entries.vectors[-(self.max_entries - 1):], vector[np.newaxis]]) \
+                if self.max_entries > 1 else vector[np.newaxis]
+            for values, value in ((entries.situations, situation), (entries.signals, read_situation(situation)),
+                                  (entries.results, dict(result)), (entries.stored_at, time.monotonic())):
+                values.append(value)
+                del values[:-self.max_entries]
+
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def _live_entries(self, user_id: str, wardrobe_key):
+        """The user's entries with stale ones dropped, or None. Call with the lock held."""
+        entries = self._users.get(user_id)
+        if entries is None:
+            return None
+        if entries.wardrobe_key != wardrobe_key:
+            del self._users[user_id]
+            return None
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = sum(1 for stored_at in entries.stored_at if stored_at < cutoff)
+        if expired:
+            entries.vectors = entries.vectors[expired:]
+            del entries.situations[:expired], entries.signals[:expired], entries.results[:expired], entries.stored_at[:expired]
+        return entries
@@ -0,0 +1,213 @@
+import re
+import json
+
+class StructuredOutputError(Exception):
+    """Exception raised when a completion can't be parsed or repaired into its endpoint's schema"""
+    pass
+
+class FieldSpec:
+    """One field of a response schema: its kind (str, list, int or a nested schema list) and whether it's required."""
+
+    def __init__(self, kind, required: bool = True, item_schema: dict = None):
+        self.kind = kind
+        self.required = required
+        self.item_schema = item_schema
+
+TEXT = FieldSpec(str)
+OPTIONAL_TEXT = FieldSpec(str, required=False)
+TEXT_LIST = FieldSpec(list)
+OPTIONAL_TEXT_LIST = FieldSpec(list, required=False)
+
+OUTFIT_SCHEMA = {
+    'top': TEXT,
+    'bottom': TEXT,
+    'shoes': TEXT,
+    'outerwear': OPTIONAL_TEXT,
+    'accessories': OPTIONAL_TEXT,
+}
+
+# Response schema per LLM endpoint; endpoints without one only get JSON repair
+RESPONSE_SCHEMAS = {
+    'outfit': OUTFIT_SCHEMA,
+    'outfit_batch': {
+        'outfits': FieldSpec(list, item_schema={'situation': FieldSpec(int), **OUTFIT_SCHEMA}),
+    },
+    'buy': {
+        'item': TEXT,
+        'explanation': TEXT,
+    },
+    'pack': {
+        'tops': TEXT_LIST,
+        'bottoms': TEXT_LIST,
+        'shoes': TEXT_LIST,
+        'outerwear': OPTIONAL_TEXT_LIST,
+        'accessories': OPTIONAL_TEXT_LIST,
+    },
+    'title': {
+        'title': TEXT,
+    },
+}
+
+_CODE_FENCE = re.compile(r'^\s*```[a-zA-Z]*\s*|\s*```\s*$')
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+
+class _Repairs:
+    def __init__(self):
+        self.made = False
+
+def parse_structured(text: str, schema: dict = None) -> tuple:
+    """
+    Parse a completion into its schema, repairing what can be repaired locally:
+    code fences, text around the object, trailing commas, truncated output,
+    strings where lists are expected (and the other way round), a single wrapper
+    object around the fields, and missing optional fields.
+
+    Args:
+        text (str): The completion text
+        schema (dict): Field name to FieldSpec, or None to only parse the JSON
+
+    Returns:
+        tuple: (the parsed dict, whether any repair was needed)
+
+    Raises:
+        StructuredOutputError: If the text can't be turned into a valid response
+    """
+    repairs = _Repairs()
+    data = _parse_json(text, repairs)
+    if not isinstance(data, dict):
+        raise StructuredOutputError("Response is not a JSON object")
+    if schema is not None:
+        data = _coerce_object(data, schema, repairs)
+    return data, repairs.made
+
+def _parse_json(text: str, repairs: _Repairs):
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        pass
+
+    candidate = _CODE_FENCE.sub('', text or '')
+    start = candidate.find('{')
+    if start == -1:
+        raise StructuredOutputError("Response contains no JSON object")
+    candidate = _TRAILING_COMMA.sub(r'\1', candidate[start:])
+
+    for attempt in (candidate, candidate[:candidate.rfind('}') + 1]):
+        try:
+            data = json.loads(attempt)
+            repairs.made = True
+            return data
+        except ValueError:
+            pass
+
+    for attempt in _close_truncated(candidate):
+        try:
+            data = json.loads(attempt)
+            repairs.made = True
+            return data
+        except ValueError:
+            pass
+    raise StructuredOutputError("Response is not valid JSON and couldn't be repaired")
+
+def _close_truncated(text: str):
+    """Yield candidate completions of JSON that was cut off mid-object."""
+    closers = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            closers.append('}' if char == '{' else ']')
+        elif char in '}]' and closers:
+            closers.pop()
+
+    body = text[:-1] if escaped else text
+    if in_string:
+        body += '"'
+    body = body.rstrip().rstrip(',')
+    tail = ''.join(reversed(closers))
+    yield body + tail
+    # Cut off after a key, or after a value whose key we can't trust: drop back to the last comma
+    if body.endswith(':'):
+        yield body + ' null' + tail
+    yield body + ': null' + tail
+    if ',' in body:
+        yield _TRAILING_COMMA.sub(r'\1', body[:body.rfind(',')] + tail)
+
+def _coerce_object(data: dict, schema: dict, repairs: _Repairs) -> dict:
+    missing = [name for name, spec in schema.items() if spec.required and _is_missing(data.get(name), spec)]
+    if missing:
+        # {"outfit": {...}} instead of the fields themselves
+        nested = [value for value in data.values() if isinstance(value, dict)]
+        if len(nested) == 1 and not any(name in data for name in schema):
+            repairs.made = True
+            return _coerce_object(nested[0], schema, repairs)
+        raise StructuredOutputError(f"Response is missing required fields: {', '.join(missing)}")
+
+    result = {}
+    for name, spec in schema.items():
+        value = data.get(name)
+        if _is_missing(value, spec):
+            if name in data:
+                repairs.made = True
+            if spec.kind is list and not spec.required:
+                result[name] = []
+            continue
+        result[name] = _coerce_value(name, value, spec, repairs)
+    return result
+
+def _coerce_value(name: str, value, spec: FieldSpec, repairs: _Repairs):
+    if spec.kind is str:
+        if isinstance(value, str):
+            return value.strip()
+        repairs.made = True
+        if isinstance(value, list):
+            return ', '.join(str(part).strip() for part in value if not _is_empty(part))
+        if isinstance(value, dict):
+            return ', '.join(str(part).strip() for part in value.values() if not _is_empty(part))
+        return str(value)
+
+    if spec.kind is int:
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        try:
+            number = int(str(value).strip().rstrip('.'))
+        except ValueError:
+            raise StructuredOutputError(f"Field {name} is not a number")
+        repairs.made = True
+        return number
+
+    if not isinstance(value, list):
+        repairs.made = True
+        value = list(value.values()) if isinstance(value, dict) else [value]
+    if spec.item_schema is not None:
+        if not all(isinstance(entry, dict) for entry in value):
+            raise StructuredOutputError(f"Field {name} must hold objects")
+        return [_coerce_object(entry, spec.item_schema, repairs) for entry in value]
+    items = []
+    for entry in value:
+        if _is_empty(entry):
+            repairs.made = True
+        elif isinstance(entry, str):
+            items.append(entry.strip())
+        else:
+            repairs.made = True
+            items.append(_coerce_value(name, entry, TEXT, repairs))
+    return items
+
+def _is_missing(value, spec: FieldSpec) -> bool:
+    """Missing, null or blank; an empty list is a valid value for a list field."""
+    if spec.kind is list:
+        return value is None or (isinstance(value, str) and not value.strip())
+    return _is_empty(value)
+
+def _is_empty(value) -> bool:
+    return value is None or (isinstance(value, (str, list, dict)) and not value) or \
+        (isinstance(value, str) and not value.strip())
@@ -1,6 +1,7 @@
 import logging
 from app.services.llm import LLMService
 from app.services.rate_limit import RateLimitError
+from app.services.prompts import render_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -24,15 +25,10 @@ class TextTransformationsService:
             Exception: If there's an error generating the title
         """
         try:
-            prompt = f"""Given this trip situation:
-{situation}
-
-Generate a clean, concise title (max 5 words) that summarizes this trip. 
-The title should be professional and easy to understand.
-Return the response as a JSON object with a single field 'title' containing the title text."""
+            prompt = render_prompt("title", situation=situation)
 
             # Get title from LLM
-            response = self.llm_service.get_completion(prompt, user_id)
+            response = self.llm_service.get_completion(prompt, user_id, endpoint="title")
             
             # Extract title from JSON response
             title = response.get('title', '').strip().strip('"\'')
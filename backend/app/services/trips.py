@@ -1,7 +1,8 @@
 import logging
 from datetime import datetime, UTC
-from app.clients.dynamodb import DynamoDBClient, DynamoDBError
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError, projection
 from app.config import Config
+from app.services.versions import UserVersions
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,11 @@ class TripsService:
     def __init__(self, dynamodb_client: DynamoDBClient):
         self.dynamodb = dynamodb_client
         self.table_name = TRIPS_TABLE
+        self.versions = UserVersions()
+
+    def get_trips_etag(self, user_id: str) -> str:
+        """ETag for GET /trips, changed by every write through this service (see UserVersions.etag)."""
+        return self.versions.etag(user_id)
 
     def save_trip(self, user_id: str, description: str, packing_list: dict) -> str:
         """
@@ -45,18 +51,20 @@ class TripsService:
                     "createdAt": timestamp
                 }
             )
+            self.versions.bump(user_id)
             
             return trip_id
         except DynamoDBError as e:
             logger.error(f"Error saving trip: {str(e)}", exc_info=True)
             raise
 
-    def get_user_trip(self, user_id: str) -> dict:
+    def get_user_trip(self, user_id: str, attributes: list = None) -> dict:
         """
         Get the user's most recent trip.
         
         Args:
             user_id (str): The user's ID
+            attributes (list): Only return these trip attributes (default: all)
             
         Returns:
             dict: The trip data or None if no trip found
@@ -65,13 +73,17 @@ class TripsService:
             DynamoDBError: If there's an error querying DynamoDB
         """
         try:
+            query = {}
+            if attributes is not None:
+                query['projection_expression'], query['expression_attribute_names'] = projection(attributes)
             # Query trips by userId, sorted by createdAt in descending order
             response = self.dynamodb.query(
                 table_name=self.table_name,
                 key_condition_expression='userId = :uid',
                 expression_attribute_values={':uid': user_id},
                 scan_index_forward=False,  # Sort in descending order
-                limit=1  # Get only the most recent trip
+                limit=1,  # Get only the most recent trip
+                **query
             )
             
             if not response.get('Items'):
@@ -151,6 +163,7 @@ class TripsService:
                     'tripId': trip_id
                 }
             )
+            self.versions.bump(user_id)
             
         except TripNotFoundError:
             raise
@@ -0,0 +1,57 @@
+import time
+import uuid
+import hashlib
+import threading
+from app.config import Config
+
+class UserVersions:
+    """
+    Per-user version counters for one kind of resource, bumped by the owning
+    service on every write it makes.
+
+    They also back the ETags of conditional GETs. A write made by another process
+    never bumps this process's counters, so each user's ETag also rolls over
+    every etag_ttl_seconds: a stale 304 is bounded by that window. The random
+    epoch keeps ETags issued before a restart from matching counters that start
+    over at 0.
+    """
+
+    def __init__(self, etag_ttl_seconds: float = Config.CONDITIONAL_GET_TTL_SECONDS):
+        self.etag_ttl_seconds = etag_ttl_seconds
+        self._epoch = uuid.uuid4().hex
+        self._versions = {}
+        self._etag_windows = {}
+        self._next_window = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: str) -> int:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            return self._versions[user_id]
+
+    def etag(self, user_id: str, *variant: str) -> str:
+        """
+        A strong ETag for the user's current version. Take it before reading the
+        resource, so a write racing the read can only make the ETag older than the
+        body, never newer.
+
+        Args:
+            user_id (str): The resource owner
+            *variant (str): Whatever else selects the representation, e.g. a filter
+
+        Returns:
+            str: The unquoted entity tag
+        """
+        now = time.monotonic()
+        with self._lock:
+            window = self._etag_windows.get(user_id)
+            if window is None or window[1] <= now:
+                self._next_window += 1
+                window = self._etag_windows[user_id] = (self._next_window, now + self.etag_ttl_seconds)
+            version = self._versions.get(user_id, 0)
+        key = '|'.join((self._epoch, user_id, str(window[0]), str(version), *variant))
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
@@ -1,7 +1,11 @@
 import logging
 from datetime import datetime, UTC
-from app.clients.dynamodb import DynamoDBClient, DynamoDBError
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError, ConditionalCheckFailedError, projection
 from app.config import Config
+from app.services.item_classifier import CLASSIFIER_VERSION, classify_wardrobe_item, item_category
+from app.services.wardrobe_search import WardrobeIndex, WardrobeSearchIndexes, duplicate_key
+from app.services.wardrobe_changes import DELETE, MAX_WRITES_PER_COMMIT, PUT, WardrobeChangeLog
+from app.services.versions import UserVersions
 
 logger = logging.getLogger(__name__)
 
@@ -11,36 +15,125 @@ class WardrobeService:
     def __init__(self, dynamodb_client: DynamoDBClient):
         self.dynamodb = dynamodb_client
         self.table_name = WARDROBE_TABLE_NAME
+        self.versions = UserVersions()
+        self.change_log = WardrobeChangeLog(dynamodb_client)
+        self.search_indexes = WardrobeSearchIndexes(
+            max_users=Config.WARDROBE_SEARCH_INDEX_USERS,
+            ttl_seconds=Config.WARDROBE_SEARCH_INDEX_TTL_SECONDS
+        )
+
+    def get_wardrobe_version(self, user_id: str) -> int:
+        return self.versions.get(user_id)
+
+    def get_wardrobe_etag(self, user_id: str, category: str = None) -> str:
+        """ETag for GET /wardrobe, changed by every write through this service (see UserVersions.etag)."""
+        return self.versions.etag(user_id, category or '')
+
+    def get_wardrobe_cursor(self, user_id: str) -> int:
+        """The change log cursor to pass to get_wardrobe_changes after a full read."""
+        return self.change_log.cursor(user_id)
+
+    def get_wardrobe_changes(self, user_id: str, since: int) -> dict:
+        """
+        Items added, updated or deleted since a cursor (see WardrobeChangeLog.changes_since).
+
+        Raises:
+            CursorExpiredError: If the cursor is too old for the compacted change log
+        """
+        try:
+            return self.change_log.changes_since(user_id, since)
+        except DynamoDBError as e:
+            logger.error(f"Error getting wardrobe changes: {str(e)}", exc_info=True)
+            raise
 
     def delete_wardrobe_item(self, user_id: str, item_id: str) -> bool:
+        """Delete an item, leaving a tombstone in the change log."""
         try:
-            return self.dynamodb.delete_item(
-                table_name=self.table_name,
-                key={
-                    'userId': user_id,
-                    'itemId': item_id
-                }
+            self.change_log.commit(
+                user_id,
+                {'Delete': {'TableName': self.table_name, 'Key': {'userId': user_id, 'itemId': item_id}}},
+                DELETE, item_id
             )
+            self.search_indexes.remove_item(user_id, item_id)
+            self.versions.bump(user_id)
+            return True
         except DynamoDBError as e:
             logger.error(f"Error deleting wardrobe item: {str(e)}", exc_info=True)
             raise
 
+    def delete_wardrobe_items(self, user_id: str, item_ids: list, progress=None) -> int:
+        """
+        Delete several items with as few transactions as the change log allows,
+        each leaving a tombstone. Transactions run one after another: they all
+        advance the same change log head, so parallel ones would only conflict.
+
+        Args:
+            user_id (str): The items' owner
+            item_ids (list): The items to delete
+            progress (callable): Called with the running count of deleted items
+
+        Returns:
+            int: The number of items deleted
+
+        Raises:
+            DynamoDBError: If a transaction fails; earlier chunks stay deleted
+        """
+        item_ids = list(dict.fromkeys(item_ids))
+        try:
+            for start in range(0, len(item_ids), MAX_WRITES_PER_COMMIT):
+                chunk = item_ids[start:start + MAX_WRITES_PER_COMMIT]
+                self.change_log.commit_many(user_id, [
+                    ({'Delete': {'TableName': self.table_name, 'Key': {'userId': user_id, 'itemId': item_id}}}, DELETE, item_id, None)
+                    for item_id in chunk
+                ])
+                for item_id in chunk:
+                    self.search_indexes.remove_item(user_id, item_id)
+                self.versions.bump(user_id)
+                if progress is not None:
+                    progress(start + len(chunk))
+            return len(item_ids)
+        except DynamoDBError as e:
+            logger.error(f"Error deleting wardrobe items: {str(e)}", exc_info=True)
+            raise
+
     def add_wardrobe_item(self, user_id: str, item_id: str, description: str) -> bool:
+        """
+        Add an item, stored with the category, colors, formality and normalized
+        tokens from the local classifier, and record it in the change log.
+        """
         try:
-            return self.dynamodb.put_item(
-                table_name=self.table_name,
-                item={
-                    'userId': user_id,
-                    'itemId': item_id,
-                    'description': description,
-                    'createdAt': datetime.now(UTC).isoformat()
-                }
+            item = {
+                'userId': user_id,
+                'itemId': item_id,
+                'description': description,
+                'createdAt': datetime.now(UTC).isoformat(),
+                **classify_wardrobe_item(description)
+            }
+            self.change_log.commit(
+                user_id,
+                {'Put': {'TableName': self.table_name, 'Item': item}},
+                PUT, item_id, item
             )
+            self.search_indexes.add_item(user_id, item)
+            self.versions.bump(user_id)
+            return True
         except DynamoDBError as e:
             logger.error(f"Error adding wardrobe item: {str(e)}", exc_info=True)
             raise
 
-    def get_wardrobe_items(self, user_id: str) -> list:
+    def get_wardrobe_items(self, user_id: str, category: str = None) -> list:
+        """
+        Get a user's wardrobe items.
+
+        Args:
+            user_id (str): The user's ID
+            category (str): Only return items of this category, if given. Items saved
+                before categorization are classified on the fly, so the filter runs
+                here rather than as a DynamoDB filter expression.
+
+        Returns:
+            list: The wardrobe items
+        """
         try:
             response = self.dynamodb.query(
                 table_name=self.table_name,
@@ -49,7 +142,117 @@ class WardrobeService:
                     ':uid': user_id
                 }
             )
-            return response.get('Items', [])
+            items = response.get('Items', [])
+            if category is not None:
+                items = [item for item in items if (item.get('category') or item_category(item['description'])) == category]
+            return items
         except DynamoDBError as e:
             logger.error(f"Error getting wardrobe items: {str(e)}", exc_info=True)
-            raise 
\ No newline at end of file
+            raise
+
+    def get_wardrobe_page(self, user_id: str, limit: int, attributes: list) -> dict:
+        """
+        The first page of a user's wardrobe, with only the given attributes.
+
+        Args:
+            user_id (str): The user's ID
+            limit (int): Maximum number of items to read
+            attributes (list): The item attributes to return
+
+        Returns:
+            dict: items, and hasMore if the wardrobe has more items than limit
+        """
+        projection_expression, names = projection(attributes)
+        try:
+            response = self.dynamodb.query(
+                table_name=self.table_name,
+                key_condition_expression='userId = :uid',
+                expression_attribute_values={':uid': user_id},
+                limit=limit,
+                projection_expression=projection_expression,
+                expression_attribute_names=names
+            )
+            return {'items': response.get('Items', []), 'hasMore': 'LastEvaluatedKey' in response}
+        except DynamoDBError as e:
+            logger.error(f"Error getting wardrobe page: {str(e)}", exc_info=True)
+            raise
+
+    def search_wardrobe_items(self, user_id: str, query: str, limit: int = Config.WARDROBE_SEARCH_MAX_RESULTS) -> list:
+        """
+        Full-text search over a user's wardrobe, with prefix matching on every term.
+        The user's index is built on the first search or duplicate check from
+        get_wardrobe_items and then kept up to date by add_wardrobe_item and
+        delete_wardrobe_item.
+
+        Args:
+            user_id (str): The user's ID
+            query (str): The search text
+            limit (int): Maximum number of items to return
+
+        Returns:
+            list: The matching items, best match first
+        """
+        results = self.search_indexes.search(user_id, query, limit)
+        if results is not None:
+            return results
+        return self._load_index(user_id).search(query, limit)
+
+    def _load_index(self, user_id: str) -> WardrobeIndex:
+        """Build the user's index from get_wardrobe_items and cache it."""
+        version = self.versions.get(user_id)
+        index = WardrobeIndex(self.get_wardrobe_items(user_id))
+        # A write while the items were loading may be missing from the index, so don't keep it
+        if self.versions.get(user_id) == version:
+            self.search_indexes.put(user_id, index)
+        return index
+
+    def find_duplicates(self, user_id: str, description: str) -> list:
+        """
+        Find items in the user's wardrobe with the same normalized tokens as description,
+        e.g. "Jeans, blue" for "Blue jeans". Looked up by duplicate key in the user's
+        search index, which is loaded once and then kept up to date on writes, so an
+        insert doesn't re-read the wardrobe.
+
+        Returns:
+            list: The matching wardrobe items
+        """
+        key = duplicate_key({'description': description})
+        duplicates = self.search_indexes.duplicates(user_id, key)
+        if duplicates is not None:
+            return duplicates
+        return self._load_index(user_id).duplicates(key)
+
+    def categorize_item(self, user_id: str, item: dict) -> bool:
+        """
+        Store the classifier's attributes on an existing item, unless it already has
+        them from the current CLASSIFIER_VERSION.
+
+        Args:
+            user_id (str): The item owner
+            item (dict): The wardrobe item as loaded
+
+        Returns:
+            bool: True if the item was updated
+        """
+        if item.get('classifierVersion') == CLASSIFIER_VERSION:
+            return False
+        attributes = classify_wardrobe_item(item['description'])
+        try:
+            # Not an upsert: an item deleted since it was read stays deleted
+            self.change_log.commit(
+                user_id,
+                {'Update': {
+                    'TableName': self.table_name,
+                    'Key': {'userId': user_id, 'itemId': item['itemId']},
+                    'UpdateExpression': 'SET ' + ', '.join(f'#{name} = :{name}' for name in attributes),
+                    'ConditionExpression': 'attribute_exists(itemId)',
+                    'ExpressionAttributeNames': {f'#{name}': name for name in attributes},
+                    'ExpressionAttributeValues': {f':{name}': value for name, value in attributes.items()}
+                }},
+                PUT, item['itemId'], {**item, **attributes}
+            )
+        except ConditionalCheckFailedError:
+            return False
+        self.search_indexes.add_item(user_id, {**item, **attributes})
+        self.versions.bump(user_id)
+        return True 
\ No newline at end of file
@@ -0,0 +1,225 @@
+import time
+import logging
+from datetime import datetime, UTC
+from app.clients.dynamodb import DynamoDBClient, ConditionalCheckFailedError
+from app.config import Config
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+WARDROBE_CHANGES_TABLE = f'{Config.ENV}-wardrobe-changes'
+
+PUT = 'put'
+DELETE = 'delete'
+
+# seq 0 is each user's head row: the last sequence number and the compaction horizon
+HEAD_SEQ = 0
+
+# Attempts to commit a change when another write to the same wardrobe wins the race
+MAX_COMMIT_ATTEMPTS = 5
+
+# A transaction holds up to 100 writes: each wardrobe write, its change row, and the head
+MAX_WRITES_PER_COMMIT = 49
+
+class CursorExpiredError(Exception):
+    """Exception raised when a sync cursor predates tombstones removed by compaction"""
+    pass
+
+class WardrobeChangeLog:
+    """
+    Per-user log of wardrobe writes for delta sync, in its own table keyed by
+    userId + seq. Each write commits in one transaction with its change row and
+    the user's head row, conditioned on the head's last seq, so changes become
+    visible in seq order and a reader's cursor never skips a change that commits
+    later with a lower seq.
+    """
+
+    def __init__(self, dynamodb_client: DynamoDBClient):
+        self.dynamodb = dynamodb_client
+        self.table_name = WARDROBE_CHANGES_TABLE
+
+    def _head(self, user_id: str) -> dict:
+        response = self.dynamodb.get_item(
+            table_name=self.table_name,
+            key={'userId': user_id, 'seq': HEAD_SEQ}
+        )
+        return response.get('Item') or {}
+
+    def cursor(self, user_id: str) -> int:
+        """The seq of the user's latest change; 0 before the first one."""
+        return int(self._head(user_id).get('lastSeq', 0))
+
+    def commit(self, user_id: str, write: dict, op: str, item_id: str, item: dict = None) -> int:
+        """
+        Apply a wardrobe write together with its change row.
+
+        Args:
+            user_id (str): The wardrobe owner
+            write (dict): The TransactWriteItems entry for the wardrobe table
+            op (str): PUT or DELETE
+            item_id (str): The item written
+            item (dict): The stored item, for PUT
+
+        Returns:
+            int: The change's seq
+
+        Raises:
+            ConditionalCheckFailedError: If the write's own condition failed, or
+                concurrent writes kept winning the race
+            DynamoDBError: If the transaction fails
+        """
+        return self.commit_many(user_id, [(write, op, item_id, item)])[0]
+
+    def commit_many(self, user_id: str, entries: list) -> list:
+        """
+        Apply several wardrobe writes and their change rows in one transaction,
+        with consecutive seqs and a single head update.
+
+        Args:
+            user_id (str): The wardrobe owner
+            entries (list): (write, op, item_id, item) tuples as taken by commit; at
+                most MAX_WRITES_PER_COMMIT
+
+        Returns:
+            list: The changes' seqs, in entry order
+
+        Raises:
+            ConditionalCheckFailedError: If a write's own condition failed, or
+                concurrent writes kept winning the race
+            DynamoDBError: If the transaction fails
+        """
+        if len(entries) > MAX_WRITES_PER_COMMIT:
+            raise ValueError(f"At most {MAX_WRITES_PER_COMMIT} writes fit in one commit")
+        last_seq = self.cursor(user_id)
+        for attempt in range(MAX_COMMIT_ATTEMPTS):
+            changed_at = datetime.now(UTC).isoformat()
+            seqs = [last_seq + offset for offset in range(1, len(entries) + 1)]
+            changes = []
+            for seq, (_, op, item_id, item) in zip(seqs, entries):
+                change = {
+                    'userId': user_id,
+                    'seq': seq,
+                    'op': op,
+                    'itemId': item_id,
+                    'changedAt': changed_at
+                }
+                if item is not None:
+                    change['item'] = item
+                changes.append({'Put': {'TableName': self.table_name, 'Item': change}})
+            try:
+                self.dynamodb.transact_write([
+                    *(entry[0] for entry in entries),
+                    *changes,
+                    {'Update': {
+                        'TableName': self.table_name,
+                        'Key': {'userId': user_id, 'seq': HEAD_SEQ},
+                        'UpdateExpression': 'SET #lastSeq = :seq',
+                        'ConditionExpression': 'attribute_not_exists(#lastSeq) OR #lastSeq = :last',
+                        'ExpressionAttributeNames': {'#lastSeq': 'lastSeq'},
+                        'ExpressionAttributeValues': {':seq': seqs[-1], ':last': last_seq}
+                    }}
+                ])
+                return seqs
+            except ConditionalCheckFailedError:
+                current_seq = self.cursor(user_id)
+                if current_seq == last_seq:
+                    # Nobody else committed, so a wardrobe write's own condition failed
+                    raise
+                last_seq = current_seq
+                metrics.increment('wardrobe_change_conflicts_total')
+                logger.warning(f"Wardrobe changes {seqs[0]}-{seqs[-1]} for {user_id} lost a race (attempt {attempt + 1})")
+        raise ConditionalCheckFailedError(f"Couldn't commit wardrobe changes after {MAX_COMMIT_ATTEMPTS} attempts")
+
+    def changes_since(self, user_id: str, since: int, limit: int = Config.WARDROBE_CHANGES_PAGE_SIZE) -> dict:
+        """
+        The changes after a cursor, oldest first. Reads only the user's head row
+        and the changed rows.
+
+        Args:
+            user_id (str): The wardrobe owner
+            since (int): The cursor from the last sync (or from GET /wardrobe)
+            limit (int): Maximum number of changes to return
+
+        Returns:
+            dict: changes (puts with the item, deletes as tombstones with the itemId),
+                cursor (the seq to sync from next) and hasMore
+
+        Raises:
+            CursorExpiredError: If compaction dropped tombstones after the cursor
+        """
+        head = self._head(user_id)
+        if since < int(head.get('compactedThrough', 0)):
+            raise CursorExpiredError("Cursor predates the compacted change log; fetch the full wardrobe")
+
+        response = self.dynamodb.query(
+            table_name=self.table_name,
+            key_condition_expression='userId = :user_id AND seq > :since',
+            expression_attribute_values={':user_id': user_id, ':since': since},
+            limit=limit
+        )
+        rows = response.get('Items', [])
+        changes = []
+        for row in rows:
+            if row['op'] == PUT:
+                changes.append({'op': PUT, 'itemId': row['itemId'], 'item': row['item']})
+            else:
+                changes.append({'op': DELETE, 'itemId': row['itemId']})
+        return {
+            'changes': changes,
+            'cursor': int(rows[-1]['seq']) if rows else since,
+            'hasMore': 'LastEvaluatedKey' in response
+        }
+
+    def compact(self, user_id: str, tombstone_ttl_seconds: float = Config.WARDROBE_CHANGES_TOMBSTONE_TTL_SECONDS) -> int:
+        """
+        Drop change rows superseded by a later change to the same item, and
+        tombstones older than tombstone_ttl_seconds. Superseded rows never matter
+        to any cursor; dropping tombstones raises the compaction horizon first, so
+        cursors before it get CursorExpiredError instead of missing a delete.
+
+        Returns:
+            int: The number of rows removed
+        """
+        rows, start_key = [], None
+        while True:
+            response = self.dynamodb.query(
+                table_name=self.table_name,
+                key_condition_expression='userId = :user_id AND seq > :head',
+                expression_attribute_values={':user_id': user_id, ':head': HEAD_SEQ},
+                exclusive_start_key=start_key
+            )
+            rows.extend(response.get('Items', []))
+            start_key = response.get('LastEvaluatedKey')
+            if start_key is None:
+                break
+
+        latest = {}
+        for row in rows:
+            latest[row['itemId']] = max(latest.get(row['itemId'], 0), int(row['seq']))
+        cutoff = datetime.fromtimestamp(time.time() - tombstone_ttl_seconds, UTC).isoformat()
+        expired = [
+            int(row['seq']) for row in rows
+            if row['op'] == DELETE and int(row['seq']) == latest[row['itemId']] and row['changedAt'] < cutoff
+        ]
+        superseded = [int(row['seq']) for row in rows if int(row['seq']) != latest[row['itemId']]]
+
+        if expired:
+            try:
+                self.dynamodb.update_item(
+                    table_name=self.table_name,
+                    key={'userId': user_id, 'seq': HEAD_SEQ},
+                    update_expression='SET #compactedThrough = :horizon',
+                    expression_attribute_names={'#compactedThrough': 'compactedThrough'},
+                    expression_attribute_values={':horizon': max(expired)},
+                    condition_expression='attribute_not_exists(#compactedThrough) OR #compactedThrough < :horizon'
+                )
+            except ConditionalCheckFailedError:
+                pass  # A concurrent compaction already raised it further
+
+        for seq in superseded + expired:
+            self.dynamodb.delete_item(
+                table_name=self.table_name,
+                key={'userId': user_id, 'seq': seq}
+            )
+        metrics.increment('wardrobe_changes_compacted_total', len(superseded) + len(expired))
+        return len(superseded) + len(expired)
@@ -0,0 +1,188 @@
+import math
+import time
+import bisect
+import threading
+from collections import OrderedDict
+from app.services.item_classifier import normalize_tokens
+from app.services.metrics import metrics
+
+# A query term that is only a prefix of an item's word counts for less than the whole word
+PREFIX_MATCH_WEIGHT = 0.6
+
+def index_tokens(item: dict) -> set:
+    """An item's searchable words: its normalized tokens plus each part of hyphenated ones."""
+    tokens = set(item.get('tokens') or normalize_tokens(item.get('description', '')))
+    for token in list(tokens):
+        if '-' in token:
+            tokens.update(part for part in token.split('-') if part)
+    return tokens
+
+def duplicate_key(item: dict) -> str:
+    """An item's normalized tokens joined, equal for descriptions that differ only in order, case or plurals."""
+    return item.get('normalizedKey') or ' '.join(normalize_tokens(item.get('description', '')))
+
+class WardrobeIndex:
+    """
+    Inverted index over one user's wardrobe: word -> item IDs, plus the sorted
+    vocabulary so a query term finds every word it prefixes with two bisections,
+    and duplicate key -> item IDs for duplicate detection on insert.
+    Not thread-safe on its own; WardrobeSearchIndexes serializes access.
+    """
+
+    def __init__(self, wardrobe_items: list):
+        self.items = {}
+        self.postings = {}
+        self.keys = {}
+        for item in wardrobe_items:
+            self._index(item)
+        self.vocabulary = sorted(self.postings)
+
+    def _index(self, item: dict) -> list:
+        item_id = item['itemId']
+        self.items[item_id] = item
+        self.keys.setdefault(duplicate_key(item), set()).add(item_id)
+        new_tokens = []
+        for token in index_tokens(item):
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = set()
+                new_tokens.append(token)
+            posting.add(item_id)
+        return new_tokens
+
+    def add(self, item: dict) -> None:
+        self.remove(item['itemId'])
+        for token in self._index(item):
+            bisect.insort(self.vocabulary, token)
+
+    def remove(self, item_id: str) -> None:
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return
+        key = duplicate_key(item)
+        self.keys[key].discard(item_id)
+        if not self.keys[key]:
+            del self.keys[key]
+        for token in index_tokens(item):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.discard(item_id)
+            if not posting:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def duplicates(self, key: str) -> list:
+        """The items whose duplicate key is key."""
+        return [self.items[item_id] for item_id in sorted(self.keys.get(key, ()))]
+
+    def _prefixed(self, term: str) -> list:
+        start = bisect.bisect_left(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + '\uffff')
+        return self.vocabulary[start:end]
+
+    def search(self, query: str, limit: int) -> list:
+        """
+        Items matching every query term, each term as a whole word or a word prefix,
+        best first. A match scores the word's IDF, less for prefix-only matches, so
+        rare and complete words rank higher.
+
+        Args:
+            query (str): The search text, e.g. "navy bla"
+            limit (int): Maximum number of items to return
+
+        Returns:
+            list: The matching wardrobe items
+        """
+        terms = normalize_tokens(query)
+        if not terms or not self.items:
+            return []
+
+        total = len(self.items)
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for token in self._prefixed(term):
+                posting = self.postings[token]
+                weight = math.log(1 + total / len(posting)) * (1.0 if token == term else PREFIX_MATCH_WEIGHT)
+                for item_id in posting:
+                    if weight > term_scores.get(item_id, 0.0):
+                        term_scores[item_id] = weight
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {item_id: score + term_scores[item_id] for item_id, score in scores.items() if item_id in term_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores, key=lambda item_id: (-scores[item_id], self.items[item_id].get('description', ''), item_id))
+        return [self.items[item_id] for item_id in ranked[:limit]]
+
+class WardrobeSearchIndexes:
+    """
+    Wardrobe indexes for the most recently searched users, kept up to date by
+    WardrobeService on every add and delete. Writes made by another process never
+    reach this one's indexes, so entries also expire after ttl_seconds.
+    """
+
+    def __init__(self, max_users: int, ttl_seconds: float):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, user_id: str) -> WardrobeIndex:
+        """The user's index if loaded and fresh, else None. Call with the lock held."""
+        entry = self._indexes.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            self._indexes.pop(user_id, None)
+            metrics.increment('wardrobe_search_index_total', labels={'result': 'miss'})
+            return None
+        self._indexes.move_to_end(user_id)
+        metrics.increment('wardrobe_search_index_total', labels={'result': 'hit'})
+        return entry[1]
+
+    def search(self, user_id: str, query: str, limit: int) -> list:
+        """
+        Search a user's cached index.
+
+        Returns:
+            list: The matching items, or None if the user's index isn't loaded
+        """
+        with self._lock:
+            index = self._get(user_id)
+            return None if index is None else index.search(query, limit)
+
+    def duplicates(self, user_id: str, key: str) -> list:
+        """
+        The items in a user's cached index with the given duplicate key.
+
+        Returns:
+            list: The matching items, or None if the user's index isn't loaded
+        """
+        with self._lock:
+            index = self._get(user_id)
+            return None if index is None else index.duplicates(key)
+
+    def put(self, user_id: str, index: WardrobeIndex) -> None:
+        with self._lock:
+            self._indexes[user_id] = (time.monotonic() + self.ttl_seconds, index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+
+    def add_item(self, user_id: str, item: dict) -> None:
+        with self._lock:
+            entry = self._indexes.get(user_id)
+            if entry is not None:
+                entry[1].add(item)
+
+    def remove_item(self, user_id: str, item_id: str) -> None:
+        with self._lock:
+            entry = self._indexes.get(user_id)
+            if entry is not None:
+                entry[1].remove(item_id)
+
+    def drop(self, user_id: str) -> None:
+        with self._lock:
+            self._indexes.pop(user_id, None)
@@ -0,0 +1,55 @@
+"""
+Micro-benchmark for the rule-based outfit engine used when the LLM is unavailable.
+
+Times recommend_outfit on a synthetic wardrobe, cold (item classification cache
+cleared before each run) and warm.
+
+Run from backend/:
+    python -m benchmarks.outfit_engine [--items 500] [--repeat 200]
+"""
+import argparse
+import random
+import timeit
+from app.services.outfit_engine import classify_item, recommend_outfit
+
+SITUATIONS = [
+    "Job interview at a bank",
+    "Hot day at the beach",
+    "Rainy winter commute to the office",
+    "Casual dinner with friends",
+]
+
+def make_wardrobe(size: int) -> list:
+    rng = random.Random(42)
+    colors = ["black", "navy", "white", "grey", "olive", "beige", "burgundy", "light blue"]
+    kinds = [
+        "t-shirt", "oxford shirt", "wool sweater", "linen shirt", "hoodie", "chinos", "jeans",
+        "tailored trousers", "linen shorts", "pencil skirt", "sneakers", "loafers", "ankle boots",
+        "sandals", "blazer", "wool overcoat", "rain jacket", "leather belt", "scarf", "silk dress",
+    ]
+    return [{"description": f"{rng.choice(colors)} {rng.choice(kinds)} #{index}"} for index in range(size)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    wardrobe_items = make_wardrobe(args.items)
+
+    def cold():
+        classify_item.cache_clear()
+        for situation in SITUATIONS:
+            recommend_outfit(wardrobe_items, situation)
+
+    def warm():
+        for situation in SITUATIONS:
+            recommend_outfit(wardrobe_items, situation)
+
+    print(f"Rule-based outfit engine, {args.items} wardrobe items, {args.repeat} runs each")
+    for name, case in (("cold classification", cold), ("warm classification", warm)):
+        seconds = min(timeit.repeat(case, number=args.repeat, repeat=3)) / (args.repeat * len(SITUATIONS))
+        print(f"  {name:<22} {seconds * 1e3:8.2f} ms/outfit")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for recommendation prompt assembly on large wardrobes.
+
+Compares the original inline join + f-string (unsorted, so not prefix-cache
+stable) against compiled templates with the memoized wardrobe fragment, both
+uncached (first call after a wardrobe write) and cached (fragment reused).
+
+Run from backend/:
+    python -m benchmarks.prompt_assembly [--items 1000] [--repeat 2000]
+"""
+import argparse
+import timeit
+from app.services.prompts import WardrobeFragmentCache, render_prompt
+
+SITUATION = "Client dinner at a rooftop restaurant, smart casual, might get chilly later"
+
+def make_wardrobe(size: int) -> list:
+    colors = ["black", "navy", "white", "grey", "olive", "beige", "burgundy", "light blue"]
+    kinds = ["t-shirt", "oxford shirt", "chinos", "jeans", "wool sweater", "blazer", "sneakers", "loafers"]
+    return [
+        {"itemId": f"item-{index}", "description": f"{colors[index % 8]} {kinds[index // 8 % 8]} #{index}"}
+        for index in range(size)
+    ]
+
+def inline_prompt(wardrobe_items: list) -> str:
+    wardrobe_description = "\n".join([item["description"] for item in wardrobe_items])
+    return f"""Given the following wardrobe items:
+{wardrobe_description}
+
+The user is in this situation: {SITUATION}
+
+Recommend an outfit using only items from their wardrobe. Format the response as a JSON object with the following structure:
+{{
+    "top": "description of top",
+    "bottom": "description of bottom",
+    "shoes": "description of shoes",
+    "outerwear": "description of outerwear (optional)",
+    "accessories": "description of accessories (optional)"
+}}"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    wardrobe_items = make_wardrobe(args.items)
+    warm_cache = WardrobeFragmentCache(max_users=1)
+    warm_cache.get("user", 1, wardrobe_items)
+    versions = iter(range(2, args.repeat * 10))
+    cold_cache = WardrobeFragmentCache(max_users=1)
+
+    cases = {
+        "inline join + f-string": lambda: inline_prompt(wardrobe_items),
+        "template, uncached block": lambda: render_prompt(
+            "outfit", cold_cache.get("user", next(versions), wardrobe_items), situation=SITUATION),
+        "template, cached block": lambda: render_prompt(
+            "outfit", warm_cache.get("user", 1, wardrobe_items), situation=SITUATION),
+    }
+
+    print(f"Prompt assembly, {args.items} wardrobe items, {args.repeat} runs each")
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=args.repeat, repeat=3)) / args.repeat
+        print(f"  {name:<26} {seconds * 1e6:10.1f} us/prompt")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Storage size and capacity-unit benchmark for compressed recommendation payloads.
+
+Builds realistic trip and interaction rows (a packing list stored on the trip and
+again on its interaction, outfit and buy recommendations), then reports each
+row's DynamoDB item size with and without the attribute codec, the write units
+per put (1 KB each) and the read units for a 50-row history query (4 KB each,
+strongly consistent), plus the time to encode and decode.
+
+Run from backend/:
+    python -m benchmarks.storage_codec [--min-bytes 512] [--repeat 2000]
+"""
+import argparse
+import math
+import timeit
+from decimal import Decimal
+from boto3.dynamodb.types import Binary
+from app.clients.codec import AttributeCodec
+
+HISTORY_PAGE = 50
+
+PACKING_LIST = {
+    "tops": [
+        "White linen button-down shirt with a relaxed fit, breathable for warm afternoons",
+        "Navy merino wool crew neck sweater for cooler evenings by the water",
+        "Light grey organic cotton t-shirt that layers under the blazer",
+    ],
+    "bottoms": [
+        "Beige slim-fit chinos that work for both sightseeing and dinners out",
+        "Dark wash straight-leg jeans for casual days and the flight",
+    ],
+    "shoes": [
+        "White leather minimalist sneakers, comfortable on cobblestones",
+        "Brown suede loafers for restaurants and evening plans",
+    ],
+    "outerwear": [
+        "Navy unstructured cotton blazer to dress up any of the outfits",
+        "Olive lightweight waterproof field jacket in case of rain",
+    ],
+    "accessories": [
+        "Brown leather belt that matches the loafers",
+        "Silver watch with a mesh strap",
+        "Tortoiseshell sunglasses",
+    ],
+}
+
+OUTFIT = {
+    "top": "White linen button-down shirt, sleeves rolled to the elbow",
+    "bottom": "Beige slim-fit chinos",
+    "shoes": "Brown suede loafers without socks",
+    "outerwear": "Navy unstructured cotton blazer in case it gets chilly after sunset",
+    "accessories": "Silver watch and tortoiseshell sunglasses",
+}
+
+BUY = {
+    "item": "A pair of lightweight charcoal wool trousers with a tapered leg and a flat front",
+    "explanation": (
+        "Your wardrobe leans heavily on casual chinos and jeans, so for client dinners and "
+        "smart occasions you end up reaching for the same beige chinos. Charcoal wool trousers "
+        "pair with the navy blazer, the white linen shirt and the merino sweater you already "
+        "own, work with both the suede loafers and the white sneakers, and handle warm "
+        "restaurants and cooler evenings alike. They would roughly double the number of "
+        "smart-casual outfits you can put together without buying anything else."
+    ),
+}
+
+def rows() -> dict:
+    base = {"userId": "google-oauth2|109876543210987654321", "timestamp": "2026-10-19T18:42:07.123456+00:00",
+            "feedback": None}
+    situation = "A week in Lisbon in early October: walking tours during the day, a couple of nice dinners, maybe one rainy day"
+    return {
+        "trip": {"userId": base["userId"], "tripId": "trip_3f9c2a7e-5d1b-4c8e-9a6f-2b7d1e0c4a58",
+                 "situation": situation, "title": "Lisbon Week in October", "packingList": PACKING_LIST,
+                 "createdAt": base["timestamp"], "days": Decimal(7)},
+        "trip interaction": {**base, "interactionId": "trip_3f9c2a7e-5d1b-4c8e-9a6f-2b7d1e0c4a58",
+                             "type": "trip", "situation": situation,
+                             "recommendation": PACKING_LIST},
+        "outfit interaction": {**base, "interactionId": "rec_8a1d4e6b-2c3f-4a5b-9e8d-7c6b5a4f3e2d",
+                               "type": "outfit_recommendation",
+                               "situation": "Client dinner at a rooftop restaurant, smart casual",
+                               "recommendation": OUTFIT},
+        "buy interaction": {**base, "interactionId": "buy_1b2c3d4e-5f6a-4b7c-8d9e-0f1a2b3c4d5e",
+                            "type": "purchase_recommendation",
+                            "situation": "Client dinner at a rooftop restaurant, smart casual",
+                            "recommendation": BUY},
+    }
+
+def attribute_size(value) -> int:
+    """Approximate DynamoDB size of a value, per the documented item size rules."""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, (bytes, Binary)):
+        return len(bytes(value))
+    if isinstance(value, (int, float, Decimal)):
+        return math.ceil(len(str(value).lstrip('-').replace('.', '')) / 2) + 1
+    if isinstance(value, dict):
+        return 3 + sum(len(name.encode()) + attribute_size(item) + 1 for name, item in value.items())
+    if isinstance(value, list):
+        return 3 + sum(attribute_size(item) + 1 for item in value)
+    raise TypeError(type(value).__name__)
+
+def item_size(item: dict) -> int:
+    return sum(len(name.encode()) + attribute_size(value) for name, value in item.items())
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--min-bytes", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    codec = AttributeCodec(attributes=["recommendation", "packingList"], min_bytes=args.min_bytes, enabled=True)
+    print(f"{'row':<20} {'bytes':>7} {'->':>3} {'bytes':>7} {'WCU':>4} {'->':>3} {'WCU':>4} "
+          f"{'encode us':>10} {'decode us':>10}")
+    history_plain = history_encoded = 0
+    for name, row in rows().items():
+        encoded = codec.encode(row)
+        plain_size, encoded_size = item_size(row), item_size(encoded)
+        stored = {key: Binary(value) if isinstance(value, bytes) else value for key, value in encoded.items()}
+        encode_us = timeit.timeit(lambda: codec.encode(row), number=args.repeat) / args.repeat * 1e6
+        decode_us = timeit.timeit(lambda: codec.decode(stored).items(), number=args.repeat) / args.repeat * 1e6
+        print(f"{name:<20} {plain_size:>7} {'->':>3} {encoded_size:>7} {math.ceil(plain_size / 1024):>4} "
+              f"{'->':>3} {math.ceil(encoded_size / 1024):>4} {encode_us:>10.1f} {decode_us:>10.1f}")
+        if name != "trip":
+            history_plain += plain_size
+            history_encoded += encoded_size
+
+    # A history page mixes the three interaction types evenly
+    history_plain = history_plain * HISTORY_PAGE / 3
+    history_encoded = history_encoded * HISTORY_PAGE / 3
+    print(f"\n{HISTORY_PAGE}-row history query: {history_plain / 1024:.1f} KB -> {history_encoded / 1024:.1f} KB, "
+          f"{math.ceil(history_plain / 4096)} -> {math.ceil(history_encoded / 4096)} RCU")
+
+if __name__ == "__main__":
+    main()
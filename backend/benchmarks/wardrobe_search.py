@@ -0,0 +1,69 @@
+"""
+Latency benchmark for wardrobe search on the in-memory inverted index.
+
+For each wardrobe size, times building the index (the first search after a cold
+start or eviction), queries of one whole word, a prefix, and several terms, and
+an incremental add + delete. Linear filtering over the descriptions, which is
+what a client does with the full GET /wardrobe list, is shown for comparison.
+
+Run from backend/:
+    python -m benchmarks.wardrobe_search [--sizes 100 1000 10000] [--repeat 200]
+"""
+import argparse
+import random
+import timeit
+from app.services.item_classifier import normalize_tokens
+from app.services.wardrobe_search import WardrobeIndex
+
+QUERIES = {
+    "one word": "blazer",
+    "prefix": "bla",
+    "three terms": "navy wool bla",
+}
+
+def make_wardrobe(size: int) -> list:
+    rng = random.Random(42)
+    colors = ["black", "navy", "white", "grey", "olive", "beige", "burgundy", "light blue", "camel", "cream"]
+    materials = ["wool", "cotton", "linen", "leather", "denim", "silk", "cashmere", "corduroy", "suede", "fleece"]
+    kinds = [
+        "t-shirt", "oxford shirt", "sweater", "hoodie", "chinos", "jeans", "trousers", "shorts", "skirt", "dress",
+        "sneakers", "loafers", "boots", "sandals", "blazer", "overcoat", "raincoat", "belt", "scarf", "cap",
+    ]
+    wardrobe_items = []
+    for index in range(size):
+        description = f"{rng.choice(colors)} {rng.choice(materials)} {rng.choice(kinds)}"
+        # Stored items carry their tokens since write-time categorization
+        wardrobe_items.append({"itemId": f"item-{index}", "description": description, "tokens": normalize_tokens(description)})
+    return wardrobe_items
+
+def linear_filter(wardrobe_items: list, query: str) -> list:
+    terms = query.lower().split()
+    return [item for item in wardrobe_items if all(term in item["description"].lower() for term in terms)]
+
+def per_call_us(case, repeat: int) -> float:
+    return min(timeit.repeat(case, number=repeat, repeat=3)) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        wardrobe_items = make_wardrobe(size)
+        index = WardrobeIndex(wardrobe_items)
+        extra = {"itemId": "extra", "description": "navy wool blazer"}
+
+        def add_and_delete():
+            index.add(extra)
+            index.remove("extra")
+
+        print(f"Wardrobe search, {size} items, {args.repeat} runs each")
+        print(f"  {'build index':<28} {per_call_us(lambda: WardrobeIndex(wardrobe_items), max(args.repeat // 20, 1)):10.1f} us")
+        for name, query in QUERIES.items():
+            print(f"  {'search, ' + name:<28} {per_call_us(lambda: index.search(query, 50), args.repeat):10.1f} us")
+            print(f"  {'linear filter, ' + name:<28} {per_call_us(lambda: linear_filter(wardrobe_items, query), args.repeat):10.1f} us")
+        print(f"  {'add + delete item':<28} {per_call_us(add_and_delete, args.repeat):10.1f} us")
+
+if __name__ == "__main__":
+    main()
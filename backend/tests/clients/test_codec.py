@@ -0,0 +1,119 @@
+import json
+import pytest
+from decimal import Decimal
+from unittest.mock import Mock, patch
+from boto3.dynamodb.types import Binary
+from app.clients import codec
+from app.clients.codec import AttributeCodec, LazyItem, is_encoded
+from app.clients.dynamodb import DynamoDBClient
+
+PACKING_LIST = {
+    'tops': ['white linen shirt with a relaxed fit', 'navy merino crew neck sweater', 'grey cotton t-shirt'],
+    'bottoms': ['beige chinos in a slim cut', 'dark wash straight leg jeans'],
+    'shoes': ['white leather sneakers', 'brown suede loafers'],
+    'outerwear': ['navy unstructured blazer', 'olive waterproof field jacket'],
+    'accessories': ['brown leather belt', 'silver watch with a mesh strap', 'grey wool scarf'],
+    'days': Decimal('4'),
+    'score': Decimal('0.75'),
+}
+
+@pytest.fixture
+def enabled_codec():
+    return AttributeCodec(attributes=['packingList', 'recommendation'], min_bytes=128, enabled=True)
+
+def stored(item: dict) -> dict:
+    """The item as boto3 reads it back: binary attributes come back as Binary."""
+    return {name: Binary(value) if isinstance(value, bytes) else value for name, value in item.items()}
+
+def test_encode_compresses_large_configured_attributes(enabled_codec):
+    item = {'userId': 'u', 'packingList': PACKING_LIST, 'situation': 'a week in Lisbon'}
+
+    encoded = enabled_codec.encode(item)
+
+    assert is_encoded(encoded['packingList'])
+    assert len(encoded['packingList']) < len(json.dumps(PACKING_LIST, default=str))
+    assert encoded['situation'] == 'a week in Lisbon'
+    assert item['packingList'] is PACKING_LIST  # The caller's item is left alone
+
+def test_encode_leaves_small_unlisted_and_disabled_attributes(enabled_codec):
+    small = {'userId': 'u', 'recommendation': {'top': 'white shirt'}}
+    unlisted = {'userId': 'u', 'wardrobe': PACKING_LIST}
+
+    assert enabled_codec.encode(small) is small
+    assert enabled_codec.encode(unlisted) is unlisted
+    disabled = AttributeCodec(attributes=['packingList'], min_bytes=0, enabled=False)
+    item = {'packingList': PACKING_LIST}
+    assert disabled.encode(item) is item
+
+def test_decode_round_trips_with_decimal_numbers(enabled_codec):
+    item = stored(enabled_codec.encode({'userId': 'u', 'packingList': PACKING_LIST}))
+
+    decoded = enabled_codec.decode(item)
+
+    assert decoded['packingList'] == PACKING_LIST
+    assert isinstance(decoded['packingList']['days'], Decimal)
+    assert decoded == {'userId': 'u', 'packingList': PACKING_LIST}
+
+def test_decode_is_lazy_and_once(enabled_codec):
+    item = stored(enabled_codec.encode({'userId': 'u', 'packingList': PACKING_LIST}))
+
+    with patch('app.clients.codec.decode_value', wraps=codec.decode_value) as decode_value:
+        decoded = enabled_codec.decode(item)
+        assert decoded['userId'] == 'u'
+        assert 'packingList' in decoded
+        decode_value.assert_not_called()
+
+        assert decoded.get('packingList') == PACKING_LIST
+        assert decoded['packingList'] == PACKING_LIST
+        assert decode_value.call_count == 1
+
+def test_lazy_item_copies_and_serializes_decoded(enabled_codec):
+    item = stored(enabled_codec.encode({'userId': 'u', 'packingList': PACKING_LIST}))
+
+    for copy in (dict(enabled_codec.decode(item)), {**enabled_codec.decode(item)}, enabled_codec.decode(item).copy()):
+        assert copy['packingList'] == PACKING_LIST
+    serialized = json.loads(json.dumps(enabled_codec.decode(item), default=float))
+    assert serialized['packingList']['tops'] == PACKING_LIST['tops']
+
+def test_decode_passes_plain_items_through(enabled_codec):
+    item = {'userId': 'u', 'recommendation': {'top': 'white shirt'}, 'photo': Binary(b'\x89PNG')}
+
+    assert enabled_codec.decode(item) is item
+    assert not isinstance(enabled_codec.decode(item), LazyItem)
+
+def test_decode_rejects_unknown_format(enabled_codec):
+    item = enabled_codec.decode({'packingList': Binary(codec.MAGIC + bytes((9, 1)) + b'payload')})
+
+    with pytest.raises(ValueError):
+        item['packingList']
+
+def test_client_encodes_writes_and_decodes_reads(enabled_codec):
+    with patch('app.clients.dynamodb.boto3') as mock_boto3:
+        client = DynamoDBClient(codec=enabled_codec)
+        table = Mock()
+        mock_boto3.resource.return_value.Table.return_value = table
+
+        client.put_item('trips', {'userId': 'u', 'packingList': PACKING_LIST})
+        written = table.put_item.call_args.kwargs['Item']
+        assert is_encoded(written['packingList'])
+
+        table.query.return_value = {'Items': [stored(written)]}
+        assert client.query('trips', 'userId = :u', {':u': 'u'})['Items'][0]['packingList'] == PACKING_LIST
+        table.get_item.return_value = {'Item': stored(written)}
+        assert client.get_item('trips', {'userId': 'u'})['Item']['packingList'] == PACKING_LIST
+
+def test_round_trip_through_dynamodb(enabled_codec):
+    moto = pytest.importorskip('moto')
+    with moto.mock_aws():
+        client = DynamoDBClient(codec=enabled_codec)
+        client.client.create_table(
+            TableName='trips',
+            KeySchema=[{'AttributeName': 'userId', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'userId', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        client.put_item('trips', {'userId': 'u', 'packingList': PACKING_LIST})
+
+        raw = client.get_table('trips').get_item(Key={'userId': 'u'})['Item']
+        assert isinstance(raw['packingList'], Binary)
+        assert client.get_item('trips', {'userId': 'u'})['Item']['packingList'] == PACKING_LIST
@@ -100,4 +100,133 @@ def test_query_success(dynamodb_client, mock_boto3):
         KeyConditionExpression='userId = :uid',
         ExpressionAttributeValues={':uid': 'user1'},
         ScanIndexForward=True
-    ) 
\ No newline at end of file
+    ) 
+def test_put_item_conditional_check_failed(dynamodb_client, mock_boto3):
+    # Mock a rejected conditional write
+    from botocore.exceptions import ClientError
+    from app.clients.dynamodb import ConditionalCheckFailedError
+    mock_table = Mock()
+    mock_table.put_item.side_effect = ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'failed'}}, 'PutItem'
+    )
+    mock_boto3.resource.return_value.Table.return_value = mock_table
+
+    # Test the condition is passed through and the failure is distinguishable
+    with pytest.raises(ConditionalCheckFailedError):
+        dynamodb_client.put_item(
+            'test-table', {'id': '1'},
+            condition_expression='attribute_not_exists(id)'
+        )
+    mock_table.put_item.assert_called_once_with(
+        Item={'id': '1'}, ConditionExpression='attribute_not_exists(id)'
+    )
+
+def test_update_item_returns_attributes(dynamodb_client, mock_boto3):
+    mock_table = Mock()
+    mock_table.update_item.return_value = {'Attributes': {'id': '1', 'count': 1}}
+    mock_boto3.resource.return_value.Table.return_value = mock_table
+
+    result = dynamodb_client.update_item(
+        'test-table',
+        {'id': '1'},
+        'SET #count = :count',
+        {'#count': 'count'},
+        {':count': 2},
+        return_values='ALL_OLD'
+    )
+
+    assert result == {'id': '1', 'count': 1}
+    assert mock_table.update_item.call_args.kwargs['ReturnValues'] == 'ALL_OLD'
+
+def test_transact_write_passes_plain_values(dynamodb_client, mock_boto3):
+    low_level = mock_boto3.resource.return_value.meta.client
+
+    dynamodb_client.transact_write([
+        {'Put': {'TableName': 'items', 'Item': {'id': '1', 'n': 2}}},
+        {'Update': {
+            'TableName': 'heads',
+            'Key': {'id': 'h'},
+            'UpdateExpression': 'SET #n = :n',
+            'ExpressionAttributeNames': {'#n': 'n'},
+            'ExpressionAttributeValues': {':n': 3}
+        }}
+    ])
+
+    # The resource's client types them; typing them here too would send maps
+    put, update = low_level.transact_write_items.call_args.kwargs['TransactItems']
+    assert put['Put']['Item'] == {'id': '1', 'n': 2}
+    assert update['Update']['Key'] == {'id': 'h'}
+    assert update['Update']['ExpressionAttributeNames'] == {'#n': 'n'}
+    assert update['Update']['ExpressionAttributeValues'] == {':n': 3}
+
+def test_transact_write_in_dynamodb():
+    moto = pytest.importorskip('moto')
+    with moto.mock_aws():
+        dynamodb = DynamoDBClient()
+        dynamodb.client.create_table(
+            TableName='items',
+            KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'},
+                       {'AttributeName': 'sort', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'},
+                                  {'AttributeName': 'sort', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+
+        dynamodb.transact_write([
+            {'Put': {'TableName': 'items', 'Item': {'id': '1', 'sort': 'a', 'n': 2}}},
+            {'Update': {
+                'TableName': 'items',
+                'Key': {'id': '1', 'sort': 'b'},
+                'UpdateExpression': 'SET #n = :n',
+                'ExpressionAttributeNames': {'#n': 'n'},
+                'ExpressionAttributeValues': {':n': 3}
+            }}
+        ])
+
+        items = dynamodb.query('items', 'id = :id', {':id': '1'})['Items']
+        assert [(item['sort'], item['n']) for item in items] == [('a', 2), ('b', 3)]
+
+def test_transact_write_condition_failed(dynamodb_client, mock_boto3):
+    from botocore.exceptions import ClientError
+    from app.clients.dynamodb import ConditionalCheckFailedError
+    low_level = mock_boto3.resource.return_value.meta.client
+    low_level.transact_write_items.side_effect = ClientError({
+        'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+        'CancellationReasons': [{'Code': 'None'}, {'Code': 'ConditionalCheckFailed'}]
+    }, 'TransactWriteItems')
+
+    with pytest.raises(ConditionalCheckFailedError):
+        dynamodb_client.transact_write([{'Delete': {'TableName': 'items', 'Key': {'id': '1'}}}])
+
+    low_level.transact_write_items.side_effect = ClientError(
+        {'Error': {'Code': 'TransactionConflictException', 'Message': 'conflict'}}, 'TransactWriteItems'
+    )
+    with pytest.raises(DynamoDBError) as error:
+        dynamodb_client.transact_write([{'Delete': {'TableName': 'items', 'Key': {'id': '1'}}}])
+    assert not isinstance(error.value, ConditionalCheckFailedError)
+
+def test_batch_delete_chunks_and_retries_unprocessed(dynamodb_client, mock_boto3):
+    resource = mock_boto3.resource.return_value
+    keys = [{'id': str(index)} for index in range(30)]
+    leftover = [{'DeleteRequest': {'Key': {'id': '29'}}}]
+    resource.batch_write_item.side_effect = [
+        {'UnprocessedItems': {}},
+        {'UnprocessedItems': {'test-table': leftover}},
+        {'UnprocessedItems': {}},
+    ]
+    chunks = []
+
+    with patch('app.clients.dynamodb.time.sleep'):
+        assert dynamodb_client.batch_delete('test-table', keys, on_chunk=chunks.append) == 30
+
+    requests = [call.kwargs['RequestItems']['test-table'] for call in resource.batch_write_item.call_args_list]
+    assert [len(request) for request in requests] == [25, 5, 1]
+    assert requests[2] == leftover
+    assert chunks == [25, 5]
+
+def test_batch_delete_gives_up_on_unprocessed(dynamodb_client, mock_boto3):
+    resource = mock_boto3.resource.return_value
+    resource.batch_write_item.side_effect = lambda RequestItems: {'UnprocessedItems': RequestItems}
+
+    with patch('app.clients.dynamodb.time.sleep'), pytest.raises(DynamoDBError):
+        dynamodb_client.batch_delete('test-table', [{'id': '1'}], max_parallel=4)
@@ -0,0 +1,71 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeOpenAIServer:
+    """
+    Local OpenAI-compatible HTTP server for exercising real client timeouts and retries.
+    Queue responses with respond(); each request consumes one, and the last one repeats.
+    """
+
+    def __init__(self):
+        self.responses = [{"status": 200, "content": {"ok": True}, "delay": 0}]
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                with server._lock:
+                    server.requests.append(body)
+                    spec = server.responses.pop(0) if len(server.responses) > 1 else server.responses[0]
+                time.sleep(spec.get("delay", 0))
+                if spec["status"] == 200:
+                    payload = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": body.get("model", "fake"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": json.dumps(spec["content"])},
+                            "finish_reason": "stop"
+                        }],
+                        "usage": spec.get("usage", {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15})
+                    }
+                else:
+                    payload = {"error": {"message": "fake error", "type": "server_error"}}
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(spec["status"])
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (timeout or losing hedge)
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    def respond(self, *responses):
+        """Queue responses, e.g. {"status": 500}, {"status": 200, "content": {...}, "delay": 0.5}."""
+        with self._lock:
+            self.responses = [dict({"content": {"ok": True}, "delay": 0}, **r) for r in responses]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,111 @@
+import gzip
+import json
+import pytest
+from datetime import datetime, timedelta, UTC
+from unittest.mock import Mock
+from app.clients.codec import AttributeCodec
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError
+from app.maintenance.archive_interactions import archive, feedback_aggregates
+from app.services.interaction_archive import InteractionArchive
+from app.services.interactions import INTERACTIONS_TABLE
+
+def days_ago(days: int) -> str:
+    return (datetime.now(UTC) - timedelta(days=days)).isoformat()
+
+@pytest.fixture
+def dynamodb():
+    moto = pytest.importorskip('moto')
+    with moto.mock_aws():
+        client = DynamoDBClient(codec=AttributeCodec(enabled=False))
+        client.client.create_table(
+            TableName=INTERACTIONS_TABLE,
+            KeySchema=[{'AttributeName': 'userId', 'KeyType': 'HASH'},
+                       {'AttributeName': 'interactionId', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'userId', 'AttributeType': 'S'},
+                                  {'AttributeName': 'interactionId', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield client
+
+def put(dynamodb, user_id, interaction_id, interaction_type, created_at, feedback=None):
+    item = {'userId': user_id, 'interactionId': interaction_id, 'type': interaction_type,
+            'createdAt': created_at, 'recommendation': {'top': 'white shirt'}}
+    if feedback is not None:
+        item['feedback'] = feedback
+    dynamodb.put_item(INTERACTIONS_TABLE, item)
+
+def test_archive_moves_old_rows_into_partitions(dynamodb, tmp_path):
+    old = days_ago(200)
+    put(dynamodb, 'a', 'rec_1', 'outfit_recommendation', old, feedback=1)
+    put(dynamodb, 'a', 'rec_2', 'outfit_recommendation', old, feedback=0)
+    put(dynamodb, 'b', 'trip_1', 'trip', old)
+    put(dynamodb, 'b', 'rec_3', 'outfit_recommendation', days_ago(5), feedback=1)
+
+    # moto ignores scan segments, so a single one is the whole table
+    summary = archive(dynamodb, str(tmp_path), older_than_days=180, segments=1)
+
+    assert summary == {'archived': 3, 'deleted': 3, 'failed_segments': []}
+    remaining = dynamodb.scan(INTERACTIONS_TABLE)['Items']
+    assert [row['interactionId'] for row in remaining] == ['rec_3']
+    parts = InteractionArchive(str(tmp_path)).parts()
+    assert {part.split('/')[-2] for part in parts} == {'type=outfit_recommendation', 'type=trip'}
+    assert all(f'date={old[:10]}' in part for part in parts)
+    rows = [json.loads(line) for part in parts for line in gzip.open(part, 'rt')]
+    assert sorted(row['interactionId'] for row in rows) == ['rec_1', 'rec_2', 'trip_1']
+    assert all(row['recommendation'] == {'top': 'white shirt'} for row in rows)
+
+def test_archive_keep_leaves_rows(dynamodb, tmp_path):
+    put(dynamodb, 'a', 'rec_1', 'outfit_recommendation', days_ago(200))
+
+    summary = archive(dynamodb, str(tmp_path), older_than_days=180, segments=1, delete=False)
+
+    assert summary == {'archived': 1, 'deleted': 0, 'failed_segments': []}
+    assert len(dynamodb.scan(INTERACTIONS_TABLE)['Items']) == 1
+
+def test_archive_reports_failed_segments(tmp_path):
+    dynamodb = Mock()
+    dynamodb.scan.side_effect = DynamoDBError('boom')
+
+    summary = archive(dynamodb, str(tmp_path), older_than_days=1, segments=2)
+
+    assert summary == {'archived': 0, 'deleted': 0, 'failed_segments': [0, 1]}
+    assert {call.kwargs['segment'] for call in dynamodb.scan.call_args_list} == {0, 1}
+    assert all(call.kwargs['total_segments'] == 2 for call in dynamodb.scan.call_args_list)
+
+def write_part(root, date, interaction_type, name, rows):
+    directory = root / f'date={date}' / f'type={interaction_type}'
+    directory.mkdir(parents=True, exist_ok=True)
+    with gzip.open(directory / name, 'wt') as part:
+        for row in rows:
+            part.write(json.dumps(row) + '\n')
+
+def row(interaction_id, interaction_type, feedback=None):
+    return {'userId': 'u', 'interactionId': interaction_id, 'type': interaction_type, 'feedback': feedback}
+
+def test_feedback_aggregates_counts_per_type_once(tmp_path):
+    write_part(tmp_path, '2026-01-05', 'outfit_recommendation', 'part-1-000.jsonl.gz',
+               [row('rec_1', 'outfit_recommendation', 1), row('rec_2', 'outfit_recommendation', 0),
+                row('rec_3', 'outfit_recommendation', 1)])
+    # The same row archived again by a later run
+    write_part(tmp_path, '2026-01-05', 'outfit_recommendation', 'part-2-000.jsonl.gz',
+               [row('rec_1', 'outfit_recommendation', 1)])
+    write_part(tmp_path, '2026-02-01', 'trip', 'part-1-001.jsonl.gz', [row('trip_1', 'trip')])
+
+    aggregates = feedback_aggregates(str(tmp_path))
+
+    assert aggregates['outfit_recommendation'] == {
+        'total': 3, 'likes': 2, 'dislikes': 1, 'noFeedback': 0, 'likeRate': 2 / 3
+    }
+    assert aggregates['trip'] == {'total': 1, 'likes': 0, 'dislikes': 0, 'noFeedback': 1, 'likeRate': None}
+
+def test_feedback_aggregates_prunes_partitions(tmp_path):
+    write_part(tmp_path, '2026-01-05', 'outfit_recommendation', 'part-1-000.jsonl.gz',
+               [row('rec_1', 'outfit_recommendation', 1)])
+    write_part(tmp_path, '2026-02-01', 'outfit_recommendation', 'part-1-000.jsonl.gz',
+               [row('rec_2', 'outfit_recommendation', 0)])
+    write_part(tmp_path, '2026-02-01', 'trip', 'part-1-000.jsonl.gz', [row('trip_1', 'trip', 1)])
+
+    assert feedback_aggregates(str(tmp_path), since='2026-02-01', types=['outfit_recommendation']) == {
+        'outfit_recommendation': {'total': 1, 'likes': 0, 'dislikes': 1, 'noFeedback': 0, 'likeRate': 0.0}
+    }
+    assert feedback_aggregates(str(tmp_path / 'missing')) == {}
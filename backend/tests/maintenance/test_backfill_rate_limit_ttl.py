@@ -0,0 +1,38 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+from app.clients.dynamodb import DynamoDBClient, DynamoDBError
+from app.config import Config
+from app.maintenance.backfill_rate_limit_ttl import backfill
+from app.services.rate_limit import RATE_LIMIT_TABLE
+
+def test_backfill_sets_missing_ttls():
+    moto = pytest.importorskip('moto')
+    with moto.mock_aws():
+        dynamodb = DynamoDBClient()
+        dynamodb.client.create_table(
+            TableName=RATE_LIMIT_TABLE,
+            KeySchema=[{'AttributeName': 'userId', 'KeyType': 'HASH'},
+                       {'AttributeName': 'date', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'userId', 'AttributeType': 'S'},
+                                  {'AttributeName': 'date', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        dynamodb.put_item(RATE_LIMIT_TABLE, {'userId': 'a', 'date': '2024-03-20', 'count': 3})
+        dynamodb.put_item(RATE_LIMIT_TABLE, {'userId': 'b', 'date': '2024-03-21', 'count': 1, 'expiresAt': 42})
+
+        # moto ignores scan segments, so a single one is the whole table
+        assert backfill(dynamodb, segments=1) == {'rows_updated': 1, 'failed_segments': []}
+        assert backfill(dynamodb, segments=1) == {'rows_updated': 0, 'failed_segments': []}
+
+        expected = datetime(2024, 3, 21, tzinfo=timezone.utc) + timedelta(days=Config.RATE_LIMIT_RETENTION_DAYS)
+        rows = {row['userId']: row for row in dynamodb.scan(RATE_LIMIT_TABLE)['Items']}
+        assert rows['a']['expiresAt'] == int(expected.timestamp())
+        assert rows['b']['expiresAt'] == 42
+
+def test_backfill_reports_failed_segments():
+    dynamodb = Mock()
+    dynamodb.scan.side_effect = DynamoDBError('boom')
+
+    assert backfill(dynamodb, segments=3) == {'rows_updated': 0, 'failed_segments': [0, 1, 2]}
+    assert {call.kwargs['segment'] for call in dynamodb.scan.call_args_list} == {0, 1, 2}
@@ -0,0 +1,25 @@
+from unittest.mock import Mock
+from app.clients.dynamodb import DynamoDBError
+from app.maintenance.backfill_wardrobe_categories import backfill
+
+def test_backfill_categorizes_every_user_and_reports_failures():
+    dynamodb = Mock()
+    dynamodb.scan.return_value = {"Items": [{"userId": "a"}, {"userId": "b"}, {"userId": "c"}]}
+    wardrobe_service = Mock()
+    wardrobe_service.table_name = "dev-wardrobe-items"
+    items = {
+        "a": [{"itemId": "1", "description": "Blue jeans"}, {"itemId": "2", "description": "Red scarf"}],
+        "b": [{"itemId": "3", "description": "White sneakers"}],
+    }
+
+    def get_wardrobe_items(user_id):
+        if user_id == "c":
+            raise DynamoDBError("throttled")
+        return items[user_id]
+
+    wardrobe_service.get_wardrobe_items.side_effect = get_wardrobe_items
+    wardrobe_service.categorize_item.side_effect = lambda user_id, item: item["itemId"] != "2"
+
+    summary = backfill(wardrobe_service, dynamodb, workers=2)
+
+    assert summary == {"users": 3, "items_updated": 2, "failed_users": ["c"]}
@@ -0,0 +1,19 @@
+from unittest.mock import Mock
+from app.clients.dynamodb import DynamoDBError
+from app.maintenance.compact_wardrobe_changes import compact
+
+def test_compact_continues_past_failed_users():
+    dynamodb = Mock()
+    dynamodb.scan.return_value = {"Items": [{"userId": "a"}, {"userId": "b"}]}
+    change_log = Mock(table_name="dev-wardrobe-changes")
+
+    def compact_user(user_id, tombstone_ttl_seconds):
+        if user_id == "b":
+            raise DynamoDBError("boom")
+        return 2
+    change_log.compact.side_effect = compact_user
+
+    summary = compact(change_log, dynamodb, workers=2, tombstone_ttl_seconds=60)
+
+    assert summary == {"users": 2, "rows_removed": 2, "failed_users": ["b"]}
+    assert dynamodb.scan.call_args.kwargs["table_name"] == "dev-wardrobe-changes"
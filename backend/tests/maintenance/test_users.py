@@ -0,0 +1,12 @@
+from unittest.mock import Mock
+from app.maintenance.users import user_ids
+
+def test_user_ids_pages_through_scan():
+    dynamodb = Mock()
+    dynamodb.scan.side_effect = [
+        {"Items": [{"userId": "a"}, {"userId": "a"}, {"userId": "b"}], "LastEvaluatedKey": {"userId": "b", "itemId": "2"}},
+        {"Items": [{"userId": "b"}, {"userId": "c"}]},
+    ]
+
+    assert list(user_ids(dynamodb, "dev-wardrobe-items")) == ["a", "b", "c"]
+    assert dynamodb.scan.call_args.kwargs["exclusive_start_key"] == {"userId": "b", "itemId": "2"}
@@ -0,0 +1,165 @@
+import json
+import pytest
+from decimal import Decimal
+from unittest.mock import Mock
+from app.clients.dynamodb import DynamoDBError
+from app.services.account import AccountService
+from app.services.feedback_ranker import FeedbackRanker, InMemoryAffinityStore
+from app.services.idempotency import IdempotencyService, InMemoryIdempotencyStore, scoped_key
+from app.services.jobs import JobsService, InMemoryJobStore
+from app.services.interaction_archive import InteractionArchive
+from app.services.interactions import InteractionsService
+from app.services.rate_limit import RateLimitService
+from app.services.trips import TripsService
+from app.services.wardrobe import WardrobeService
+
+ROWS = {
+    "wardrobe-items": [[{"userId": "u", "itemId": "1", "description": "Blue jeans", "classifierVersion": Decimal(1)}],
+                       [{"userId": "u", "itemId": "2", "description": "Red scarf"}]],
+    "interactions": [[{"userId": "u", "interactionId": "rec_1", "feedback": Decimal("1")}]],
+    "trips": [[]],
+    "rate-limits": [[{"userId": "u", "date": "2024-01-01", "count": Decimal(3)}]],
+    "wardrobe-changes": [[{"userId": "u", "seq": Decimal(0)}, {"userId": "u", "seq": Decimal(1)}]],
+}
+
+@pytest.fixture
+def mock_dynamodb():
+    dynamodb = Mock()
+
+    def query(table_name, exclusive_start_key=None, **kwargs):
+        pages = ROWS[table_name.split("-", 1)[1]]
+        index = exclusive_start_key["page"] if exclusive_start_key else 0
+        response = {"Items": pages[index]}
+        if index + 1 < len(pages):
+            response["LastEvaluatedKey"] = {"page": index + 1}
+        return response
+
+    dynamodb.query.side_effect = query
+    dynamodb.batch_delete.side_effect = lambda table_name, keys, max_parallel, on_chunk: (on_chunk(len(keys)), len(keys))[1]
+    return dynamodb
+
+@pytest.fixture
+def ranker():
+    return FeedbackRanker(InMemoryAffinityStore())
+
+@pytest.fixture
+def account_service(mock_dynamodb, ranker):
+    return AccountService(
+        mock_dynamodb, WardrobeService(mock_dynamodb), TripsService(mock_dynamodb),
+        InteractionsService(mock_dynamodb), RateLimitService(mock_dynamodb), feedback_ranker=ranker
+    )
+
+def test_export_ndjson_streams_every_section(account_service):
+    lines = [json.loads(line) for line in "".join(account_service.export("u", "ndjson")).splitlines()]
+
+    assert [(line["section"], line["item"].get("itemId") or line["item"].get("interactionId") or line["item"].get("date")) for line in lines] == [
+        ("wardrobeItems", "1"), ("wardrobeItems", "2"), ("interactions", "rec_1"), ("rateLimits", "2024-01-01"),
+    ]
+    assert lines[0]["item"]["classifierVersion"] == 1
+
+def test_export_json_is_one_document(account_service):
+    document = json.loads("".join(account_service.export("u", "json")))
+
+    assert document["userId"] == "u"
+    assert [item["itemId"] for item in document["wardrobeItems"]] == ["1", "2"]
+    assert document["trips"] == []
+    assert document["rateLimits"][0]["count"] == 3
+    assert "wardrobeChanges" not in document
+
+def test_export_is_lazy(account_service, mock_dynamodb):
+    chunks = account_service.export("u", "ndjson")
+    next(chunks)
+
+    assert mock_dynamodb.query.call_count == 1
+
+def test_delete_account_deletes_every_table_and_reports_progress(account_service, mock_dynamodb, ranker):
+    ranker.record_feedback("u", {"top": "White shirt", "bottom": "Blue jeans"}, 1)
+    etag = account_service.wardrobe_service.get_wardrobe_etag("u")
+    progress = []
+
+    deleted = account_service.delete_account("u", progress=progress.append)
+
+    assert deleted == {"wardrobeItems": 2, "interactions": 1, "trips": 0, "rateLimits": 1, "wardrobeChanges": 2}
+    assert all(state["done"] for state in progress[-1]["tables"].values())
+    deleted_keys = [key for call in mock_dynamodb.batch_delete.call_args_list for key in call.args[1]]
+    assert {"userId": "u", "seq": Decimal(0)} in deleted_keys
+    assert ranker.store.get("u") == ({}, {})
+    assert account_service.wardrobe_service.get_wardrobe_etag("u") != etag
+
+def test_delete_account_finishes_other_tables_before_failing(account_service, mock_dynamodb):
+    def batch_delete(table_name, keys, max_parallel, on_chunk):
+        if table_name.endswith("-interactions"):
+            raise DynamoDBError("throttled")
+        return len(keys)
+    mock_dynamodb.batch_delete.side_effect = batch_delete
+
+    with pytest.raises(DynamoDBError, match="interactions"):
+        account_service.delete_account("u")
+
+    tables = {call.args[0].split("-", 1)[1] for call in mock_dynamodb.batch_delete.call_args_list}
+    assert tables == {"wardrobe-items", "interactions", "rate-limits", "wardrobe-changes"}
+
+@pytest.fixture
+def archived(tmp_path):
+    """An archive run over interactions of u and another user."""
+    from app.maintenance.archive_interactions import archive
+    dynamodb = Mock()
+    dynamodb.scan.return_value = {"Items": [
+        {"userId": "u", "interactionId": "rec_0", "type": "outfit_recommendation",
+         "createdAt": "2023-01-01T10:00:00", "feedback": Decimal("1")},
+        {"userId": "u", "interactionId": "trip_0", "type": "trip", "createdAt": "2023-01-02T10:00:00"},
+        {"userId": "v", "interactionId": "rec_9", "type": "outfit_recommendation", "createdAt": "2023-01-01T11:00:00"},
+    ]}
+    dynamodb.batch_delete.side_effect = lambda table_name, keys: len(keys)
+    assert archive(dynamodb, str(tmp_path), older_than_days=180, segments=1)["archived"] == 3
+    return InteractionArchive(str(tmp_path))
+
+@pytest.fixture
+def archived_account_service(mock_dynamodb, ranker, archived):
+    return AccountService(
+        mock_dynamodb, WardrobeService(mock_dynamodb), TripsService(mock_dynamodb),
+        InteractionsService(mock_dynamodb), RateLimitService(mock_dynamodb), feedback_ranker=ranker,
+        interaction_archive=archived
+    )
+
+def test_export_includes_archived_interactions(archived_account_service):
+    lines = [json.loads(line) for line in "".join(archived_account_service.export("u", "ndjson")).splitlines()]
+
+    interactions = [line["item"]["interactionId"] for line in lines if line["section"] == "interactions"]
+    assert interactions == ["rec_1", "rec_0", "trip_0"]
+
+def test_delete_account_purges_archived_interactions(archived_account_service, archived):
+    deleted = archived_account_service.delete_account("u")
+
+    assert deleted["interactionArchive"] == 2
+    assert list(archived.user_rows("u")) == []
+    assert [row["interactionId"] for row in archived.user_rows("v")] == ["rec_9"]
+    # The trip partition held only u's row, so its file is gone
+    assert all("type=trip" not in part for part in archived.parts())
+    assert "".join(archived_account_service.export("u", "ndjson")).count('"interactions"') == 1
+
+def test_delete_account_deletes_stored_responses_and_finished_jobs(mock_dynamodb):
+    idempotency_service = IdempotencyService(InMemoryIdempotencyStore())
+    for user_id in ("u", "v"):
+        key = scoped_key(user_id, "/recommend/wear", "k1")
+        idempotency_service.begin(key, "fp")
+        idempotency_service.complete(key, "fp", {"outfit": {"top": "White shirt"}}, 200)
+    job_store = InMemoryJobStore()
+    for job_id, user_id, status in (("1", "u", "succeeded"), ("2", "u", "running"), ("3", "v", "succeeded")):
+        job_store.create({"jobId": job_id, "userId": user_id, "type": "outfit_recommendation", "status": status})
+    jobs_service = JobsService(job_store, max_workers=1)
+    service = AccountService(
+        mock_dynamodb, WardrobeService(mock_dynamodb), TripsService(mock_dynamodb),
+        InteractionsService(mock_dynamodb), RateLimitService(mock_dynamodb),
+        idempotency_service=idempotency_service, jobs_service=jobs_service
+    )
+
+    deleted = service.delete_account("u")
+
+    assert deleted["idempotencyKeys"] == 1
+    assert deleted["jobs"] == 1
+    assert idempotency_service.begin(scoped_key("u", "/recommend/wear", "k1"), "fp") is None
+    assert idempotency_service.begin(scoped_key("v", "/recommend/wear", "k1"), "fp") is not None
+    # The running job may be this deletion, still polled by its client
+    assert [job_id for job_id in "123" if job_store.get(job_id)] == ["2", "3"]
+    jobs_service.executor.shutdown(wait=True)
@@ -0,0 +1,68 @@
+import threading
+import pytest
+from app.services.concurrency import ConcurrencyLimiter, LLMOverloadedError
+from app.services.metrics import metrics
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+def make_limiter(max_concurrent=1, max_queue=1, queue_timeout=1.0):
+    return ConcurrencyLimiter('test', max_concurrent, max_queue, queue_timeout, retry_after=3)
+
+def test_acquire_tracks_in_flight():
+    limiter = make_limiter()
+
+    with limiter.acquire():
+        assert metrics.gauge('test_in_flight') == 1
+
+    assert metrics.gauge('test_in_flight') == 0
+
+def test_sheds_when_queue_is_full():
+    limiter = make_limiter(max_queue=0)
+
+    with limiter.acquire():
+        with pytest.raises(LLMOverloadedError) as exc_info:
+            with limiter.acquire():
+                pass
+
+    assert exc_info.value.retry_after == 3
+    assert metrics.counter('test_shed_total', labels={'reason': 'queue_full'}) == 1
+
+def test_sheds_after_queue_timeout():
+    limiter = make_limiter(queue_timeout=0.05)
+
+    with limiter.acquire():
+        with pytest.raises(LLMOverloadedError):
+            with limiter.acquire():
+                pass
+
+    assert metrics.counter('test_shed_total', labels={'reason': 'queue_timeout'}) == 1
+    assert metrics.gauge('test_queued') == 0
+
+def test_queued_call_runs_when_slot_frees():
+    limiter = make_limiter()
+    started = threading.Event()
+    release = threading.Event()
+    finished = []
+
+    def hold_slot():
+        with limiter.acquire():
+            started.set()
+            release.wait(timeout=2)
+
+    holder = threading.Thread(target=hold_slot)
+    holder.start()
+    started.wait(timeout=2)
+
+    def queued_call():
+        with limiter.acquire():
+            finished.append(True)
+
+    waiter = threading.Thread(target=queued_call)
+    waiter.start()
+    release.set()
+    holder.join(timeout=2)
+    waiter.join(timeout=2)
+
+    assert finished == [True]
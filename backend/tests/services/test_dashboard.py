@@ -0,0 +1,68 @@
+import time
+import threading
+import pytest
+from unittest.mock import Mock
+from app.clients.dynamodb import DynamoDBError
+from app.services.dashboard import DashboardService
+
+@pytest.fixture
+def services():
+    wardrobe, trips, interactions = Mock(), Mock(), Mock()
+    wardrobe.get_wardrobe_page.return_value = {"items": [{"itemId": "1", "description": "Blue jeans"}], "hasMore": False}
+    trips.get_user_trip.return_value = {"tripId": "trip_1", "description": "Rome"}
+    interactions.get_recent_interactions.side_effect = lambda user_id, interaction_type, limit, attributes: {
+        "outfit_recommendation": [{"interactionId": "rec_3", "createdAt": "2024-01-03"}, {"interactionId": "rec_1", "createdAt": "2024-01-01"}],
+        "purchase_recommendation": [{"interactionId": "buy_2", "createdAt": "2024-01-02"}],
+        "trip": [],
+    }[interaction_type]
+    return wardrobe, trips, interactions
+
+def test_get_dashboard_merges_recent_interactions(services):
+    dashboard = DashboardService(*services, workers=4)
+
+    result = dashboard.get_dashboard("user1", wardrobe_limit=50, interactions_limit=2)
+
+    assert result["wardrobe"]["items"] == [{"itemId": "1", "description": "Blue jeans"}]
+    assert result["trip"]["tripId"] == "trip_1"
+    assert [interaction["interactionId"] for interaction in result["interactions"]] == ["rec_3", "buy_2"]
+    services[0].get_wardrobe_page.assert_called_once_with("user1", 50, ["itemId", "description", "category"])
+    assert services[2].get_recent_interactions.call_count == 3
+
+def test_get_dashboard_reads_in_parallel(services):
+    wardrobe, trips, interactions = services
+    barrier = threading.Barrier(5, timeout=2)
+
+    def slow(result):
+        def read(*args):
+            barrier.wait()
+            time.sleep(0.05)
+            return result
+        return read
+
+    wardrobe.get_wardrobe_page.side_effect = slow({"items": [], "hasMore": False})
+    trips.get_user_trip.side_effect = slow(None)
+    interactions.get_recent_interactions.side_effect = slow([])
+
+    started = time.monotonic()
+    result = DashboardService(*services, workers=8).get_dashboard("user1")
+
+    assert time.monotonic() - started < 0.15
+    assert result == {"wardrobe": {"items": [], "hasMore": False}, "trip": None, "interactions": []}
+
+def test_get_dashboard_raises_read_errors(services):
+    services[1].get_user_trip.side_effect = DynamoDBError("boom")
+
+    with pytest.raises(DynamoDBError):
+        DashboardService(*services, workers=4).get_dashboard("user1")
+
+def test_dashboard_etag_follows_each_part(services):
+    wardrobe, trips, interactions = services
+    wardrobe.get_wardrobe_etag.return_value = "w1"
+    trips.get_trips_etag.return_value = "t1"
+    interactions.get_interactions_etag.return_value = "i1"
+    dashboard = DashboardService(*services, workers=1)
+    etag = dashboard.get_dashboard_etag("user1")
+
+    interactions.get_interactions_etag.return_value = "i2"
+
+    assert dashboard.get_dashboard_etag("user1") != etag
@@ -0,0 +1,124 @@
+import pytest
+from unittest.mock import Mock
+from app.services.feedback_ranker import (
+    DynamoDBAffinityStore, FeedbackRanker, InMemoryAffinityStore, feedback_value, outfit_items, pair_key
+)
+
+LIKED = {"top": "White oxford shirt", "bottom": "Grey wool trousers", "shoes": "Brown leather loafers"}
+
+WARDROBE = [
+    {"description": "White oxford shirt"},
+    {"description": "Black t-shirt"},
+    {"description": "Grey wool trousers"},
+    {"description": "Blue jeans"},
+    {"description": "Brown leather loafers"},
+    {"description": "White sneakers"},
+    {"description": "Navy wool blazer"},
+]
+
+@pytest.fixture
+def ranker():
+    return FeedbackRanker(InMemoryAffinityStore(), candidates_per_category=1, min_confidence=2)
+
+def test_feedback_value():
+    assert feedback_value(1) == 1
+    assert feedback_value(0) == -1
+    assert feedback_value(None) == 0
+
+def test_outfit_items_normalizes_and_skips_non_items():
+    assert outfit_items({"top": "  White  Shirt ", "bottom": "white shirt", "situation": 2, "shoes": ""}) == ["white shirt"]
+
+def test_rank_without_feedback_returns_none(ranker):
+    assert ranker.rank("test_user", WARDROBE, "office meeting") is None
+
+def test_record_feedback_updates_items_and_pairs_incrementally(ranker):
+    ranker.record_feedback("test_user", LIKED, 1)
+    ranker.record_feedback("test_user", LIKED, 2)
+
+    items, pairs = ranker.store.get("test_user")
+    assert items["white oxford shirt"] == 3
+    assert pairs[pair_key("grey wool trousers", "white oxford shirt")] == 3
+    assert len(pairs) == 3
+
+def test_rank_preselects_best_candidate_per_category(ranker):
+    ranker.record_feedback("test_user", {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}, 1)
+
+    ranking = ranker.rank("test_user", WARDROBE, "casual weekend")
+
+    assert [item["description"] for item in ranking.candidates] == [
+        "Black t-shirt", "Blue jeans", "White sneakers", "Navy wool blazer"
+    ]
+    # One like isn't enough to skip the LLM
+    assert ranking.outfit is None
+
+def test_rank_returns_outfit_liked_repeatedly_when_it_fits(ranker):
+    ranker.record_feedback("test_user", LIKED, 1)
+    ranker.record_feedback("test_user", LIKED, 1)
+
+    assert ranker.rank("test_user", WARDROBE, "client meeting").outfit == LIKED
+    # The same outfit doesn't suit the beach
+    assert ranker.rank("test_user", WARDROBE, "hot day at the beach").outfit is None
+
+def test_rank_fills_both_slots_with_a_liked_one_piece(ranker):
+    dress = {"top": "Black cocktail dress", "bottom": "Black cocktail dress", "shoes": "Black heels"}
+    ranker.record_feedback("test_user", dress, 1)
+    ranker.record_feedback("test_user", dress, 1)
+
+    wardrobe = [{"description": "Black cocktail dress"}, {"description": "Black heels"}, {"description": "Blue jeans"}]
+    assert ranker.rank("test_user", wardrobe, "cocktail party").outfit == dress
+
+def test_rank_ignores_disliked_outfit(ranker):
+    ranker.record_feedback("test_user", LIKED, 1)
+    ranker.record_feedback("test_user", LIKED, 1)
+    ranker.record_feedback("test_user", LIKED, -2)
+
+    assert ranker.rank("test_user", WARDROBE, "client meeting").outfit is None
+
+def test_dynamodb_store_updates_each_counter_in_one_transaction():
+    dynamodb = Mock()
+    store = DynamoDBAffinityStore(dynamodb)
+
+    store.add("test_user", {"white shirt": 1}, {pair_key("white shirt", "jeans"): 1})
+
+    dynamodb.update_item.assert_not_called()
+    item, pair = (write["Update"] for write in dynamodb.transact_write.call_args.args[0])
+    assert item["Key"] == {"userId": "test_user", "affinityKey": "item#white shirt"}
+    assert pair["Key"] == {"userId": "test_user", "affinityKey": "pair#jeans\twhite shirt"}
+    assert item["UpdateExpression"] == "SET #net = if_not_exists(#net, :zero) + :delta, #expiresAt = :expiresAt"
+    assert item["ExpressionAttributeValues"][":delta"] == 1
+
+@pytest.fixture
+def affinity_table():
+    moto = pytest.importorskip("moto")
+    from app.clients.dynamodb import DynamoDBClient
+    from app.services.feedback_ranker import FEEDBACK_AFFINITY_TABLE
+    with moto.mock_aws():
+        dynamodb = DynamoDBClient()
+        dynamodb.client.create_table(
+            TableName=FEEDBACK_AFFINITY_TABLE,
+            KeySchema=[{"AttributeName": "userId", "KeyType": "HASH"},
+                       {"AttributeName": "affinityKey", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "userId", "AttributeType": "S"},
+                                  {"AttributeName": "affinityKey", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        yield dynamodb
+
+def test_dynamodb_store_in_dynamodb(affinity_table):
+    store = DynamoDBAffinityStore(affinity_table)
+    ranker = FeedbackRanker(store, candidates_per_category=1, min_confidence=2)
+
+    ranker.record_feedback("test_user", LIKED, 1)
+    ranker.record_feedback("test_user", LIKED, 1)
+    ranker.record_feedback("test_user", {"top": "Black t-shirt", "bottom": "Blue jeans"}, 1)
+    ranker.record_feedback("test_user", {"top": "Black t-shirt", "bottom": "Blue jeans"}, -1)
+
+    items, pairs = store.get("test_user")
+    # Counters that cancelled out are left out
+    assert items == {"white oxford shirt": 2, "grey wool trousers": 2, "brown leather loafers": 2}
+    assert pairs[pair_key("white oxford shirt", "grey wool trousers")] == 2
+    assert len(pairs) == 3
+    assert ranker.rank("test_user", WARDROBE, "client meeting").outfit == LIKED
+
+    ranker.forget("test_user")
+    assert store.get("test_user") == ({}, {})
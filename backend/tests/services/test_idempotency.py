@@ -0,0 +1,142 @@
+import json
+import threading
+import pytest
+from unittest.mock import Mock, patch
+from app.services.idempotency import (
+    IdempotencyService, InMemoryIdempotencyStore, DynamoDBIdempotencyStore,
+    IdempotencyConflictError, IdempotencyInProgressError, IDEMPOTENCY_TABLE
+)
+from app.clients.dynamodb import ConditionalCheckFailedError, DynamoDBError
+
+@pytest.fixture
+def idempotency_service():
+    return IdempotencyService(InMemoryIdempotencyStore(), ttl_seconds=60, wait_timeout=1)
+
+def test_first_request_claims_key(idempotency_service):
+    assert idempotency_service.begin("user#/recommend/wear#k1", "fp") is None
+
+def test_completed_request_is_replayed(idempotency_service):
+    idempotency_service.begin("k1", "fp")
+    idempotency_service.complete("k1", "fp", {"outfit": {"top": "Shirt"}}, 200)
+
+    assert idempotency_service.begin("k1", "fp") == ({"outfit": {"top": "Shirt"}}, 200)
+
+def test_key_reused_with_different_body(idempotency_service):
+    idempotency_service.begin("k1", "fp")
+    idempotency_service.complete("k1", "fp", {}, 200)
+
+    with pytest.raises(IdempotencyConflictError):
+        idempotency_service.begin("k1", "other")
+
+def test_released_key_can_be_claimed_again(idempotency_service):
+    idempotency_service.begin("k1", "fp")
+    idempotency_service.release("k1")
+
+    assert idempotency_service.begin("k1", "fp") is None
+
+def test_expired_key_can_be_claimed_again():
+    service = IdempotencyService(InMemoryIdempotencyStore(), ttl_seconds=0, wait_timeout=1)
+    service.begin("k1", "fp")
+    service.complete("k1", "fp", {}, 200)
+
+    assert service.begin("k1", "fp") is None
+
+def test_claim_drops_expired_keys():
+    store = InMemoryIdempotencyStore()
+    service = IdempotencyService(store, ttl_seconds=0, wait_timeout=1)
+    for key in ("k1", "k2"):
+        service.begin(key, "fp")
+        service.complete(key, "fp", {"outfit": {"top": "Shirt"}}, 200)
+
+    # Neither key is looked up again, but the next claim removes both
+    service.begin("k3", "fp")
+
+    assert set(store._records) == {"k3"}
+
+def test_concurrent_duplicate_waits_for_first_request(idempotency_service):
+    idempotency_service.begin("k1", "fp")
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(idempotency_service.begin("k1", "fp")))
+    waiter.start()
+
+    idempotency_service.complete("k1", "fp", {"item_to_buy": "Loafers"}, 200)
+    waiter.join(timeout=2)
+
+    assert results == [({"item_to_buy": "Loafers"}, 200)]
+
+def test_expired_lease_is_taken_over():
+    # The first request's worker died without completing or releasing the key
+    service = IdempotencyService(InMemoryIdempotencyStore(), ttl_seconds=60, wait_timeout=1, lease_seconds=0)
+    service.begin("k1", "fp")
+
+    assert service.begin("k1", "fp") is None
+    service.complete("k1", "fp", {"outfit": {"top": "Shirt"}}, 200)
+    assert service.begin("k1", "fp") == ({"outfit": {"top": "Shirt"}}, 200)
+
+def test_duplicate_times_out_while_first_request_runs():
+    service = IdempotencyService(InMemoryIdempotencyStore(), ttl_seconds=60, wait_timeout=0.05)
+    service.begin("k1", "fp")
+
+    with pytest.raises(IdempotencyInProgressError):
+        service.begin("k1", "fp")
+
+def test_dynamodb_store_claims_with_condition():
+    mock_dynamodb = Mock()
+    store = DynamoDBIdempotencyStore(mock_dynamodb)
+
+    assert store.claim("k1", "fp", 60) is None
+
+    put_args = mock_dynamodb.put_item.call_args[1]
+    assert put_args['table_name'] == IDEMPOTENCY_TABLE
+    assert put_args['item']['status'] == 'in_progress'
+    assert 'attribute_not_exists(idempotencyKey)' in put_args['condition_expression']
+    assert 'expiresAt <= :now' in put_args['condition_expression']
+
+def test_dynamodb_store_leases_claims_and_keeps_responses():
+    mock_dynamodb = Mock()
+    service = IdempotencyService(DynamoDBIdempotencyStore(mock_dynamodb), ttl_seconds=86400, lease_seconds=90)
+
+    with patch('app.services.idempotency.time.time', return_value=1000):
+        service.begin("k1", "fp")
+        claimed = mock_dynamodb.put_item.call_args[1]['item']
+        service.complete("k1", "fp", {}, 200)
+        completed = mock_dynamodb.put_item.call_args[1]['item']
+
+    assert claimed['expiresAt'] == 1090
+    assert completed['expiresAt'] == 1000 + 86400
+
+def test_dynamodb_store_returns_existing_record_when_claimed():
+    mock_dynamodb = Mock()
+    mock_dynamodb.put_item.side_effect = ConditionalCheckFailedError("taken")
+    mock_dynamodb.get_item.return_value = {'Item': {
+        'idempotencyKey': 'k1',
+        'status': 'completed',
+        'fingerprint': 'fp',
+        'response': json.dumps({'body': {'ok': True}, 'status': 200}),
+        'expiresAt': 4102444800
+    }}
+    service = IdempotencyService(DynamoDBIdempotencyStore(mock_dynamodb), wait_timeout=1)
+
+    assert service.begin("k1", "fp") == ({'ok': True}, 200)
+
+def test_dynamodb_errors_fail_open():
+    mock_dynamodb = Mock()
+    mock_dynamodb.put_item.side_effect = DynamoDBError("DynamoDB error")
+    service = IdempotencyService(DynamoDBIdempotencyStore(mock_dynamodb))
+
+    assert service.begin("k1", "fp") is None
+
+def test_dynamodb_store_deletes_a_users_keys():
+    mock_dynamodb = Mock()
+    mock_dynamodb.scan.side_effect = [
+        {"Items": [{"idempotencyKey": "u#/recommend/wear#k1"}], "LastEvaluatedKey": {"idempotencyKey": "x"}},
+        {"Items": []},
+    ]
+    mock_dynamodb.batch_delete.return_value = 1
+
+    assert IdempotencyService(DynamoDBIdempotencyStore(mock_dynamodb)).forget("u") == 1
+
+    scan = mock_dynamodb.scan.call_args_list[0].kwargs
+    assert scan["filter_expression"] == "begins_with(#p0, :prefix)"
+    assert scan["expression_attribute_values"] == {":prefix": "u#"}
+    mock_dynamodb.batch_delete.assert_called_once_with(IDEMPOTENCY_TABLE, [{"idempotencyKey": "u#/recommend/wear#k1"}])
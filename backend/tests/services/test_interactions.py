@@ -136,4 +136,83 @@ def test_update_interaction_feedback_dynamodb_error(interactions_service, mock_d
     with pytest.raises(DynamoDBError) as exc_info:
         interactions_service.update_interaction_feedback(user_id, interaction_id, feedback)
     
-    assert str(exc_info.value) == "Test error" 
\ No newline at end of file
+    assert str(exc_info.value) == "Test error" 
+def test_update_interaction_feedback_updates_ranker_by_change(mock_dynamodb):
+    ranker = Mock()
+    interactions_service = InteractionsService(mock_dynamodb, feedback_ranker=ranker)
+    recommendation = {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+    mock_dynamodb.update_item.return_value = {
+        "type": "outfit_recommendation",
+        "recommendation": recommendation,
+        "feedback": 0
+    }
+
+    interactions_service.update_interaction_feedback("test_user", "rec_123", 1)
+
+    assert mock_dynamodb.update_item.call_args.kwargs["return_values"] == "ALL_OLD"
+    ranker.record_feedback.assert_called_once_with("test_user", recommendation, 2)
+
+def test_update_interaction_feedback_ranker_error_keeps_feedback(mock_dynamodb):
+    ranker = Mock()
+    ranker.record_feedback.side_effect = DynamoDBError("Test error")
+    interactions_service = InteractionsService(mock_dynamodb, feedback_ranker=ranker)
+    mock_dynamodb.update_item.return_value = {"type": "outfit_recommendation", "recommendation": {}}
+
+    interactions_service.update_interaction_feedback("test_user", "rec_123", 1)
+
+    mock_dynamodb.update_item.assert_called_once()
+
+def test_update_interaction_feedback_skips_ranker_for_other_types(mock_dynamodb):
+    ranker = Mock()
+    interactions_service = InteractionsService(mock_dynamodb, feedback_ranker=ranker)
+    mock_dynamodb.update_item.return_value = {"type": "trip", "recommendation": {"packingList": {}}}
+
+    interactions_service.update_interaction_feedback("test_user", "trip_123", 1)
+
+    ranker.record_feedback.assert_not_called()
+
+def test_writes_change_interactions_etag(interactions_service, mock_dynamodb):
+    etag = interactions_service.get_interactions_etag("test_user")
+
+    interactions_service.update_interaction_feedback("test_user", "rec_1", 1)
+
+    assert interactions_service.get_interactions_etag("test_user") != etag
+    assert interactions_service.get_interactions_etag("other_user") != etag
+
+def test_get_recent_interactions_reads_one_type_newest_first(interactions_service, mock_dynamodb):
+    mock_dynamodb.query.return_value = {"Items": [{"interactionId": "buy_2"}]}
+
+    assert interactions_service.get_recent_interactions("test_user", "purchase_recommendation", 5, ["interactionId"]) == [{"interactionId": "buy_2"}]
+
+    query = mock_dynamodb.query.call_args.kwargs
+    assert query["expression_attribute_values"] == {":user_id": "test_user", ":prefix": "buy_"}
+    assert query["scan_index_forward"] is False
+    assert query["limit"] == 5
+    assert query["projection_expression"] == "#p0"
+    assert query["expression_attribute_names"] == {"#p0": "interactionId"}
+
+def test_delete_interactions_in_parallel_batches(interactions_service, mock_dynamodb):
+    mock_dynamodb.batch_delete.side_effect = lambda table_name, keys, max_parallel, on_chunk: (on_chunk(len(keys)), len(keys))[1]
+    etag = interactions_service.get_interactions_etag("test_user")
+    progress = []
+
+    assert interactions_service.delete_interactions("test_user", ["rec_1", "rec_2", "rec_1"], progress=progress.append) == 2
+
+    keys = mock_dynamodb.batch_delete.call_args.args[1]
+    assert keys == [{"userId": "test_user", "interactionId": "rec_1"}, {"userId": "test_user", "interactionId": "rec_2"}]
+    assert progress == [2]
+    assert interactions_service.get_interactions_etag("test_user") != etag
+
+def test_clear_interactions_pages_through_keys(interactions_service, mock_dynamodb):
+    mock_dynamodb.query.side_effect = [
+        {"Items": [{"interactionId": "buy_1"}, {"interactionId": "rec_1"}], "LastEvaluatedKey": {"interactionId": "rec_1"}},
+        {"Items": [{"interactionId": "trip_1"}]},
+    ]
+    mock_dynamodb.batch_delete.side_effect = lambda table_name, keys, max_parallel, on_chunk: (on_chunk(len(keys)), len(keys))[1]
+    progress = []
+
+    assert interactions_service.clear_interactions("test_user", progress=progress.append) == 3
+
+    assert progress == [2, 3]
+    assert mock_dynamodb.query.call_args.kwargs["exclusive_start_key"] == {"interactionId": "rec_1"}
+    assert mock_dynamodb.query.call_args.kwargs["projection_expression"] == "#p0"
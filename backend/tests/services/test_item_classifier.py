@@ -0,0 +1,23 @@
+from app.services.item_classifier import CLASSIFIER_VERSION, classify_wardrobe_item, normalize_tokens
+
+def test_classify_wardrobe_item():
+    assert classify_wardrobe_item("Navy wool blazer") == {
+        "category": "outerwear",
+        "colors": ["navy"],
+        "formality": "formal",
+        "tokens": ["blazer", "navy", "wool"],
+        "normalizedKey": "blazer navy wool",
+        "classifierVersion": CLASSIFIER_VERSION,
+    }
+
+def test_classify_unknown_item_as_other():
+    attributes = classify_wardrobe_item("Gray charcoal thing")
+
+    assert attributes["category"] == "other"
+    assert attributes["colors"] == ["grey"]
+    assert attributes["formality"] == "neutral"
+
+def test_normalized_tokens_match_reworded_duplicates():
+    assert normalize_tokens("Blue Jeans") == normalize_tokens("jeans, blue")
+    assert normalize_tokens("A pair of white sneakers") == normalize_tokens("White sneaker")
+    assert normalize_tokens("Black dress") == ["black", "dress"]
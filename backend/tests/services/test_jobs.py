@@ -0,0 +1,99 @@
+import threading
+import pytest
+from unittest.mock import Mock
+from app.services.jobs import JobsService, InMemoryJobStore, DynamoDBJobStore, JobQueueFullError, JOBS_TABLE
+
+@pytest.fixture
+def jobs_service():
+    service = JobsService(InMemoryJobStore(), max_workers=1, max_queue_depth=1)
+    yield service
+    service.executor.shutdown(wait=True)
+
+def test_job_succeeds(jobs_service):
+    job_id = jobs_service.submit("user1", "outfit_recommendation", lambda: ({"outfit": {"top": "Shirt"}}, 200))
+    jobs_service.executor.shutdown(wait=True)
+
+    job = jobs_service.get_job("user1", job_id)
+    assert job["status"] == "succeeded"
+    assert job["type"] == "outfit_recommendation"
+    assert job["status_code"] == 200
+    assert job["result"] == {"outfit": {"top": "Shirt"}}
+
+def test_job_error_response_is_failed(jobs_service):
+    job_id = jobs_service.submit("user1", "outfit_recommendation", lambda: ({"error": "limit"}, 429))
+    jobs_service.executor.shutdown(wait=True)
+
+    job = jobs_service.get_job("user1", job_id)
+    assert job["status"] == "failed"
+    assert job["status_code"] == 429
+
+def test_job_exception_is_failed(jobs_service):
+    def work():
+        raise Exception("boom")
+
+    job_id = jobs_service.submit("user1", "packing_list", work)
+    jobs_service.executor.shutdown(wait=True)
+
+    job = jobs_service.get_job("user1", job_id)
+    assert job["status"] == "failed"
+    assert job["result"] == {"error": "boom"}
+
+def test_job_reports_progress(jobs_service):
+    def work(report):
+        report({"deleted": 25, "total": 50})
+        return {"deleted": 50}, 200
+
+    job_id = jobs_service.submit("user1", "interactions_delete", work, reports_progress=True)
+    jobs_service.executor.shutdown(wait=True)
+
+    job = jobs_service.get_job("user1", job_id)
+    assert job["progress"] == {"deleted": 25, "total": 50}
+    assert job["result"] == {"deleted": 50}
+
+def test_job_is_private_to_its_user(jobs_service):
+    job_id = jobs_service.submit("user1", "packing_list", lambda: ({}, 200))
+
+    assert jobs_service.get_job("user2", job_id) is None
+    assert jobs_service.get_job("user1", "missing") is None
+
+def test_admission_control_rejects_when_queue_is_full(jobs_service):
+    release = threading.Event()
+
+    def blocking_work():
+        release.wait(timeout=2)
+        return {}, 200
+
+    jobs_service.submit("user1", "packing_list", blocking_work)  # running
+    jobs_service.submit("user1", "packing_list", blocking_work)  # queued
+    assert jobs_service.queue_depth == 1
+
+    with pytest.raises(JobQueueFullError):
+        jobs_service.submit("user1", "packing_list", blocking_work)
+
+    release.set()
+
+def test_dynamodb_job_store_updates_fields():
+    mock_dynamodb = Mock()
+    store = DynamoDBJobStore(mock_dynamodb)
+
+    store.update("job1", {"status": "running"})
+
+    mock_dynamodb.update_item.assert_called_once_with(
+        table_name=JOBS_TABLE,
+        key={"jobId": "job1"},
+        update_expression="SET #status = :status",
+        expression_attribute_names={"#status": "status"},
+        expression_attribute_values={":status": "running"}
+    )
+
+def test_dynamodb_job_store_deletes_a_users_finished_jobs():
+    mock_dynamodb = Mock()
+    mock_dynamodb.scan.return_value = {"Items": [{"jobId": "job1"}]}
+    mock_dynamodb.batch_delete.return_value = 1
+
+    assert JobsService(DynamoDBJobStore(mock_dynamodb), max_workers=1).forget("user1") == 1
+
+    scan = mock_dynamodb.scan.call_args.kwargs
+    assert scan["filter_expression"] == "#userId = :user_id AND #status IN (:succeeded, :failed)"
+    assert scan["expression_attribute_values"][":user_id"] == "user1"
+    mock_dynamodb.batch_delete.assert_called_once_with(JOBS_TABLE, [{"jobId": "job1"}])
@@ -1,7 +1,9 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, patch, ANY
 from app.services.llm import LLMService
 from app.services.rate_limit import RateLimitError
+from app.services.concurrency import ConcurrencyLimiter, LLMOverloadedError
+from app.services.metrics import metrics
 
 @pytest.fixture
 def mock_openai_client():
@@ -34,13 +36,14 @@ def test_get_completion_success(llm_service, mock_openai_client, mock_rate_limit
     assert response == {"key": "value"}
     
     # Verify rate limit was checked
-    mock_rate_limit_service.check_and_increment.assert_called_once_with("test_user")
+    mock_rate_limit_service.check_and_increment.assert_called_once_with("test_user", units=1, endpoint="default")
     
     # Verify the API was called correctly
     mock_openai_client.return_value.chat.completions.create.assert_called_once_with(
         model="gpt-3.5-turbo",
         messages=[{"role": "user", "content": "test prompt"}],
-        response_format={"type": "json_object"}
+        response_format={"type": "json_object"},
+        timeout=ANY
     )
 
 def test_get_completion_rate_limit_exceeded(llm_service, mock_rate_limit_service):
@@ -54,7 +57,7 @@ def test_get_completion_rate_limit_exceeded(llm_service, mock_rate_limit_service
     assert "Daily rate limit exceeded" in str(exc_info.value)
     
     # Verify rate limit was checked
-    mock_rate_limit_service.check_and_increment.assert_called_once_with("test_user")
+    mock_rate_limit_service.check_and_increment.assert_called_once_with("test_user", units=1, endpoint="default")
 
 def test_get_completion_custom_model(llm_service, mock_openai_client, mock_rate_limit_service):
     # Mock rate limit check
@@ -71,13 +74,14 @@ def test_get_completion_custom_model(llm_service, mock_openai_client, mock_rate_
     response = llm_service.get_completion("test prompt", user_id="test_user", model="gpt-4")
     
     # Verify rate limit was checked
-    mock_rate_limit_service.check_and_increment.assert_called_once_with("test_user")
+    mock_rate_limit_service.check_and_increment.assert_called_once_with("test_user", units=1, endpoint="default")
     
     # Verify the API was called with custom model
     mock_openai_client.return_value.chat.completions.create.assert_called_once_with(
         model="gpt-4",
         messages=[{"role": "user", "content": "test prompt"}],
-        response_format={"type": "json_object"}
+        response_format={"type": "json_object"},
+        timeout=ANY
     )
 
 def test_get_completion_api_error(llm_service, mock_openai_client, mock_rate_limit_service):
@@ -94,7 +98,7 @@ def test_get_completion_api_error(llm_service, mock_openai_client, mock_rate_lim
     assert "Failed to get completion from OpenAI" in str(exc_info.value)
     
     # Verify rate limit was checked
-    mock_rate_limit_service.check_and_increment.assert_called_once_with("test_user")
+    mock_rate_limit_service.check_and_increment.assert_called_once_with("test_user", units=1, endpoint="default")
 
 def test_get_completion_invalid_json(llm_service, mock_openai_client, mock_rate_limit_service):
     # Mock rate limit check
@@ -114,4 +118,69 @@ def test_get_completion_invalid_json(llm_service, mock_openai_client, mock_rate_
     assert "Failed to parse JSON response" in str(exc_info.value)
     
     # Verify rate limit was checked
-    mock_rate_limit_service.check_and_increment.assert_called_once_with("test_user") 
\ No newline at end of file
+    mock_rate_limit_service.check_and_increment.assert_called_once_with("test_user", units=1, endpoint="default") 
+def test_get_completion_shed_does_not_charge_rate_limit(llm_service, mock_openai_client, mock_rate_limit_service):
+    # Fill the only slot and leave no room in the queue
+    llm_service.limiter = ConcurrencyLimiter('llm', max_concurrent=1, max_queue=0, queue_timeout=1, retry_after=2)
+
+    with llm_service.limiter.acquire():
+        with pytest.raises(LLMOverloadedError):
+            llm_service.get_completion("test prompt", user_id="test_user")
+
+    mock_rate_limit_service.check_and_increment.assert_not_called()
+    mock_openai_client.return_value.chat.completions.create.assert_not_called()
+
+def test_get_completion_tiers_model_by_prompt_size(llm_service, mock_openai_client):
+    mock_response = Mock()
+    mock_response.choices = [Mock(message=Mock(content='{"tops": [], "bottoms": [], "shoes": []}'))]
+    mock_response.usage = Mock(prompt_tokens=1200, completion_tokens=40, total_tokens=1240)
+    mock_openai_client.return_value.chat.completions.create.return_value = mock_response
+    buckets = {'default': [[None, 'standard']], 'pack': [[100, 'standard'], [None, 'large']]}
+
+    with patch.object(llm_service.tiering_policy, 'buckets', buckets):
+        llm_service.get_completion("x" * 4000, user_id="test_user", endpoint="pack")
+
+    assert mock_openai_client.return_value.chat.completions.create.call_args.kwargs["model"] == \
+        llm_service.tiering_policy.models['large']
+    assert metrics.counter('llm_tokens_total', labels={'tier': 'large', 'kind': 'prompt_tokens'}) >= 1200
+    assert metrics.observation_count('llm_tier_latency_seconds', labels={'tier': 'large'}) >= 1
+
+def completion(content):
+    response = Mock()
+    response.choices = [Mock(message=Mock(content=content))]
+    return response
+
+def test_get_completion_repairs_locally_without_reasking(llm_service, mock_openai_client):
+    metrics.reset()
+    create = mock_openai_client.return_value.chat.completions.create
+    create.return_value = completion('```json\n{"title": "Lisbon Week"\n```')
+
+    assert llm_service.get_completion("test prompt", user_id="test_user", endpoint="title") == {"title": "Lisbon Week"}
+    assert create.call_count == 1
+    assert metrics.counter('llm_structured_output_total', labels={'endpoint': 'title', 'outcome': 'repaired'}) == 1
+
+def test_get_completion_reasks_once_when_repair_fails(llm_service, mock_openai_client, mock_rate_limit_service):
+    metrics.reset()
+    create = mock_openai_client.return_value.chat.completions.create
+    create.side_effect = [completion('{"item": "Trench coat"}'),
+                          completion('{"item": "Trench coat", "explanation": "Layers well"}')]
+
+    result = llm_service.get_completion("test prompt", user_id="test_user", endpoint="buy")
+
+    assert result == {"item": "Trench coat", "explanation": "Layers well"}
+    assert create.call_count == 2
+    assert create.call_args.kwargs["messages"][0]["content"].startswith("test prompt")
+    mock_rate_limit_service.check_and_increment.assert_called_once_with("test_user", units=1, endpoint="buy")
+    assert metrics.counter('llm_structured_output_total', labels={'endpoint': 'buy', 'outcome': 'reasked'}) == 1
+
+def test_get_completion_fails_after_bounded_reask(llm_service, mock_openai_client):
+    metrics.reset()
+    create = mock_openai_client.return_value.chat.completions.create
+    create.return_value = completion('{"item": "Trench coat"}')
+
+    with pytest.raises(Exception) as exc_info:
+        llm_service.get_completion("test prompt", user_id="test_user", endpoint="buy")
+
+    assert "Failed to parse JSON response" in str(exc_info.value)
+    assert create.call_count == 2
+    assert metrics.counter('llm_structured_output_total', labels={'endpoint': 'buy', 'outcome': 'failed'}) == 1
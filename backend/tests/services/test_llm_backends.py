@@ -0,0 +1,146 @@
+import json
+import pytest
+from unittest.mock import Mock, patch
+from app.services.llm import LLMService
+from app.services.llm_backends import (
+    BackendError, BackendRoute, BackendRouter, DeterministicBackend, OpenAICompatibleHTTPBackend
+)
+from app.services.resilience import CircuitBreaker
+from app.services.metrics import metrics
+from tests.fake_openai_server import FakeOpenAIServer
+
+MESSAGES = [{"role": "user", "content": "prompt"}]
+
+@pytest.fixture
+def fake_openai():
+    with FakeOpenAIServer() as server:
+        yield server
+
+def make_route(backend):
+    breaker = CircuitBreaker(name=f'test_{backend.name}', failure_rate_threshold=0.5, window_size=4,
+                             min_calls=2, reset_timeout=60)
+    return BackendRoute(backend, breaker, alpha=0.5)
+
+def test_http_backend_returns_completion(fake_openai):
+    fake_openai.respond({"status": 200, "content": {"top": "Shirt"}})
+    backend = OpenAICompatibleHTTPBackend(fake_openai.base_url, api_key="key", model="local-model")
+
+    result = backend.complete("gpt-3.5-turbo", MESSAGES, timeout=5)
+
+    assert json.loads(result.content) == {"top": "Shirt"}
+    assert result.backend == "http"
+    assert fake_openai.requests[0]["model"] == "local-model"
+
+@pytest.mark.parametrize("status,retryable", [(429, True), (503, True), (400, False)])
+def test_http_backend_flags_retryable_errors(fake_openai, status, retryable):
+    fake_openai.respond({"status": status})
+    backend = OpenAICompatibleHTTPBackend(fake_openai.base_url)
+
+    with pytest.raises(BackendError) as exc_info:
+        backend.complete("gpt-3.5-turbo", MESSAGES, timeout=5)
+
+    assert exc_info.value.retryable is retryable
+    assert exc_info.value.status_code == status
+
+def test_deterministic_backend_fills_prompt_template():
+    prompt = (
+        "My wardrobe items:\n- blue jeans\n- white shirt\n\n"
+        'Respond with JSON like {"top": "item", "bottom": "item"}'
+    )
+    backend = DeterministicBackend()
+
+    first = json.loads(backend.complete("model", [{"role": "user", "content": prompt}], timeout=1).content)
+    second = json.loads(backend.complete("model", [{"role": "user", "content": prompt}], timeout=1).content)
+
+    assert first == second
+    assert set(first) == {"top", "bottom"}
+    assert all(value in ("- blue jeans", "- white shirt") for value in first.values())
+
+def test_router_prefers_faster_backend_and_keeps_order_for_unsampled():
+    slow, fast, standby = (make_route(DeterministicBackend(name=name)) for name in ("slow", "fast", "standby"))
+    router = BackendRouter([slow, fast, standby])
+    assert [route.name for route in router.ranked()] == ["slow", "fast", "standby"]
+
+    slow.record(2.0, ok=True)
+    fast.record(0.2, ok=True)
+
+    assert [route.name for route in router.ranked()] == ["fast", "slow", "standby"]
+
+def test_errors_push_backend_down_the_ranking():
+    primary, secondary = make_route(DeterministicBackend(name="primary")), make_route(DeterministicBackend(name="secondary"))
+    primary.record(0.1, ok=True)
+    secondary.record(0.3, ok=True)
+
+    primary.record(0.01, ok=False)
+
+    assert [route.name for route in BackendRouter([primary, secondary]).ranked()] == ["secondary", "primary"]
+
+def test_recovered_backend_moves_back_up_the_ranking():
+    with patch('app.services.llm_backends.time.monotonic', return_value=0):
+        primary, secondary = make_route(DeterministicBackend(name="primary")), make_route(DeterministicBackend(name="secondary"))
+        router = BackendRouter([primary, secondary])
+        primary.record(0.1, ok=True)
+        secondary.record(0.3, ok=True)
+        primary.record(0.01, ok=False)
+        primary.record(0.01, ok=False)
+        assert [route.name for route in router.ranked()] == ["secondary", "primary"]
+
+    # The primary gets no traffic while demoted, but its errors wear off
+    with patch('app.services.llm_backends.time.monotonic', return_value=10):
+        assert [route.name for route in router.ranked()] == ["secondary", "primary"]
+    with patch('app.services.llm_backends.time.monotonic', return_value=120):
+        assert [route.name for route in router.ranked()] == ["primary", "secondary"]
+        primary.record(0.1, ok=True)
+        assert primary.ewma_error_rate < 0.1
+
+def test_llm_service_fails_over_to_next_backend(fake_openai):
+    metrics.reset()
+    fake_openai.respond({"status": 503})
+    with patch('app.services.llm.Config.LLM_BACKENDS', ['http', 'deterministic']), \
+         patch('app.services.llm.Config.LLM_HTTP_BACKEND_URL', fake_openai.base_url), \
+         patch('app.services.llm.Config.LLM_MAX_ATTEMPTS', 1):
+        service = LLMService(rate_limit_service=Mock())
+
+    result = service.get_completion('Respond with JSON like {"title": "text"}', "user1")
+
+    assert "title" in result
+    assert len(fake_openai.requests) == 1
+    assert metrics.counter('llm_backend_failovers_total', labels={'backend': 'deterministic'}) == 1
+    assert metrics.counter('llm_backend_errors_total', labels={'backend': 'http'}) == 1
+
+def test_llm_service_rejects_unknown_backend():
+    with patch('app.services.llm.Config.LLM_BACKENDS', ['carrier-pigeon']), \
+         patch('app.services.llm.OpenAI'):
+        with pytest.raises(ValueError):
+            LLMService(rate_limit_service=Mock())
+
+def test_http_backend_reports_cached_tokens(fake_openai):
+    fake_openai.respond({"status": 200, "content": {"ok": True},
+                         "usage": {"prompt_tokens": 2048, "completion_tokens": 20, "total_tokens": 2068,
+                                   "prompt_tokens_details": {"cached_tokens": 1536}}})
+    backend = OpenAICompatibleHTTPBackend(fake_openai.base_url)
+
+    result = backend.complete("gpt-3.5-turbo", MESSAGES, timeout=5)
+
+    assert result.usage == {"prompt_tokens": 2048, "completion_tokens": 20, "total_tokens": 2068,
+                            "cached_tokens": 1536}
+
+def test_llm_service_tracks_prefix_cache_hit_rate(fake_openai):
+    metrics.reset()
+    fake_openai.respond(
+        {"status": 200, "content": {"ok": True},
+         "usage": {"prompt_tokens": 1000, "completion_tokens": 10, "total_tokens": 1010}},
+        {"status": 200, "content": {"ok": True},
+         "usage": {"prompt_tokens": 1000, "completion_tokens": 10, "total_tokens": 1010,
+                   "prompt_tokens_details": {"cached_tokens": 900}}}
+    )
+    with patch('app.services.llm.Config.OPENAI_BASE_URL', fake_openai.base_url):
+        service = LLMService(rate_limit_service=Mock())
+
+    service.get_completion("prompt", "user1", endpoint="default")
+    service.get_completion("prompt", "user1", endpoint="default")
+
+    labels = {'endpoint': 'default'}
+    assert metrics.counter('llm_prompt_tokens_total', labels) == 2000
+    assert metrics.counter('llm_cached_tokens_total', labels) == 900
+    assert metrics.gauge('llm_prefix_cache_hit_ratio', labels) == 0.45
@@ -0,0 +1,25 @@
+from app.services.metrics import MetricsRegistry
+
+def test_counters_and_gauges_with_labels():
+    registry = MetricsRegistry()
+
+    registry.increment('requests_total', labels={'endpoint': 'wear'})
+    registry.increment('requests_total', 2, labels={'endpoint': 'wear'})
+    registry.set_gauge('in_flight', 4)
+
+    snapshot = registry.snapshot()
+    assert snapshot['counters'] == {'requests_total{endpoint=wear}': 3}
+    assert snapshot['gauges'] == {'in_flight': 4}
+
+def test_histogram_percentiles():
+    registry = MetricsRegistry()
+
+    for value in range(1, 101):
+        registry.observe('latency_seconds', value)
+
+    histogram = registry.snapshot()['histograms']['latency_seconds']
+    assert histogram['count'] == 100
+    assert histogram['sum'] == 5050
+    assert histogram['p50'] == 51
+    assert registry.percentile('latency_seconds', 0.95) == 95
+    assert registry.percentile('missing', 0.95) is None
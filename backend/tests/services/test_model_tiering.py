@@ -0,0 +1,49 @@
+import pytest
+from app.services.model_tiering import ModelTieringPolicy, estimate_tokens
+from app.services.metrics import metrics
+
+MODELS = {'small': 'small-model', 'standard': 'standard-model', 'large': 'large-model'}
+BUCKETS = {
+    'default': [[None, 'standard']],
+    'title': [[10, 'small'], [None, 'standard']],
+    'pack': [[10, 'standard'], [50, 'standard'], [None, 'large']],
+}
+
+@pytest.fixture
+def policy():
+    metrics.reset()
+    return ModelTieringPolicy(MODELS, BUCKETS)
+
+def test_estimate_tokens_rounds_up():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+@pytest.mark.parametrize("endpoint,prompt_chars,tier", [
+    ("title", 40, "small"),
+    ("title", 41, "standard"),
+    ("pack", 200, "standard"),
+    ("pack", 201, "large"),
+    ("unknown", 10000, "standard"),
+])
+def test_choose_picks_tier_by_endpoint_and_size(policy, endpoint, prompt_chars, tier):
+    decision = policy.choose(endpoint, "x" * prompt_chars)
+
+    assert decision.tier == tier
+    assert decision.model == MODELS[tier]
+    assert decision.estimated_tokens == estimate_tokens("x" * prompt_chars)
+
+def test_decisions_are_recorded_per_tier(policy):
+    policy.choose("title", "short")
+    policy.choose("title", "short")
+    policy.choose("pack", "x" * 400)
+
+    assert metrics.counter('llm_tier_decisions_total', labels={'endpoint': 'title', 'tier': 'small'}) == 2
+    assert metrics.counter('llm_tier_decisions_total', labels={'endpoint': 'pack', 'tier': 'large'}) == 1
+    assert metrics.observation_count('llm_prompt_tokens_estimated', labels={'endpoint': 'pack', 'tier': 'large'}) == 1
+
+def test_explicit_model_bypasses_buckets(policy):
+    decision = policy.explicit("title", "short", "gpt-4")
+
+    assert decision.model == "gpt-4"
+    assert decision.tier == "explicit"
@@ -0,0 +1,61 @@
+import json
+import pytest
+from app.services.structured_output import OUTFIT_SCHEMA, parse_structured
+from app.services.outfit_engine import (
+    NoValidOutfitError, ONE_PIECE, classify_item, read_situation, recommend_outfit
+)
+
+WARDROBE = [{"description": description} for description in [
+    "White linen shirt", "Grey wool sweater", "Black graphic t-shirt",
+    "Navy tailored trousers", "Blue ripped jeans", "Beige linen shorts",
+    "Brown leather loafers", "White sneakers", "Leather sandals", "Waterproof ankle boots",
+    "Navy wool blazer", "Yellow raincoat", "Black leather belt",
+]]
+
+@pytest.mark.parametrize("description,category", [
+    ("Navy wool blazer", "outerwear"),
+    ("Denim shirt jacket", "outerwear"),
+    ("White Oxford shirts", "top"),
+    ("Black dress shoes", "shoes"),
+    ("Red summer dress", ONE_PIECE),
+    ("Mystery object", None),
+])
+def test_classify_item_uses_head_noun(description, category):
+    assert classify_item(description)[0] == category
+
+def test_read_situation():
+    assert read_situation("Job interview at a bank") == (1, 0, False)
+    assert read_situation("Hot day at the beach") == (-1, -1, False)
+    assert read_situation("Rainy winter commute to the office") == (1, 1, True)
+
+def test_formal_situation_gets_formal_outfit_with_outerwear():
+    outfit = recommend_outfit(WARDROBE, "Job interview at a bank")
+
+    assert outfit["top"] == "White linen shirt"
+    assert outfit["bottom"] == "Navy tailored trousers"
+    assert outfit["shoes"] == "Brown leather loafers"
+    assert outfit["outerwear"] == "Navy wool blazer"
+
+def test_hot_casual_situation_gets_light_outfit_without_outerwear():
+    outfit = recommend_outfit(WARDROBE, "Hot day at the beach")
+
+    assert outfit["bottom"] == "Beige linen shorts"
+    assert outfit["shoes"] == "Leather sandals"
+    assert "outerwear" not in outfit
+
+def test_rainy_situation_prefers_rain_gear():
+    outfit = recommend_outfit(WARDROBE, "Rainy walk in the park")
+
+    assert outfit["shoes"] == "Waterproof ankle boots"
+    assert outfit["outerwear"] == "Yellow raincoat"
+
+def test_one_piece_replaces_top_and_bottom():
+    outfit = recommend_outfit([{"description": "Black cocktail dress"}, {"description": "Black heels"}], "Cocktail party")
+
+    assert outfit == {"top": "Black cocktail dress", "bottom": "Black cocktail dress", "shoes": "Black heels"}
+    # Still a complete outfit by the API contract
+    parse_structured(json.dumps(outfit), OUTFIT_SCHEMA)
+
+def test_incomplete_wardrobe_raises():
+    with pytest.raises(NoValidOutfitError):
+        recommend_outfit([{"description": "White shirt"}, {"description": "Blue jeans"}], "Casual dinner")
@@ -0,0 +1,82 @@
+from app.services.prompts import (
+    PROMPT_TEMPLATES, WARDROBE_HEADER, WardrobeFragmentCache, render_prompt, wardrobe_block
+)
+from app.services.versions import UserVersions
+
+def items(*descriptions):
+    return [{"itemId": f"id-{index}", "description": description} for index, description in enumerate(descriptions)]
+
+def test_wardrobe_block_is_independent_of_item_order():
+    first = wardrobe_block(["Blue jeans", "Black  t-shirt", "White sneakers "])
+    second = wardrobe_block(["White sneakers", "Blue jeans", "Black t-shirt"])
+
+    assert first == second
+    assert first == f"{WARDROBE_HEADER}\nBlack t-shirt\nBlue jeans\nWhite sneakers"
+
+def test_render_prompt_puts_static_segments_first():
+    wardrobe = wardrobe_block(["Blue jeans", "Black t-shirt"])
+
+    office = render_prompt("outfit", wardrobe, situation="office")
+    dinner = render_prompt("outfit", wardrobe, situation="dinner")
+
+    shared_prefix = PROMPT_TEMPLATES["outfit"].prefix + wardrobe + "\n\n"
+    assert office.startswith(shared_prefix)
+    assert dinner.startswith(shared_prefix)
+    assert office.endswith("office")
+
+def test_render_prompt_without_wardrobe():
+    prompt = render_prompt("title", situation="Week in Lisbon")
+
+    assert prompt.startswith(PROMPT_TEMPLATES["title"].prefix)
+    assert prompt.endswith("Week in Lisbon")
+    assert WARDROBE_HEADER not in prompt
+
+def test_fragment_cache_reuses_block_until_version_changes():
+    cache = WardrobeFragmentCache(max_users=10)
+    wardrobe = items("Blue jeans", "Black t-shirt")
+
+    first = cache.get("user1", 1, wardrobe)
+    assert cache.get("user1", 1, wardrobe) is first
+
+    changed = [{"itemId": "id-0", "description": "Blue jeans"}, {"itemId": "id-1", "description": "Red t-shirt"}]
+    assert cache.get("user1", 1, changed) is first
+    assert "Red t-shirt" in cache.get("user1", 2, changed)
+
+def test_fragment_cache_misses_when_items_change_under_same_version():
+    cache = WardrobeFragmentCache(max_users=10)
+    cache.get("user1", 1, items("Blue jeans", "Black t-shirt"))
+
+    fragment = cache.get("user1", 1, items("Blue jeans", "Black t-shirt", "White sneakers"))
+
+    assert "White sneakers" in fragment
+
+def test_fragment_cache_evicts_least_recently_used_user():
+    cache = WardrobeFragmentCache(max_users=2)
+    cache.get("user1", 1, items("Blue jeans"))
+    cache.get("user2", 1, items("Grey hoodie"))
+    cache.get("user1", 1, items("Blue jeans"))
+    cache.get("user3", 1, items("White sneakers"))
+
+    assert set(cache._entries) == {"user1", "user3"}
+
+def test_wardrobe_versions_bump_per_user():
+    versions = UserVersions()
+
+    assert versions.get("user1") == 0
+    assert versions.bump("user1") == 1
+    assert versions.get("user1") == 1
+    assert versions.get("user2") == 0
+
+def test_fragment_groups_items_by_category():
+    cache = WardrobeFragmentCache(max_users=10)
+    wardrobe = [
+        {"itemId": "1", "description": "White sneakers", "category": "shoes"},
+        {"itemId": "2", "description": "Blue jeans"},
+        {"itemId": "3", "description": "Black t-shirt", "category": "top"},
+    ]
+
+    fragment = cache.get("user1", 1, wardrobe)
+
+    assert fragment == "\n".join([
+        WARDROBE_HEADER, "Tops:", "Black t-shirt", "Bottoms:", "Blue jeans", "Shoes:", "White sneakers"
+    ])
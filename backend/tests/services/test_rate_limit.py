@@ -1,95 +1,208 @@
 import pytest
 from unittest.mock import Mock, patch
-from datetime import datetime, timezone
-from app.services.rate_limit import RateLimitService, RateLimitError, MAX_REQUESTS_PER_DAY
-from app.clients.dynamodb import DynamoDBError
+from datetime import datetime, timedelta, timezone
+from app.services.rate_limit import (
+    RateLimitService, RateLimitError, DailyQuota, TokenBucket, MAX_REQUESTS_PER_DAY, RATE_LIMIT_TABLE
+)
+from app.clients.dynamodb import DynamoDBError, ConditionalCheckFailedError
 from app.config import Config
 
+NOW = datetime(2024, 3, 20, 15, 30, tzinfo=timezone.utc)
+
 @pytest.fixture
 def mock_dynamodb_client():
-    return Mock()
+    client = Mock()
+    client.update_item.return_value = {'userId': 'user1', 'date': '2024-03-20', 'count': 1}
+    return client
 
 @pytest.fixture
 def rate_limit_service(mock_dynamodb_client):
     return RateLimitService(dynamodb_client=mock_dynamodb_client)
 
+@pytest.fixture(autouse=True)
+def fixed_now():
+    with patch('app.services.rate_limit.datetime') as mock_datetime:
+        mock_datetime.now.return_value = NOW
+        yield
+
 def test_first_request_of_day(rate_limit_service, mock_dynamodb_client):
-    # Mock empty response for first request
-    mock_dynamodb_client.get_item.return_value = {}
-    
-    # Test first request
-    result = rate_limit_service.check_and_increment('user1')
-    
-    assert result is True
-    mock_dynamodb_client.get_item.assert_called_once()
-    mock_dynamodb_client.put_item.assert_called_once()
-    # Verify the put_item call had the correct structure
-    put_item_args = mock_dynamodb_client.put_item.call_args[1]
-    assert put_item_args['table_name'] == f'{Config.ENV}-rate-limits'
-    assert put_item_args['item']['userId'] == 'user1'
-    assert put_item_args['item']['count'] == 1
-
-@patch('app.services.rate_limit.datetime')
-def test_increment_existing_count(mock_datetime, rate_limit_service, mock_dynamodb_client):
-    # Mock datetime to return a fixed date
-    mock_datetime.now.return_value = datetime(2024, 3, 20, tzinfo=timezone.utc)
-    
-    # Mock existing record with count < MAX_REQUESTS_PER_DAY
-    mock_dynamodb_client.get_item.return_value = {
-        'Item': {
-            'date': '2024-03-20',
-            'userId': 'user1',
-            'count': 5,
-            'createdAt': '2024-03-20T00:00:00+00:00'
-        }
-    }
-    
-    # Test incrementing count
     result = rate_limit_service.check_and_increment('user1')
-    
+
     assert result is True
-    mock_dynamodb_client.get_item.assert_called_once()
+    # Checked and charged in a single conditional update, with no read first
+    mock_dynamodb_client.get_item.assert_not_called()
     mock_dynamodb_client.update_item.assert_called_once()
-    # Verify the update_item call had the correct structure
     update_args = mock_dynamodb_client.update_item.call_args[1]
     assert update_args['table_name'] == f'{Config.ENV}-rate-limits'
-    assert update_args['key'] == {'date': '2024-03-20', 'userId': 'user1'}
-    assert update_args['update_expression'] == 'SET #count = #count + :inc'
-    assert update_args['expression_attribute_names'] == {'#count': 'count'}
-    assert update_args['expression_attribute_values'] == {':inc': 1}
+    assert update_args['key'] == {'userId': 'user1', 'date': '2024-03-20'}
+    assert '#count = if_not_exists(#count, :zero) + :cost' in update_args['update_expression']
+    assert '#tat = :now + :refill' in update_args['update_expression']
+    assert update_args['expression_attribute_values'][':cost'] == 1
+    assert update_args['return_item_on_condition_failure'] is True
+
+def test_charge_sets_ttl(rate_limit_service, mock_dynamodb_client):
+    rate_limit_service.check_and_increment('user1')
+
+    # The end of 2024-03-20 plus the retention period
+    expected = datetime(2024, 3, 21, tzinfo=timezone.utc) + timedelta(days=Config.RATE_LIMIT_RETENTION_DAYS)
+    values = mock_dynamodb_client.update_item.call_args[1]['expression_attribute_values']
+    assert values[':expiresAt'] == int(expected.timestamp())
 
-@patch('app.services.rate_limit.datetime')
 @patch('app.services.rate_limit.MAX_REQUESTS_PER_DAY', 10)
-def test_rate_limit_exceeded(mock_datetime, rate_limit_service, mock_dynamodb_client):
-    # Mock datetime to return a fixed date
-    mock_datetime.now.return_value = datetime(2024, 3, 20, tzinfo=timezone.utc)
-    
-    # Mock existing record with count >= MAX_REQUESTS_PER_DAY
-    mock_dynamodb_client.get_item.return_value = {
-        'Item': {
-            'id': 'user1:2024-03-20',
-            'userId': 'user1',
-            'count': 10,
-            'createdAt': '2024-03-20T00:00:00+00:00'
-        }
-    }
-    
-    # Test rate limit exceeded
+def test_rate_limit_exceeded(rate_limit_service, mock_dynamodb_client):
+    mock_dynamodb_client.update_item.side_effect = ConditionalCheckFailedError(
+        'failed', item={'userId': 'user1', 'date': '2024-03-20', 'count': 10}
+    )
+
     with pytest.raises(RateLimitError) as exc_info:
         rate_limit_service.check_and_increment('user1')
-    
+
     assert "Daily rate limit exceeded" in str(exc_info.value)
-    mock_dynamodb_client.get_item.assert_called_once()
+    assert exc_info.value.retry_after is None
+    mock_dynamodb_client.update_item.assert_called_once()
+
+def test_burst_exceeded_says_when_to_retry(rate_limit_service, mock_dynamodb_client):
+    # The bucket is drained and needs 30s more before another unit fits
+    full_at = NOW.timestamp() + Config.RATE_LIMIT_BURST_CAPACITY * Config.RATE_LIMIT_REFILL_SECONDS + 30 - Config.RATE_LIMIT_REFILL_SECONDS
+    mock_dynamodb_client.update_item.side_effect = ConditionalCheckFailedError(
+        'failed', item={'count': 3, 'bucketFullAt': full_at}
+    )
+
+    with pytest.raises(RateLimitError) as exc_info:
+        rate_limit_service.check_and_increment('user1')
+
+    assert exc_info.value.retry_after == 30
+
+def test_stale_state_is_replanned(rate_limit_service, mock_dynamodb_client):
+    # Another process charged a moment ago, so the bucket isn't full any more
+    mock_dynamodb_client.update_item.side_effect = [
+        ConditionalCheckFailedError('failed', item={'count': 2, 'bucketFullAt': NOW.timestamp() + 5}),
+        {'count': 3, 'bucketFullAt': NOW.timestamp() + 25},
+    ]
+
+    assert rate_limit_service.check_and_increment('user1') is True
+
+    first, second = mock_dynamodb_client.update_item.call_args_list
+    assert '#tat = :now + :refill' in first[1]['update_expression']
+    assert '#tat = #tat + :refill' in second[1]['update_expression']
+    assert '#tat BETWEEN :now AND :tatLimit' in second[1]['condition_expression']
+
+def test_next_charge_planned_from_last_state(rate_limit_service, mock_dynamodb_client):
+    mock_dynamodb_client.update_item.return_value = {'count': 1, 'bucketFullAt': NOW.timestamp() + 20}
+
+    rate_limit_service.check_and_increment('user1')
+    rate_limit_service.check_and_increment('user1')
+
+    second = mock_dynamodb_client.update_item.call_args_list[1]
+    assert '#tat = #tat + :refill' in second[1]['update_expression']
+    assert mock_dynamodb_client.update_item.call_count == 2
+
+def test_endpoint_weights(rate_limit_service, mock_dynamodb_client):
+    rate_limit_service.check_and_increment('user1', endpoint='pack')
+    assert mock_dynamodb_client.update_item.call_args[1]['expression_attribute_values'][':cost'] == 2
+
+    # The trip title is paid for by the packing list
+    mock_dynamodb_client.update_item.reset_mock()
+    assert rate_limit_service.check_and_increment('user1', endpoint='title') is True
     mock_dynamodb_client.update_item.assert_not_called()
 
 def test_dynamodb_error_fail_open(rate_limit_service, mock_dynamodb_client):
     # Mock DynamoDB error
-    mock_dynamodb_client.get_item.side_effect = DynamoDBError("DynamoDB error")
-    
+    mock_dynamodb_client.update_item.side_effect = DynamoDBError("DynamoDB error")
+
     # Test fail-open behavior
     result = rate_limit_service.check_and_increment('user1')
-    
+
     assert result is True
-    mock_dynamodb_client.get_item.assert_called_once()
-    mock_dynamodb_client.put_item.assert_not_called()
-    mock_dynamodb_client.update_item.assert_not_called() 
\ No newline at end of file
+    mock_dynamodb_client.update_item.assert_called_once()
+
+@patch('app.services.rate_limit.MAX_REQUESTS_PER_DAY', 10)
+def test_batch_units_exceed_remaining_quota(mock_dynamodb_client):
+    service = RateLimitService(mock_dynamodb_client, algorithms=['daily_quota'])
+    mock_dynamodb_client.update_item.side_effect = ConditionalCheckFailedError(
+        'failed', item={'date': '2024-03-20', 'userId': 'user1', 'count': 8}
+    )
+
+    # 8 + 3 units would go over the limit, so nothing is charged
+    with pytest.raises(RateLimitError):
+        service.check_and_increment('user1', units=3)
+    assert mock_dynamodb_client.update_item.call_args[1]['expression_attribute_values'][':countLimit'] == 7
+
+    # 8 + 2 units fits exactly
+    mock_dynamodb_client.update_item.side_effect = None
+    assert service.check_and_increment('user1', units=2) is True
+    update_args = mock_dynamodb_client.update_item.call_args[1]
+    assert update_args['expression_attribute_values'][':cost'] == 2
+    assert update_args['expression_attribute_values'][':countLimit'] == 8
+
+@patch('app.services.rate_limit.MAX_REQUESTS_PER_DAY', 5)
+def test_first_charge_over_daily_quota_is_rejected(rate_limit_service, mock_dynamodb_client):
+    with pytest.raises(RateLimitError) as exc_info:
+        rate_limit_service.check_and_increment('user1', units=7, endpoint='outfit_batch')
+
+    assert exc_info.value.retry_after is None
+    mock_dynamodb_client.update_item.assert_not_called()
+
+def test_first_charge_over_daily_quota_in_dynamodb(dynamodb_table):
+    service = RateLimitService(dynamodb_table, [DailyQuota(limit=5)])
+
+    with pytest.raises(RateLimitError):
+        service.check_and_increment('user1', units=7, endpoint='outfit_batch')
+
+    assert dynamodb_table.scan(RATE_LIMIT_TABLE)['Items'] == []
+
+def test_token_bucket_lets_oversized_charges_through_a_full_bucket():
+    bucket = TokenBucket(capacity=3, refill_seconds=10)
+    now = NOW.timestamp()
+
+    bucket.check({}, 7, now)
+    bucket.check({'bucketFullAt': now - 1}, 7, now)
+    with pytest.raises(RateLimitError):
+        bucket.check({'bucketFullAt': now + 1}, 7, now)
+
+@pytest.fixture
+def dynamodb_table():
+    moto = pytest.importorskip('moto')
+    from app.clients.dynamodb import DynamoDBClient
+    with moto.mock_aws():
+        dynamodb = DynamoDBClient()
+        dynamodb.client.create_table(
+            TableName=RATE_LIMIT_TABLE,
+            KeySchema=[{'AttributeName': 'userId', 'KeyType': 'HASH'},
+                       {'AttributeName': 'date', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'userId', 'AttributeType': 'S'},
+                                  {'AttributeName': 'date', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield dynamodb
+
+def test_counter_rows_carry_ttl_in_dynamodb(dynamodb_table):
+    service = RateLimitService(dynamodb_table)
+
+    service.check_and_increment('user1')
+    service.check_and_increment('user1')
+
+    row, = dynamodb_table.scan(RATE_LIMIT_TABLE)['Items']
+    assert row['count'] == 2
+    assert row['expiresAt'] > NOW.timestamp() + Config.RATE_LIMIT_RETENTION_DAYS * 86400
+
+def test_limits_in_dynamodb_across_processes(dynamodb_table):
+    algorithms = lambda: [DailyQuota(limit=5), TokenBucket(capacity=3, refill_seconds=10)]
+    first, second = RateLimitService(dynamodb_table, algorithms()), RateLimitService(dynamodb_table, algorithms())
+
+    # The burst allowance is shared: the second process's view of the bucket is stale
+    assert first.check_and_increment('user1', endpoint='pack') is True
+    assert second.check_and_increment('user1') is True
+    with pytest.raises(RateLimitError) as exc_info:
+        first.check_and_increment('user1')
+    assert exc_info.value.retry_after == 10
+
+    # Once the bucket refills, the daily quota is what stops the user
+    with patch('app.services.rate_limit.datetime') as later:
+        later.now.return_value = NOW + timedelta(minutes=5)
+        assert second.check_and_increment('user1', units=2) is True
+        with pytest.raises(RateLimitError) as exc_info:
+            first.check_and_increment('user1')
+    assert exc_info.value.retry_after is None
+    row, = dynamodb_table.scan(RATE_LIMIT_TABLE)['Items']
+    assert row['count'] == 5
@@ -1,6 +1,10 @@
 import pytest
 from unittest.mock import Mock, patch
 from app.services.recommendations import RecommendationsService, InsufficientWardrobeError
+from app.services.prompts import wardrobe_block
+from app.services.rate_limit import RateLimitError
+from app.services.concurrency import LLMOverloadedError
+from app.services.feedback_ranker import FeedbackRanker, InMemoryAffinityStore
 
 @pytest.fixture
 def mock_llm_service():
@@ -86,9 +90,216 @@ def test_get_outfit_recommendation_llm_error(recommendations_service, mock_llm_s
     mock_llm_service.get_completion.side_effect = Exception("LLM error")
     
     # Act & Assert
-    with pytest.raises(Exception) as exc_info:
-        recommendations_service.get_outfit_recommendation(user_id, situation)
+    with patch('app.services.recommendations.Config.OUTFIT_FALLBACK_ENABLED', False):
+        with pytest.raises(Exception) as exc_info:
+            recommendations_service.get_outfit_recommendation(user_id, situation)
     
     assert str(exc_info.value) == "LLM error"
     mock_wardrobe_service.get_wardrobe_items.assert_called_once_with(user_id)
-    mock_llm_service.get_completion.assert_called_once() 
\ No newline at end of file
+    mock_llm_service.get_completion.assert_called_once() 
+def test_get_batch_outfit_recommendations_single_completion(recommendations_service, mock_llm_service, mock_wardrobe_service):
+    # Arrange
+    user_id = "test_user"
+    situations = ["office meeting", "casual dinner"]
+    mock_wardrobe_service.get_wardrobe_items.return_value = [
+        {"description": "Black t-shirt"},
+        {"description": "Blue jeans"},
+        {"description": "White sneakers"}
+    ]
+    mock_llm_service.get_completion.return_value = {
+        "outfits": [
+            {"situation": 2, "top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"},
+            {"situation": 1, "top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+        ]
+    }
+
+    # Act
+    recommendations = recommendations_service.get_batch_outfit_recommendations(user_id, situations)
+
+    # Assert
+    assert recommendations == [
+        {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"},
+        {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+    ]
+    mock_wardrobe_service.get_wardrobe_items.assert_called_once_with(user_id)
+    mock_llm_service.get_completion.assert_called_once()
+    prompt = mock_llm_service.get_completion.call_args[0][0]
+    assert "1. office meeting" in prompt
+    assert "2. casual dinner" in prompt
+    assert mock_llm_service.get_completion.call_args.kwargs["rate_limit_units"] == 2
+
+@patch('app.services.recommendations.Config.BATCH_PROMPT_TOKEN_BUDGET', 100)
+def test_get_batch_outfit_recommendations_chunks_by_token_budget(recommendations_service, mock_llm_service, mock_wardrobe_service):
+    # Arrange
+    situations = ["monday", "tuesday", "wednesday"]
+    mock_wardrobe_service.get_wardrobe_items.return_value = [
+        {"description": "Black t-shirt"},
+        {"description": "Blue jeans"},
+        {"description": "White sneakers"}
+    ]
+    mock_llm_service.get_completion.return_value = {"outfits": [{"situation": 1, "top": "Black t-shirt"}]}
+
+    # Act
+    recommendations = recommendations_service.get_batch_outfit_recommendations("test_user", situations)
+
+    # Assert: each situation gets its own completion, the batch is charged once
+    assert len(recommendations) == 3
+    assert mock_llm_service.get_completion.call_count == 3
+    units = [call.kwargs["rate_limit_units"] for call in mock_llm_service.get_completion.call_args_list]
+    assert units == [3, 0, 0]
+
+@patch('app.services.recommendations.Config.BATCH_PROMPT_TOKEN_BUDGET', 100)
+def test_outfit_missing_from_second_chunk_is_asked_again_without_charge(recommendations_service, mock_llm_service, mock_wardrobe_service):
+    mock_wardrobe_service.get_wardrobe_items.return_value = [
+        {"description": "Black t-shirt"},
+        {"description": "Blue jeans"},
+        {"description": "White sneakers"}
+    ]
+    outfit = {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+    mock_llm_service.get_completion.side_effect = [
+        {"outfits": [{"situation": 1, **outfit}]},
+        {"outfits": []},
+        outfit
+    ]
+
+    recommendations = recommendations_service.get_batch_outfit_recommendations("test_user", ["monday", "tuesday"])
+
+    assert recommendations == [outfit, outfit]
+    calls = mock_llm_service.get_completion.call_args_list
+    assert [call.kwargs["rate_limit_units"] for call in calls] == [2, 0, 0]
+    assert calls[2].kwargs["endpoint"] == "outfit"
+    assert "tuesday" in calls[2].args[0]
+
+@patch('app.services.recommendations.Config.BATCH_PROMPT_TOKEN_BUDGET', 100)
+def test_outfit_missing_from_second_chunk_falls_back_to_local_engine(recommendations_service, mock_llm_service, mock_wardrobe_service):
+    mock_wardrobe_service.get_wardrobe_items.return_value = [
+        {"description": "Black t-shirt"},
+        {"description": "Blue jeans"},
+        {"description": "White sneakers"}
+    ]
+    mock_llm_service.get_completion.side_effect = [
+        {"outfits": [{"situation": 1, "top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}]},
+        Exception("LLM error"),
+        Exception("LLM error")
+    ]
+
+    first, second = recommendations_service.get_batch_outfit_recommendations("test_user", ["monday", "tuesday"])
+
+    assert not hasattr(first, "degraded_reason")
+    assert second.degraded_reason == "llm_unavailable"
+    assert set(second) >= {"top", "bottom", "shoes"}
+
+def test_prompts_share_prefix_for_same_wardrobe(recommendations_service, mock_wardrobe_service, mock_llm_service):
+    items = [{"description": "Black t-shirt"}, {"description": "Blue jeans"}, {"description": "White sneakers"}]
+    mock_wardrobe_service.get_wardrobe_items.return_value = items
+    mock_llm_service.get_completion.return_value = {"top": "Black t-shirt"}
+
+    recommendations_service.get_outfit_recommendation("test_user", "office meeting")
+    mock_wardrobe_service.get_wardrobe_items.return_value = list(reversed(items))
+    recommendations_service.get_outfit_recommendation("test_user", "casual dinner")
+
+    first, second = (call[0][0] for call in mock_llm_service.get_completion.call_args_list)
+    prefix = first[:first.index("office meeting")]
+    assert second.startswith(prefix)
+    assert first.index("Blue jeans") < first.index("office meeting")
+
+def test_wardrobe_fragment_is_shared_across_modes(recommendations_service, mock_wardrobe_service, mock_llm_service):
+    items = [{"itemId": str(index), "description": description}
+             for index, description in enumerate(["Black t-shirt", "Blue jeans", "White sneakers"])]
+    mock_wardrobe_service.get_wardrobe_items.return_value = items
+    mock_wardrobe_service.get_wardrobe_version.return_value = 1
+    mock_llm_service.get_completion.return_value = {}
+
+    with patch('app.services.prompts.wardrobe_block', wraps=wardrobe_block) as render:
+        recommendations_service.get_outfit_recommendation("test_user", "office meeting")
+        recommendations_service.get_items_to_buy_recommendation("test_user", "office meeting")
+        recommendations_service.get_packing_recommendation("test_user", "weekend in Rome")
+        assert render.call_count == 1
+
+        mock_wardrobe_service.get_wardrobe_version.return_value = 2
+        recommendations_service.get_outfit_recommendation("test_user", "office meeting")
+        assert render.call_count == 2
+
+def test_near_duplicate_situation_skips_llm_call(recommendations_service, mock_wardrobe_service, mock_llm_service):
+    mock_wardrobe_service.get_wardrobe_items.return_value = [
+        {"itemId": str(index), "description": description}
+        for index, description in enumerate(["Black t-shirt", "Blue jeans", "White sneakers"])
+    ]
+    mock_wardrobe_service.get_wardrobe_version.return_value = 1
+    mock_llm_service.get_completion.return_value = {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+
+    first = recommendations_service.get_outfit_recommendation("test_user", "casual dinner")
+    second = recommendations_service.get_outfit_recommendation("test_user", "Dinner, casual")
+    recommendations_service.get_outfit_recommendation("test_user", "job interview")
+
+    assert second == first
+    assert mock_llm_service.get_completion.call_count == 2
+
+def test_similar_situation_with_other_weather_calls_llm(recommendations_service, mock_wardrobe_service, mock_llm_service):
+    mock_wardrobe_service.get_wardrobe_items.return_value = [
+        {"itemId": str(index), "description": description}
+        for index, description in enumerate(["Black t-shirt", "Blue jeans", "White sneakers"])
+    ]
+    mock_wardrobe_service.get_wardrobe_version.return_value = 1
+    mock_llm_service.get_completion.return_value = {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+
+    recommendations_service.get_outfit_recommendation("test_user", "hiking trip")
+    recommendations_service.get_outfit_recommendation("test_user", "winter hiking trip")
+
+    assert mock_llm_service.get_completion.call_count == 2
+
+def test_outfit_falls_back_to_local_engine_when_over_quota(recommendations_service, mock_llm_service, mock_wardrobe_service):
+    mock_wardrobe_service.get_wardrobe_items.return_value = [
+        {"description": "Black t-shirt"},
+        {"description": "Blue jeans"},
+        {"description": "White sneakers"},
+        {"description": "Navy blazer"}
+    ]
+    mock_llm_service.get_completion.side_effect = RateLimitError("Daily rate limit exceeded")
+
+    recommendation = recommendations_service.get_outfit_recommendation("test_user", "casual dinner")
+
+    assert recommendation == {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+    assert recommendation.degraded_reason == "rate_limited"
+
+def test_outfit_fallback_reraises_without_complete_outfit(recommendations_service, mock_llm_service, mock_wardrobe_service):
+    mock_wardrobe_service.get_wardrobe_items.return_value = [
+        {"description": "Black t-shirt"},
+        {"description": "Grey hoodie"},
+        {"description": "White sneakers"}
+    ]
+    mock_llm_service.get_completion.side_effect = LLMOverloadedError("Upstream is unavailable", retry_after=5)
+
+    with pytest.raises(LLMOverloadedError):
+        recommendations_service.get_outfit_recommendation("test_user", "casual dinner")
+
+def test_outfit_liked_repeatedly_skips_llm(mock_llm_service, mock_wardrobe_service):
+    ranker = FeedbackRanker(InMemoryAffinityStore(), min_confidence=2)
+    service = RecommendationsService(mock_llm_service, mock_wardrobe_service, feedback_ranker=ranker)
+    liked = {"top": "White oxford shirt", "bottom": "Grey wool trousers", "shoes": "Brown leather loafers"}
+    mock_wardrobe_service.get_wardrobe_items.return_value = [
+        {"description": description} for description in [*liked.values(), "Blue jeans", "White sneakers"]
+    ]
+    ranker.record_feedback("test_user", liked, 2)
+
+    recommendation = service.get_outfit_recommendation("test_user", "client meeting")
+
+    assert recommendation == liked
+    mock_llm_service.get_completion.assert_not_called()
+
+@patch('app.services.recommendations.Config.FEEDBACK_PRESELECT_MIN_ITEMS', 5)
+def test_feedback_preselects_prompt_candidates(mock_llm_service, mock_wardrobe_service):
+    ranker = FeedbackRanker(InMemoryAffinityStore(), candidates_per_category=1)
+    service = RecommendationsService(mock_llm_service, mock_wardrobe_service, feedback_ranker=ranker)
+    mock_wardrobe_service.get_wardrobe_items.return_value = [
+        {"description": description}
+        for description in ["Black t-shirt", "Red polo", "Blue jeans", "Khaki chinos", "White sneakers"]
+    ]
+    mock_llm_service.get_completion.return_value = {"top": "Red polo"}
+    ranker.record_feedback("test_user", {"top": "Red polo", "bottom": "Khaki chinos", "shoes": "White sneakers"}, 1)
+
+    service.get_outfit_recommendation("test_user", "casual dinner")
+
+    prompt = mock_llm_service.get_completion.call_args[0][0]
+    assert "Red polo" in prompt and "Khaki chinos" in prompt
+    assert "Black t-shirt" not in prompt and "Blue jeans" not in prompt
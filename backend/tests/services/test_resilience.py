@@ -0,0 +1,110 @@
+import time
+import pytest
+from unittest.mock import Mock, patch
+from concurrent.futures import ThreadPoolExecutor
+from app.services.llm import LLMService
+from app.services.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, hedged_call
+from app.services.metrics import metrics
+from tests.fake_openai_server import FakeOpenAIServer
+
+@pytest.fixture
+def fake_openai():
+    with FakeOpenAIServer() as server:
+        yield server
+
+@pytest.fixture
+def llm_service(fake_openai):
+    metrics.reset()
+    with patch('app.services.llm.Config.OPENAI_BASE_URL', fake_openai.base_url), \
+         patch('app.services.llm.Config.LLM_RETRY_BASE_DELAY_SECONDS', 0.01), \
+         patch('app.services.llm.Config.LLM_RETRY_MAX_DELAY_SECONDS', 0.02):
+        service = LLMService(rate_limit_service=Mock())
+    yield service
+    service.hedge_executor.shutdown(wait=False)
+
+def test_retries_upstream_errors_then_succeeds(llm_service, fake_openai):
+    outfit = {"top": "Shirt", "bottom": "Jeans", "shoes": "Sneakers"}
+    fake_openai.respond({"status": 500}, {"status": 503}, {"status": 200, "content": outfit})
+
+    assert llm_service.get_completion("prompt", "user1", endpoint="outfit") == outfit
+    assert len(fake_openai.requests) == 3
+    assert metrics.counter('llm_retries_total', labels={'endpoint': 'outfit'}) == 2
+
+def test_does_not_retry_client_errors(llm_service, fake_openai):
+    fake_openai.respond({"status": 400})
+
+    with pytest.raises(Exception) as exc_info:
+        llm_service.get_completion("prompt", "user1")
+
+    assert "Failed to get completion from OpenAI" in str(exc_info.value)
+    assert len(fake_openai.requests) == 1
+
+def test_endpoint_deadline_bounds_slow_upstream(llm_service, fake_openai):
+    fake_openai.respond({"status": 200, "delay": 1})
+
+    started = time.monotonic()
+    with patch.dict('app.services.llm.Config.LLM_DEADLINE_SECONDS', {'title': 0.3}):
+        with pytest.raises(Exception):
+            llm_service.get_completion("prompt", "user1", endpoint="title")
+
+    assert time.monotonic() - started < 0.8
+
+def test_hedged_request_beats_slow_primary(llm_service, fake_openai):
+    llm_service.hedging_enabled = True
+    fake_openai.respond({"status": 200, "delay": 1, "content": {"top": "slow", "bottom": "slow", "shoes": "slow"}},
+                        {"status": 200, "content": {"top": "hedge", "bottom": "hedge", "shoes": "hedge"}})
+
+    started = time.monotonic()
+    with patch('app.services.llm.Config.LLM_HEDGE_DELAY_SECONDS', 0.1):
+        result = llm_service.get_completion("prompt", "user1", endpoint="outfit")
+
+    assert result["top"] == "hedge"
+    assert time.monotonic() - started < 0.8
+    assert metrics.counter('llm_hedges_total', labels={'endpoint': 'outfit'}) == 1
+
+def test_circuit_breaker_fails_fast_against_failing_upstream(llm_service, fake_openai):
+    fake_openai.respond({"status": 500})
+    llm_service.router.routes[0].breaker = CircuitBreaker('llm', failure_rate_threshold=0.5, window_size=4,
+                                                           min_calls=2, reset_timeout=60)
+
+    with pytest.raises(Exception):
+        llm_service.get_completion("prompt", "user1")
+    requests_before = len(fake_openai.requests)
+
+    with pytest.raises(CircuitOpenError):
+        llm_service.get_completion("prompt", "user1")
+    assert len(fake_openai.requests) == requests_before
+
+def test_circuit_breaker_half_open_probe():
+    breaker = CircuitBreaker('test', failure_rate_threshold=0.5, window_size=4, min_calls=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()  # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+def test_retry_policy_delays_are_bounded():
+    policy = RetryPolicy(max_attempts=5, base_delay=0.1, max_delay=0.5)
+
+    delays = list(policy.delays())
+
+    assert len(delays) == 4
+    assert all(0.1 <= delay <= 0.5 for delay in delays)
+
+def test_hedged_call_returns_primary_error_before_hedge():
+    executor = ThreadPoolExecutor(max_workers=2)
+    call = Mock(side_effect=ValueError("bad request"))
+
+    with pytest.raises(ValueError):
+        hedged_call(call, 1.0, executor)
+
+    assert call.call_count == 1
+    executor.shutdown()
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.services.situation_cache import SituationCache, embed_situation
+from app.services.metrics import metrics
+
+OUTFIT = {"top": "Linen shirt", "bottom": "Chinos", "shoes": "Loafers"}
+
+@pytest.fixture
+def cache():
+    metrics.reset()
+    return SituationCache(threshold=0.78, max_entries=3, max_users=2, ttl_seconds=60)
+
+def similarity(first, second):
+    return float(embed_situation(first, 4096) @ embed_situation(second, 4096))
+
+def test_embedding_ignores_case_punctuation_and_word_order():
+    assert similarity("casual dinner", "Dinner, casual") == pytest.approx(1.0)
+    assert np.linalg.norm(embed_situation("casual dinner", 4096)) == pytest.approx(1.0)
+    assert not embed_situation("", 4096).any()
+
+def test_near_duplicates_score_above_unrelated_situations():
+    assert similarity("casual dinner", "Casual dinner with friends") >= 0.78
+    assert similarity("casual dinner with friends", "formal dinner with friends") < 0.78
+    assert similarity("casual dinner", "job interview") < 0.2
+
+def test_lookup_returns_copy_of_similar_recommendation(cache):
+    cache.store("user1", 1, "casual dinner", OUTFIT)
+
+    result = cache.lookup("user1", 1, "Casual dinner with friends")
+
+    assert result == OUTFIT
+    result["top"] = "changed"
+    assert cache.lookup("user1", 1, "casual dinner") == OUTFIT
+    assert metrics.counter('situation_cache_requests_total', labels={'result': 'hit'}) == 2
+    assert metrics.observation_count('situation_cache_similarity') == 2
+
+def test_dissimilar_situation_misses(cache):
+    cache.store("user1", 1, "casual dinner", OUTFIT)
+
+    assert cache.lookup("user1", 1, "job interview") is None
+    assert cache.lookup("user2", 1, "casual dinner") is None
+    assert metrics.counter('situation_cache_requests_total', labels={'result': 'miss'}) == 2
+
+@pytest.mark.parametrize("stored, asked", [
+    ("job interview", "job interview in the rain"),
+    ("hiking trip", "winter hiking trip"),
+    ("office party", "casual office party"),
+])
+def test_similar_text_with_other_weather_or_formality_misses(cache, stored, asked):
+    # Close enough as text to pass the threshold
+    assert similarity(stored, asked) >= 0.78
+    cache.store("user1", 1, stored, OUTFIT)
+
+    assert cache.lookup("user1", 1, asked) is None
+    assert cache.lookup("user1", 1, stored) == OUTFIT
+
+def test_wardrobe_version_change_drops_entries(cache):
+    cache.store("user1", 1, "casual dinner", OUTFIT)
+
+    assert cache.lookup("user1", 2, "casual dinner") is None
+    assert cache.lookup("user1", 1, "casual dinner") is None
+
+def test_keeps_most_recent_entries_per_user(cache):
+    for situation in ("beach wedding", "job interview", "hiking trip", "office party"):
+        cache.store("user1", 1, situation, {"top": situation})
+
+    assert cache.lookup("user1", 1, "beach wedding") is None
+    assert cache.lookup("user1", 1, "office party") == {"top": "office party"}
+
+def test_expired_entries_miss(cache):
+    with patch('app.services.situation_cache.time.monotonic', return_value=0):
+        cache.store("user1", 1, "casual dinner", OUTFIT)
+    with patch('app.services.situation_cache.time.monotonic', return_value=61):
+        assert cache.lookup("user1", 1, "casual dinner") is None
+
+def test_evicts_least_recently_used_user(cache):
+    for user_id in ("user1", "user2", "user3"):
+        cache.store(user_id, 1, "casual dinner", OUTFIT)
+
+    assert cache.lookup("user1", 1, "casual dinner") is None
+    assert cache.lookup("user3", 1, "casual dinner") == OUTFIT
@@ -0,0 +1,61 @@
+import pytest
+from app.services.structured_output import RESPONSE_SCHEMAS, StructuredOutputError, parse_structured
+
+OUTFIT = RESPONSE_SCHEMAS['outfit']
+
+def test_valid_response_needs_no_repair():
+    data, repaired = parse_structured('{"top": "Shirt", "bottom": "Jeans", "shoes": "Sneakers"}', OUTFIT)
+
+    assert data == {"top": "Shirt", "bottom": "Jeans", "shoes": "Sneakers"}
+    assert repaired is False
+
+@pytest.mark.parametrize("text", [
+    '```json\n{"top": "Shirt", "bottom": "Jeans", "shoes": "Sneakers"}\n```',
+    'Here you go: {"top": "Shirt", "bottom": "Jeans", "shoes": "Sneakers",} Enjoy!',
+    '{"top": "Shirt", "bottom": "Jeans", "shoes": "Sneakers", "outerwear": "Den',
+    '{"top": "Shirt", "bottom": "Jeans", "shoes": "Sneakers", "accessories"',
+    '{"outfit": {"top": "Shirt", "bottom": "Jeans", "shoes": "Sneakers"}}',
+])
+def test_repairs_malformed_json(text):
+    data, repaired = parse_structured(text, OUTFIT)
+
+    assert {key: data[key] for key in ("top", "bottom", "shoes")} == \
+        {"top": "Shirt", "bottom": "Jeans", "shoes": "Sneakers"}
+    assert repaired is True
+
+def test_coerces_wrong_shapes_and_fills_optional_lists():
+    text = '{"tops": "White shirt", "bottoms": ["Chinos", null], "shoes": [{"pair": "Loafers"}], "outerwear": null}'
+
+    data, repaired = parse_structured(text, RESPONSE_SCHEMAS['pack'])
+
+    assert data == {"tops": ["White shirt"], "bottoms": ["Chinos"], "shoes": ["Loafers"],
+                    "outerwear": [], "accessories": []}
+    assert repaired is True
+
+def test_lists_joined_into_text_fields():
+    data, _ = parse_structured('{"top": "Shirt", "bottom": "Jeans", "shoes": "Sneakers", "accessories": ["Belt", "Watch"]}', OUTFIT)
+
+    assert data["accessories"] == "Belt, Watch"
+
+def test_batch_situation_numbers_are_coerced():
+    text = '{"outfits": [{"situation": "1", "top": "Shirt", "bottom": "Jeans", "shoes": "Sneakers"}]}'
+
+    data, _ = parse_structured(text, RESPONSE_SCHEMAS['outfit_batch'])
+
+    assert data["outfits"][0]["situation"] == 1
+
+@pytest.mark.parametrize("text", [
+    'invalid json',
+    '{"top": "Shirt"}',
+    '{"top": "Shirt", "bottom": "", "shoes": "Sneakers"}',
+    '["Shirt", "Jeans"]',
+])
+def test_unrepairable_responses_raise(text):
+    with pytest.raises(StructuredOutputError):
+        parse_structured(text, OUTFIT)
+
+def test_without_schema_only_parses_json():
+    data, repaired = parse_structured('```\n{"anything": 1}\n```')
+
+    assert data == {"anything": 1}
+    assert repaired is True
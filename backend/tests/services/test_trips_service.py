@@ -123,4 +123,16 @@ def test_delete_trip_dynamodb_error(trips_service, mock_dynamodb):
     
     # Act & Assert
     with pytest.raises(DynamoDBError):
-        trips_service.delete_trip(user_id, trip_id) 
\ No newline at end of file
+        trips_service.delete_trip(user_id, trip_id) 
+def test_writes_change_trips_etag(trips_service, mock_dynamodb):
+    etag = trips_service.get_trips_etag("test_user")
+
+    trips_service.save_trip("test_user", "Weekend in Rome", {"tops": ["White shirt"]})
+    saved = trips_service.get_trips_etag("test_user")
+    assert saved != etag
+
+    mock_dynamodb.get_item.return_value = {"Item": {"tripId": "trip_123"}}
+    mock_dynamodb.delete_item.side_effect = DynamoDBError("Test error")
+    with pytest.raises(DynamoDBError):
+        trips_service.delete_trip("test_user", "trip_123")
+    assert trips_service.get_trips_etag("test_user") == saved
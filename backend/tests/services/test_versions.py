@@ -0,0 +1,27 @@
+from unittest.mock import patch
+from app.services.versions import UserVersions
+
+def test_etag_changes_on_bump_only_for_that_user():
+    versions = UserVersions(etag_ttl_seconds=60)
+    etag = versions.etag("user1")
+
+    assert versions.etag("user1") == etag
+    assert versions.etag("user1", "top") != etag
+
+    other = versions.etag("user2")
+    versions.bump("user1")
+
+    assert versions.etag("user1") != etag
+    assert versions.etag("user2") == other
+
+def test_etag_rolls_over_after_ttl():
+    versions = UserVersions(etag_ttl_seconds=60)
+    with patch("app.services.versions.time.monotonic", return_value=100.0):
+        etag = versions.etag("user1")
+    with patch("app.services.versions.time.monotonic", return_value=159.0):
+        assert versions.etag("user1") == etag
+    with patch("app.services.versions.time.monotonic", return_value=161.0):
+        assert versions.etag("user1") != etag
+
+def test_etags_differ_across_processes():
+    assert UserVersions().etag("user1") != UserVersions().etag("user1")
@@ -0,0 +1,110 @@
+import pytest
+from unittest.mock import Mock
+from app.clients.dynamodb import ConditionalCheckFailedError
+from app.services.wardrobe_changes import CursorExpiredError, WardrobeChangeLog
+
+@pytest.fixture
+def mock_dynamodb():
+    dynamodb = Mock()
+    dynamodb.get_item.return_value = {}
+    return dynamodb
+
+@pytest.fixture
+def change_log(mock_dynamodb):
+    return WardrobeChangeLog(mock_dynamodb)
+
+def head(last_seq, compacted_through=0):
+    return {"Item": {"userId": "u", "seq": 0, "lastSeq": last_seq, "compactedThrough": compacted_through}}
+
+WRITE = {"Delete": {"TableName": "wardrobe", "Key": {"userId": "u", "itemId": "a"}}}
+
+def test_commit_retries_with_next_seq_after_losing_race(change_log, mock_dynamodb):
+    mock_dynamodb.get_item.side_effect = [head(3), head(4)]
+    mock_dynamodb.transact_write.side_effect = [ConditionalCheckFailedError("raced"), True]
+
+    assert change_log.commit("u", WRITE, "delete", "a") == 5
+
+    first, second = [call.args[0] for call in mock_dynamodb.transact_write.call_args_list]
+    assert first[1]["Put"]["Item"]["seq"] == 4
+    assert second[1]["Put"]["Item"]["seq"] == 5
+    assert second[2]["Update"]["ExpressionAttributeValues"] == {":seq": 5, ":last": 4}
+
+def test_commit_reraises_when_write_condition_fails(change_log, mock_dynamodb):
+    mock_dynamodb.get_item.return_value = head(3)
+    mock_dynamodb.transact_write.side_effect = ConditionalCheckFailedError("item gone")
+
+    with pytest.raises(ConditionalCheckFailedError):
+        change_log.commit("u", WRITE, "delete", "a")
+    mock_dynamodb.transact_write.assert_called_once()
+
+def test_changes_since_returns_puts_and_tombstones(change_log, mock_dynamodb):
+    mock_dynamodb.get_item.return_value = head(7)
+    mock_dynamodb.query.return_value = {"Items": [
+        {"seq": 6, "op": "put", "itemId": "b", "item": {"itemId": "b", "description": "Blue jeans"}},
+        {"seq": 7, "op": "delete", "itemId": "a"},
+    ]}
+
+    result = change_log.changes_since("u", 5)
+
+    assert result == {
+        "changes": [
+            {"op": "put", "itemId": "b", "item": {"itemId": "b", "description": "Blue jeans"}},
+            {"op": "delete", "itemId": "a"},
+        ],
+        "cursor": 7,
+        "hasMore": False,
+    }
+    assert mock_dynamodb.query.call_args.kwargs["expression_attribute_values"] == {":user_id": "u", ":since": 5}
+
+def test_changes_since_without_changes_keeps_cursor(change_log, mock_dynamodb):
+    mock_dynamodb.query.return_value = {"Items": []}
+
+    assert change_log.changes_since("u", 0) == {"changes": [], "cursor": 0, "hasMore": False}
+
+def test_changes_since_expired_cursor(change_log, mock_dynamodb):
+    mock_dynamodb.get_item.return_value = head(20, compacted_through=10)
+
+    with pytest.raises(CursorExpiredError):
+        change_log.changes_since("u", 9)
+    mock_dynamodb.query.assert_not_called()
+
+def test_compact_drops_superseded_rows_and_old_tombstones(change_log, mock_dynamodb):
+    mock_dynamodb.query.side_effect = [
+        {"Items": [
+            {"seq": 1, "op": "put", "itemId": "a", "changedAt": "2020-01-01T00:00:00+00:00"},
+            {"seq": 2, "op": "put", "itemId": "b", "changedAt": "2020-01-01T00:00:00+00:00"},
+        ], "LastEvaluatedKey": {"userId": "u", "seq": 2}},
+        {"Items": [
+            {"seq": 3, "op": "delete", "itemId": "a", "changedAt": "2020-01-02T00:00:00+00:00"},
+            {"seq": 4, "op": "put", "itemId": "c", "changedAt": "2020-01-02T00:00:00+00:00"},
+            {"seq": 5, "op": "put", "itemId": "c", "changedAt": "2999-01-01T00:00:00+00:00"},
+        ]},
+    ]
+
+    assert change_log.compact("u", tombstone_ttl_seconds=86400) == 3
+
+    assert mock_dynamodb.update_item.call_args.kwargs["expression_attribute_values"] == {":horizon": 3}
+    deleted = sorted(call.kwargs["key"]["seq"] for call in mock_dynamodb.delete_item.call_args_list)
+    assert deleted == [1, 3, 4]
+
+def test_compact_keeps_recent_tombstones(change_log, mock_dynamodb):
+    mock_dynamodb.query.return_value = {"Items": [
+        {"seq": 1, "op": "put", "itemId": "a", "changedAt": "2999-01-01T00:00:00+00:00"},
+        {"seq": 2, "op": "delete", "itemId": "a", "changedAt": "2999-01-01T00:00:00+00:00"},
+    ]}
+
+    assert change_log.compact("u", tombstone_ttl_seconds=86400) == 1
+
+    mock_dynamodb.update_item.assert_not_called()
+    mock_dynamodb.delete_item.assert_called_once_with(table_name=change_log.table_name, key={"userId": "u", "seq": 1})
+
+def test_commit_many_uses_consecutive_seqs_and_one_head_update(change_log, mock_dynamodb):
+    mock_dynamodb.get_item.return_value = head(3)
+    writes = [{"Delete": {"TableName": "wardrobe", "Key": {"userId": "u", "itemId": item_id}}} for item_id in ("a", "b")]
+
+    assert change_log.commit_many("u", [(writes[0], "delete", "a", None), (writes[1], "delete", "b", None)]) == [4, 5]
+
+    operations = mock_dynamodb.transact_write.call_args.args[0]
+    assert operations[:2] == writes
+    assert [operation["Put"]["Item"]["seq"] for operation in operations[2:4]] == [4, 5]
+    assert operations[4]["Update"]["ExpressionAttributeValues"] == {":seq": 5, ":last": 3}
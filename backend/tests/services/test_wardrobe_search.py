@@ -0,0 +1,49 @@
+from unittest.mock import patch
+from app.services.wardrobe_search import WardrobeIndex, WardrobeSearchIndexes
+
+def items(*descriptions):
+    return [{"itemId": str(index), "description": description} for index, description in enumerate(descriptions)]
+
+WARDROBE = items("Navy wool blazer", "Navy chinos", "Black blazer", "White t-shirt", "Blue jeans")
+
+def descriptions(results):
+    return [item["description"] for item in results]
+
+def test_search_matches_all_terms_with_prefixes():
+    index = WardrobeIndex(WARDROBE)
+
+    assert descriptions(index.search("navy bla", 10)) == ["Navy wool blazer"]
+    assert descriptions(index.search("blazers", 10)) == ["Black blazer", "Navy wool blazer"]
+    assert descriptions(index.search("shirt", 10)) == ["White t-shirt"]
+    assert index.search("red", 10) == []
+    assert index.search("the", 10) == []
+
+def test_search_ranks_whole_words_above_prefixes():
+    index = WardrobeIndex(items("Bluebell print scarf", "Blue jeans", "Blue blouse"))
+
+    assert descriptions(index.search("blue", 10)) == ["Blue blouse", "Blue jeans", "Bluebell print scarf"]
+
+def test_index_updates_incrementally():
+    index = WardrobeIndex(WARDROBE)
+
+    index.add({"itemId": "9", "description": "Navy raincoat"})
+    index.remove("1")
+
+    assert descriptions(index.search("navy", 10)) == ["Navy raincoat", "Navy wool blazer"]
+    assert "chino" not in index.vocabulary
+
+def test_search_respects_limit():
+    assert len(WardrobeIndex(WARDROBE).search("b", 2)) == 2
+
+def test_indexes_evict_least_recently_used_and_expire():
+    indexes = WardrobeSearchIndexes(max_users=2, ttl_seconds=60)
+    indexes.put("user1", WardrobeIndex(WARDROBE))
+    indexes.put("user2", WardrobeIndex(WARDROBE))
+    indexes.search("user1", "navy", 10)
+    indexes.put("user3", WardrobeIndex(WARDROBE))
+
+    assert indexes.search("user2", "navy", 10) is None
+    assert indexes.search("user1", "navy", 10) is not None
+
+    with patch("app.services.wardrobe_search.time.monotonic", return_value=1e12):
+        assert indexes.search("user1", "navy", 10) is None
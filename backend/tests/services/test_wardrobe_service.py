@@ -0,0 +1,118 @@
+import pytest
+from unittest.mock import Mock
+from app.clients.dynamodb import ConditionalCheckFailedError
+from app.services.item_classifier import CLASSIFIER_VERSION
+from app.services.wardrobe import WardrobeService
+
+@pytest.fixture
+def mock_dynamodb():
+    dynamodb = Mock()
+    dynamodb.get_item.return_value = {}
+    return dynamodb
+
+@pytest.fixture
+def wardrobe_service(mock_dynamodb):
+    return WardrobeService(mock_dynamodb)
+
+def test_add_wardrobe_item_stores_classification(wardrobe_service, mock_dynamodb):
+    wardrobe_service.add_wardrobe_item("test_user", "item-1", "Black leather boots")
+
+    write, change, head = mock_dynamodb.transact_write.call_args.args[0]
+    item = write["Put"]["Item"]
+    assert item["category"] == "shoes"
+    assert item["colors"] == ["black"]
+    assert item["normalizedKey"] == "black boot leather"
+    assert change["Put"]["Item"]["op"] == "put"
+    assert change["Put"]["Item"]["item"] == item
+    assert head["Update"]["ExpressionAttributeValues"] == {":seq": 1, ":last": 0}
+    assert wardrobe_service.get_wardrobe_version("test_user") == 1
+
+def test_delete_wardrobe_item_leaves_tombstone(wardrobe_service, mock_dynamodb):
+    mock_dynamodb.get_item.return_value = {"Item": {"userId": "test_user", "seq": 0, "lastSeq": 4}}
+
+    assert wardrobe_service.delete_wardrobe_item("test_user", "item-1") is True
+
+    write, change, _ = mock_dynamodb.transact_write.call_args.args[0]
+    assert write["Delete"]["Key"] == {"userId": "test_user", "itemId": "item-1"}
+    assert change["Put"]["Item"]["seq"] == 5
+    assert change["Put"]["Item"]["op"] == "delete"
+    assert "item" not in change["Put"]["Item"]
+
+def test_get_wardrobe_items_filters_by_category(wardrobe_service, mock_dynamodb):
+    mock_dynamodb.query.return_value = {"Items": [
+        {"itemId": "1", "description": "Blue jeans", "category": "bottom"},
+        {"itemId": "2", "description": "Grey chinos"},
+        {"itemId": "3", "description": "White t-shirt", "category": "top"},
+    ]}
+
+    items = wardrobe_service.get_wardrobe_items("test_user", category="bottom")
+
+    assert [item["itemId"] for item in items] == ["1", "2"]
+
+def test_find_duplicates(wardrobe_service, mock_dynamodb):
+    mock_dynamodb.query.return_value = {"Items": [
+        {"itemId": "1", "description": "Blue jeans", "normalizedKey": "blue jean"},
+        {"itemId": "2", "description": "Jeans (blue)"},
+        {"itemId": "3", "description": "Black jeans"},
+    ]}
+
+    duplicates = wardrobe_service.find_duplicates("test_user", "blue JEANS")
+
+    assert [item["itemId"] for item in duplicates] == ["1", "2"]
+
+def test_find_duplicates_reads_the_wardrobe_once(wardrobe_service, mock_dynamodb):
+    mock_dynamodb.query.return_value = {"Items": [
+        {"itemId": "1", "description": "Blue jeans", "normalizedKey": "blue jean"},
+    ]}
+
+    assert wardrobe_service.find_duplicates("test_user", "Red scarf") == []
+    wardrobe_service.add_wardrobe_item("test_user", "2", "Scarf, red")
+    duplicates = wardrobe_service.find_duplicates("test_user", "red scarfs")
+
+    # Later inserts are checked against the index, which the add kept up to date
+    assert [item["itemId"] for item in duplicates] == ["2"]
+    mock_dynamodb.query.assert_called_once()
+
+    wardrobe_service.delete_wardrobe_item("test_user", "2")
+    assert wardrobe_service.find_duplicates("test_user", "Red scarf") == []
+    mock_dynamodb.query.assert_called_once()
+
+def test_categorize_item_skips_current_version(wardrobe_service, mock_dynamodb):
+    item = {"itemId": "1", "description": "Blue jeans", "classifierVersion": CLASSIFIER_VERSION}
+
+    assert wardrobe_service.categorize_item("test_user", item) is False
+    mock_dynamodb.transact_write.assert_not_called()
+
+def test_categorize_item_updates_existing_item_only(wardrobe_service, mock_dynamodb):
+    assert wardrobe_service.categorize_item("test_user", {"itemId": "1", "description": "Blue jeans"}) is True
+    update = mock_dynamodb.transact_write.call_args.args[0][0]["Update"]
+    assert update["ConditionExpression"] == "attribute_exists(itemId)"
+    assert update["ExpressionAttributeValues"][":category"] == "bottom"
+
+    mock_dynamodb.transact_write.side_effect = ConditionalCheckFailedError("deleted")
+    assert wardrobe_service.categorize_item("test_user", {"itemId": "2", "description": "Red scarf"}) is False
+
+def test_search_builds_index_once_and_updates_it_on_writes(wardrobe_service, mock_dynamodb):
+    mock_dynamodb.query.return_value = {"Items": [
+        {"itemId": "1", "description": "Navy wool blazer"},
+        {"itemId": "2", "description": "Blue jeans"},
+    ]}
+
+    assert [item["itemId"] for item in wardrobe_service.search_wardrobe_items("test_user", "navy")] == ["1"]
+    wardrobe_service.add_wardrobe_item("test_user", "3", "Navy raincoat")
+    wardrobe_service.delete_wardrobe_item("test_user", "1")
+
+    assert [item["itemId"] for item in wardrobe_service.search_wardrobe_items("test_user", "navy")] == ["3"]
+    mock_dynamodb.query.assert_called_once()
+
+def test_delete_wardrobe_items_in_chunks(wardrobe_service, mock_dynamodb):
+    item_ids = [f"item-{index}" for index in range(60)]
+
+    progress = []
+
+    assert wardrobe_service.delete_wardrobe_items("test_user", item_ids + ["item-0"], progress=progress.append) == 60
+
+    chunks = [call.args[0] for call in mock_dynamodb.transact_write.call_args_list]
+    assert [len(chunk) for chunk in chunks] == [2 * 49 + 1, 2 * 11 + 1]
+    assert progress == [49, 60]
+    assert wardrobe_service.get_wardrobe_version("test_user") == 2
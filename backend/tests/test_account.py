@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import Mock
+from app.services.jobs import JobsService, InMemoryJobStore
+
+@pytest.fixture
+def client():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+
+    def fake_requires_auth(f):
+        def wrapped(*args, **kwargs):
+            from flask import request
+            request.user = {'sub': 'test_user'}
+            return f(*args, **kwargs)
+        wrapped.__name__ = f.__name__
+        return wrapped
+
+    from app.routes import account
+    account.requires_auth = fake_requires_auth
+
+    mock_account_service = Mock()
+    jobs_service = JobsService(InMemoryJobStore(), max_workers=1)
+    from app.routes.account import init_account_routes
+    init_account_routes(app, mock_account_service, jobs_service=jobs_service)
+
+    with app.test_client() as test_client:
+        yield test_client, mock_account_service, jobs_service
+    jobs_service.executor.shutdown(wait=True)
+
+def test_export_streams_ndjson(client):
+    test_client, mock_account_service, _ = client
+    mock_account_service.export.return_value = iter(['{"section":"trips","item":{}}\n', '{"section":"trips","item":{}}\n'])
+
+    response = test_client.get('/me/export')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'attachment' in response.headers['Content-Disposition']
+    assert len(response.data.splitlines()) == 2
+    mock_account_service.export.assert_called_once_with('test_user', 'ndjson')
+
+def test_export_invalid_format(client):
+    test_client, mock_account_service, _ = client
+
+    assert test_client.get('/me/export?format=xml').status_code == 400
+    mock_account_service.export.assert_not_called()
+
+def test_export_error_before_streaming(client):
+    test_client, mock_account_service, _ = client
+
+    def failing():
+        raise Exception("DB error")
+        yield
+    mock_account_service.export.return_value = failing()
+
+    assert test_client.get('/me/export?format=json').status_code == 500
+
+def test_delete_account_runs_as_job(client):
+    test_client, mock_account_service, jobs_service = client
+
+    def delete_account(user_id, progress):
+        progress({'tables': {'trips': {'deleted': 1, 'done': True}}})
+        return {'trips': 1}
+    mock_account_service.delete_account.side_effect = delete_account
+
+    response = test_client.delete('/me')
+    assert response.status_code == 202
+    jobs_service.executor.shutdown(wait=True)
+
+    job = jobs_service.get_job('test_user', response.json['job_id'])
+    assert job['progress'] == {'tables': {'trips': {'deleted': 1, 'done': True}}}
+    assert job['result'] == {'deleted': {'trips': 1}}
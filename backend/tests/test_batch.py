@@ -0,0 +1,88 @@
+import jwt
+import pytest
+from flask import Flask
+from unittest.mock import MagicMock
+from app.routes import auth, batch, interactions, wardrobe
+
+@pytest.fixture
+def client(monkeypatch):
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+
+    # Real authentication, whatever other route tests patched in before
+    for module in (batch, interactions, wardrobe):
+        monkeypatch.setattr(module, "requires_auth", auth.requires_auth)
+
+    wardrobe_service = MagicMock()
+    wardrobe_service.get_wardrobe_etag.return_value = "wardrobe-v1"
+    wardrobe_service.get_wardrobe_cursor.return_value = 0
+    wardrobe_service.get_wardrobe_items.return_value = []
+    interactions_service = MagicMock()
+    wardrobe.init_wardrobe_routes(app, wardrobe_service)
+    interactions.init_interaction_routes(app, interactions_service)
+    batch.init_batch_routes(app, wardrobe_service)
+
+    token = jwt.encode({"sub": "user-123"}, auth.JWT_SECRET, algorithm=auth.JWT_ALGORITHM)
+    with app.test_client() as test_client:
+        yield test_client, {"Authorization": f"Bearer {token}"}, wardrobe_service, interactions_service
+
+def test_batch_dispatches_and_coalesces(client):
+    test_client, headers, wardrobe_service, interactions_service = client
+
+    response = test_client.post("/batch", headers=headers, json={"requests": [
+        {"method": "DELETE", "path": "/wardrobe/a"},
+        {"method": "PATCH", "path": "/interactions/rec_1/feedback", "body": {"feedback": 1}},
+        {"method": "DELETE", "path": "/wardrobe/b"},
+        {"method": "PATCH", "path": "/interactions/rec_2/feedback", "body": {"feedback": 5}},
+        {"method": "GET", "path": "/wardrobe", "headers": {"If-None-Match": '"wardrobe-v1"'}},
+    ]})
+
+    assert response.status_code == 200
+    results = response.get_json()["responses"]
+    assert [result["status"] for result in results] == [200, 200, 200, 400, 304]
+    assert results[4]["etag"] == '"wardrobe-v1"'
+    wardrobe_service.delete_wardrobe_items.assert_called_once_with("user-123", ["a", "b"])
+    wardrobe_service.delete_wardrobe_item.assert_not_called()
+    interactions_service.update_interaction_feedback.assert_called_once_with("user-123", "rec_1", 1)
+
+def test_batch_requires_auth(client):
+    test_client, _, wardrobe_service, _ = client
+
+    response = test_client.post("/batch", json={"requests": [{"method": "DELETE", "path": "/wardrobe/a"}]})
+
+    assert response.status_code == 401
+    wardrobe_service.delete_wardrobe_items.assert_not_called()
+
+def test_batch_rejects_invalid_sub_requests(client):
+    test_client, headers, _, _ = client
+
+    response = test_client.post("/batch", headers=headers, json={"requests": [
+        {"method": "POST", "path": "/batch"},
+        {"method": "TRACE", "path": "/wardrobe"},
+        {"path": "wardrobe"},
+        {"method": "GET", "path": "/nowhere"},
+    ]})
+
+    assert [result["status"] for result in response.get_json()["responses"]] == [400, 400, 400, 404]
+
+def test_batch_limits_size(client, monkeypatch):
+    test_client, headers, _, _ = client
+    monkeypatch.setattr(batch.Config, "MAX_BATCH_REQUESTS", 1)
+
+    response = test_client.post("/batch", headers=headers, json={"requests": [
+        {"method": "GET", "path": "/wardrobe"},
+        {"method": "GET", "path": "/wardrobe"},
+    ]})
+
+    assert response.status_code == 400
+
+def test_coalesced_failure_fails_each_sub_request(client):
+    test_client, headers, wardrobe_service, _ = client
+    wardrobe_service.delete_wardrobe_items.side_effect = Exception("DB error")
+
+    response = test_client.post("/batch", headers=headers, json={"requests": [
+        {"method": "DELETE", "path": "/wardrobe/a"},
+        {"method": "DELETE", "path": "/wardrobe/b"},
+    ]})
+
+    assert [result["status"] for result in response.get_json()["responses"]] == [500, 500]
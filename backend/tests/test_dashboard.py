@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import Mock
+
+@pytest.fixture
+def client():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+
+    def fake_requires_auth(f):
+        def wrapped(*args, **kwargs):
+            from flask import request
+            request.user = {'sub': 'test_user'}
+            return f(*args, **kwargs)
+        wrapped.__name__ = f.__name__
+        return wrapped
+
+    from app.routes import dashboard
+    dashboard.requires_auth = fake_requires_auth
+
+    mock_dashboard_service = Mock()
+    mock_dashboard_service.get_dashboard_etag.return_value = "dashboard-v1"
+    from app.routes.dashboard import init_dashboard_routes
+    init_dashboard_routes(app, mock_dashboard_service)
+
+    with app.test_client() as test_client:
+        yield test_client, mock_dashboard_service
+
+def test_get_dashboard(client):
+    test_client, mock_dashboard_service = client
+    document = {"wardrobe": {"items": [], "hasMore": False}, "trip": None, "interactions": []}
+    mock_dashboard_service.get_dashboard.return_value = document
+
+    response = test_client.get('/me/dashboard')
+
+    assert response.status_code == 200
+    assert response.json == document
+    assert response.headers['ETag'] == '"dashboard-v1"'
+    mock_dashboard_service.get_dashboard.assert_called_once_with('test_user')
+
+def test_get_dashboard_not_modified(client):
+    test_client, mock_dashboard_service = client
+
+    response = test_client.get('/me/dashboard', headers={'If-None-Match': '"dashboard-v1"'})
+
+    assert response.status_code == 304
+    mock_dashboard_service.get_dashboard.assert_not_called()
+
+def test_get_dashboard_error(client):
+    test_client, mock_dashboard_service = client
+    mock_dashboard_service.get_dashboard.side_effect = Exception("Test error")
+
+    response = test_client.get('/me/dashboard')
+
+    assert response.status_code == 500
@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import Mock
+from app.services.jobs import JobsService, InMemoryJobStore
+
+@pytest.fixture
+def client():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+
+    def fake_requires_auth(f):
+        def wrapped(*args, **kwargs):
+            from flask import request
+            request.user = {'sub': 'test_user'}
+            return f(*args, **kwargs)
+        wrapped.__name__ = f.__name__
+        return wrapped
+
+    from app.routes import interactions
+    interactions.requires_auth = fake_requires_auth
+
+    mock_interactions_service = Mock()
+    mock_interactions_service.get_interactions_etag.return_value = "interactions-v1"
+    jobs_service = JobsService(InMemoryJobStore(), max_workers=1)
+    from app.routes.interactions import init_interaction_routes
+    init_interaction_routes(app, mock_interactions_service, jobs_service=jobs_service)
+
+    with app.test_client() as test_client:
+        yield test_client, mock_interactions_service, jobs_service
+    jobs_service.executor.shutdown(wait=True)
+
+def test_get_interactions_not_modified(client):
+    test_client, mock_interactions_service, _ = client
+
+    response = test_client.get('/interactions', headers={'If-None-Match': '"interactions-v1"'})
+
+    assert response.status_code == 304
+    mock_interactions_service.get_user_interactions.assert_not_called()
+
+def test_delete_interactions_inline(client):
+    test_client, mock_interactions_service, _ = client
+    mock_interactions_service.delete_interactions.return_value = 2
+
+    response = test_client.post('/interactions/delete', json={'interactionIds': ['rec_1', 'buy_1']})
+
+    assert response.status_code == 200
+    assert response.json == {'deleted': 2}
+
+def test_delete_interactions_large_set_runs_as_job(client, monkeypatch):
+    test_client, mock_interactions_service, jobs_service = client
+    from app.routes import bulk
+    monkeypatch.setattr(bulk.Config, 'BULK_DELETE_SYNC_MAX_ITEMS', 1)
+
+    def delete_interactions(user_id, interaction_ids, progress):
+        progress(1)
+        return len(interaction_ids)
+    mock_interactions_service.delete_interactions.side_effect = delete_interactions
+
+    response = test_client.post('/interactions/delete', json={'interactionIds': ['rec_1', 'buy_1']})
+    assert response.status_code == 202
+    jobs_service.executor.shutdown(wait=True)
+
+    job = jobs_service.get_job('test_user', response.json['job_id'])
+    assert job['progress'] == {'deleted': 1, 'total': 2}
+    assert job['result'] == {'deleted': 2}
+
+def test_clear_interactions_runs_as_job(client):
+    test_client, mock_interactions_service, jobs_service = client
+    mock_interactions_service.clear_interactions.return_value = 7
+
+    response = test_client.delete('/interactions')
+    assert response.status_code == 202
+    assert response.headers['Location'] == f"/jobs/{response.json['job_id']}"
+    jobs_service.executor.shutdown(wait=True)
+
+    assert jobs_service.get_job('test_user', response.json['job_id'])['result'] == {'deleted': 7}
@@ -0,0 +1,56 @@
+import pytest
+from flask import Flask, request
+from unittest.mock import Mock
+
+MOCK_USER = {"sub": "test_user"}
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+
+    # Override requires_auth decorator
+    def fake_requires_auth(f):
+        def wrapped(*args, **kwargs):
+            request.user = MOCK_USER
+            return f(*args, **kwargs)
+        wrapped.__name__ = f.__name__
+        return wrapped
+
+    # Monkey patch it into jobs module before init
+    from app.routes import jobs
+    jobs.requires_auth = fake_requires_auth
+
+    mock_jobs_service = Mock()
+    from app.routes.jobs import init_job_routes
+    init_job_routes(app, mock_jobs_service)
+
+    with app.test_client() as test_client:
+        yield test_client, mock_jobs_service
+
+def test_get_job(client):
+    test_client, mock_jobs_service = client
+    job = {
+        "job_id": "job1",
+        "type": "outfit_recommendation",
+        "status": "succeeded",
+        "created_at": "2024-03-21T12:00:00+00:00",
+        "status_code": 200,
+        "result": {"outfit": {"top": "Shirt"}, "interaction_id": "rec_1"}
+    }
+    mock_jobs_service.get_job.return_value = job
+
+    response = test_client.get('/jobs/job1')
+
+    assert response.status_code == 200
+    assert response.json == job
+    mock_jobs_service.get_job.assert_called_once_with("test_user", "job1")
+
+def test_get_job_not_found(client):
+    test_client, mock_jobs_service = client
+    mock_jobs_service.get_job.return_value = None
+
+    response = test_client.get('/jobs/missing')
+
+    assert response.status_code == 404
+    assert response.json["type"] == "not_found"
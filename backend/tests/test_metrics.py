@@ -0,0 +1,31 @@
+import pytest
+from unittest.mock import patch
+from app.config import Config
+
+@pytest.fixture
+def client():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+
+    from app.routes.metrics import init_metrics_routes
+    init_metrics_routes(app)
+
+    with app.test_client() as test_client, patch.object(Config, 'METRICS_SCRAPE_TOKEN', 'scrape-secret'):
+        yield test_client
+
+def test_get_metrics_with_scrape_token(client):
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+
+    assert response.status_code == 200
+    assert 'counters' in response.json
+
+def test_get_metrics_rejects_unauthenticated_requests(client):
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+def test_get_metrics_disabled_without_scrape_token(client):
+    with patch.object(Config, 'METRICS_SCRAPE_TOKEN', None):
+        response = client.get('/metrics', headers={'Authorization': 'Bearer None'})
+
+    assert response.status_code == 401
@@ -1,7 +1,14 @@
+import threading
 import pytest
 from flask import Flask, request
 from unittest.mock import Mock
 from app.services.recommendations import InsufficientWardrobeError
+from app.services.rate_limit import RateLimitError
+from app.services.idempotency import IdempotencyService, InMemoryIdempotencyStore
+from app.services.concurrency import LLMOverloadedError
+from app.services.jobs import JobsService, InMemoryJobStore
+from app.services.outfit_engine import DegradedOutfit
+from app.config import Config
 
 # Fake JWT payload to simulate authenticated user
 MOCK_USER = {"sub": "test_user"}
@@ -77,6 +84,22 @@ def test_recommend_outfit_success(client):
         user_id=MOCK_USER["sub"], situation=situation, recommendation=recommendation
     )
 
+def test_recommend_outfit_flags_degraded_outfit(client):
+    test_client, mock_recommendations_service, mock_interactions_service, _, _ = client
+    outfit = {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+    mock_recommendations_service.get_outfit_recommendation.return_value = DegradedOutfit(outfit, "rate_limited")
+    mock_interactions_service.save_recommendation_interaction.return_value = "rec_1"
+
+    response = test_client.post('/recommend/wear', json={"situation": "casual dinner"})
+
+    assert response.status_code == 200
+    assert response.json == {
+        "outfit": outfit,
+        "interaction_id": "rec_1",
+        "degraded": True,
+        "degraded_reason": "rate_limited"
+    }
+
 def test_recommend_outfit_missing_situation(client):
     test_client, _, _, _, _ = client
     response = test_client.post('/recommend/wear', json={})
@@ -250,4 +273,234 @@ def test_recommend_packing_list_general_error(client):
     response = test_client.post('/recommend/pack', json={"situation": situation})
     
     assert response.status_code == 500
-    assert response.json == {"error": "Test error"} 
\ No newline at end of file
+    assert response.json == {"error": "Test error"} 
+def test_recommend_outfits_batch_success(client):
+    test_client, mock_recommendations_service, mock_interactions_service, _, _ = client
+    situations = ["Monday office meeting", "Friday team dinner"]
+    recommendations = [
+        {"top": "White shirt", "bottom": "Grey trousers", "shoes": "Loafers"},
+        {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+    ]
+
+    mock_recommendations_service.get_batch_outfit_recommendations.return_value = recommendations
+    mock_interactions_service.save_recommendation_interaction.side_effect = ["rec_1", "rec_2"]
+
+    response = test_client.post('/recommend/wear/batch', json={"situations": situations})
+
+    assert response.status_code == 200
+    assert response.json == {
+        "results": [
+            {"situation": situations[0], "outfit": recommendations[0], "interaction_id": "rec_1"},
+            {"situation": situations[1], "outfit": recommendations[1], "interaction_id": "rec_2"}
+        ]
+    }
+    mock_recommendations_service.get_batch_outfit_recommendations.assert_called_once_with(
+        MOCK_USER["sub"], situations
+    )
+    assert mock_interactions_service.save_recommendation_interaction.call_count == 2
+
+def test_recommend_outfits_batch_flags_degraded_outfits(client):
+    test_client, mock_recommendations_service, mock_interactions_service, _, _ = client
+    outfit = {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+    mock_recommendations_service.get_batch_outfit_recommendations.return_value = [
+        outfit, DegradedOutfit(outfit, "llm_unavailable")
+    ]
+    mock_interactions_service.save_recommendation_interaction.side_effect = ["rec_1", "rec_2"]
+
+    response = test_client.post('/recommend/wear/batch', json={"situations": ["monday", "tuesday"]})
+
+    assert response.status_code == 200
+    first, second = response.json["results"]
+    assert "degraded" not in first
+    assert second["degraded"] is True
+    assert second["degraded_reason"] == "llm_unavailable"
+
+def test_recommend_outfits_batch_invalid_situations(client):
+    test_client, mock_recommendations_service, _, _, _ = client
+
+    assert test_client.post('/recommend/wear/batch', json={}).status_code == 400
+    assert test_client.post('/recommend/wear/batch', json={"situations": []}).status_code == 400
+    assert test_client.post('/recommend/wear/batch', json={"situations": ["ok", ""]}).status_code == 400
+    mock_recommendations_service.get_batch_outfit_recommendations.assert_not_called()
+
+def test_recommend_outfits_batch_too_many_situations(client):
+    test_client, mock_recommendations_service, _, _, _ = client
+    situations = [f"day {i}" for i in range(Config.MAX_BATCH_SITUATIONS + 1)]
+
+    response = test_client.post('/recommend/wear/batch', json={"situations": situations})
+
+    assert response.status_code == 400
+    mock_recommendations_service.get_batch_outfit_recommendations.assert_not_called()
+
+def test_recommend_outfits_batch_rate_limited(client):
+    test_client, mock_recommendations_service, _, _, _ = client
+    mock_recommendations_service.get_batch_outfit_recommendations.side_effect = RateLimitError(
+        "Daily rate limit exceeded"
+    )
+
+    response = test_client.post('/recommend/wear/batch', json={"situations": ["a", "b"]})
+
+    assert response.status_code == 429
+    assert response.json["type"] == "rate_limit"
+    assert 'Retry-After' not in response.headers
+
+def test_recommend_outfits_batch_burst_limited(client):
+    test_client, mock_recommendations_service, _, _, _ = client
+    mock_recommendations_service.get_batch_outfit_recommendations.side_effect = RateLimitError(
+        "Too many requests", retry_after=12
+    )
+
+    response = test_client.post('/recommend/wear/batch', json={"situations": ["a", "b"]})
+
+    assert response.status_code == 429
+    assert response.json["retry_after"] == 12
+    assert response.headers['Retry-After'] == '12'
+
+@pytest.fixture
+def idempotent_client(mock_recommendations_service, mock_interactions_service,
+                      mock_trips_service, mock_text_transformations_service):
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+
+    def fake_requires_auth(f):
+        def wrapped(*args, **kwargs):
+            request.user = MOCK_USER
+            return f(*args, **kwargs)
+        wrapped.__name__ = f.__name__
+        return wrapped
+
+    from app.routes import recommendations
+    recommendations.requires_auth = fake_requires_auth
+
+    from app.routes.recommendations import init_recommendation_routes
+    init_recommendation_routes(app, mock_recommendations_service, mock_interactions_service,
+                               mock_trips_service, mock_text_transformations_service,
+                               idempotency_service=IdempotencyService(InMemoryIdempotencyStore()))
+
+    with app.test_client() as test_client:
+        yield test_client, mock_recommendations_service, mock_interactions_service
+
+def test_idempotency_key_replays_response(idempotent_client):
+    test_client, mock_recommendations_service, mock_interactions_service = idempotent_client
+    recommendation = {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+    mock_recommendations_service.get_outfit_recommendation.return_value = recommendation
+    mock_interactions_service.save_recommendation_interaction.return_value = "rec_1"
+    headers = {"Idempotency-Key": "abc"}
+
+    first = test_client.post('/recommend/wear', json={"situation": "casual dinner"}, headers=headers)
+    second = test_client.post('/recommend/wear', json={"situation": "casual dinner"}, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json == second.json
+    assert second.headers["Idempotent-Replayed"] == "true"
+    mock_recommendations_service.get_outfit_recommendation.assert_called_once()
+    mock_interactions_service.save_recommendation_interaction.assert_called_once()
+
+def test_idempotency_key_with_different_body(idempotent_client):
+    test_client, mock_recommendations_service, mock_interactions_service = idempotent_client
+    mock_recommendations_service.get_items_to_buy_recommendation.return_value = {"item": "Loafers"}
+    mock_interactions_service.save_purchase_recommendation_interaction.return_value = "buy_1"
+    headers = {"Idempotency-Key": "abc"}
+
+    test_client.post('/recommend/buy', json={"situation": "casual dinner"}, headers=headers)
+    response = test_client.post('/recommend/buy', json={"situation": "wedding"}, headers=headers)
+
+    assert response.status_code == 422
+    assert response.json["type"] == "idempotency_conflict"
+
+def test_idempotency_key_failed_request_is_not_stored(idempotent_client):
+    test_client, mock_recommendations_service, mock_interactions_service = idempotent_client
+    mock_interactions_service.save_recommendation_interaction.return_value = "rec_1"
+    mock_recommendations_service.get_outfit_recommendation.side_effect = [
+        RateLimitError("Daily rate limit exceeded"),
+        {"top": "Black t-shirt"}
+    ]
+    headers = {"Idempotency-Key": "abc"}
+
+    first = test_client.post('/recommend/wear', json={"situation": "casual dinner"}, headers=headers)
+    second = test_client.post('/recommend/wear', json={"situation": "casual dinner"}, headers=headers)
+
+    assert first.status_code == 429
+    assert second.status_code == 200
+    assert mock_recommendations_service.get_outfit_recommendation.call_count == 2
+
+@pytest.fixture
+def async_client(mock_recommendations_service, mock_interactions_service,
+                 mock_trips_service, mock_text_transformations_service):
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+
+    def fake_requires_auth(f):
+        def wrapped(*args, **kwargs):
+            request.user = MOCK_USER
+            return f(*args, **kwargs)
+        wrapped.__name__ = f.__name__
+        return wrapped
+
+    from app.routes import recommendations
+    recommendations.requires_auth = fake_requires_auth
+
+    jobs_service = JobsService(InMemoryJobStore(), max_workers=1, max_queue_depth=0)
+    from app.routes.recommendations import init_recommendation_routes
+    init_recommendation_routes(app, mock_recommendations_service, mock_interactions_service,
+                               mock_trips_service, mock_text_transformations_service,
+                               jobs_service=jobs_service)
+
+    with app.test_client() as test_client:
+        yield test_client, mock_recommendations_service, mock_interactions_service, jobs_service
+    jobs_service.executor.shutdown(wait=True)
+
+def test_recommend_outfit_async(async_client):
+    test_client, mock_recommendations_service, mock_interactions_service, jobs_service = async_client
+    recommendation = {"top": "Black t-shirt", "bottom": "Blue jeans", "shoes": "White sneakers"}
+    mock_recommendations_service.get_outfit_recommendation.return_value = recommendation
+    mock_interactions_service.save_recommendation_interaction.return_value = "rec_1"
+
+    response = test_client.post('/recommend/wear?async=1', json={"situation": "casual dinner"})
+
+    assert response.status_code == 202
+    job_id = response.json["job_id"]
+    assert response.headers["Location"] == f"/jobs/{job_id}"
+
+    jobs_service.executor.shutdown(wait=True)
+    job = jobs_service.get_job(MOCK_USER["sub"], job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"outfit": recommendation, "interaction_id": "rec_1"}
+
+def test_recommend_outfit_async_error_is_stored(async_client):
+    test_client, mock_recommendations_service, _, jobs_service = async_client
+    mock_recommendations_service.get_outfit_recommendation.side_effect = InsufficientWardrobeError("Need more")
+
+    response = test_client.post('/recommend/wear?async=1', json={"situation": "casual dinner"})
+
+    jobs_service.executor.shutdown(wait=True)
+    job = jobs_service.get_job(MOCK_USER["sub"], response.json["job_id"])
+    assert job["status"] == "failed"
+    assert job["status_code"] == 400
+    assert job["result"]["type"] == "insufficient_wardrobe"
+
+def test_recommend_outfit_async_queue_full(async_client):
+    test_client, mock_recommendations_service, mock_interactions_service, jobs_service = async_client
+    release = threading.Event()
+    mock_interactions_service.save_purchase_recommendation_interaction.return_value = "buy_1"
+    mock_recommendations_service.get_items_to_buy_recommendation.side_effect = lambda *args: release.wait(timeout=2)
+
+    first = test_client.post('/recommend/buy?async=1', json={"situation": "wedding"})
+    second = test_client.post('/recommend/buy?async=1', json={"situation": "wedding"})
+    release.set()
+
+    assert first.status_code == 202
+    assert second.status_code == 503
+    assert second.headers["Retry-After"] == str(Config.JOB_RETRY_AFTER_SECONDS)
+
+def test_recommend_outfit_llm_overloaded(client):
+    test_client, mock_recommendations_service, _, _, _ = client
+    mock_recommendations_service.get_outfit_recommendation.side_effect = LLMOverloadedError(
+        "Too many concurrent requests (queue_full)", retry_after=2
+    )
+
+    response = test_client.post('/recommend/wear', json={"situation": "casual dinner"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert response.json["type"] == "overloaded"
@@ -4,7 +4,9 @@ from app.services.trips import TripNotFoundError
 
 @pytest.fixture
 def mock_trips_service():
-    return Mock()
+    service = Mock()
+    service.get_trips_etag.return_value = "trips-v1"
+    return service
 
 @pytest.fixture
 def client(mock_trips_service):
@@ -89,4 +91,16 @@ def test_delete_trip_not_found(client):
     
     # Assert
     assert response.status_code == 500
-    assert 'Trip trip_123 not found' in response.json['error'] 
\ No newline at end of file
+    assert 'Trip trip_123 not found' in response.json['error'] 
+def test_get_user_trip_not_modified(client):
+    test_client, mock_trips_service = client
+    mock_trips_service.get_user_trip.return_value = {"tripId": "trip_123"}
+
+    response = test_client.get('/trips')
+    assert response.headers['ETag'] == '"trips-v1"'
+
+    response = test_client.get('/trips', headers={'If-None-Match': '"trips-v1"'})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    mock_trips_service.get_user_trip.assert_called_once()
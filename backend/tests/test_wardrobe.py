@@ -25,6 +25,8 @@ def client():
 
     # Provide a mocked DynamoDB client
     mock_dynamodb = MagicMock()
+    mock_dynamodb.get_wardrobe_cursor.return_value = 0
+    mock_dynamodb.get_wardrobe_etag.return_value = "wardrobe-v1"
     init_wardrobe_routes(app, mock_dynamodb)
 
     with app.test_client() as test_client:
@@ -96,3 +98,123 @@ def test_delete_wardrobe_item_failure(client):
     assert response.status_code == 500
     assert data == {"error": "Failed to delete item"}
     mock_dynamodb.delete_wardrobe_item.assert_called_once_with(MOCK_USER["sub"], item_id)
+
+def test_add_wardrobe_item_reports_duplicates(client):
+    test_client, mock_dynamodb = client
+    mock_dynamodb.find_duplicates.return_value = [{"itemId": "abc", "description": "Blue jeans"}]
+
+    response = test_client.post("/wardrobe", json={"description": "jeans, blue"})
+
+    assert response.status_code == 201
+    assert response.get_json()["duplicateOf"] == ["abc"]
+    mock_dynamodb.add_wardrobe_item.assert_called_once()
+
+def test_get_wardrobe_items_by_category(client):
+    test_client, mock_dynamodb = client
+    mock_dynamodb.get_wardrobe_items.return_value = [{"itemId": "abc", "description": "Blue jeans"}]
+
+    response = test_client.get("/wardrobe?category=bottom")
+
+    assert response.status_code == 200
+    mock_dynamodb.get_wardrobe_items.assert_called_once_with(MOCK_USER["sub"], category="bottom")
+
+def test_get_wardrobe_items_invalid_category(client):
+    test_client, mock_dynamodb = client
+
+    response = test_client.get("/wardrobe?category=hats")
+
+    assert response.status_code == 400
+    mock_dynamodb.get_wardrobe_items.assert_not_called()
+
+def test_search_wardrobe_items(client):
+    test_client, mock_dynamodb = client
+    mock_dynamodb.search_wardrobe_items.return_value = [{"itemId": "abc", "description": "Navy blazer"}]
+
+    response = test_client.get("/wardrobe/search?q=navy%20bla&limit=5")
+
+    assert response.status_code == 200
+    assert response.get_json()["items"] == [{"itemId": "abc", "description": "Navy blazer"}]
+    mock_dynamodb.search_wardrobe_items.assert_called_once_with(MOCK_USER["sub"], "navy bla", limit=5)
+
+def test_search_wardrobe_items_missing_query(client):
+    test_client, mock_dynamodb = client
+
+    response = test_client.get("/wardrobe/search?q=%20")
+
+    assert response.status_code == 400
+    mock_dynamodb.search_wardrobe_items.assert_not_called()
+
+def test_get_wardrobe_items_includes_cursor(client):
+    test_client, mock_dynamodb = client
+    mock_dynamodb.get_wardrobe_items.return_value = []
+    mock_dynamodb.get_wardrobe_cursor.return_value = 12
+
+    response = test_client.get("/wardrobe")
+
+    assert response.get_json() == {"items": [], "cursor": 12}
+
+def test_get_wardrobe_changes(client):
+    test_client, mock_dynamodb = client
+    changes = {"changes": [{"op": "delete", "itemId": "abc"}], "cursor": 13, "hasMore": False}
+    mock_dynamodb.get_wardrobe_changes.return_value = changes
+
+    response = test_client.get("/wardrobe/changes?since=12")
+
+    assert response.status_code == 200
+    assert response.get_json() == changes
+    mock_dynamodb.get_wardrobe_changes.assert_called_once_with(MOCK_USER["sub"], 12)
+
+def test_get_wardrobe_changes_invalid_cursor(client):
+    test_client, mock_dynamodb = client
+
+    assert test_client.get("/wardrobe/changes").status_code == 400
+    assert test_client.get("/wardrobe/changes?since=-1").status_code == 400
+    mock_dynamodb.get_wardrobe_changes.assert_not_called()
+
+def test_get_wardrobe_changes_expired_cursor(client):
+    from app.services.wardrobe_changes import CursorExpiredError
+    test_client, mock_dynamodb = client
+    mock_dynamodb.get_wardrobe_changes.side_effect = CursorExpiredError("too old")
+
+    response = test_client.get("/wardrobe/changes?since=1")
+
+    assert response.status_code == 410
+    assert response.get_json()["type"] == "resync_required"
+
+def test_get_wardrobe_items_not_modified(client):
+    test_client, mock_dynamodb = client
+
+    response = test_client.get("/wardrobe?category=top", headers={"If-None-Match": '"wardrobe-v1"'})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"wardrobe-v1"'
+    mock_dynamodb.get_wardrobe_etag.assert_called_once_with(MOCK_USER["sub"], "top")
+    mock_dynamodb.get_wardrobe_items.assert_not_called()
+
+def test_get_wardrobe_items_modified(client):
+    test_client, mock_dynamodb = client
+    mock_dynamodb.get_wardrobe_items.return_value = []
+
+    response = test_client.get("/wardrobe", headers={"If-None-Match": '"wardrobe-v0"'})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"wardrobe-v1"'
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+def test_delete_wardrobe_items_inline(client):
+    test_client, mock_dynamodb = client
+    mock_dynamodb.delete_wardrobe_items.return_value = 2
+
+    response = test_client.post("/wardrobe/delete", json={"itemIds": ["a", "b"]})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"deleted": 2}
+    assert mock_dynamodb.delete_wardrobe_items.call_args.args == (MOCK_USER["sub"], ["a", "b"])
+
+def test_delete_wardrobe_items_invalid(client):
+    test_client, mock_dynamodb = client
+
+    assert test_client.post("/wardrobe/delete", json={"itemIds": []}).status_code == 400
+    assert test_client.post("/wardrobe/delete", json={"itemIds": [1]}).status_code == 400
+    assert test_client.post("/wardrobe/delete", json={}).status_code == 400
+    mock_dynamodb.delete_wardrobe_items.assert_not_called()
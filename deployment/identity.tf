@@ -34,9 +34,12 @@ resource "aws_iam_policy" "dynamodb_access" {
           module.dynamodb.interactions_table_arn,
           "${module.dynamodb.interactions_table_arn}/index/*",
           module.dynamodb.rate_limits_table_arn,
-          "${module.dynamodb.rate_limits_table_arn}/index/*",
           module.dynamodb.trips_table_arn,
-          "${module.dynamodb.trips_table_arn}/index/*"
+          "${module.dynamodb.trips_table_arn}/index/*",
+          module.dynamodb.idempotency_keys_table_arn,
+          module.dynamodb.jobs_table_arn,
+          module.dynamodb.feedback_affinity_table_arn,
+          module.dynamodb.wardrobe_changes_table_arn
         ]
       }
     ]
@@ -70,10 +70,10 @@ resource "aws_dynamodb_table" "rate_limits" {
     type = "S"
   }
 
-  global_secondary_index {
-    name               = "UserIdIndex"
-    hash_key           = "userId"
-    projection_type    = "ALL"
+  # Daily counters expire RATE_LIMIT_RETENTION_DAYS after their day
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
   }
 
   tags = var.tags
@@ -104,4 +104,84 @@ resource "aws_dynamodb_table" "trips" {
   }
 
   tags = var.tags
-} 
\ No newline at end of file
+}
+
+resource "aws_dynamodb_table" "idempotency_keys" {
+  name         = "${var.environment}-idempotency-keys"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "idempotencyKey"
+
+  attribute {
+    name = "idempotencyKey"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+resource "aws_dynamodb_table" "jobs" {
+  name         = "${var.environment}-jobs"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "jobId"
+
+  attribute {
+    name = "jobId"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+resource "aws_dynamodb_table" "feedback_affinity" {
+  name         = "${var.environment}-feedback-affinity"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "userId"
+  range_key    = "affinityKey"
+
+  attribute {
+    name = "userId"
+    type = "S"
+  }
+
+  attribute {
+    name = "affinityKey"
+    type = "S"
+  }
+
+  # Affinities expire FEEDBACK_AFFINITY_RETENTION_DAYS after their last feedback
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+resource "aws_dynamodb_table" "wardrobe_changes" {
+  name         = "${var.environment}-wardrobe-changes"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "userId"
+  range_key    = "seq"
+
+  attribute {
+    name = "userId"
+    type = "S"
+  }
+
+  attribute {
+    name = "seq"
+    type = "N"
+  }
+
+  tags = var.tags
+}
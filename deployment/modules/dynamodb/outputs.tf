@@ -36,4 +36,44 @@ output "trips_table_name" {
 output "trips_table_arn" {
   description = "ARN of the trips DynamoDB table"
   value       = aws_dynamodb_table.trips.arn
-} 
\ No newline at end of file
+}
+
+output "idempotency_keys_table_name" {
+  description = "Name of the idempotency keys DynamoDB table"
+  value       = aws_dynamodb_table.idempotency_keys.name
+}
+
+output "idempotency_keys_table_arn" {
+  description = "ARN of the idempotency keys DynamoDB table"
+  value       = aws_dynamodb_table.idempotency_keys.arn
+}
+
+output "jobs_table_name" {
+  description = "Name of the jobs DynamoDB table"
+  value       = aws_dynamodb_table.jobs.name
+}
+
+output "jobs_table_arn" {
+  description = "ARN of the jobs DynamoDB table"
+  value       = aws_dynamodb_table.jobs.arn
+}
+
+output "feedback_affinity_table_name" {
+  description = "Name of the feedback affinity DynamoDB table"
+  value       = aws_dynamodb_table.feedback_affinity.name
+}
+
+output "feedback_affinity_table_arn" {
+  description = "ARN of the feedback affinity DynamoDB table"
+  value       = aws_dynamodb_table.feedback_affinity.arn
+}
+
+output "wardrobe_changes_table_name" {
+  description = "Name of the wardrobe changes DynamoDB table"
+  value       = aws_dynamodb_table.wardrobe_changes.name
+}
+
+output "wardrobe_changes_table_arn" {
+  description = "ARN of the wardrobe changes DynamoDB table"
+  value       = aws_dynamodb_table.wardrobe_changes.arn
+}